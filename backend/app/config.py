@@ -46,10 +46,17 @@ class Settings(BaseSettings):
     
     # AI/LLM Configuration
     # Multiple Gemini API keys for redundancy (comma-separated)
-    # If one key hits quota, system rotates to the next
+    # Requests are spread across keys; a key that hits quota cools down
     gemini_api_key: str = ""  # Primary key (backwards compatible)
     gemini_api_keys: str = ""  # Multiple keys: "key1,key2,key3"
     gemini_model: str = "gemini-2.0-flash"
+    # Per-key limits enforced by the key pool (per process - divide by worker count)
+    gemini_rpm_per_key: int = 60
+    gemini_tpm_per_key: int = 1_000_000
+    gemini_max_concurrency_per_key: int = 4
+    gemini_key_cooldown_seconds: float = 60.0  # Key rests this long after a 429
+    gemini_queue_timeout_seconds: float = 120.0  # Max wait for a key with budget
+    gemini_stream_responses: bool = True  # Parse resume sections as they stream in
 
     def get_gemini_api_keys(self) -> list:
         """Get all Gemini API keys as a list, with fallback to single key."""
@@ -62,7 +69,20 @@ class Settings(BaseSettings):
             keys = [self.gemini_api_key]
         return keys
     
-    # Vector Search (Pinecone)
+    # Vector Search
+    vector_backend: str = "pinecone"  # "pinecone" or "local" (in-process, memory-mapped)
+    vector_dimension: int = 768  # Gemini embedding dimension
+    vector_index_dir: str = ""  # Local backend files; defaults to data/vector_index (never under static/)
+    vector_ann_min_vectors: int = 50_000  # Local backend builds an IVF index from this size (0 = always exact)
+    vector_ann_lists: int = 0  # IVF lists (0 = sqrt of corpus size)
+    vector_ann_probes: int = 8  # IVF lists searched per query
+    embedding_model: str = "embedding-001"
+    embedding_batch_size: int = 100  # Texts per embed_content call
+    embedding_cache_size: int = 1024  # In-process LRU in front of the embedding_cache table
+    vector_upsert_batch_size: int = 100  # Vectors per upsert request when re-indexing
+    candidate_search_rerank_limit: int = 1000  # Skill matches re-ranked by vector similarity per search
+    candidate_index_ttl_seconds: int = 300  # Reload the skill -> profiles index to see other workers' changes
+    candidate_query_cache_size: int = 512  # Parsed HR queries kept in memory
     pinecone_api_key: str = ""
     pinecone_index_name: str = "candidate-profiles"
     pinecone_environment: str = "us-east-1"
@@ -72,6 +92,80 @@ class Settings(BaseSettings):
     cloudinary_api_key: str = ""
     cloudinary_api_secret: str = ""
 
+    # Optional shared cache backend (e.g. "redis://localhost:6379/0")
+    # Leave empty to use per-worker in-process caches only
+    redis_url: str = ""
+
+    # Test session payload cache (question list served by /api/tests/start)
+    test_session_cache_size: int = 256  # Max tests held per worker
+    test_session_cache_ttl_seconds: int = 300  # Bounds staleness across workers
+
+    # Write-behind buffer for auto-save/submit-answer
+    answer_buffer_flush_interval_seconds: float = 1.0
+    answer_buffer_max_pending: int = 500  # Flush early once this many answers are queued
+
+    # Attempt timing cache used by heartbeats
+    attempt_cache_size: int = 20000
+    attempt_cache_ttl_seconds: int = 120  # Re-sync with DB (other workers' changes)
+    attempt_activity_flush_interval_seconds: float = 30.0
+
+    # Compiled answer keys used to score attempts
+    answer_key_cache_size: int = 256
+    answer_key_cache_ttl_seconds: int = 300  # Bounds staleness across workers
+
+    # Shared outbound HTTP client (Supabase, Cloudinary, content proxy)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_timeout_seconds: float = 60.0
+
+    # Streaming uploads to Supabase Storage (see supabase_upload)
+    upload_stream_chunk_bytes: int = 256 * 1024  # Read size while streaming a body
+    supabase_resumable_threshold_bytes: int = 20 * 1024 * 1024  # TUS upload from this size
+    supabase_tus_chunk_bytes: int = 6 * 1024 * 1024  # Supabase requires 6MB TUS chunks
+    supabase_tus_max_retries: int = 3  # Consecutive failed PATCHes before giving up
+
+    # Resumable chunked uploads of answer files and proctoring videos (see chunked_upload)
+    upload_staging_dir: str = ""  # Defaults to data/upload_staging (never under static/)
+    upload_chunk_bytes: int = 5 * 1024 * 1024  # Request body size per chunk PUT
+    upload_max_answer_file_bytes: int = 100 * 1024 * 1024
+    upload_max_video_bytes: int = 1024 * 1024 * 1024
+    upload_session_ttl_hours: int = 48  # Unfinished sessions and their chunks are purged after this
+    upload_processing_timeout_minutes: int = 30  # PROCESSING longer than this = push died, back to FAILED
+
+    # On-disk cache for documents served by /api/tests/content-proxy
+    document_cache_dir: str = ""  # Defaults to data/doc_cache (never under static/)
+    document_cache_max_bytes: int = 2 * 1024 * 1024 * 1024  # 2GB total
+    document_cache_max_file_bytes: int = 100 * 1024 * 1024  # Skip files larger than this
+
+    # Resume parsing queue (resume_parsing_jobs table)
+    resume_parse_concurrency: int = 2  # Parsing workers per process
+    resume_queue_poll_seconds: float = 5.0  # Picks up jobs queued by other workers
+    resume_job_stale_seconds: int = 300  # Re-queue PROCESSING jobs older than this
+    resume_parse_cache_size: int = 128  # In-process LRU in front of resume_parse_results
+
+    # Resume page rasterization (scanned pages sent to Gemini as images)
+    resume_max_pages: int = 10  # Later pages are ignored
+    resume_raster_target_px: int = 1600  # Long edge of a rendered page
+    resume_raster_max_dpi: int = 150
+    resume_raster_grayscale: bool = True
+    resume_raster_format: str = "jpeg"  # jpeg, webp or png
+    resume_raster_quality: int = 80
+    resume_raster_memory_budget_bytes: int = 32 * 1024 * 1024  # Pixmap + encoded pages per job
+
+    # Skill name -> id dictionary used when applying parsed resumes
+    skill_dictionary_ttl_seconds: int = 300  # Reload to pick up other workers' skills
+
+    # Process pool for CPU-bound resume work (0 = run in threads instead)
+    cpu_pool_workers: int = 2
+
+    # Thread pools for blocking SDK calls, one per service (see blocking_io)
+    cloudinary_io_workers: int = 4
+    cloudinary_io_timeout_seconds: float = 300.0  # Video uploads can be large
+    pinecone_io_workers: int = 8
+    pinecone_io_timeout_seconds: float = 30.0
+    genai_io_workers: int = 8
+    genai_io_timeout_seconds: float = 60.0
+
     class Config:
         env_file = ".env"
         extra = "ignore"
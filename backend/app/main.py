@@ -6,7 +6,18 @@ import os
 
 from .config import get_settings
 from .database import init_db
+from .services.answer_buffer import answer_buffer
+from .services.attempt_cache import attempt_cache
+from .services.http_client import close_http_client
+from .services.resume_queue import resume_queue
+from .services.cpu_pool import cpu_pool
+from .services.blocking_io import blocking_io
+from .services.chunked_upload import chunked_uploads
+from .services.skill_dictionary import skill_dictionary
+from .services.evaluation import rescore_job
+from .services.profile_index import reindex_job
 from .routers import auth_router, jobs_router, courses_router, assessments_router, admin_router, tests_router, profile_router, notification_router, standalone_assessments_router
+from .routers.profile import process_resume_job
 
 settings = get_settings()
 
@@ -15,9 +26,22 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    answer_buffer.start()
+    attempt_cache.start()
+    cpu_pool.start()
+    await skill_dictionary.warm_up()
+    resume_queue.start(process_resume_job)
     yield
-    # Shutdown
-    pass
+    # Shutdown - never lose buffered answers
+    await resume_queue.stop()
+    await chunked_uploads.stop()
+    await rescore_job.stop()
+    await reindex_job.stop()
+    await answer_buffer.stop()
+    await attempt_cache.stop()
+    cpu_pool.stop()
+    blocking_io.shutdown()
+    await close_http_client()
 
 
 app = FastAPI(
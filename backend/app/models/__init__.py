@@ -11,7 +11,10 @@ from .profile import (
     profile_skills
 )
 from .notification import Notification, UserNotification, NotificationType, TargetAudience
-from .resume_job import ResumeParsingJob, ResumeParsingStatus
+from .resume_job import ResumeParsingJob, ResumeParsingStatus, ResumeParseResult
+from .embedding import EmbeddingCacheEntry
+from .upload import UploadSession, UploadChunk, UploadStatus, UploadKind
+from .job_run import JobRun
 
 __all__ = [
     "User", "UserRole",
@@ -28,5 +31,11 @@ __all__ = [
     # Notification models
     "Notification", "UserNotification", "NotificationType", "TargetAudience",
     # Resume parsing job
-    "ResumeParsingJob", "ResumeParsingStatus"
+    "ResumeParsingJob", "ResumeParsingStatus", "ResumeParseResult",
+    # Embedding cache
+    "EmbeddingCacheEntry",
+    # Chunked uploads
+    "UploadSession", "UploadChunk", "UploadStatus", "UploadKind",
+    # Admin background jobs
+    "JobRun"
 ]
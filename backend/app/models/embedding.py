@@ -0,0 +1,26 @@
+"""
+Embedding Cache Model - Gemini embeddings keyed by model and text hash.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, UniqueConstraint
+from ..database import Base
+
+
+class EmbeddingCacheEntry(Base):
+    """
+    float32 embedding bytes keyed by (model, SHA-256 of the text).
+
+    Unchanged profile summaries and repeated HR queries are never re-embedded.
+    Read through app/services/embedding_cache.py.
+    """
+    __tablename__ = "embedding_cache"
+    __table_args__ = (
+        UniqueConstraint("model", "text_hash", name="uq_embedding_cache_model_hash"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    model = Column(String(64), nullable=False)
+    text_hash = Column(String(64), nullable=False)
+    dimension = Column(Integer, nullable=False)
+    embedding = Column(LargeBinary, nullable=False)  # float32, little-endian
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
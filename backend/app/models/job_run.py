@@ -0,0 +1,27 @@
+"""
+Job Run Model - State of singleton admin background jobs, shared by all workers.
+"""
+from sqlalchemy import Column, String, Text, DateTime
+from ..database import Base
+
+
+class JobRun(Base):
+    """
+    Current/last run of one named background job (re-evaluation, re-index).
+
+    One row per job name. A run is claimed with a conditional UPDATE, so only
+    one worker runs it at a time and every worker reports the same status.
+    Driven by app/services/job_runs.py.
+    """
+    __tablename__ = "job_runs"
+
+    name = Column(String(50), primary_key=True)
+    run_id = Column(String(32), nullable=True)  # Random token of the current run
+    state = Column(String(20), nullable=False, default="idle")  # running, completed, failed
+    params = Column(Text, nullable=True)  # JSON
+    progress = Column(Text, nullable=True)  # JSON, last reported totals
+    error = Column(Text, nullable=True)
+
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Refreshed while running
+    finished_at = Column(DateTime(timezone=True), nullable=True)
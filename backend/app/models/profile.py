@@ -60,6 +60,7 @@ class CandidateProfile(Base):
     # Professional summary (elaborate, 200-400 words for vector search)
     professional_summary = Column(Text, nullable=True)
     summary_embedding_id = Column(String(100), nullable=True)  # Pinecone vector ID
+    summary_embedding_hash = Column(String(64), nullable=True)  # Hash of the indexed summary + metadata
     
     # Contact & Links
     linkedin_url = Column(String(500), nullable=True)
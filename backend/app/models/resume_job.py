@@ -1,9 +1,10 @@
 """
 Resume Parsing Job Model - Tracks background resume processing status.
+Resume Parse Result Model - Parse results cached by PDF content hash.
 """
 from enum import Enum
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint, Enum as SQLEnum
 from ..database import Base
 
 
@@ -19,14 +20,23 @@ class ResumeParsingJob(Base):
     """
     Tracks resume parsing jobs for background processing.
     Allows users to check status without blocking.
+
+    Doubles as the work queue: PENDING rows are claimed by the resume
+    queue workers (app/services/resume_queue.py).
     """
     __tablename__ = "resume_parsing_jobs"
+    __table_args__ = (
+        # Queue claim: oldest PENDING job first
+        Index("idx_resume_jobs_status_id", "status", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     # File info
     resume_filename = Column(String(255), nullable=False)
+    # Stored file to parse (jobs never carry the PDF bytes themselves)
+    resume_url = Column(String(500), nullable=True)
     
     # Status tracking
     status = Column(
@@ -35,9 +45,34 @@ class ResumeParsingJob(Base):
         nullable=False
     )
     error_message = Column(Text, nullable=True)
-    retry_count = Column(Integer, default=0)
+    retry_count = Column(Integer, default=0)  # User retries (/retry-resume)
+    interrupt_count = Column(Integer, default=0)  # Workers that died mid-job (resume_queue)
+    claim_token = Column(String(32), nullable=True)  # Current worker's claim; its writes must match
+    # Sections parsed so far while Gemini is still streaming (JSON)
+    partial_result = Column(Text, nullable=True)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Refreshed while a worker parses
     completed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ResumeParseResult(Base):
+    """
+    Normalized ParsedResume JSON keyed by SHA-256 of the PDF bytes.
+
+    parser_version changes with the prompt/model, so stale results are
+    simply never looked up again. Read through app/services/resume_parse_cache.py.
+    """
+    __tablename__ = "resume_parse_results"
+    __table_args__ = (
+        UniqueConstraint("content_hash", "parser_version", name="uq_resume_parse_hash_version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)
+    parser_version = Column(String(32), nullable=False)
+    result = Column(Text, nullable=False)  # ParsedResume JSON
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
@@ -1,7 +1,7 @@
 """
 Division, Question, Test models for the assessment system
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -187,15 +187,28 @@ class TestAttempt(Base):
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     time_taken_seconds = Column(Integer, nullable=True)
+    last_activity = Column(DateTime(timezone=True), nullable=True)  # Updated by heartbeat (batched)
     
     # Relationships
     test = relationship("Test", back_populates="attempts")
     answers = relationship("UserAnswer", back_populates="attempt")
 
 
+# Admin results list: completed attempts newest first, keyset paged on
+# (completed_at, id). NULLS LAST ordering in an index is Postgres-only.
+Index(
+    "idx_test_attempts_status_completed",
+    TestAttempt.status, TestAttempt.completed_at.desc().nulls_last(), TestAttempt.id.desc()
+).ddl_if(dialect="postgresql")
+
+
 class UserAnswer(Base):
     """Individual user answers for a test attempt"""
     __tablename__ = "user_answers"
+    __table_args__ = (
+        # One answer per question per attempt - required by the bulk upsert paths
+        Index("uq_user_answers_attempt_question", "attempt_id", "question_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     attempt_id = Column(Integer, ForeignKey("test_attempts.id"), nullable=False)
@@ -0,0 +1,68 @@
+"""
+Chunked Upload Models - Resumable uploads of answer files and proctoring videos.
+"""
+from enum import Enum
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index, PrimaryKeyConstraint
+from ..database import Base
+
+
+class UploadStatus(str, Enum):
+    """Status of a chunked upload session."""
+    UPLOADING = "uploading"    # Accepting chunks
+    PROCESSING = "processing"  # Assembling and pushing to cloud storage
+    COMPLETED = "completed"
+    FAILED = "failed"          # Push failed; /complete can be called again
+
+
+class UploadKind(str, Enum):
+    """What the uploaded file is for (decides validation and destination)."""
+    ANSWER_FILE = "answer_file"
+    PROCTORING_VIDEO = "proctoring_video"
+
+
+class UploadSession(Base):
+    """
+    One resumable upload: init, PUT chunk N, complete.
+
+    Chunks are staged on local disk; upload_chunks records which ones have
+    arrived so a client can resume after a disconnect.
+    Driven by app/services/chunked_upload.py.
+    """
+    __tablename__ = "upload_sessions"
+    __table_args__ = (
+        Index("idx_upload_sessions_attempt", "attempt_id", "kind"),
+    )
+
+    id = Column(String(32), primary_key=True)  # Random hex token
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    attempt_id = Column(Integer, ForeignKey("test_attempts.id"), nullable=False)
+    question_id = Column(Integer, nullable=True)  # Answer files only
+    kind = Column(String(32), nullable=False)
+
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=True)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+
+    status = Column(String(20), default=UploadStatus.UPLOADING.value, nullable=False)
+    file_url = Column(String(500), nullable=True)
+    error_message = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    processing_started_at = Column(DateTime(timezone=True), nullable=True)  # Last claim by /complete
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class UploadChunk(Base):
+    """A chunk of an upload session that has been written to staging."""
+    __tablename__ = "upload_chunks"
+    __table_args__ = (
+        PrimaryKeyConstraint("upload_id", "chunk_index"),
+    )
+
+    upload_id = Column(String(32), ForeignKey("upload_sessions.id", ondelete="CASCADE"), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    offset = Column(BigInteger, nullable=False)
+    size = Column(Integer, nullable=False)
+    received_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
@@ -4,11 +4,11 @@ Admin API endpoints for managing divisions, tests, questions, and candidates
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, or_, text, case
 from typing import List, Optional, Dict
 from datetime import datetime, timezone
 import os
-import io
+import base64
 import uuid
 import aiofiles
 import json
@@ -25,7 +25,25 @@ from ..schemas.test import (
     TestGenerateRequest, TestCreate, TestUpdate, TestResponse,
     AdminDashboardStats, CandidateListItem
 )
+from ..schemas.profile import SearchQuery, CandidateSearchResponse
 from ..services.auth import get_current_user
+from ..services.test_session_cache import test_session_cache
+from ..services.answer_buffer import answer_buffer
+from ..services.attempt_cache import attempt_cache
+from ..services.document_cache import document_cache, collect_document_urls
+from ..services.evaluation import answer_keys, rescore_job
+from ..services.resume_queue import resume_queue
+from ..services.resume_parse_cache import resume_parse_cache
+from ..services.resume_parser import extraction_stats
+from ..services.cpu_pool import cpu_pool
+from ..services.blocking_io import blocking_io
+from ..services.gemini_pool import gemini_pool
+from ..services.skill_dictionary import skill_dictionary
+from ..services.vector_search import vector_search_service
+from ..services.embedding_cache import embedding_cache
+from ..services.profile_index import reindex_job
+from ..services.candidate_search import candidate_search
+from ..services.chunked_upload import chunked_uploads
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -87,6 +105,90 @@ async def get_dashboard_stats(
     )
 
 
+@router.get("/metrics")
+async def get_runtime_metrics(
+    admin: User = Depends(require_admin)
+):
+    """In-process cache and write-buffer metrics for this worker"""
+    return {
+        "test_session_cache": test_session_cache.stats(),
+        "answer_buffer": answer_buffer.stats(),
+        "attempt_cache": attempt_cache.stats(),
+        "document_cache": document_cache.stats(),
+        "answer_keys": answer_keys.stats(),
+        "resume_queue": resume_queue.stats(),
+        "resume_parse_cache": resume_parse_cache.stats(),
+        "resume_extraction": extraction_stats.stats(),
+        "cpu_pool": cpu_pool.stats(),
+        "blocking_io": blocking_io.stats(),
+        "gemini_pool": gemini_pool.stats(),
+        "skill_dictionary": skill_dictionary.stats(),
+        "vector_search": vector_search_service.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "candidate_search": candidate_search.stats(),
+        "chunked_uploads": chunked_uploads.stats(),
+    }
+
+
+# ========== Re-evaluation ==========
+
+@router.post("/evaluations/rescore")
+async def start_rescore(
+    test_id: Optional[int] = None,
+    after_id: int = 0,
+    chunk_size: int = 500,
+    admin: User = Depends(require_admin)
+):
+    """
+    Re-score completed attempts against the current answer keys in the background.
+    Pass after_id=<progress.last_attempt_id> to resume an interrupted run.
+    """
+    if chunk_size < 1 or chunk_size > 5000:
+        raise HTTPException(status_code=400, detail="chunk_size must be between 1 and 5000")
+    try:
+        return await rescore_job.start(test_id=test_id, after_id=after_id, chunk_size=chunk_size)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/evaluations/rescore")
+async def get_rescore_status(
+    admin: User = Depends(require_admin)
+):
+    """Progress of the current/last re-evaluation run (any worker)"""
+    return await rescore_job.status()
+
+
+# ========== Vector index ==========
+
+@router.post("/vector-index/reindex")
+async def start_reindex(
+    after_id: int = 0,
+    chunk_size: int = 500,
+    force: bool = False,
+    admin: User = Depends(require_admin)
+):
+    """
+    Re-index candidate profiles for vector search in the background; profiles
+    whose summary and metadata are unchanged are skipped unless force=true.
+    Pass after_id=<progress.last_profile_id> to resume an interrupted run.
+    """
+    if chunk_size < 1 or chunk_size > 5000:
+        raise HTTPException(status_code=400, detail="chunk_size must be between 1 and 5000")
+    try:
+        return await reindex_job.start(after_id=after_id, chunk_size=chunk_size, force=force)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/vector-index/reindex")
+async def get_reindex_status(
+    admin: User = Depends(require_admin)
+):
+    """Progress of the current/last re-index run (any worker)"""
+    return await reindex_job.status()
+
+
 # ========== Division CRUD ==========
 
 @router.get("/divisions", response_model=List[DivisionResponse])
@@ -221,6 +323,7 @@ async def update_division_documents(
     
     division.documents = documents
     await db.commit()
+    await test_session_cache.invalidate_all()
     
     return {"message": "Documents updated", "documents": documents}
 
@@ -279,6 +382,8 @@ async def create_question(
     db.add(question)
     await db.commit()
     await db.refresh(question)
+    await test_session_cache.invalidate_all()
+    answer_keys.invalidate_all()
     
     return question
 
@@ -302,6 +407,8 @@ async def update_question(
     
     await db.commit()
     await db.refresh(question)
+    await test_session_cache.invalidate_all()
+    answer_keys.invalidate_all()
     
     return question
 
@@ -324,6 +431,8 @@ async def delete_question(
     print(f"[DeleteQuestion] Found question: id={question.id}, is_active={question.is_active}")
     question.is_active = False
     await db.commit()
+    await test_session_cache.invalidate_all()
+    answer_keys.invalidate_all()
     print(f"[DeleteQuestion] Successfully soft-deleted question {question_id}")
 
     return {"message": "Question deleted", "question_id": question_id}
@@ -515,6 +624,8 @@ async def update_test(
     
     await db.commit()
     await db.refresh(test)
+    await test_session_cache.invalidate(test_id)
+    answer_keys.invalidate(test_id)
     
     division_name = None
     if test.division_id:
@@ -559,6 +670,13 @@ async def publish_test(
     
     test.is_published = True
     await db.commit()
+    await test_session_cache.invalidate(test_id)
+
+    # Build the session payload now and pre-warm its documents/media on local disk
+    from .tests import _get_session_payload
+    payload = await _get_session_payload(db, test_id)
+    if payload:
+        document_cache.schedule_prewarm(collect_document_urls(payload))
     
     return {"message": "Test published"}
 
@@ -578,6 +696,7 @@ async def delete_test(
     
     test.is_active = False
     await db.commit()
+    await test_session_cache.invalidate(test_id)
     
     return {"success": True, "message": "Test deleted"}
 
@@ -719,6 +838,27 @@ async def get_candidates(
     return candidates
 
 
+@router.post("/candidates/search", response_model=CandidateSearchResponse)
+async def search_candidates(
+    search: SearchQuery,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_admin)
+):
+    """
+    HR search: natural-language query plus optional skill / experience
+    filters. Candidates having any of the skills are ranked by skill match
+    and summary similarity; top_k is the page size.
+    """
+    return await candidate_search.search(
+        db,
+        search.query,
+        skill_filters=search.skill_filters,
+        min_experience=search.min_experience,
+        page=search.page,
+        page_size=search.top_k,
+    )
+
+
 @router.post("/candidates/{candidate_id}/approve")
 async def approve_candidate(
     candidate_id: int,
@@ -807,95 +947,197 @@ async def get_all_attempts(
 
 # ========== Test Results (for grading) ==========
 
+TEST_RESULTS_PASS_PERCENTAGE = 50
+
+
+def _test_results_query(
+    job_id: Optional[int] = None,
+    test_id: Optional[int] = None,
+    completed_from: Optional[datetime] = None,
+    completed_to: Optional[datetime] = None,
+    status: Optional[str] = None
+):
+    """
+    Completed attempts (standalone assessments excluded) joined with their
+    user, test, linked job and file answer in one statement, filters in SQL.
+    Only the columns the results list shows are selected.
+    """
+    # A test linked to several jobs is reported under the newest one
+    job_per_test = (
+        select(Job.test_id, func.max(Job.id).label("job_id"))
+        .where(Job.test_id.isnot(None))
+        .group_by(Job.test_id)
+        .subquery()
+    )
+    file_answer = (
+        select(func.max(UserAnswer.answer_text))
+        .where(UserAnswer.attempt_id == TestAttempt.id, UserAnswer.answer_text.like("FILE:%"))
+        .correlate(TestAttempt)
+        .scalar_subquery()
+    )
+    query = (
+        select(
+            TestAttempt.id, TestAttempt.user_id, TestAttempt.test_id, TestAttempt.score,
+            TestAttempt.total_marks, TestAttempt.percentage, TestAttempt.completed_at,
+            TestAttempt.tab_switches,
+            User.name.label("user_name"), User.email.label("user_email"),
+            Test.title.label("test_title"),
+            Job.id.label("job_id"), Job.role.label("job_title"), Job.company_name.label("company"),
+            file_answer.label("file_answer"),
+        )
+        .outerjoin(User, User.id == TestAttempt.user_id)
+        .outerjoin(Test, Test.id == TestAttempt.test_id)
+        .outerjoin(job_per_test, job_per_test.c.test_id == TestAttempt.test_id)
+        .outerjoin(Job, Job.id == job_per_test.c.job_id)
+        .where(TestAttempt.status == "completed")
+        .where(func.coalesce(Test.assessment_type, "") != "standalone_assessment")
+    )
+
+    if job_id:
+        query = query.where(TestAttempt.test_id.in_(select(Job.test_id).where(Job.id == job_id)))
+    if test_id:
+        query = query.where(TestAttempt.test_id == test_id)
+    if completed_from:
+        query = query.where(TestAttempt.completed_at >= completed_from)
+    if completed_to:
+        query = query.where(TestAttempt.completed_at < completed_to)
+    if status == "passed":
+        query = query.where(func.coalesce(TestAttempt.percentage, 0) >= TEST_RESULTS_PASS_PERCENTAGE)
+    elif status == "failed":
+        query = query.where(func.coalesce(TestAttempt.percentage, 0) < TEST_RESULTS_PASS_PERCENTAGE)
+
+    # Newest first; attempts without completed_at last
+    return query.order_by(
+        TestAttempt.completed_at.desc().nulls_last(), TestAttempt.id.desc()
+    )
+
+
+def _encode_results_cursor(completed_at: Optional[datetime], attempt_id: int) -> str:
+    payload = json.dumps({"c": completed_at.isoformat() if completed_at else None, "id": attempt_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+async def _test_results_page(db: AsyncSession, query, cursor: Optional[str], limit: int) -> list:
+    """
+    Up to limit + 1 rows after the cursor's (completed_at, id). The keyset
+    condition is written as a range on completed_at so it is an index bound;
+    attempts without completed_at (sorted last) are read after the others.
+    """
+    if not cursor:
+        return (await db.execute(query.limit(limit + 1))).all()
+
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        completed_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        attempt_id = int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    rows = []
+    if completed_at is not None:
+        rows = (await db.execute(
+            query.where(
+                TestAttempt.completed_at <= completed_at,
+                or_(TestAttempt.completed_at < completed_at, TestAttempt.id < attempt_id),
+            ).limit(limit + 1)
+        )).all()
+        attempt_id = None
+    if len(rows) <= limit:
+        null_rows = query.where(TestAttempt.completed_at.is_(None))
+        if attempt_id is not None:
+            null_rows = null_rows.where(TestAttempt.id < attempt_id)
+        rows += (await db.execute(null_rows.limit(limit + 1 - len(rows)))).all()
+    return rows
+
+
+async def _count_test_results(db: AsyncSession, query, estimate: bool) -> dict:
+    """
+    Totals for the filtered results. Exact counts come from one aggregate
+    with the passed/failed split; on Postgres, estimate=True returns only the
+    planner's row estimate (no split) instead of scanning every match.
+    """
+    matched = query.order_by(None).subquery()
+    if estimate and db.bind.dialect.name == "postgresql":
+        count_query = select(func.count()).select_from(matched)
+        try:
+            compiled = count_query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+            result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            # The count node's input carries the estimated row count
+            return {"total": int(plan[0]["Plan"]["Plans"][0]["Plan Rows"]), "passed": None,
+                    "failed": None, "total_is_estimate": True}
+        except Exception as e:
+            print(f"[TestResults] Count estimate failed, counting exactly: {e}")
+
+    passed = func.coalesce(matched.c.percentage, 0) >= TEST_RESULTS_PASS_PERCENTAGE
+    row = (await db.execute(
+        select(func.count(), func.coalesce(func.sum(case((passed, 1), else_=0)), 0)).select_from(matched)
+    )).one()
+    total, passed_count = row[0], int(row[1])
+    return {"total": total, "passed": passed_count, "failed": total - passed_count, "total_is_estimate": False}
+
+
+def _test_result_row(row) -> dict:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "user_name": row.user_name or "Unknown",
+        "user_email": row.user_email or "",
+        "test_id": row.test_id,
+        "test_title": row.test_title or f"Test #{row.test_id}",
+        "job_id": row.job_id,
+        "job_title": row.job_title,
+        "company": row.company,
+        "score": row.score or 0,
+        "max_score": row.total_marks or 100,
+        "percentage": row.percentage or 0,
+        "status": "passed" if (row.percentage or 0) >= TEST_RESULTS_PASS_PERCENTAGE else "failed",
+        "completed_at": row.completed_at.isoformat() if row.completed_at else None,
+        "tab_switches": row.tab_switches or 0,
+        "file_answer": row.file_answer,
+    }
+
+
 @router.get("/test-results")
 async def get_test_results(
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_admin),
-    job_id: Optional[int] = None
+    job_id: Optional[int] = None,
+    test_id: Optional[int] = None,
+    completed_from: Optional[datetime] = None,
+    completed_to: Optional[datetime] = None,
+    status: Optional[str] = Query(default=None, pattern="^(passed|failed)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    include_total: bool = False,
+    estimate_total: bool = True
 ):
-    """Get all completed test attempts with user, job, and score info (excludes standalone assessments)"""
-    
-    # Get all standalone assessment IDs to exclude them
-    standalone_result = await db.execute(
-        select(Test.id).where(Test.assessment_type == "standalone_assessment")
-    )
-    standalone_ids = [row[0] for row in standalone_result.all()]
-    
-    # Get completed attempts, excluding standalone assessments
-    query = select(TestAttempt).where(
-        TestAttempt.status == "completed"
-    )
-    
-    if standalone_ids:
-        query = query.where(TestAttempt.test_id.notin_(standalone_ids))
-    
-    query = query.order_by(TestAttempt.completed_at.desc())
-    
-    result = await db.execute(query)
-    attempts = result.scalars().all()
-    
-    if not attempts:
-        return []
-    
-    # Get user info separately
-    user_ids = list(set(a.user_id for a in attempts))
-    users_result = await db.execute(select(User).where(User.id.in_(user_ids)))
-    users = {u.id: u for u in users_result.scalars().all()}
-    
-    # Get test info
-    test_ids = list(set(a.test_id for a in attempts))
-    tests_result = await db.execute(select(Test).where(Test.id.in_(test_ids)))
-    tests = {t.id: t for t in tests_result.scalars().all()}
-    
-    # Get jobs linked to tests
-    from ..models.job import Job
-    jobs_result = await db.execute(select(Job).where(Job.test_id.in_(test_ids)))
-    jobs_by_test = {j.test_id: j for j in jobs_result.scalars().all()}
-    
-    # Filter by job if specified
-    if job_id:
-        job_test_ids = [tid for tid, j in jobs_by_test.items() if j.id == job_id]
-        attempts = [a for a in attempts if a.test_id in job_test_ids]
-    
-    # Check for file answers
-    attempt_ids = [a.id for a in attempts]
-    if attempt_ids:
-        answers_result = await db.execute(
-            select(UserAnswer).where(
-                UserAnswer.attempt_id.in_(attempt_ids),
-                UserAnswer.answer_text.like("FILE:%")
-            )
-        )
-        file_answers = {a.attempt_id: a.answer_text for a in answers_result.scalars().all()}
-    else:
-        file_answers = {}
-    
-    results = []
-    for a in attempts:
-        user = users.get(a.user_id)
-        test = tests.get(a.test_id)
-        job = jobs_by_test.get(a.test_id)
-        
-        results.append({
-            "id": a.id,
-            "user_id": a.user_id,
-            "user_name": user.name if user else "Unknown",
-            "user_email": user.email if user else "",
-            "test_id": a.test_id,
-            "test_title": test.title if test else f"Test #{a.test_id}",
-            "job_id": job.id if job else None,
-            "job_title": job.role if job else None,
-            "company": job.company_name if job else None,
-            "score": a.score or 0,
-            "max_score": a.total_marks or 100,
-            "percentage": a.percentage or 0,
-            "status": "passed" if (a.percentage or 0) >= 50 else "failed",
-            "completed_at": a.completed_at.isoformat() if a.completed_at else None,
-            "tab_switches": a.tab_switches or 0,
-            "file_answer": file_answers.get(a.id)
-        })
-    
-    return results
+    """
+    Completed test attempts with user, job, and score info (excludes standalone assessments).
+
+    Newest first, one page of `limit` rows per call: pass next_cursor back as
+    `cursor` for the next page (null on the last one). include_total adds the
+    total for the filters - a planner estimate unless estimate_total=false;
+    exact totals also carry the passed/failed split (null when estimated).
+    """
+    query = _test_results_query(job_id, test_id, completed_from, completed_to, status)
+
+    counts = {"total": None, "passed": None, "failed": None, "total_is_estimate": False}
+    if include_total:
+        counts = await _count_test_results(db, query, estimate_total)
+
+    # One extra row tells whether another page exists
+    rows = await _test_results_page(db, query, cursor, limit)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "results": [_test_result_row(row) for row in rows],
+        "next_cursor": _encode_results_cursor(rows[-1].completed_at, rows[-1].id) if has_more else None,
+        "limit": limit,
+        **counts,
+    }
 
 
 @router.get("/test-results/{result_id}/download")
@@ -968,42 +1210,13 @@ async def export_test_results_excel(
             detail="openpyxl not installed. Run: pip install openpyxl"
         )
     
-    # Get all test results using same logic as get_test_results
-    standalone_result = await db.execute(
-        select(Test.id).where(Test.assessment_type == "standalone_assessment")
-    )
-    standalone_ids = [row[0] for row in standalone_result.all()]
-    
-    query = select(TestAttempt).where(TestAttempt.status == "completed")
-    if standalone_ids:
-        query = query.where(TestAttempt.test_id.notin_(standalone_ids))
-    query = query.order_by(TestAttempt.completed_at.desc())
-    
-    result = await db.execute(query)
-    attempts = result.scalars().all()
-    
-    if not attempts:
-        raise HTTPException(status_code=404, detail="No test results found")
-    
-    # Get user, test, and job data
-    user_ids = list(set(a.user_id for a in attempts))
-    users_result = await db.execute(select(User).where(User.id.in_(user_ids)))
-    users = {u.id: u for u in users_result.scalars().all()}
-    
-    test_ids = list(set(a.test_id for a in attempts))
-    tests_result = await db.execute(select(Test).where(Test.id.in_(test_ids)))
-    tests = {t.id: t for t in tests_result.scalars().all()}
-    
-    from ..models.job import Job
-    jobs_result = await db.execute(select(Job).where(Job.test_id.in_(test_ids)))
-    jobs_by_test = {j.test_id: j for j in jobs_result.scalars().all()}
-    
-    # Filter by job if specified
-    if job_id:
-        job_test_ids = [tid for tid, j in jobs_by_test.items() if j.id == job_id]
-        attempts = [a for a in attempts if a.test_id in job_test_ids]
-        if not attempts:
-            raise HTTPException(status_code=404, detail="No results found for this job")
+    # Same joined query as get_test_results, without paging
+    result = await db.execute(_test_results_query(job_id=job_id))
+    rows = [_test_result_row(row) for row in result.all()]
+
+    if not rows:
+        detail = "No results found for this job" if job_id else "No test results found"
+        raise HTTPException(status_code=404, detail=detail)
     
     # Create Excel workbook
     wb = openpyxl.Workbook()
@@ -1036,26 +1249,25 @@ async def export_test_results_excel(
         cell.border = thin_border
     
     # Data rows
-    for row_num, attempt in enumerate(attempts, 2):
-        user = users.get(attempt.user_id)
-        test = tests.get(attempt.test_id)
-        job = jobs_by_test.get(attempt.test_id)
-        
-        status = "Passed" if (attempt.percentage or 0) >= 50 else "Failed"
-        completed = attempt.completed_at.strftime("%Y-%m-%d %H:%M") if attempt.completed_at else "N/A"
+    for row_num, row in enumerate(rows, 2):
+        status = "Passed" if row["status"] == "passed" else "Failed"
+        completed = (
+            datetime.fromisoformat(row["completed_at"]).strftime("%Y-%m-%d %H:%M")
+            if row["completed_at"] else "N/A"
+        )
         
         row_data = [
             row_num - 1,
-            user.name if user else "Unknown",
-            user.email if user else "",
-            job.role if job else "N/A",
-            job.company_name if job else "N/A",
-            test.title if test else f"Test #{attempt.test_id}",
-            attempt.score or 0,
-            attempt.total_marks or 100,
-            round(attempt.percentage or 0, 1),
+            row["user_name"],
+            row["user_email"],
+            row["job_title"] or "N/A",
+            row["company"] or "N/A",
+            row["test_title"],
+            row["score"],
+            row["max_score"],
+            round(row["percentage"], 1),
             status,
-            attempt.tab_switches or 0,
+            row["tab_switches"],
             completed
         ]
         
@@ -1079,7 +1291,6 @@ async def export_test_results_excel(
     output.seek(0)
     
     # Generate filename
-    from datetime import datetime
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     job_suffix = f"_job{job_id}" if job_id else "_all"
     filename = f"test_results{job_suffix}_{timestamp}.xlsx"
@@ -1214,10 +1425,7 @@ async def upload_file(
     # For HTML and Documents, use Supabase (more reliable for these file types)
     if file_type in ["html", "document"]:
         try:
-            from ..services.supabase_upload import upload_bytes_to_supabase
-
-            async with aiofiles.open(file_path, 'rb') as f:
-                content = await f.read()
+            from ..services.supabase_upload import upload_file_to_supabase
 
             # Determine content type
             if file_type == "html":
@@ -1230,11 +1438,13 @@ async def upload_file(
             supabase_path = f"{folder}/{unique_name}"
             print(f"[Upload] Attempting Supabase upload: bucket=division-docs, path={supabase_path}")
 
-            public_url = await upload_bytes_to_supabase(
-                content=content,
+            # Streamed from the temp file, never held in memory
+            public_url = await upload_file_to_supabase(
+                file_path,
                 bucket="division-docs",
                 file_path=supabase_path,
-                content_type=content_type_upload
+                content_type=content_type_upload,
+                upsert=True
             )
 
             # Clean up local file
@@ -1266,14 +1476,11 @@ async def upload_file(
 
     if file_type in ["video", "image"] and is_cloudinary_available():
         try:
-            async with aiofiles.open(file_path, 'rb') as f:
-                content = await f.read()
-                file_stream = io.BytesIO(content)
-
+            # The SDK reads the temp file itself (videos in chunks)
             if file_type == "video":
-                result = await upload_video(file_stream, folder="hiring-pro/test-media/videos")
+                result = await upload_video(file_path, folder="hiring-pro/test-media/videos")
             else:
-                result = await upload_image(file_stream, folder="hiring-pro/test-media/images")
+                result = await upload_image(file_path, folder="hiring-pro/test-media/images")
 
             if result:
                 try:
@@ -1467,6 +1674,8 @@ async def import_questions_from_excel(
     
     # Commit batch
     await db.commit()
+    await test_session_cache.invalidate_all()
+    answer_keys.invalidate_all()
     
     return {
         "success": True,
@@ -1681,7 +1890,7 @@ async def download_candidate_resume(
 ):
     """Admin endpoint to download a candidate's resume"""
     from fastapi.responses import FileResponse, StreamingResponse
-    import httpx
+    from ..services.http_client import get_http_client
     
     # Get candidate profile
     from ..models.profile import CandidateProfile
@@ -1716,12 +1925,11 @@ async def download_candidate_resume(
     
     # Handle remote URL (Supabase) - stream for scalability
     async def stream_from_url():
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            async with client.stream("GET", profile.resume_url) as response:
-                if response.status_code != 200:
-                    return
-                async for chunk in response.aiter_bytes(chunk_size=65536):
-                    yield chunk
+        async with get_http_client().stream("GET", profile.resume_url) as response:
+            if response.status_code != 200:
+                return
+            async for chunk in response.aiter_bytes(chunk_size=65536):
+                yield chunk
     
     return StreamingResponse(
         stream_from_url(),
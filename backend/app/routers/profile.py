@@ -2,6 +2,8 @@
 Profile Router - Resume upload, parsing, and profile CRUD operations
 """
 import asyncio
+import json
+import os
 from datetime import datetime, timezone
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
@@ -10,16 +12,20 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from ..database import get_db
-from ..models import User, CandidateProfile, Skill, Education, WorkExperience, Project
-from ..models import Certification, Publication, Award, UserLanguage
-from ..models import SkillCategory, ProficiencyLevel, LanguageProficiency
+from ..models import User, CandidateProfile, Skill
+from ..models import ProficiencyLevel, LanguageProficiency
 from ..models import ResumeParsingJob, ResumeParsingStatus
 from ..services.auth import get_current_user
 from ..services.resume_parser import (
-    parse_resume_with_gemini, parse_resume_safe, 
-    normalize_skill_name, deduplicate_skills
+    parse_resume_with_gemini, parse_resume_safe, deduplicate_skills
+)
+from ..services.vector_search import vector_search_service, profile_vector_metadata, profile_index_hash
+from ..services.resume_queue import resume_queue, ClaimedJob
+from ..services.skill_dictionary import skill_dictionary
+from ..services.candidate_search import candidate_search
+from ..services.profile_rows import (
+    add_child_rows, update_child_row, delete_child_row, replace_child_rows, replace_profile_skills
 )
-from ..services.vector_search import vector_search_service
 from ..schemas.profile import (
     ProfileResponse, ProfileUpdate,
     EducationCreate, EducationUpdate,
@@ -32,6 +38,13 @@ from ..schemas.profile import (
 
 router = APIRouter(prefix="/api/profile", tags=["Profile"])
 
+LANGUAGE_PROFICIENCY = {
+    "native": LanguageProficiency.NATIVE,
+    "fluent": LanguageProficiency.FLUENT,
+    "intermediate": LanguageProficiency.INTERMEDIATE,
+    "basic": LanguageProficiency.BASIC
+}
+
 
 # ============================================================================
 # Helper Functions
@@ -39,34 +52,10 @@ router = APIRouter(prefix="/api/profile", tags=["Profile"])
 
 async def get_or_create_skill(db: AsyncSession, name: str, category: str = "other") -> Skill:
     """Get existing skill or create new one."""
-    normalized = normalize_skill_name(name)
-    
-    result = await db.execute(
-        select(Skill).where(Skill.name == normalized)
-    )
-    skill = result.scalar_one_or_none()
-    
-    if not skill:
-        # Map category string to enum
-        category_map = {
-            "language": SkillCategory.LANGUAGE,
-            "framework": SkillCategory.FRAMEWORK,
-            "database": SkillCategory.DATABASE,
-            "cloud": SkillCategory.CLOUD,
-            "tool": SkillCategory.TOOL,
-            "soft_skill": SkillCategory.SOFT_SKILL,
-        }
-        skill_category = category_map.get(category, SkillCategory.OTHER)
-        
-        skill = Skill(
-            name=normalized,
-            display_name=name,
-            category=skill_category
-        )
-        db.add(skill)
-        await db.flush()  # Get the ID
-    
-    return skill
+    skills = await skill_dictionary.get_skills(db, [(name, category)])
+    if not skills:
+        raise ValueError(f"Invalid skill name: {name!r}")
+    return next(iter(skills.values()))
 
 
 async def get_profile_with_relations(db: AsyncSession, user_id: int) -> Optional[CandidateProfile]:
@@ -84,10 +73,24 @@ async def get_profile_with_relations(db: AsyncSession, user_id: int) -> Optional
             selectinload(CandidateProfile.languages),
         )
         .where(CandidateProfile.user_id == user_id)
+        # Child rows are written with bulk statements - refresh loaded collections
+        .execution_options(populate_existing=True)
     )
     return result.scalar_one_or_none()
 
 
+async def get_profile_id(db: AsyncSession, user_id: int) -> int:
+    """Get the user's profile id without loading relations (404 if missing)."""
+    result = await db.execute(select(CandidateProfile.id).where(CandidateProfile.user_id == user_id))
+    profile_id = result.scalar_one_or_none()
+    if profile_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile_id
+
+
 # ============================================================================
 # Profile Endpoints
 # ============================================================================
@@ -233,36 +236,36 @@ async def upload_resume(
     print(f"✅ Resume URL saved to profile for user {current_user.id}")
     print(f"✅ Profile marked as complete for user {current_user.id}")
 
-    # ===== STEP 4: CREATE PARSING JOB AND FIRE BACKGROUND TASK =====
+    # ===== STEP 4: QUEUE PARSING JOB =====
+    # The job row references the saved file; a queue worker claims it and
+    # loads the PDF itself, so the request does not keep the bytes alive.
     job_id = 0
-    job_tracking_enabled = False
 
     try:
         job = ResumeParsingJob(
             user_id=current_user.id,
             resume_filename=file.filename,
+            resume_url=_safe_truncate(resume_url, 500),
             status=ResumeParsingStatus.PENDING
         )
         db.add(job)
         await db.commit()
         await db.refresh(job)
         job_id = job.id
-        job_tracking_enabled = True
-        print(f"Created resume parsing job {job_id} for user {current_user.id}")
+        print(f"Queued resume parsing job {job_id} for user {current_user.id}")
+        resume_queue.notify()
     except Exception as e:
         print(f"Job tracking disabled: {e}")
         await db.rollback()
-
-    # Fire background parsing (resume is ALREADY saved, this can fail safely)
-    asyncio.create_task(
-        process_resume_background(
-            job_id=job_id if job_tracking_enabled else None,
-            user_id=current_user.id,
-            pdf_bytes=pdf_bytes,
-            filename=file.filename,
-            resume_url=resume_url  # Pass the already-saved URL
+        # No job row to queue - parse directly (resume is ALREADY saved)
+        asyncio.create_task(
+            process_resume_background(
+                user_id=current_user.id,
+                pdf_bytes=pdf_bytes,
+                filename=file.filename,
+                resume_url=resume_url
+            )
         )
-    )
 
     return {
         "status": "processing",
@@ -300,7 +303,8 @@ async def get_resume_status(
         "error_message": job.error_message,
         "retry_count": job.retry_count,
         "created_at": job.created_at.isoformat() if job.created_at else None,
-        "completed_at": job.completed_at.isoformat() if job.completed_at else None
+        "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+        **_partial_status(job)
     }
 
 
@@ -311,7 +315,7 @@ async def get_latest_resume_status(
 ):
     """Get the status of the user's most recent resume parsing job.
 
-    Auto-detects stuck jobs (PROCESSING for > 5 minutes) and marks them as failed.
+    Read-only: jobs whose worker died are recovered by resume_queue.
     """
     result = await db.execute(
         select(ResumeParsingJob)
@@ -324,24 +328,27 @@ async def get_latest_resume_status(
     if not job:
         return {"status": "none", "message": "No resume parsing jobs found"}
 
-    # Auto-detect stuck jobs (PROCESSING for more than 5 minutes)
-    if job.status == ResumeParsingStatus.PROCESSING and job.started_at:
-        stuck_threshold = datetime.now(timezone.utc) - job.started_at
-        if stuck_threshold.total_seconds() > 300:  # 5 minutes
-            job.status = ResumeParsingStatus.FAILED
-            job.error_message = "Job timed out (stuck in processing). Please retry."
-            job.completed_at = datetime.now(timezone.utc)
-            await db.commit()
-
     return {
         "job_id": job.id,
         "status": job.status.value,
         "error_message": job.error_message,
         "retry_count": job.retry_count,
-        "can_retry": job.status == ResumeParsingStatus.FAILED
+        "can_retry": job.status == ResumeParsingStatus.FAILED,
+        **_partial_status(job)
     }
 
 
+def _partial_status(job: ResumeParsingJob) -> dict:
+    """Sections already parsed while the job is still streaming from Gemini."""
+    if job.status != ResumeParsingStatus.PROCESSING or not job.partial_result:
+        return {}
+    try:
+        partial = json.loads(job.partial_result)
+    except ValueError:
+        return {}
+    return {"sections_ready": partial.get("sections", []), "partial_result": partial.get("resume")}
+
+
 @router.post("/retry-resume")
 async def retry_resume_parsing(
     db: AsyncSession = Depends(get_db),
@@ -378,7 +385,7 @@ async def retry_resume_parsing(
             detail="Maximum retry attempts (3) reached. Please upload a new resume."
         )
 
-    # Get the resume from storage
+    # The resume must still be in storage
     from ..models import CandidateProfile
     profile_result = await db.execute(
         select(CandidateProfile).where(CandidateProfile.user_id == current_user.id)
@@ -391,63 +398,26 @@ async def retry_resume_parsing(
             detail="No resume file found. Please upload a new resume."
         )
 
-    # Fetch the resume from storage (supports both local and remote)
-    import httpx
-    import os
-    import aiofiles
-
-    pdf_bytes = None
     resume_url = profile.resume_url
 
-    try:
-        if resume_url.startswith("/uploads/"):
-            # Local storage - read file directly
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            local_path = os.path.join(base_dir, resume_url.lstrip("/"))
-
-            if not os.path.exists(local_path):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Resume file not found. Please upload again."
-                )
-
-            async with aiofiles.open(local_path, 'rb') as f:
-                pdf_bytes = await f.read()
-            print(f"Loaded resume from local storage: {local_path}")
-        else:
-            # Remote storage (Supabase) - fetch via HTTP
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.get(resume_url)
-                response.raise_for_status()
-                pdf_bytes = response.content
-            print(f"Loaded resume from remote storage: {resume_url}")
-
-    except HTTPException:
-        raise
-    except Exception as e:
+    # Local files can vanish on redeploy; remote files are fetched by the worker
+    if resume_url.startswith("/uploads/") and not os.path.exists(_local_resume_path(resume_url)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Could not fetch resume from storage: {str(e)}"
+            detail="Resume file not found. Please upload again."
         )
 
-    # Reset job status and increment retry count
+    # Reset job status, increment retry count and put it back on the queue
     job.status = ResumeParsingStatus.PENDING
+    job.resume_url = _safe_truncate(resume_url, 500)
     job.error_message = None
+    job.partial_result = None
     job.started_at = None
     job.completed_at = None
     job.retry_count += 1
+    job.interrupt_count = 0
     await db.commit()
-
-    # Fire background task with resume_url (file is already saved)
-    asyncio.create_task(
-        process_resume_background(
-            job_id=job.id,
-            user_id=current_user.id,
-            pdf_bytes=pdf_bytes,
-            filename=job.resume_filename or "resume.pdf",
-            resume_url=resume_url
-        )
-    )
+    resume_queue.notify()
 
     return {
         "status": "retrying",
@@ -461,58 +431,96 @@ async def retry_resume_parsing(
 # Background Processing Function
 # ============================================================================
 
+def _local_resume_path(resume_url: str) -> str:
+    """Filesystem path of a resume stored under /uploads/."""
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(base_dir, resume_url.lstrip("/"))
+
+
+async def load_resume_bytes(resume_url: str) -> bytes:
+    """Fetch a saved resume from local storage or Supabase."""
+    import aiofiles
+    from ..services.http_client import get_http_client
+
+    if resume_url.startswith("/uploads/"):
+        async with aiofiles.open(_local_resume_path(resume_url), 'rb') as f:
+            return await f.read()
+
+    response = await get_http_client().get(resume_url)
+    response.raise_for_status()
+    return response.content
+
+
+async def process_resume_job(job: ClaimedJob):
+    """Queue handler: parse a job claimed by a resume_queue worker."""
+    await process_resume_background(
+        user_id=job.user_id,
+        pdf_bytes=None,
+        filename=job.filename or "resume.pdf",
+        resume_url=job.resume_url,
+        claim=job
+    )
+
+
 async def process_resume_background(
-    job_id: Optional[int],
     user_id: int,
-    pdf_bytes: bytes,
+    pdf_bytes: Optional[bytes],
     filename: str,
-    resume_url: Optional[str] = None  # Already saved by upload endpoint
+    resume_url: Optional[str] = None,  # Already saved by upload endpoint
+    claim: Optional[ClaimedJob] = None
 ):
     """
     Background task to PARSE resume and update profile.
 
     IMPORTANT: The resume file is ALREADY SAVED before this runs.
     This function only handles AI parsing - if it fails, the file is still safe.
+    When pdf_bytes is None the file is loaded from resume_url (queued jobs).
+
+    Job rows are only written while the queue claim holds: if this worker was
+    presumed dead and the job re-queued, its results are dropped.
 
     The user can retry parsing without re-uploading the file.
     """
     from ..database import async_session_maker
 
     async with async_session_maker() as db:
+        async def update_job(**values) -> bool:
+            if claim is None:
+                return False
+            try:
+                return await resume_queue.update_claimed(db, claim, **values)
+            except Exception as e:
+                print(f"Could not update resume job {claim.id}: {e}")
+                await db.rollback()
+                return False
+
         try:
-            job = None
+            if pdf_bytes is None:
+                pdf_bytes = await load_resume_bytes(resume_url)
 
-            # Mark job as processing
-            if job_id:
-                try:
-                    result = await db.execute(
-                        select(ResumeParsingJob).where(ResumeParsingJob.id == job_id)
-                    )
-                    job = result.scalar_one_or_none()
-                    if job:
-                        job.status = ResumeParsingStatus.PROCESSING
-                        job.started_at = datetime.now(timezone.utc)
-                        await db.commit()
-                except Exception as e:
-                    print(f"Could not update job status: {e}")
-                    job = None
+            async def publish_sections(sections: List[str], partial) -> None:
+                # Candidates see finished sections while Gemini writes the rest
+                await update_job(partial_result=json.dumps({"sections": sections, "resume": partial.model_dump()}))
 
             # Parse resume with retries + API key rotation
-            parsed, error = await parse_resume_safe(pdf_bytes, max_retries=3)
+            parsed, error = await parse_resume_safe(
+                pdf_bytes, max_retries=3, on_section=publish_sections if claim else None
+            )
 
             if error or not parsed:
                 error_msg = error or "Parsing returned no data"
                 print(f"Resume parsing failed for user {user_id}: {error_msg}")
 
                 # Mark job as failed (but resume file is STILL SAVED!)
-                if job:
-                    try:
-                        job.status = ResumeParsingStatus.FAILED
-                        job.error_message = error_msg[:500]
-                        job.completed_at = datetime.now(timezone.utc)
-                        await db.commit()
-                    except Exception:
-                        pass
+                await update_job(
+                    status=ResumeParsingStatus.FAILED,
+                    error_message=error_msg[:500],
+                    completed_at=datetime.now(timezone.utc)
+                )
+                return
+
+            # Re-queued as stale and claimed elsewhere? That run applies its own result
+            if claim and not await update_job():
                 return
 
             # Apply parsed data to profile
@@ -520,31 +528,25 @@ async def process_resume_background(
             await apply_parsed_to_profile(db, user_id, parsed, filename, resume_url)
 
             # Mark job as complete
-            if job:
-                try:
-                    job.status = ResumeParsingStatus.COMPLETED
-                    job.completed_at = datetime.now(timezone.utc)
-                    await db.commit()
-                except Exception:
-                    pass
+            await update_job(
+                status=ResumeParsingStatus.COMPLETED,
+                partial_result=None,
+                completed_at=datetime.now(timezone.utc)
+            )
 
             print(f"✅ Resume parsing completed for user {user_id}")
 
         except Exception as e:
             print(f"Background parsing error for user {user_id}: {e}")
-            if job_id:
-                try:
-                    result = await db.execute(
-                        select(ResumeParsingJob).where(ResumeParsingJob.id == job_id)
-                    )
-                    job = result.scalar_one_or_none()
-                    if job:
-                        job.status = ResumeParsingStatus.FAILED
-                        job.error_message = str(e)[:500]
-                        job.completed_at = datetime.now(timezone.utc)
-                        await db.commit()
-                except Exception:
-                    pass
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+            await update_job(
+                status=ResumeParsingStatus.FAILED,
+                error_message=str(e)[:500],
+                completed_at=datetime.now(timezone.utc)
+            )
 
 
 def _safe_truncate(value: Optional[str], max_len: int) -> Optional[str]:
@@ -569,23 +571,15 @@ async def apply_parsed_to_profile(
     """
     from ..services.resume_parser import deduplicate_skills
 
-    # Get or create profile
-    profile = await get_profile_with_relations(db, user_id)
+    # Get or create profile - child rows are replaced in bulk below, so the
+    # relationships are not loaded here
+    result = await db.execute(select(CandidateProfile).where(CandidateProfile.user_id == user_id))
+    profile = result.scalar_one_or_none()
 
     if not profile:
         profile = CandidateProfile(user_id=user_id)
         db.add(profile)
         await db.flush()
-        profile = await get_profile_with_relations(db, user_id)
-    else:
-        # Clear existing related data for re-parse
-        profile.education.clear()
-        profile.work_experience.clear()
-        profile.projects.clear()
-        profile.skills.clear()
-        profile.certifications.clear()
-        profile.publications.clear()
-        profile.awards.clear()
 
     # Update resume metadata (URL is already saved by upload endpoint, but update if provided)
     if filename:
@@ -634,139 +628,105 @@ async def apply_parsed_to_profile(
         await db.rollback()
         raise
 
-    # Add education with defensive truncation
+    # Build child rows with defensive truncation
     # GPA column is now VARCHAR(100) after migration - can store "9.25 (3rd Rank in Class)" etc.
-    for edu in parsed.education:
-        try:
-            profile.education.append(Education(
-                school=_safe_truncate(edu.school, 300),
-                degree=_safe_truncate(edu.degree, 200),
-                field_of_study=_safe_truncate(edu.field_of_study, 200),
-                start_year=edu.start_year,
-                end_year=edu.end_year,
-                gpa=_safe_truncate(edu.gpa, 100)  # VARCHAR(100) after migration
-            ))
-        except Exception as e:
-            print(f"Failed to add education entry: {e}")
-            continue  # Skip this entry, continue with others
-
-    # Add work experience with defensive truncation
-    for exp in parsed.work_experience:
-        try:
-            profile.work_experience.append(WorkExperience(
-                company=_safe_truncate(exp.company, 300),
-                role=_safe_truncate(exp.role, 200),
-                city=_safe_truncate(exp.city, 100),
-                country=_safe_truncate(exp.country, 100),
-                start_date=_safe_truncate(exp.start_date, 20),
-                end_date=_safe_truncate(exp.end_date, 20),
-                is_current=exp.is_current,
-                description=exp.description  # Text field, no limit
-            ))
-        except Exception as e:
-            print(f"Failed to add work experience entry: {e}")
-            continue
-
-    # Add projects with defensive truncation
-    for proj in parsed.projects:
-        try:
-            profile.projects.append(Project(
-                name=_safe_truncate(proj.name, 300),
-                description=proj.description,  # Text field
-                technologies=proj.technologies[:20] if proj.technologies else [],  # Limit array size
-                start_year=proj.start_year,
-                end_year=proj.end_year,
-                url=_safe_truncate(proj.url, 500)
-            ))
-        except Exception as e:
-            print(f"Failed to add project entry: {e}")
-            continue
+    sections = {
+        "education": [
+            {
+                "school": _safe_truncate(edu.school, 300),
+                "degree": _safe_truncate(edu.degree, 200),
+                "field_of_study": _safe_truncate(edu.field_of_study, 200),
+                "start_year": edu.start_year,
+                "end_year": edu.end_year,
+                "gpa": _safe_truncate(edu.gpa, 100),  # VARCHAR(100) after migration
+            }
+            for edu in parsed.education
+        ],
+        "work_experience": [
+            {
+                "company": _safe_truncate(exp.company, 300),
+                "role": _safe_truncate(exp.role, 200),
+                "city": _safe_truncate(exp.city, 100),
+                "country": _safe_truncate(exp.country, 100),
+                "start_date": _safe_truncate(exp.start_date, 20),
+                "end_date": _safe_truncate(exp.end_date, 20),
+                "is_current": exp.is_current,
+                "description": exp.description,  # Text field, no limit
+            }
+            for exp in parsed.work_experience
+        ],
+        "projects": [
+            {
+                "name": _safe_truncate(proj.name, 300),
+                "description": proj.description,  # Text field
+                "technologies": proj.technologies[:20] if proj.technologies else [],  # Limit array size
+                "start_year": proj.start_year,
+                "end_year": proj.end_year,
+                "url": _safe_truncate(proj.url, 500),
+            }
+            for proj in parsed.projects
+        ],
+        "certifications": [
+            {
+                "title": _safe_truncate(cert.title, 300),
+                "issuer": _safe_truncate(cert.issuer, 200),
+                "year": cert.year,
+                "url": _safe_truncate(cert.url, 500),
+            }
+            for cert in parsed.certifications[:20]  # Limit count
+        ],
+        "publications": [
+            {
+                "title": _safe_truncate(pub.title, 500),
+                "publisher": _safe_truncate(pub.publisher, 300),
+                "year": pub.year,
+                "url": _safe_truncate(pub.url, 500),
+            }
+            for pub in parsed.publications[:20]
+        ],
+        "awards": [
+            {
+                "title": _safe_truncate(award.title, 300),
+                "issuer": _safe_truncate(award.issuer, 200),
+                "year": award.year,
+            }
+            for award in parsed.awards[:20]
+        ],
+        "languages": [
+            {
+                "language": _safe_truncate(lang.language, 100),
+                "proficiency": LANGUAGE_PROFICIENCY.get(lang.proficiency, LanguageProficiency.INTERMEDIATE),
+            }
+            for lang in parsed.languages[:10]
+        ],
+    }
 
-    # Add skills (deduplicated)
+    # Skills (deduplicated) - resolved in bulk, constant number of queries
     skill_names = []
+    skill_ids = []
     try:
-        deduped_skills = deduplicate_skills(parsed.skills)
-        for skill_entry in deduped_skills[:50]:  # Limit to 50 skills
-            try:
-                skill = await get_or_create_skill(
-                    db,
-                    _safe_truncate(skill_entry.name, 100),
-                    skill_entry.category or "other"
-                )
-                if skill not in profile.skills:
-                    profile.skills.append(skill)
-                skill_names.append(skill.name)
-            except Exception as e:
-                print(f"Failed to add skill {skill_entry.name}: {e}")
-                continue
+        deduped_skills = deduplicate_skills(parsed.skills)[:50]  # Limit to 50 skills
+        skills = await skill_dictionary.get_skills(
+            db, [(skill_entry.name, skill_entry.category or "other") for skill_entry in deduped_skills]
+        )
+        for name, skill in skills.items():
+            skill_ids.append(skill.id)
+            skill_names.append(name)
     except Exception as e:
         print(f"Failed to process skills: {e}")
 
-    # Add certifications
-    for cert in parsed.certifications[:20]:  # Limit count
-        try:
-            profile.certifications.append(Certification(
-                title=_safe_truncate(cert.title, 300),
-                issuer=_safe_truncate(cert.issuer, 200),
-                year=cert.year,
-                url=_safe_truncate(cert.url, 500)
-            ))
-        except Exception as e:
-            print(f"Failed to add certification: {e}")
-            continue
-
-    # Add publications
-    for pub in parsed.publications[:20]:
-        try:
-            profile.publications.append(Publication(
-                title=_safe_truncate(pub.title, 500),
-                publisher=_safe_truncate(pub.publisher, 300),
-                year=pub.year,
-                url=_safe_truncate(pub.url, 500)
-            ))
-        except Exception as e:
-            print(f"Failed to add publication: {e}")
-            continue
-
-    # Add awards
-    for award in parsed.awards[:20]:
-        try:
-            profile.awards.append(Award(
-                title=_safe_truncate(award.title, 300),
-                issuer=_safe_truncate(award.issuer, 200),
-                year=award.year
-            ))
-        except Exception as e:
-            print(f"Failed to add award: {e}")
-            continue
-
-    # Add languages from resume
-    for lang in parsed.languages[:10]:
-        try:
-            prof_map = {
-                "native": LanguageProficiency.NATIVE,
-                "fluent": LanguageProficiency.FLUENT,
-                "intermediate": LanguageProficiency.INTERMEDIATE,
-                "basic": LanguageProficiency.BASIC
-            }
-            proficiency = prof_map.get(lang.proficiency, LanguageProficiency.INTERMEDIATE)
-            profile.languages.append(UserLanguage(
-                language=_safe_truncate(lang.language, 100),
-                proficiency=proficiency
-            ))
-        except Exception as e:
-            print(f"Failed to add language: {e}")
-            continue
-
-    # Commit all profile data
+    # Replace all child rows: one DELETE + one multi-row INSERT per table
     try:
+        counts = await replace_child_rows(db, profile.id, sections)
+        counts["skills"] = await replace_profile_skills(db, profile.id, skill_ids)
         await db.flush()
     except Exception as e:
         print(f"Failed to flush profile data: {e}")
         # Don't rollback - we already saved the resume_url
         await db.rollback()
         # Re-fetch profile and save just the essential fields
-        profile = await get_profile_with_relations(db, user_id)
+        result = await db.execute(select(CandidateProfile).where(CandidateProfile.user_id == user_id))
+        profile = result.scalar_one_or_none()
         if profile:
             profile.resume_filename = _safe_truncate(filename, 255)
             profile.resume_url = _safe_truncate(resume_url, 500)
@@ -787,11 +747,18 @@ async def apply_parsed_to_profile(
             )
             if embedding_id:
                 profile.summary_embedding_id = embedding_id
+                profile.summary_embedding_hash = profile_index_hash(
+                    profile.professional_summary,
+                    profile_vector_metadata(
+                        skill_names, profile.years_of_experience, profile.current_role, profile.current_company
+                    )
+                )
         except Exception as e:
             print(f"Vector indexing skipped (non-critical): {str(e)[:100]}")
 
     await db.commit()
-    print(f"✅ Profile saved for user {user_id}: {len(profile.education)} edu, {len(profile.work_experience)} exp, {len(profile.skills)} skills")
+    candidate_search.index.note_profile(profile.id, skill_ids, profile.years_of_experience)
+    print(f"✅ Profile saved for user {user_id}: {counts['education']} edu, {counts['work_experience']} exp, {counts['skills']} skills")
 
 
 @router.get("/me", response_model=ProfileResponse)
@@ -918,7 +885,7 @@ async def download_resume(
     For local storage: serves file directly
     For Supabase: streams from storage
     """
-    import httpx
+    from ..services.http_client import get_http_client
     from fastapi.responses import StreamingResponse, FileResponse
     import os
     
@@ -964,15 +931,14 @@ async def download_resume(
     else:
         # Remote URL (Supabase) - stream the content
         async def stream_from_url():
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                async with client.stream("GET", profile.resume_url) as response:
-                    if response.status_code != 200:
-                        raise HTTPException(
-                            status_code=status.HTTP_502_BAD_GATEWAY,
-                            detail="Failed to fetch resume from storage"
-                        )
-                    async for chunk in response.aiter_bytes(chunk_size=65536):  # 64KB chunks
-                        yield chunk
+            async with get_http_client().stream("GET", profile.resume_url) as response:
+                if response.status_code != 200:
+                    raise HTTPException(
+                        status_code=status.HTTP_502_BAD_GATEWAY,
+                        detail="Failed to fetch resume from storage"
+                    )
+                async for chunk in response.aiter_bytes(chunk_size=65536):  # 64KB chunks
+                    yield chunk
         
         return StreamingResponse(
             stream_from_url(),
@@ -989,6 +955,13 @@ async def download_resume(
 # Language (Manual Add/Remove)
 # ============================================================================
 
+def _language_row(language_data: UserLanguageCreate) -> dict:
+    return {
+        "language": language_data.language,
+        "proficiency": LANGUAGE_PROFICIENCY.get(language_data.proficiency, LanguageProficiency.INTERMEDIATE),
+    }
+
+
 @router.post("/me/languages", response_model=ProfileResponse)
 async def add_language(
     language_data: UserLanguageCreate,
@@ -996,32 +969,23 @@ async def add_language(
     current_user: User = Depends(get_current_user)
 ):
     """Add a language proficiency to profile."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
-        )
-    
-    # Map proficiency
-    prof_map = {
-        "native": LanguageProficiency.NATIVE,
-        "fluent": LanguageProficiency.FLUENT,
-        "intermediate": LanguageProficiency.INTERMEDIATE,
-        "basic": LanguageProficiency.BASIC
-    }
-    proficiency = prof_map.get(language_data.proficiency, LanguageProficiency.INTERMEDIATE)
-    
-    profile.languages.append(UserLanguage(
-        language=language_data.language,
-        proficiency=proficiency
-    ))
-    
+    profile_id = await get_profile_id(db, current_user.id)
+    await add_child_rows(db, profile_id, "languages", [_language_row(language_data)])
     await db.commit()
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    return profile
+    return await get_profile_with_relations(db, current_user.id)
+
+
+@router.put("/me/languages", response_model=ProfileResponse)
+async def replace_languages(
+    languages: List[UserLanguageCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Replace all languages on the profile in one write."""
+    profile_id = await get_profile_id(db, current_user.id)
+    await replace_child_rows(db, profile_id, {"languages": [_language_row(lang) for lang in languages]})
+    await db.commit()
+    return await get_profile_with_relations(db, current_user.id)
 
 
 @router.delete("/me/languages/{language_id}")
@@ -1031,25 +995,14 @@ async def remove_language(
     current_user: User = Depends(get_current_user)
 ):
     """Remove a language from profile."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
+    profile_id = await get_profile_id(db, current_user.id)
+    if not await delete_child_row(db, profile_id, "languages", language_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
+            detail="Language not found"
         )
-    
-    # Find and remove the language
-    for lang in profile.languages:
-        if lang.id == language_id:
-            profile.languages.remove(lang)
-            await db.commit()
-            return {"message": "Language removed"}
-    
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail="Language not found"
-    )
+    await db.commit()
+    return {"message": "Language removed"}
 
 
 # ============================================================================
@@ -1063,26 +1016,23 @@ async def add_education(
     current_user: User = Depends(get_current_user)
 ):
     """Add a new education entry."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
-        )
-    
-    profile.education.append(Education(
-        school=edu_data.school,
-        degree=edu_data.degree,
-        field_of_study=edu_data.field_of_study,
-        start_year=edu_data.start_year,
-        end_year=edu_data.end_year,
-        gpa=edu_data.gpa
-    ))
-    
+    profile_id = await get_profile_id(db, current_user.id)
+    await add_child_rows(db, profile_id, "education", [edu_data.model_dump()])
     await db.commit()
-    profile = await get_profile_with_relations(db, current_user.id)
-    return profile
+    return await get_profile_with_relations(db, current_user.id)
+
+
+@router.put("/me/education", response_model=ProfileResponse)
+async def replace_education(
+    entries: List[EducationCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Replace all education entries in one write."""
+    profile_id = await get_profile_id(db, current_user.id)
+    await replace_child_rows(db, profile_id, {"education": [edu.model_dump() for edu in entries]})
+    await db.commit()
+    return await get_profile_with_relations(db, current_user.id)
 
 
 @router.put("/me/education/{education_id}", response_model=ProfileResponse)
@@ -1093,35 +1043,16 @@ async def update_education(
     current_user: User = Depends(get_current_user)
 ):
     """Update an education entry."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
-        )
-    
-    # Find the education entry
-    education = None
-    for edu in profile.education:
-        if edu.id == education_id:
-            education = edu
-            break
-    
-    if not education:
+    profile_id = await get_profile_id(db, current_user.id)
+    # Update fields that were provided
+    update_dict = edu_data.model_dump(exclude_unset=True)
+    if not await update_child_row(db, profile_id, "education", education_id, update_dict):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Education entry not found"
         )
-    
-    # Update fields that were provided
-    update_dict = edu_data.model_dump(exclude_unset=True)
-    for field, value in update_dict.items():
-        setattr(education, field, value)
-    
     await db.commit()
-    profile = await get_profile_with_relations(db, current_user.id)
-    return profile
+    return await get_profile_with_relations(db, current_user.id)
 
 
 @router.delete("/me/education/{education_id}")
@@ -1131,24 +1062,14 @@ async def delete_education(
     current_user: User = Depends(get_current_user)
 ):
     """Delete an education entry."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
+    profile_id = await get_profile_id(db, current_user.id)
+    if not await delete_child_row(db, profile_id, "education", education_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
+            detail="Education entry not found"
         )
-    
-    for edu in profile.education:
-        if edu.id == education_id:
-            profile.education.remove(edu)
-            await db.commit()
-            return {"message": "Education entry deleted"}
-    
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail="Education entry not found"
-    )
+    await db.commit()
+    return {"message": "Education entry deleted"}
 
 
 # ============================================================================
@@ -1162,28 +1083,23 @@ async def add_experience(
     current_user: User = Depends(get_current_user)
 ):
     """Add a new work experience entry."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
-        )
-    
-    profile.work_experience.append(WorkExperience(
-        company=exp_data.company,
-        role=exp_data.role,
-        city=exp_data.city,
-        country=exp_data.country,
-        start_date=exp_data.start_date,
-        end_date=exp_data.end_date,
-        is_current=exp_data.is_current,
-        description=exp_data.description
-    ))
-    
+    profile_id = await get_profile_id(db, current_user.id)
+    await add_child_rows(db, profile_id, "work_experience", [exp_data.model_dump()])
     await db.commit()
-    profile = await get_profile_with_relations(db, current_user.id)
-    return profile
+    return await get_profile_with_relations(db, current_user.id)
+
+
+@router.put("/me/experience", response_model=ProfileResponse)
+async def replace_experience(
+    entries: List[WorkExperienceCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Replace all work experience entries in one write."""
+    profile_id = await get_profile_id(db, current_user.id)
+    await replace_child_rows(db, profile_id, {"work_experience": [exp.model_dump() for exp in entries]})
+    await db.commit()
+    return await get_profile_with_relations(db, current_user.id)
 
 
 @router.put("/me/experience/{experience_id}", response_model=ProfileResponse)
@@ -1194,35 +1110,16 @@ async def update_experience(
     current_user: User = Depends(get_current_user)
 ):
     """Update a work experience entry."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
-        )
-    
-    # Find the experience entry
-    experience = None
-    for exp in profile.work_experience:
-        if exp.id == experience_id:
-            experience = exp
-            break
-    
-    if not experience:
+    profile_id = await get_profile_id(db, current_user.id)
+    # Update fields that were provided
+    update_dict = exp_data.model_dump(exclude_unset=True)
+    if not await update_child_row(db, profile_id, "work_experience", experience_id, update_dict):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Work experience entry not found"
         )
-    
-    # Update fields that were provided
-    update_dict = exp_data.model_dump(exclude_unset=True)
-    for field, value in update_dict.items():
-        setattr(experience, field, value)
-    
     await db.commit()
-    profile = await get_profile_with_relations(db, current_user.id)
-    return profile
+    return await get_profile_with_relations(db, current_user.id)
 
 
 @router.delete("/me/experience/{experience_id}")
@@ -1232,24 +1129,14 @@ async def delete_experience(
     current_user: User = Depends(get_current_user)
 ):
     """Delete a work experience entry."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
+    profile_id = await get_profile_id(db, current_user.id)
+    if not await delete_child_row(db, profile_id, "work_experience", experience_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
+            detail="Work experience entry not found"
         )
-    
-    for exp in profile.work_experience:
-        if exp.id == experience_id:
-            profile.work_experience.remove(exp)
-            await db.commit()
-            return {"message": "Work experience entry deleted"}
-    
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail="Work experience entry not found"
-    )
+    await db.commit()
+    return {"message": "Work experience entry deleted"}
 
 
 # ============================================================================
@@ -1263,26 +1150,23 @@ async def add_project(
     current_user: User = Depends(get_current_user)
 ):
     """Add a new project entry."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
-        )
-    
-    profile.projects.append(Project(
-        name=proj_data.name,
-        description=proj_data.description,
-        technologies=proj_data.technologies,
-        start_year=proj_data.start_year,
-        end_year=proj_data.end_year,
-        url=proj_data.url
-    ))
-    
+    profile_id = await get_profile_id(db, current_user.id)
+    await add_child_rows(db, profile_id, "projects", [proj_data.model_dump()])
     await db.commit()
-    profile = await get_profile_with_relations(db, current_user.id)
-    return profile
+    return await get_profile_with_relations(db, current_user.id)
+
+
+@router.put("/me/projects", response_model=ProfileResponse)
+async def replace_projects(
+    entries: List[ProjectCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Replace all project entries in one write."""
+    profile_id = await get_profile_id(db, current_user.id)
+    await replace_child_rows(db, profile_id, {"projects": [proj.model_dump() for proj in entries]})
+    await db.commit()
+    return await get_profile_with_relations(db, current_user.id)
 
 
 @router.put("/me/projects/{project_id}", response_model=ProfileResponse)
@@ -1293,35 +1177,16 @@ async def update_project(
     current_user: User = Depends(get_current_user)
 ):
     """Update a project entry."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
-        )
-    
-    # Find the project
-    project = None
-    for proj in profile.projects:
-        if proj.id == project_id:
-            project = proj
-            break
-    
-    if not project:
+    profile_id = await get_profile_id(db, current_user.id)
+    # Update fields that were provided
+    update_dict = proj_data.model_dump(exclude_unset=True)
+    if not await update_child_row(db, profile_id, "projects", project_id, update_dict):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
-    
-    # Update fields that were provided
-    update_dict = proj_data.model_dump(exclude_unset=True)
-    for field, value in update_dict.items():
-        setattr(project, field, value)
-    
     await db.commit()
-    profile = await get_profile_with_relations(db, current_user.id)
-    return profile
+    return await get_profile_with_relations(db, current_user.id)
 
 
 @router.delete("/me/projects/{project_id}")
@@ -1331,24 +1196,14 @@ async def delete_project(
     current_user: User = Depends(get_current_user)
 ):
     """Delete a project entry."""
-    profile = await get_profile_with_relations(db, current_user.id)
-    
-    if not profile:
+    profile_id = await get_profile_id(db, current_user.id)
+    if not await delete_child_row(db, profile_id, "projects", project_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Profile not found"
+            detail="Project not found"
         )
-    
-    for proj in profile.projects:
-        if proj.id == project_id:
-            profile.projects.remove(proj)
-            await db.commit()
-            return {"message": "Project deleted"}
-    
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail="Project not found"
-    )
+    await db.commit()
+    return {"message": "Project deleted"}
 
 
 # ============================================================================
@@ -1382,6 +1237,7 @@ async def add_skill(
     
     profile.skills.append(skill)
     await db.commit()
+    candidate_search.index.note_profile(profile.id, [s.id for s in profile.skills], profile.years_of_experience)
     profile = await get_profile_with_relations(db, current_user.id)
     return profile
 
@@ -1405,6 +1261,7 @@ async def remove_skill(
         if skill.id == skill_id:
             profile.skills.remove(skill)
             await db.commit()
+            candidate_search.index.note_profile(profile.id, [s.id for s in profile.skills], profile.years_of_experience)
             return {"message": "Skill removed from profile"}
     
     raise HTTPException(
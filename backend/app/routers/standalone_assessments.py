@@ -28,6 +28,10 @@ from ..schemas.test import (
     AssessmentResultResponse, SectionResult, AnswerResult,
 )
 from ..services.auth import get_current_user
+from ..services.test_session_cache import test_session_cache
+from ..services.document_cache import document_cache, collect_document_urls
+from ..services.answer_buffer import upsert_user_answers
+from ..services.evaluation import answer_keys
 
 router = APIRouter(prefix="/api/standalone-assessments", tags=["Standalone Assessments"])
 
@@ -109,6 +113,19 @@ async def recalculate_assessment_totals(db: AsyncSession, assessment_id: int):
         assessment.total_marks = total_marks
     
     await db.commit()
+    # Questions may also be served through other tests' sample pools
+    await test_session_cache.invalidate_all()
+    answer_keys.invalidate_all()
+
+
+async def _section_document_urls(db: AsyncSession, assessment_id: int) -> List[str]:
+    """Cacheable document/media URLs of an assessment's active section questions."""
+    result = await db.execute(
+        select(Question.media_url, Question.html_content, Question.documents)
+        .join(TestSection, Question.section_id == TestSection.id)
+        .where(TestSection.test_id == assessment_id, Question.is_active == True)
+    )
+    return collect_document_urls({"questions": [row._asdict() for row in result.all()]})
 
 
 def format_section_response(section: TestSection) -> dict:
@@ -256,6 +273,8 @@ async def update_assessment(
     
     await db.commit()
     await db.refresh(assessment)
+    await test_session_cache.invalidate(assessment_id)
+    answer_keys.invalidate(assessment_id)
     
     # Reload with sections
     assessment = await get_assessment_or_404(db, assessment_id)
@@ -274,6 +293,7 @@ async def delete_assessment(
     assessment = await get_assessment_or_404(db, assessment_id)
     assessment.is_active = False
     await db.commit()
+    await test_session_cache.invalidate(assessment_id)
     
     return {"message": "Assessment deleted successfully"}
 
@@ -299,6 +319,10 @@ async def publish_assessment(
     assessment.is_published = True
     assessment.is_active = True  # Ensure assessment is active when published
     await db.commit()
+    await test_session_cache.invalidate(assessment_id)
+
+    # Pre-warm the section questions' documents/media on local disk
+    document_cache.schedule_prewarm(await _section_document_urls(db, assessment_id))
     
     return {"message": "Assessment published successfully"}
 
@@ -315,6 +339,7 @@ async def unpublish_assessment(
     assessment = await get_assessment_or_404(db, assessment_id)
     assessment.is_published = False
     await db.commit()
+    await test_session_cache.invalidate(assessment_id)
     
     return {"message": "Assessment unpublished successfully"}
 
@@ -977,7 +1002,16 @@ async def submit_assessment(
             )
         
         # ========== STEP 2: Load assessment data ==========
-        assessment = await get_assessment_or_404(db, attempt.test_id)
+        # Questions and sections come from the compiled answer key
+        assessment_result = await db.execute(
+            select(Test).where(
+                and_(
+                    Test.id == attempt.test_id,
+                    Test.assessment_type == "standalone_assessment"
+                )
+            )
+        )
+        assessment = assessment_result.scalar_one_or_none()
         
         if not assessment:
             logger.error(f"[SUBMIT] Assessment not found: {attempt.test_id}")
@@ -986,24 +1020,14 @@ async def submit_assessment(
                 detail="Assessment not found"
             )
         
-        # ========== STEP 3: Build lookups ==========
-        question_lookup = {}
-        section_lookup = {}
-        for section in assessment.sections:
-            section_lookup[section.id] = section
-            for q in section.questions:
-                question_lookup[q.id] = q
-        
-        logger.info(f"[SUBMIT] Loaded {len(question_lookup)} questions from {len(section_lookup)} sections")
-        
-        # ========== STEP 4: Get pre-saved answers (CRITICAL for auto-save recovery) ==========
+        # ========== STEP 3: Get pre-saved answers (CRITICAL for auto-save recovery) ==========
         existing_answers_result = await db.execute(
             select(UserAnswer).where(UserAnswer.attempt_id == attempt.id)
         )
         existing_answers = {ua.question_id: ua for ua in existing_answers_result.scalars().all()}
         logger.info(f"[SUBMIT] Found {len(existing_answers)} pre-saved answers")
         
-        # ========== STEP 5: Merge answers (pre-saved + new from request) ==========
+        # ========== STEP 4: Merge answers (pre-saved + new from request) ==========
         all_answers = {}
         for qid, ua in existing_answers.items():
             all_answers[qid] = ua.answer_text
@@ -1013,95 +1037,54 @@ async def submit_assessment(
         
         logger.info(f"[SUBMIT] Total merged answers: {len(all_answers)}")
         
-        # ========== STEP 6: Helper functions ==========
-        def get_option_text(options, option_id):
-            """Get the text of an option by its ID"""
-            if not options or not option_id:
-                return str(option_id) if option_id else ""
-            for opt in options:
-                if isinstance(opt, dict) and opt.get('id') == option_id:
-                    return opt.get('text', str(option_id))
-            return str(option_id)
-
-        def get_option_id(options, text_or_id):
-            """Get the ID of an option by its text or ID"""
-            if not options or not text_or_id:
-                return str(text_or_id) if text_or_id else ""
-            for opt in options:
-                if isinstance(opt, dict) and opt.get('id') == text_or_id:
-                    return text_or_id
-            for opt in options:
-                if isinstance(opt, dict) and opt.get('text') == text_or_id:
-                    return opt.get('id', text_or_id)
-            return str(text_or_id)
-
-        # ========== STEP 7: Evaluate ALL answers ==========
-        total_score = 0.0
-        section_results = {}
-
-        for question_id, selected_option in all_answers.items():
-            question = question_lookup.get(question_id)
-
-            # DEBUG: Log what we're comparing
-            if question:
-                logger.info(f"[EVAL] Q{question_id}: selected='{selected_option}', correct='{question.correct_answer}', options_type={type(question.options)}")
-            if not question:
-                logger.warning(f"[SUBMIT] Question not found: {question_id}")
-                continue
-
-            # Normalize answer
-            selected_option_id = get_option_id(question.options, selected_option)
-
-            # DEBUG: Log normalized value and comparison
-            logger.info(f"[EVAL] Q{question_id}: normalized='{selected_option_id}' vs correct='{question.correct_answer}' => match={selected_option_id == question.correct_answer}")
-
-            # Check correctness
-            is_correct = (question.correct_answer or "") == selected_option_id
-            marks_obtained = float(question.marks) if is_correct else 0.0
-            total_score += marks_obtained
-
-            # Update or create answer record
+        # ========== STEP 5: Evaluate ALL answers in one pass ==========
+        key = await answer_keys.get(db, assessment.id)
+        scored = key.score(all_answers)
+        total_score = scored.score
+        if scored.unknown_question_ids:
+            logger.warning(f"[SUBMIT] Questions not found: {scored.unknown_question_ids}")
+
+        # ========== STEP 6: Write answer records ==========
+        new_rows = []
+        for graded in scored.answers:
+            question_id = graded.question.id
             if question_id in existing_answers:
-                existing_answers[question_id].answer_text = selected_option_id
-                existing_answers[question_id].is_correct = is_correct
-                existing_answers[question_id].marks_obtained = marks_obtained
+                existing_answers[question_id].answer_text = graded.answer_text
+                existing_answers[question_id].is_correct = graded.is_correct
+                existing_answers[question_id].marks_obtained = graded.marks_obtained
             else:
-                user_answer = UserAnswer(
-                    attempt_id=attempt.id,
-                    question_id=question_id,
-                    answer_text=selected_option_id,
-                    is_correct=is_correct,
-                    marks_obtained=marks_obtained,
-                    time_spent_seconds=0
-                )
-                db.add(user_answer)
-
-            # Build section result
-            if question.section_id not in section_results:
-                section = section_lookup.get(question.section_id)
-                section_results[question.section_id] = {
-                    "section_id": question.section_id,
-                    "section_title": section.title if section else "Unknown",
-                    "total_marks": 0.0,
-                    "marks_obtained": 0.0,
-                    "questions": []
-                }
-
-            user_answer_text = get_option_text(question.options, selected_option_id)
-            correct_answer_text = get_option_text(question.options, question.correct_answer) if question.correct_answer else ""
-
-            section_results[question.section_id]["marks_obtained"] += marks_obtained
-            section_results[question.section_id]["total_marks"] += float(question.marks)
-            section_results[question.section_id]["questions"].append({
-                "question_id": question.id,
-                "question_number": question.question_number or str(question.id),
-                "question_text": question.question_text or "",
-                "user_answer": user_answer_text,
-                "correct_answer": correct_answer_text,
-                "is_correct": is_correct,
-                "marks_obtained": float(marks_obtained),
-                "max_marks": float(question.marks),
-            })
+                new_rows.append({
+                    "attempt_id": attempt.id,
+                    "question_id": question_id,
+                    "answer_text": graded.answer_text,
+                    "is_correct": graded.is_correct,
+                    "marks_obtained": graded.marks_obtained,
+                    "time_spent_seconds": 0,
+                })
+        await upsert_user_answers(db, new_rows)
+
+        # ========== STEP 7: Build section results ==========
+        section_results = {}
+        for section_id, section in scored.sections.items():
+            section_results[section_id] = {
+                "section_id": section_id,
+                "section_title": section.section_title,
+                "total_marks": section.total_marks,
+                "marks_obtained": section.marks_obtained,
+                "questions": [
+                    {
+                        "question_id": graded.question.id,
+                        "question_number": graded.question.question_number or str(graded.question.id),
+                        "question_text": graded.question.question_text,
+                        "user_answer": graded.question.display(graded.answer_text) or "",
+                        "correct_answer": graded.question.display(graded.question.correct_answer) or "",
+                        "is_correct": graded.is_correct,
+                        "marks_obtained": float(graded.marks_obtained),
+                        "max_marks": graded.question.marks,
+                    }
+                    for graded in section.answers
+                ]
+            }
 
         logger.info(f"[SUBMIT] Evaluation complete: score={total_score}/{assessment.total_marks}")
 
@@ -8,10 +8,10 @@ RELIABILITY FEATURES:
 - Auto-save for crash recovery
 - Idempotent completion (safe to call multiple times)
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List, Optional
+from sqlalchemy import select
+from typing import List, Optional, Tuple
 from datetime import datetime, timezone
 import asyncio
 
@@ -21,9 +21,16 @@ from ..models.test import Test, TestQuestion, Question, TestAttempt, UserAnswer
 from ..schemas.test import (
     StartTestRequest, SubmitAnswerRequest, CompleteTestRequest,
     TestAttemptResponse, TestSessionResponse, TestResultResponse,
-    QuestionForTest
+    QuestionForTest, ChunkedUploadInit, ChunkedUploadResponse
 )
 from ..services.auth import get_current_user
+from ..services.test_session_cache import test_session_cache
+from ..services.answer_buffer import answer_buffer, lock_attempts, upsert_user_answers
+from ..services.attempt_cache import attempt_cache
+from ..services.document_cache import document_cache
+from ..services.evaluation import AnswerKey, answer_keys
+from ..services.http_client import get_http_client
+from ..services.chunked_upload import chunked_uploads
 
 router = APIRouter(prefix="/api/tests", tags=["Test Engine"])
 
@@ -46,46 +53,20 @@ async def test_heartbeat(
     - Remaining time
     - Whether answers are being saved
 
+    Served from attempt_cache - no DB access unless the entry is missing.
     Frontend should show warning if this fails 3 times in a row.
     """
     try:
-        result = await db.execute(
-            select(TestAttempt)
-            .where(TestAttempt.id == attempt_id)
-            .where(TestAttempt.user_id == current_user.id)
-        )
-        attempt = result.scalar_one_or_none()
+        timing = await attempt_cache.get(db, attempt_id, current_user.id)
 
-        if not attempt:
+        if not timing:
             return {"status": "error", "message": "Attempt not found"}
 
-        # Get test for duration
-        test_result = await db.execute(
-            select(Test).where(Test.id == attempt.test_id)
-        )
-        test = test_result.scalar_one_or_none()
-
-        # Calculate remaining time
-        remaining_seconds = None
-        if attempt.started_at and test:
-            started_at = attempt.started_at
-            if started_at.tzinfo is None:
-                started_at = started_at.replace(tzinfo=timezone.utc)
-            elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
-            remaining_seconds = max(0, (test.duration_minutes * 60) - elapsed)
-
-        # Count saved answers
-        answer_count = await db.execute(
-            select(func.count(UserAnswer.id))
-            .where(UserAnswer.attempt_id == attempt_id)
-        )
-        saved_answers = answer_count.scalar() or 0
-
         return {
             "status": "ok",
-            "attempt_status": attempt.status,
-            "remaining_seconds": remaining_seconds,
-            "saved_answers": saved_answers,
+            "attempt_status": timing.status,
+            "remaining_seconds": timing.remaining_seconds(),
+            "saved_answers": timing.saved_answers,
             "server_time": datetime.now(timezone.utc).isoformat()
         }
     except Exception as e:
@@ -107,37 +88,49 @@ async def heartbeat(
     
     Called every 2 minutes by frontend to:
     - Prevent connection timeouts
-    - Update last activity timestamp
+    - Update last activity timestamp (batched, written periodically)
     - Verify session is still valid
     """
-    result = await db.execute(
-        select(TestAttempt)
-        .where(TestAttempt.id == attempt_id)
-        .where(TestAttempt.user_id == current_user.id)
-        .where(TestAttempt.status == "in_progress")
-    )
-    attempt = result.scalar_one_or_none()
+    timing = await attempt_cache.get(db, attempt_id, current_user.id)
     
-    if not attempt:
+    if not timing or timing.status != "in_progress":
         return {"alive": False, "reason": "attempt_not_found_or_completed"}
     
-    # Update last_activity timestamp if the field exists
-    # This helps track active sessions
-    try:
-        if hasattr(attempt, 'last_activity'):
-            attempt.last_activity = datetime.now(timezone.utc)
-            await db.commit()
-    except:
-        pass  # Field might not exist, that's ok
+    attempt_cache.touch(attempt_id)
     
     return {
         "alive": True,
         "attempt_id": attempt_id,
-        "status": attempt.status,
+        "status": timing.status,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
 
+async def _score_answers(db: AsyncSession, test_id: int, answers: List[UserAnswer]) -> Tuple[Optional[AnswerKey], float]:
+    """
+    Re-score an attempt's answers against the compiled answer key (picks up key
+    corrections; only rows whose result changed are written on commit). Every
+    completion path scores through here so an attempt gets the same score
+    however it ended. Returns (key, total score).
+    """
+    key = await answer_keys.get(db, test_id, [a.question_id for a in answers])
+    if key is None:
+        return None, sum(a.marks_obtained or 0 for a in answers)
+
+    scored = key.score(
+        {a.question_id: a.answer_text for a in answers},
+        {a.question_id: a for a in answers}
+    )
+    answers_by_question = {a.question_id: a for a in answers}
+    for graded in scored.answers:
+        answer = answers_by_question[graded.question.id]
+        answer.is_correct = graded.is_correct
+        answer.marks_obtained = graded.marks_obtained
+    # Questions outside the key keep their stored marks
+    unknown = set(scored.unknown_question_ids)
+    return key, scored.score + sum(a.marks_obtained or 0 for a in answers if a.question_id in unknown)
+
+
 @router.post("/emergency-submit/{attempt_id}")
 async def emergency_submit_test(
     attempt_id: int,
@@ -185,13 +178,19 @@ async def emergency_submit_test(
             )
             test = test_result.scalar_one_or_none()
 
+            # Write buffered answers before scoring, then hold the attempt row
+            # so another worker's buffer can't add answers until we commit
+            await answer_buffer.flush_attempt(db, attempt_id)
+            await lock_attempts(db, [attempt_id])
+
             # Calculate score from whatever answers we have
             answers_result = await db.execute(
                 select(UserAnswer).where(UserAnswer.attempt_id == attempt_id)
             )
             answers = answers_result.scalars().all()
 
-            total_score = sum(a.marks_obtained or 0 for a in answers)
+            # Re-score against the compiled answer key
+            _, total_score = await _score_answers(db, attempt.test_id, answers)
             total_marks = attempt.total_marks or (test.total_marks if test else 100)
             percentage = (total_score / total_marks * 100) if total_marks > 0 else 0
 
@@ -210,6 +209,7 @@ async def emergency_submit_test(
                 attempt.time_taken_seconds = int((now - started_at).total_seconds())
 
             await db.commit()
+            attempt_cache.set_status(attempt_id, "completed")
 
             print(f"✅ EMERGENCY SUBMIT SUCCESS: attempt {attempt_id}, score {total_score}/{total_marks}")
 
@@ -298,12 +298,17 @@ async def emergency_submit_no_auth(
     )
     test = test_result.scalar_one_or_none()
 
+    # Write buffered answers before scoring, then hold the attempt row
+    await answer_buffer.flush_attempt(db, attempt_id)
+    await lock_attempts(db, [attempt_id])
+
     answers_result = await db.execute(
         select(UserAnswer).where(UserAnswer.attempt_id == attempt_id)
     )
     answers = answers_result.scalars().all()
 
-    total_score = sum(a.marks_obtained or 0 for a in answers)
+    # Re-score against the compiled answer key, same as /complete
+    _, total_score = await _score_answers(db, attempt.test_id, answers)
     total_marks = attempt.total_marks or (test.total_marks if test else 100)
     percentage = (total_score / total_marks * 100) if total_marks > 0 else 0
 
@@ -324,6 +329,7 @@ async def emergency_submit_no_auth(
         attempt.time_taken_seconds = int((now - started_at).total_seconds())
 
     await db.commit()
+    attempt_cache.set_status(attempt_id, "completed")
 
     print(f"✅ EMERGENCY NO-AUTH SUBMIT: attempt {attempt_id}, user {email}, score {total_score}")
 
@@ -353,7 +359,8 @@ async def bulk_save_answers(
     - Periodically during test (every 2 minutes)
     - When user tries to close browser
 
-    More reliable than saving answers one-by-one.
+    More reliable than saving answers one-by-one. Writes with a single
+    INSERT ... ON CONFLICT upsert regardless of how many answers are sent.
     """
     # Verify attempt
     result = await db.execute(
@@ -369,93 +376,71 @@ async def bulk_save_answers(
     if attempt.status == "completed":
         return {"saved": 0, "message": "Test already completed"}
 
-    saved_count = 0
-    errors = []
+    # Write older buffered saves first so they can't overwrite this batch
+    await answer_buffer.flush_attempt(db, attempt_id)
+
+    # Last write wins for duplicate question_ids (ON CONFLICT can't touch a row twice)
+    latest = {a.question_id: a for a in answers}
 
-    # Get all questions for scoring
-    question_ids = [a.question_id for a in answers]
-    if question_ids:
+    # Get all questions for scoring in one query
+    questions_map = {}
+    if latest:
         q_result = await db.execute(
-            select(Question).where(Question.id.in_(question_ids))
+            select(Question.id, Question.question_type, Question.options,
+                   Question.correct_answer, Question.marks)
+            .where(Question.id.in_(latest.keys()))
         )
-        questions_map = {q.id: q for q in q_result.scalars().all()}
-    else:
-        questions_map = {}
-
-    # Helper to normalize answer to option ID
-    def normalize_to_option_id(options, text_or_id):
-        """Convert text answer to option ID for consistent comparison"""
-        if not options or not text_or_id:
-            return text_or_id
-        # First check if it's already an ID
-        for opt in options:
-            if isinstance(opt, dict) and opt.get('id') == text_or_id:
-                return text_or_id  # Already an ID
-        # Then check if it's text that matches an option
-        for opt in options:
-            if isinstance(opt, dict) and opt.get('text') == text_or_id:
-                return opt.get('id', text_or_id)
-        return text_or_id  # Return as-is if not found
-
-    for answer_data in answers:
-        try:
-            question = questions_map.get(answer_data.question_id)
-
-            # Normalize the answer for MCQ questions
-            normalized_answer = answer_data.answer_text
-            if question and question.question_type == "mcq" and question.options:
-                normalized_answer = normalize_to_option_id(question.options, answer_data.answer_text)
-
-            # Check existing
-            existing_result = await db.execute(
-                select(UserAnswer)
-                .where(UserAnswer.attempt_id == attempt_id)
-                .where(UserAnswer.question_id == answer_data.question_id)
-            )
-            existing = existing_result.scalar_one_or_none()
-
-            # Calculate score for MCQ
-            is_correct = None
-            marks_obtained = 0
-            if question and question.question_type == "mcq" and question.correct_answer:
-                is_correct = (normalized_answer == question.correct_answer)
-                marks_obtained = question.marks if is_correct else 0
-
-            if existing:
-                existing.answer_text = normalized_answer
-                existing.annotation_data = answer_data.annotation_data
-                existing.time_spent_seconds = answer_data.time_spent_seconds
-                existing.answered_at = datetime.now(timezone.utc)
-                existing.is_correct = is_correct
-                existing.marks_obtained = marks_obtained
-            else:
-                new_answer = UserAnswer(
-                    attempt_id=attempt_id,
-                    question_id=answer_data.question_id,
-                    answer_text=normalized_answer,
-                    annotation_data=answer_data.annotation_data,
-                    is_correct=is_correct,
-                    marks_obtained=marks_obtained,
-                    time_spent_seconds=answer_data.time_spent_seconds
-                )
-                db.add(new_answer)
-
-            saved_count += 1
-
-        except Exception as e:
-            errors.append({"question_id": answer_data.question_id, "error": str(e)[:50]})
+        questions_map = {q.id: q for q in q_result.all()}
+
+    # Per-question lookup of option text/id -> option id (ids take precedence)
+    option_lookup = {}
+    for q in questions_map.values():
+        if q.question_type == "mcq" and q.options:
+            opts = [o for o in q.options if isinstance(o, dict)]
+            lookup = {o.get('text'): o.get('id', o.get('text')) for o in opts}
+            lookup.update({o.get('id'): o.get('id') for o in opts})
+            option_lookup[q.id] = lookup
+
+    # Normalize and score every answer in a single pass
+    now = datetime.now(timezone.utc)
+    rows = []
+    for question_id, answer_data in latest.items():
+        question = questions_map.get(question_id)
+        answer_text = answer_data.answer_text
+        if answer_text and question_id in option_lookup:
+            answer_text = option_lookup[question_id].get(answer_text, answer_text)
+
+        is_correct = None
+        marks_obtained = 0
+        if question and question.question_type == "mcq" and question.correct_answer:
+            is_correct = (answer_text == question.correct_answer)
+            marks_obtained = question.marks if is_correct else 0
+
+        rows.append({
+            "attempt_id": attempt_id,
+            "question_id": question_id,
+            "answer_text": answer_text,
+            "annotation_data": answer_data.annotation_data,
+            "time_spent_seconds": answer_data.time_spent_seconds,
+            "answered_at": now,
+            "is_correct": is_correct,
+            "marks_obtained": marks_obtained,
+        })
 
     try:
+        await upsert_user_answers(db, rows)
         await db.commit()
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to save answers: {str(e)[:100]}")
 
+    attempt_cache.mark_answered(attempt_id, latest.keys())
+
     return {
-        "saved": saved_count,
+        "saved": len(answers),
         "total": len(answers),
-        "errors": errors if errors else None,
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        "errors": None,
+        "timestamp": now.isoformat()
     }
 
 
@@ -506,65 +491,13 @@ async def get_available_tests(
     return test_data
 
 
-@router.post("/start", response_model=TestSessionResponse)
-async def start_test(
-    data: StartTestRequest,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Start a new test session"""
-    # Get the test
-    result = await db.execute(
-        select(Test)
-        .where(Test.id == data.test_id)
-        .where(Test.is_active == True)
-        .where(Test.is_published == True)
-    )
-    test = result.scalar_one_or_none()
-    
-    if not test:
-        raise HTTPException(status_code=404, detail="Test not found or not available")
-    
-    # Check if user already COMPLETED this test (prevent retake)
-    completed_result = await db.execute(
-        select(TestAttempt)
-        .where(TestAttempt.test_id == data.test_id)
-        .where(TestAttempt.user_id == current_user.id)
-        .where(TestAttempt.status == "completed")
-    )
-    completed_attempt = completed_result.scalar_one_or_none()
-    
-    if completed_attempt:
-        raise HTTPException(
-            status_code=400, 
-            detail="You have already completed this test. Each test can only be taken once."
-        )
-    
-    # Check if user has an in-progress attempt (to resume)
-    existing_result = await db.execute(
-        select(TestAttempt)
-        .where(TestAttempt.test_id == data.test_id)
-        .where(TestAttempt.user_id == current_user.id)
-        .where(TestAttempt.status == "in_progress")
-        .order_by(TestAttempt.started_at.desc())
-        .limit(1)
-    )
-    existing_attempt = existing_result.scalar_one_or_none()
-    
-    if existing_attempt:
-        # Resume existing attempt
-        attempt = existing_attempt
-    else:
-        # Create new attempt
-        attempt = TestAttempt(
-            user_id=current_user.id,
-            test_id=test.id,
-            total_marks=test.total_marks
-        )
-        db.add(attempt)
-        await db.commit()
-        await db.refresh(attempt)
-    
+async def _build_session_payload(db: AsyncSession, test: Test) -> dict:
+    """
+    Build the candidate-facing session payload for a test.
+
+    Identical for every candidate, so callers cache it in test_session_cache.
+    Correct answers are never included.
+    """
     # Get questions for this test
     questions_result = await db.execute(
         select(Question)
@@ -573,34 +506,20 @@ async def start_test(
         .order_by(TestQuestion.order)
     )
     questions = questions_result.scalars().all()
-    
+
     # If no questions linked yet, get questions based on test config
     if not questions:
-        # For demo, generate some sample MCQ questions
         questions = await _get_sample_questions(db, test)
-    
-    # CRITICAL: Prevent starting test with no questions
-    if not questions:
-        # Delete the attempt we just created since test can't proceed
-        if not existing_attempt:
-            await db.delete(attempt)
-            await db.commit()
-        raise HTTPException(
-            status_code=400,
-            detail="This test has no questions configured. Please contact the administrator."
-        )
-    
+
     # Get division documents for agent_analysis questions
     division_docs = None
     if test.division_id:
         from ..models.test import Division
         div_result = await db.execute(
-            select(Division).where(Division.id == test.division_id)
+            select(Division.documents).where(Division.id == test.division_id)
         )
-        division = div_result.scalar_one_or_none()
-        if division and division.documents:
-            division_docs = division.documents
-    
+        division_docs = div_result.scalar_one_or_none() or None
+
     # Convert to response format (without correct answers)
     question_responses = [
         QuestionForTest(
@@ -615,21 +534,128 @@ async def start_test(
             # For agent_analysis, use division docs; otherwise use question docs
             documents=division_docs if q.question_type == "agent_analysis" and division_docs else q.documents,
             marks=q.marks
-        )
+        ).model_dump(mode="json")
         for q in questions
     ]
-    
+
+    return {
+        "test_id": test.id,
+        "test_title": test.title,
+        "duration_minutes": test.duration_minutes,
+        "total_marks": test.total_marks,
+        "is_active": test.is_active,
+        "is_published": test.is_published,
+        "enable_tab_switch_detection": test.enable_tab_switch_detection,
+        "max_tab_switches_allowed": test.max_tab_switches_allowed,
+        "questions": question_responses,
+    }
+
+
+async def _get_session_payload(db: AsyncSession, test_id: int) -> Optional[dict]:
+    """Get a test's session payload from cache, building it on a miss."""
+    payload = await test_session_cache.get(test_id)
+    if payload is not None:
+        return payload
+
+    test_result = await db.execute(select(Test).where(Test.id == test_id))
+    test = test_result.scalar_one_or_none()
+    if not test:
+        return None
+
+    payload = await _build_session_payload(db, test)
+    # Don't cache an empty question set - admin is still configuring the test
+    if payload["questions"]:
+        await test_session_cache.set(test_id, payload)
+    return payload
+
+
+async def _question_in_test(db: AsyncSession, test_id: int, question_id: int) -> bool:
+    """
+    Whether a question is part of a test: linked or in one of its sections
+    (answer key), or served from the sample pool (session payload). Both are
+    cached, so buffered saves can be checked without a query.
+    """
+    key = await answer_keys.get(db, test_id)
+    if key is not None and question_id in key.questions:
+        return True
+    payload = await _get_session_payload(db, test_id)
+    return payload is not None and any(q["id"] == question_id for q in payload["questions"])
+
+
+def _session_response(payload: dict, attempt: TestAttempt) -> TestSessionResponse:
     return TestSessionResponse(
         attempt_id=attempt.id,
-        test_id=test.id,
-        test_title=test.title,
-        duration_minutes=test.duration_minutes,
-        total_questions=len(question_responses),
-        questions=question_responses,
+        test_id=payload["test_id"],
+        test_title=payload["test_title"],
+        duration_minutes=payload["duration_minutes"],
+        total_questions=len(payload["questions"]),
+        questions=payload["questions"],
         started_at=attempt.started_at,
-        enable_tab_switch_detection=test.enable_tab_switch_detection,
-        max_tab_switches_allowed=test.max_tab_switches_allowed
+        enable_tab_switch_detection=payload["enable_tab_switch_detection"],
+        max_tab_switches_allowed=payload["max_tab_switches_allowed"]
+    )
+
+
+@router.post("/start", response_model=TestSessionResponse)
+async def start_test(
+    data: StartTestRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Start a new test session"""
+    # Get the (cached) test payload
+    payload = await _get_session_payload(db, data.test_id)
+
+    if not payload or not payload["is_active"] or not payload["is_published"]:
+        raise HTTPException(status_code=404, detail="Test not found or not available")
+
+    # Completed and in-progress attempts in one query
+    attempts_result = await db.execute(
+        select(TestAttempt)
+        .where(TestAttempt.test_id == data.test_id)
+        .where(TestAttempt.user_id == current_user.id)
+        .where(TestAttempt.status.in_(["completed", "in_progress"]))
+        .order_by(TestAttempt.started_at.desc())
     )
+    attempts = attempts_result.scalars().all()
+
+    # Check if user already COMPLETED this test (prevent retake)
+    if any(a.status == "completed" for a in attempts):
+        raise HTTPException(
+            status_code=400, 
+            detail="You have already completed this test. Each test can only be taken once."
+        )
+
+    # CRITICAL: Prevent starting test with no questions
+    if not payload["questions"]:
+        raise HTTPException(
+            status_code=400,
+            detail="This test has no questions configured. Please contact the administrator."
+        )
+
+    if attempts:
+        # Resume existing attempt
+        attempt = attempts[0]
+        answered_result = await db.execute(
+            select(UserAnswer.question_id).where(UserAnswer.attempt_id == attempt.id)
+        )
+        answered = answered_result.scalars().all()
+    else:
+        # Create new attempt
+        attempt = TestAttempt(
+            user_id=current_user.id,
+            test_id=data.test_id,
+            total_marks=payload["total_marks"]
+        )
+        db.add(attempt)
+        await db.commit()
+        await db.refresh(attempt)
+        answered = []
+
+    # Heartbeats for this attempt are served from memory from now on
+    attempt_cache.put(attempt, payload["duration_minutes"], answered)
+
+    return _session_response(payload, attempt)
 
 
 @router.get("/{test_id}/session", response_model=Optional[TestSessionResponse])
@@ -650,68 +676,14 @@ async def get_test_session(
     
     if not attempt:
         return None
-        
-    # Get test info
-    test_result = await db.execute(select(Test).where(Test.id == test_id))
-    test = test_result.scalar_one_or_none()
-    if not test:
-        return None
-        
-    # Get questions
-    questions_result = await db.execute(
-        select(Question)
-        .join(TestQuestion, Question.id == TestQuestion.question_id)
-        .where(TestQuestion.test_id == test.id)
-        .order_by(TestQuestion.order)
-    )
-    questions = questions_result.scalars().all()
-    
-    if not questions:
-        questions = await _get_sample_questions(db, test)
-    
-    # If still no questions, return None (cannot resume without questions)
-    if not questions:
+
+    payload = await _get_session_payload(db, test_id)
+
+    # If no questions, return None (cannot resume without questions)
+    if not payload or not payload["questions"]:
         return None
-    
-    # Get division documents for agent_analysis questions
-    division_docs = None
-    if test.division_id:
-        from ..models.test import Division
-        div_result = await db.execute(
-            select(Division).where(Division.id == test.division_id)
-        )
-        division = div_result.scalar_one_or_none()
-        if division and division.documents:
-            division_docs = division.documents
-    
-    question_responses = [
-        QuestionForTest(
-            id=q.id,
-            question_type=q.question_type,
-            question_text=q.question_text,
-            options=q.options,
-            media_url=q.media_url,
-            passage=q.passage,
-            sentences=q.sentences,
-            html_content=q.html_content,
-            # For agent_analysis, use division docs; otherwise use question docs
-            documents=division_docs if q.question_type == "agent_analysis" and division_docs else q.documents,
-            marks=q.marks
-        )
-        for q in questions
-    ]
-    
-    return TestSessionResponse(
-        attempt_id=attempt.id,
-        test_id=test.id,
-        test_title=test.title,
-        duration_minutes=test.duration_minutes,
-        total_questions=len(question_responses),
-        questions=question_responses,
-        started_at=attempt.started_at,
-        enable_tab_switch_detection=test.enable_tab_switch_detection,
-        max_tab_switches_allowed=test.max_tab_switches_allowed
-    )
+
+    return _session_response(payload, attempt)
 
 
 async def _get_sample_questions(db: AsyncSession, test: Test) -> List[Question]:
@@ -781,13 +753,12 @@ async def submit_answer(
     """
     Submit an answer for a question.
 
-    Robust implementation:
-    - Single transaction (no partial saves)
-    - Retry on transient failures
-    - Proper error handling
+    Write-behind implementation:
+    - Answer is scored immediately and queued in answer_buffer
+    - Buffer coalesces repeated saves and writes them in batches
+    - /complete and emergency submits flush the attempt before scoring; a
+      completion on another worker still gets it (answer_buffer re-scores)
     """
-    import asyncio
-
     # Verify attempt belongs to user
     result = await db.execute(
         select(TestAttempt)
@@ -806,100 +777,51 @@ async def submit_answer(
     )
     question = q_result.scalar_one_or_none()
 
-    if not question:
+    if not question or not await _question_in_test(db, attempt.test_id, question.id):
         raise HTTPException(status_code=404, detail="Question not found")
 
-    # Retry logic for transient DB failures
-    max_retries = 3
-    last_error = None
-
-    for attempt_num in range(max_retries):
-        try:
-            # Check if answer already exists
-            existing_result = await db.execute(
-                select(UserAnswer)
-                .where(UserAnswer.attempt_id == attempt_id)
-                .where(UserAnswer.question_id == data.question_id)
-            )
-            existing_answer = existing_result.scalar_one_or_none()
-
-            # Helper to normalize answer to option ID
-            def normalize_to_option_id(options, text_or_id):
-                """Convert text answer to option ID for consistent comparison"""
-                if not options or not text_or_id:
-                    return text_or_id
-                # First check if it's already an ID
-                for opt in options:
-                    if isinstance(opt, dict) and opt.get('id') == text_or_id:
-                        return text_or_id  # Already an ID
-                # Then check if it's text that matches an option
-                for opt in options:
-                    if isinstance(opt, dict) and opt.get('text') == text_or_id:
-                        return opt.get('id', text_or_id)
-                return text_or_id  # Return as-is if not found
-
-            # Normalize the answer for MCQ questions
-            normalized_answer = data.answer_text
-            if question.question_type == "mcq" and question.options:
-                normalized_answer = normalize_to_option_id(question.options, data.answer_text)
-
-            if existing_answer:
-                # Update existing answer
-                existing_answer.answer_text = normalized_answer
-                existing_answer.annotation_data = data.annotation_data
-                existing_answer.time_spent_seconds = data.time_spent_seconds
-                existing_answer.answered_at = datetime.now(timezone.utc)
-
-                # Auto-score for MCQ
-                if question.question_type == "mcq" and question.correct_answer:
-                    existing_answer.is_correct = (normalized_answer == question.correct_answer)
-                    existing_answer.marks_obtained = question.marks if existing_answer.is_correct else 0
-
-                await db.commit()
-                return {"message": "Answer updated", "answer_id": existing_answer.id, "saved": True}
-            else:
-                # Create new answer
-                is_correct = None
-                marks_obtained = 0
-
-                # Auto-score for MCQ
-                if question.question_type == "mcq" and question.correct_answer:
-                    is_correct = (normalized_answer == question.correct_answer)
-                    marks_obtained = question.marks if is_correct else 0
-
-                answer = UserAnswer(
-                    attempt_id=attempt_id,
-                    question_id=data.question_id,
-                    answer_text=normalized_answer,  # Store normalized ID
-                    annotation_data=data.annotation_data,
-                    is_correct=is_correct,
-                    marks_obtained=marks_obtained,
-                    time_spent_seconds=data.time_spent_seconds
-                )
-                db.add(answer)
-
-                # Update current question in attempt - SINGLE transaction
-                attempt.current_question += 1
-
-                await db.commit()
-                await db.refresh(answer)
+    # Helper to normalize answer to option ID
+    def normalize_to_option_id(options, text_or_id):
+        """Convert text answer to option ID for consistent comparison"""
+        if not options or not text_or_id:
+            return text_or_id
+        # First check if it's already an ID
+        for opt in options:
+            if isinstance(opt, dict) and opt.get('id') == text_or_id:
+                return text_or_id  # Already an ID
+        # Then check if it's text that matches an option
+        for opt in options:
+            if isinstance(opt, dict) and opt.get('text') == text_or_id:
+                return opt.get('id', text_or_id)
+        return text_or_id  # Return as-is if not found
 
-                return {"message": "Answer submitted", "answer_id": answer.id, "saved": True}
+    # Normalize the answer for MCQ questions
+    normalized_answer = data.answer_text
+    if question.question_type == "mcq" and question.options:
+        normalized_answer = normalize_to_option_id(question.options, data.answer_text)
 
-        except Exception as e:
-            last_error = str(e)
-            print(f"Answer submit attempt {attempt_num + 1}/{max_retries} failed: {last_error}")
-            await db.rollback()
+    fields = {
+        "answer_text": normalized_answer,  # Store normalized ID
+        "annotation_data": data.annotation_data,
+        "time_spent_seconds": data.time_spent_seconds,
+    }
 
-            if attempt_num < max_retries - 1:
-                await asyncio.sleep(0.5 * (attempt_num + 1))  # Backoff
-                continue
+    # Auto-score for MCQ
+    if question.question_type == "mcq" and question.correct_answer:
+        is_correct = (normalized_answer == question.correct_answer)
+        fields["is_correct"] = is_correct
+        fields["marks_obtained"] = question.marks if is_correct else 0
 
-    # All retries failed
-    raise HTTPException(
-        status_code=500,
-        detail=f"Failed to save answer after {max_retries} attempts. Please try again."
+    was_pending = answer_buffer.enqueue(
+        attempt_id, data.question_id, advance_question=True, **fields
     )
+    attempt_cache.mark_answered(attempt_id, [data.question_id])
+
+    return {
+        "message": "Answer updated" if was_pending else "Answer submitted",
+        "answer_id": None,  # Assigned when the buffer flushes
+        "saved": True
+    }
 
 
 @router.post("/auto-save-answer")
@@ -915,53 +837,37 @@ async def auto_save_answer(
     Lighter than submit-answer:
     - No validation errors shown to user
     - Silent failure (returns success even if save fails)
+    - Queued in answer_buffer, written in the next batch
     - Used for crash recovery
     """
     try:
         # Verify attempt
         result = await db.execute(
-            select(TestAttempt)
+            select(TestAttempt.test_id)
             .where(TestAttempt.id == attempt_id)
             .where(TestAttempt.user_id == current_user.id)
             .where(TestAttempt.status == "in_progress")
         )
-        attempt = result.scalar_one_or_none()
-
-        if not attempt:
+        test_id = result.scalar_one_or_none()
+        if test_id is None:
             return {"saved": False, "reason": "attempt_not_found"}
 
-        # Upsert answer
-        existing_result = await db.execute(
-            select(UserAnswer)
-            .where(UserAnswer.attempt_id == attempt_id)
-            .where(UserAnswer.question_id == data.question_id)
-        )
-        existing_answer = existing_result.scalar_one_or_none()
-
-        if existing_answer:
-            existing_answer.answer_text = data.answer_text
-            existing_answer.annotation_data = data.annotation_data
-            existing_answer.time_spent_seconds = data.time_spent_seconds
-            existing_answer.answered_at = datetime.now(timezone.utc)
-        else:
-            answer = UserAnswer(
-                attempt_id=attempt_id,
-                question_id=data.question_id,
-                answer_text=data.answer_text,
-                annotation_data=data.annotation_data,
-                time_spent_seconds=data.time_spent_seconds
-            )
-            db.add(answer)
+        # An unknown question would be rejected by the database at flush time
+        if not await _question_in_test(db, test_id, data.question_id):
+            return {"saved": False, "reason": "question_not_in_test"}
 
-        await db.commit()
+        answer_buffer.enqueue(
+            attempt_id,
+            data.question_id,
+            answer_text=data.answer_text,
+            annotation_data=data.annotation_data,
+            time_spent_seconds=data.time_spent_seconds
+        )
+        attempt_cache.mark_answered(attempt_id, [data.question_id])
         return {"saved": True, "timestamp": datetime.now(timezone.utc).isoformat()}
 
     except Exception as e:
         print(f"Auto-save failed (non-critical): {e}")
-        try:
-            await db.rollback()
-        except:
-            pass
         return {"saved": False, "reason": "db_error"}
 
 
@@ -1076,6 +982,9 @@ async def upload_answer_file(
             detail="Cloud storage temporarily unavailable. Please try again in a few moments."
         )
     
+    # Write buffered saves first so a stale auto-save can't overwrite the file URL
+    await answer_buffer.flush_attempt(db, attempt_id)
+
     # Store file URL as answer
     answer = await db.execute(
         select(UserAnswer).where(
@@ -1100,6 +1009,123 @@ async def upload_answer_file(
     return {"message": "File uploaded", "filepath": public_url}
 
 
+# ============================================================================
+# CHUNKED UPLOADS - Resumable answer files and proctoring videos
+# ============================================================================
+
+@router.post("/uploads", response_model=ChunkedUploadResponse)
+async def init_chunked_upload(
+    request: ChunkedUploadInit,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Start a resumable upload. Send the file as chunk_size pieces with
+    PUT /uploads/{upload_id}/chunks/{n}, then POST /uploads/{upload_id}/complete.
+    """
+    session = await chunked_uploads.init(
+        db,
+        user_id=current_user.id,
+        kind=request.kind,
+        attempt_id=request.attempt_id,
+        filename=request.filename,
+        total_size=request.total_size,
+        content_type=request.content_type,
+        question_id=request.question_id,
+    )
+    return await chunked_uploads.describe(db, session)
+
+
+@router.put("/uploads/{upload_id}/chunks/{chunk_index}", response_model=ChunkedUploadResponse)
+async def put_upload_chunk(
+    upload_id: str,
+    chunk_index: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Store chunk chunk_index (raw request body). Every chunk but the last is
+    exactly chunk_size bytes. Re-sending a chunk replaces it.
+    """
+    session = await chunked_uploads.get(db, upload_id, current_user.id)
+    await chunked_uploads.write_chunk(db, session, chunk_index, request.stream())
+    return await chunked_uploads.describe(db, session)
+
+
+@router.get("/uploads/{upload_id}", response_model=ChunkedUploadResponse)
+async def get_chunked_upload(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Upload state - after a disconnect, resend missing_chunks only."""
+    session = await chunked_uploads.get(db, upload_id, current_user.id)
+    return await chunked_uploads.describe(db, session)
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=ChunkedUploadResponse, status_code=202)
+async def complete_chunked_upload(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Assemble the chunks and push the file to cloud storage in the background.
+    Poll GET /uploads/{upload_id} until status is completed (file_url set).
+    Idempotent; calling it again after a failed push retries the push.
+    """
+    session = await chunked_uploads.get(db, upload_id, current_user.id)
+    session = await chunked_uploads.complete(db, session)
+    return await chunked_uploads.describe(db, session)
+
+
+def _answer_details(key: Optional[AnswerKey], answers: List[UserAnswer]) -> List[dict]:
+    """Result rows for stored answers, with option IDs converted to text for display"""
+    answer_details = []
+    for answer in answers:
+        question = key.questions.get(answer.question_id) if key else None
+        answer_details.append({
+            "question_id": answer.question_id,
+            "question_text": question.question_text if question else "",
+            "user_answer": question.display(answer.answer_text) if question else answer.answer_text,
+            "correct_answer": question.display(question.correct_answer) if question else None,
+            "is_correct": answer.is_correct,
+            "marks_obtained": answer.marks_obtained,
+            "max_marks": question.marks if question else 0
+        })
+    return answer_details
+
+
+async def _existing_result(db: AsyncSession, attempt: TestAttempt) -> TestResultResponse:
+    """Result of an attempt that is already completed, as stored (no re-scoring)"""
+    test_result = await db.execute(
+        select(Test).where(Test.id == attempt.test_id)
+    )
+    test = test_result.scalar_one_or_none()
+
+    answers_result = await db.execute(
+        select(UserAnswer).where(UserAnswer.attempt_id == attempt.id)
+    )
+    answers = answers_result.scalars().all()
+
+    key = await answer_keys.get(db, attempt.test_id, [a.question_id for a in answers])
+    answer_details = _answer_details(key, answers)
+
+    return TestResultResponse(
+        attempt_id=attempt.id,
+        test_id=attempt.test_id,
+        test_title=test.title if test else "Unknown",
+        score=attempt.score or 0,
+        total_marks=attempt.total_marks or (test.total_marks if test else 0),
+        percentage=attempt.percentage or 0,
+        passed=attempt.passed or False,
+        time_taken_seconds=attempt.time_taken_seconds or 0,
+        completed_at=attempt.completed_at,
+        answers=answer_details
+    )
+
+
 @router.post("/complete/{attempt_id}", response_model=TestResultResponse)
 async def complete_test(
     attempt_id: int,
@@ -1128,66 +1154,9 @@ async def complete_test(
     if not attempt:
         raise HTTPException(status_code=404, detail="Test attempt not found")
 
-    # Helper to get option text from ID
-    def get_option_text(options, option_id):
-        """Get the text of an option by its ID"""
-        if not options or not option_id:
-            return option_id
-        for opt in options:
-            if isinstance(opt, dict) and opt.get('id') == option_id:
-                return opt.get('text', option_id)
-        return option_id  # Return ID if not found
-
     # If already completed, return the existing result (idempotent)
     if attempt.status == "completed":
-        # Fetch and return existing results
-        test_result = await db.execute(
-            select(Test).where(Test.id == attempt.test_id)
-        )
-        test = test_result.scalar_one_or_none()
-
-        answers_result = await db.execute(
-            select(UserAnswer).where(UserAnswer.attempt_id == attempt_id)
-        )
-        answers = answers_result.scalars().all()
-
-        question_ids = [a.question_id for a in answers]
-        if question_ids:
-            questions_result = await db.execute(
-                select(Question).where(Question.id.in_(question_ids))
-            )
-            questions_map = {q.id: q for q in questions_result.scalars().all()}
-        else:
-            questions_map = {}
-
-        answer_details = []
-        for answer in answers:
-            question = questions_map.get(answer.question_id)
-            # Convert IDs to text for display
-            user_answer_text = get_option_text(question.options, answer.answer_text) if question else answer.answer_text
-            correct_answer_text = get_option_text(question.options, question.correct_answer) if question else None
-            answer_details.append({
-                "question_id": answer.question_id,
-                "question_text": question.question_text if question else "",
-                "user_answer": user_answer_text,
-                "correct_answer": correct_answer_text,
-                "is_correct": answer.is_correct,
-                "marks_obtained": answer.marks_obtained,
-                "max_marks": question.marks if question else 0
-            })
-
-        return TestResultResponse(
-            attempt_id=attempt.id,
-            test_id=attempt.test_id,
-            test_title=test.title if test else "Unknown",
-            score=attempt.score or 0,
-            total_marks=attempt.total_marks or (test.total_marks if test else 0),
-            percentage=attempt.percentage or 0,
-            passed=attempt.passed or False,
-            time_taken_seconds=attempt.time_taken_seconds or 0,
-            completed_at=attempt.completed_at,
-            answers=answer_details
-        )
+        return await _existing_result(db, attempt)
 
     # Retry logic for completion
     max_retries = 3
@@ -1195,6 +1164,16 @@ async def complete_test(
 
     for retry in range(max_retries):
         try:
+            # Write buffered answers before scoring
+            await answer_buffer.flush_attempt(db, attempt_id)
+
+            # Hold the attempt row so another worker's buffer can't add answers until we commit
+            locked = await lock_attempts(db, [attempt_id])
+            if locked.get(attempt_id, (None, None))[0] != "in_progress":
+                # Completed meanwhile (another worker, emergency submit): keep that result
+                await db.refresh(attempt)
+                return await _existing_result(db, attempt)
+
             # Update tab switches if provided
             if data and data.tab_switches:
                 attempt.tab_switches = max(attempt.tab_switches or 0, data.tab_switches)
@@ -1214,7 +1193,8 @@ async def complete_test(
             )
             answers = answers_result.scalars().all()
 
-            total_score = sum(a.marks_obtained or 0 for a in answers)
+            # Re-score against the compiled answer key
+            key, total_score = await _score_answers(db, attempt.test_id, answers)
             total_marks = attempt.total_marks or (test.total_marks if test else 0)
             percentage = (total_score / total_marks * 100) if total_marks > 0 else 0
             passed = percentage >= 50  # 50% passing
@@ -1236,6 +1216,7 @@ async def complete_test(
 
             await db.commit()
             await db.refresh(attempt)
+            attempt_cache.set_status(attempt_id, "completed")
             break  # Success!
 
         except Exception as e:
@@ -1261,31 +1242,8 @@ async def complete_test(
                 detail=f"Failed to complete test after {max_retries} attempts. Your answers are saved - please try again."
             )
     
-    # Build answer details - fetch all questions in ONE query (avoid N+1)
-    question_ids = [a.question_id for a in answers]
-    if question_ids:
-        questions_result = await db.execute(
-            select(Question).where(Question.id.in_(question_ids))
-        )
-        questions_map = {q.id: q for q in questions_result.scalars().all()}
-    else:
-        questions_map = {}
-
-    answer_details = []
-    for answer in answers:
-        question = questions_map.get(answer.question_id)
-        # Convert IDs to text for display
-        user_answer_text = get_option_text(question.options, answer.answer_text) if question else answer.answer_text
-        correct_answer_text = get_option_text(question.options, question.correct_answer) if question else None
-        answer_details.append({
-            "question_id": answer.question_id,
-            "question_text": question.question_text if question else "",
-            "user_answer": user_answer_text,
-            "correct_answer": correct_answer_text,
-            "is_correct": answer.is_correct,
-            "marks_obtained": answer.marks_obtained,
-            "max_marks": question.marks if question else 0
-        })
+    # Build answer details from the compiled key (no question queries)
+    answer_details = _answer_details(key, answers)
     
     return TestResultResponse(
         attempt_id=attempt.id,
@@ -1407,7 +1365,8 @@ async def recover_saved_answers(
     if not attempt:
         raise HTTPException(status_code=404, detail="Test attempt not found")
 
-    # Get all saved answers
+    # Get all saved answers (including buffered ones)
+    await answer_buffer.flush_attempt(db, attempt_id)
     answers_result = await db.execute(
         select(UserAnswer).where(UserAnswer.attempt_id == attempt_id)
     )
@@ -1498,13 +1457,16 @@ async def auto_complete_expired_test(
                 detail="Test has not expired yet. Use /complete endpoint instead."
             )
 
-    # Calculate score from saved answers
+    # Calculate score from saved answers (attempt row held until commit)
+    await answer_buffer.flush_attempt(db, attempt_id)
+    await lock_attempts(db, [attempt_id])
     answers_result = await db.execute(
         select(UserAnswer).where(UserAnswer.attempt_id == attempt_id)
     )
     answers = answers_result.scalars().all()
 
-    total_score = sum(a.marks_obtained or 0 for a in answers)
+    # Re-score against the compiled answer key, same as /complete
+    _, total_score = await _score_answers(db, attempt.test_id, answers)
     total_marks = attempt.total_marks or (test.total_marks if test else 0)
     percentage = (total_score / total_marks * 100) if total_marks > 0 else 0
     passed = percentage >= 50
@@ -1526,6 +1488,7 @@ async def auto_complete_expired_test(
         attempt.time_taken_seconds = int((now - started_at).total_seconds())
 
     await db.commit()
+    attempt_cache.set_status(attempt_id, "completed")
 
     return {
         "message": "Test auto-completed due to time expiration",
@@ -1560,42 +1523,14 @@ async def get_test_result(
     )
     test = test_result.scalar_one_or_none()
     
-    # Helper to get option text from ID
-    def get_option_text(options, option_id):
-        """Get the text of an option by its ID"""
-        if not options or not option_id:
-            return option_id
-        for opt in options:
-            if isinstance(opt, dict) and opt.get('id') == option_id:
-                return opt.get('text', option_id)
-        return option_id  # Return ID if not found
-
-    # Get answers with questions
+    # Get answers; question text/options come from the compiled answer key
     answers_result = await db.execute(
         select(UserAnswer).where(UserAnswer.attempt_id == attempt_id)
     )
     answers = answers_result.scalars().all()
 
-    answer_details = []
-    for answer in answers:
-        q_result = await db.execute(
-            select(Question).where(Question.id == answer.question_id)
-        )
-        question = q_result.scalar_one_or_none()
-
-        # Convert IDs to text for display
-        user_answer_text = get_option_text(question.options, answer.answer_text) if question else answer.answer_text
-        correct_answer_text = get_option_text(question.options, question.correct_answer) if question else None
-
-        answer_details.append({
-            "question_id": answer.question_id,
-            "question_text": question.question_text if question else "",
-            "user_answer": user_answer_text,
-            "correct_answer": correct_answer_text,
-            "is_correct": answer.is_correct,
-            "marks_obtained": answer.marks_obtained,
-            "max_marks": question.marks if question else 0
-        })
+    key = await answer_keys.get(db, attempt.test_id, [a.question_id for a in answers])
+    answer_details = _answer_details(key, answers)
 
     return TestResultResponse(
         attempt_id=attempt.id,
@@ -1611,18 +1546,45 @@ async def get_test_result(
     )
 
 
+# Request headers forwarded to the upstream store by the content proxy
+PROXY_FORWARD_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+# Upstream response headers passed back to the browser
+PROXY_PASSBACK_HEADERS = ("content-length", "content-range", "accept-ranges", "etag", "last-modified")
+
+
+def _proxy_media_type(url: str, upstream_type: Optional[str]) -> str:
+    """FORCE override based on file extension because Supabase/upstream often sends text/plain"""
+    lower_url = url.lower().split("?", 1)[0]
+    if lower_url.endswith('.html') or lower_url.endswith('.htm'):
+        return "text/html; charset=utf-8"
+    if lower_url.endswith('.pdf'):
+        return "application/pdf"
+    return upstream_type or "application/octet-stream"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
 @router.get("/content-proxy")
 async def proxy_content(
-    url: str
+    url: str,
+    request: Request
 ):
     """
     Proxy endpoint to serve content with correct content-type/disposition.
     Uses streaming to prevent memory exhaustion (OOM) on large files.
-    Optimized for 10k+ concurrent users.
+    Optimized for 10k+ concurrent users:
+    - Hot documents are served from the local disk cache (Range + ETag aware)
+    - Misses stream through the shared pooled HTTP client with Range and
+      If-None-Match forwarded, so 206/304 come straight from upstream
     """
     import httpx
-    from fastapi.responses import StreamingResponse, RedirectResponse
-    from fastapi import HTTPException
+    from fastapi.responses import StreamingResponse, RedirectResponse, FileResponse, Response
+    from starlette.background import BackgroundTask
 
     # Validate URL is from Cloudinary, Supabase, or our backend
     allowed_domains = [
@@ -1633,58 +1595,106 @@ async def proxy_content(
     if not any(url.startswith(domain) for domain in allowed_domains):
         raise HTTPException(status_code=400, detail="Invalid URL source")
 
+    # Headers for inline display and caching
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Content-Disposition": "inline",
+        "Cache-Control": "public, max-age=3600",  # Cache for 1 hour
+    }
+
+    # Serve hot documents from local disk
+    cached = document_cache.get(url)
+    if cached is not None:
+        headers["ETag"] = cached.etag
+        if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(
+            cached.path,
+            media_type=_proxy_media_type(url, cached.media_type),
+            headers=headers
+        )
+
     # For Supabase public files, redirect directly to avoid proxying
     # This is much more efficient for large files (12MB HTML, etc.)
     if url.startswith("https://rmysstjbjaaqctbbswmj.supabase.co/storage/v1/object/public/"):
+        # Warm the disk cache so the next candidate is served locally
+        document_cache.schedule_fill(url)
         # Return redirect for browsers to fetch directly from CDN
         # This dramatically reduces server memory usage
         return RedirectResponse(url=url, status_code=302)
 
+    client = get_http_client()
+    upstream_headers = {
+        name: request.headers[name] for name in PROXY_FORWARD_HEADERS if name in request.headers
+    }
+    # Bytes are passed through as-is, so the upstream length must describe them
+    upstream_headers["accept-encoding"] = "identity"
     try:
-        # For non-public URLs, stream with optimizations
-        async def stream_generator():
-            # Use connection pooling with limits
-            limits = httpx.Limits(max_keepalive_connections=5, max_connections=10)
-            async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
-                try:
-                    # Smaller chunk size (32KB) to reduce memory per connection
-                    async with client.stream("GET", url, timeout=60.0) as response:
-                        response.raise_for_status()
-                        async for chunk in response.aiter_bytes(chunk_size=32768):
-                            yield chunk
-                except httpx.HTTPError as e:
-                    print(f"Stream error: {e}")
-                    raise
-
-        # Fetch header info first to set media_type correctly without loading body
-        async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
-            head_response = await client.head(url, timeout=10.0)
-
-        # Default to upstream content-type
-        media_type = head_response.headers.get("content-type", "application/octet-stream")
-        content_length = head_response.headers.get("content-length")
-
-        # FORCE override based on file extension because Supabase/upstream often sends text/plain
-        lower_url = url.lower()
-        if lower_url.endswith('.html') or lower_url.endswith('.htm'):
-            media_type = "text/html; charset=utf-8"
-        elif lower_url.endswith('.pdf'):
-            media_type = "application/pdf"
-
-        # Headers for inline display and caching
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Content-Disposition": "inline",
-            "Cache-Control": "public, max-age=3600",  # Cache for 1 hour
-        }
-        if content_length:
-            headers["Content-Length"] = content_length
+        # Single streamed GET - its headers replace the old separate HEAD request
+        upstream = await client.send(
+            client.build_request("GET", url, headers=upstream_headers),
+            stream=True
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch content: {str(e)}")
+
+    for name in PROXY_PASSBACK_HEADERS:
+        if name in upstream.headers:
+            headers[name] = upstream.headers[name]
+    # Encoded anyway: aiter_bytes() decodes, so the upstream length no longer applies
+    encoded = upstream.headers.get("content-encoding", "identity").lower() != "identity"
+    if encoded:
+        headers.pop("content-length", None)
+
+    if upstream.status_code == 304:
+        await upstream.aclose()
+        return Response(status_code=304, headers=headers)
+    if upstream.status_code == 416:
+        await upstream.aclose()
+        return Response(status_code=416, headers=headers)
+    if upstream.status_code not in (200, 206):
+        await upstream.aclose()
+        raise HTTPException(
+            status_code=404 if upstream.status_code == 404 else 502,
+            detail=f"Failed to fetch content: upstream returned {upstream.status_code}"
+        )
 
-        return StreamingResponse(
-            stream_generator(),
-            media_type=media_type,
-            headers=headers
+    media_type = _proxy_media_type(url, upstream.headers.get("content-type"))
+
+    # Tee complete bodies into the disk cache (never partial 206 ranges)
+    writer = None
+    if upstream.status_code == 200:
+        content_length = None if encoded else upstream.headers.get("content-length")
+        writer = document_cache.open_writer(
+            url,
+            upstream.headers.get("content-type", media_type),
+            upstream.headers.get("etag"),
+            int(content_length) if content_length and content_length.isdigit() else None,
         )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch content: {str(e)}")
+    async def stream_generator():
+        completed = False
+        try:
+            # Smaller chunk size (32KB) to reduce memory per connection
+            async for chunk in upstream.aiter_bytes(chunk_size=32768):
+                if writer is not None:
+                    await writer.write(chunk)
+                yield chunk
+            completed = True
+        except httpx.HTTPError as e:
+            print(f"Stream error: {e}")
+            raise
+        finally:
+            if writer is not None:
+                if completed:
+                    await writer.commit()
+                else:
+                    await writer.abort()
+
+    return StreamingResponse(
+        stream_generator(),
+        status_code=upstream.status_code,
+        media_type=media_type,
+        headers=headers,
+        background=BackgroundTask(upstream.aclose)
+    )
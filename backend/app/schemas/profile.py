@@ -259,7 +259,8 @@ class SearchQuery(BaseModel):
     query: str
     skill_filters: Optional[List[str]] = None
     min_experience: Optional[float] = None
-    top_k: int = 20
+    top_k: int = Field(default=20, ge=1, le=100)  # Page size
+    page: int = Field(default=1, ge=1)
 
 
 class CandidateSearchResult(BaseModel):
@@ -272,3 +273,12 @@ class CandidateSearchResult(BaseModel):
     years_exp: Optional[float] = None
     skills: List[str] = Field(default_factory=list)
     professional_summary: Optional[str] = None
+
+
+class CandidateSearchResponse(BaseModel):
+    results: List[CandidateSearchResult]
+    total: int
+    page: int
+    page_size: int
+    skills: List[str] = Field(default_factory=list)  # Skills searched for (filters + parsed from query)
+    min_experience: Optional[float] = None
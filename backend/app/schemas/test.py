@@ -253,6 +253,32 @@ class TestResultResponse(BaseModel):
     answers: List[dict]  # Question with user answer and correctness
 
 
+# ========== Chunked Upload Schemas ==========
+
+class ChunkedUploadInit(BaseModel):
+    """Start a resumable upload (answer_file or proctoring_video)"""
+    kind: str
+    attempt_id: int
+    question_id: Optional[int] = None  # Required for answer files
+    filename: str
+    content_type: Optional[str] = None
+    total_size: int
+
+
+class ChunkedUploadResponse(BaseModel):
+    """Upload session state; clients resume by sending missing_chunks"""
+    upload_id: str
+    kind: str
+    status: str  # uploading, processing, completed, failed
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: List[int]
+    missing_chunks: List[int]
+    file_url: Optional[str] = None
+    error_message: Optional[str] = None
+
+
 # ========== Admin Stats Schemas ==========
 
 class AdminDashboardStats(BaseModel):
@@ -0,0 +1,365 @@
+"""
+Write-Behind Answer Buffer
+
+auto-save-answer and submit-answer fire on nearly every keystroke. Instead of
+a SELECT + INSERT/UPDATE + COMMIT per call, answers are coalesced in memory
+per (attempt_id, question_id) and written in batches on a short interval.
+
+RELIABILITY:
+- /complete, /emergency-submit and friends call flush_attempt() before scoring
+- Shutdown calls stop(), which flushes everything still pending
+- A failed background flush re-queues its entries (newer saves win)
+- A row the database rejects (e.g. a deleted question) is written on its own
+  and dropped after MAX_ROW_FAILURES flushes, so it can't block the others
+- Buffers are per worker, so the interval is kept short (default 1s)
+
+Because buffers are per worker, an attempt can be completed on another worker
+while auto-saves are still queued here. Every write locks the attempt rows
+(lock_attempts) and checks their status:
+- in_progress: written as usual
+- completed: answers saved before completed_at are written and the attempt
+  is re-scored; anything saved afterwards is dropped
+- anything else: dropped
+Completion paths take the same lock before reading answers, so a write and
+a completion never interleave.
+"""
+import asyncio
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..database import dialect_insert
+from ..models.test import TestAttempt, UserAnswer
+from .evaluation import rescore_attempts
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+AnswerKey = Tuple[int, int]  # (attempt_id, question_id)
+
+# Keeps bound parameters well under the asyncpg/SQLite limits (~32k)
+UPSERT_CHUNK_SIZE = 1000
+
+# Flushes a rejected row is retried in before it is dropped
+MAX_ROW_FAILURES = 3
+
+
+async def upsert_user_answers(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """
+    Upsert UserAnswer rows with INSERT ... ON CONFLICT (attempt_id, question_id)
+    DO UPDATE - one statement per UPSERT_CHUNK_SIZE rows. All rows must have
+    the same keys. Does not commit.
+    """
+    if not rows:
+        return
+    insert = dialect_insert(db)
+    update_columns = [c for c in rows[0] if c not in ("attempt_id", "question_id")]
+
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(UserAnswer).values(rows[i:i + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["attempt_id", "question_id"],
+            set_={c: stmt.excluded[c] for c in update_columns}
+        )
+        await db.execute(stmt)
+
+
+async def lock_attempts(db: AsyncSession, attempt_ids) -> Dict[int, Any]:
+    """
+    Lock TestAttempt rows (SELECT ... FOR UPDATE) until the transaction ends
+    and return {attempt_id: (status, completed_at)}. SQLite ignores the lock.
+    """
+    result = await db.execute(
+        select(TestAttempt.id, TestAttempt.status, TestAttempt.completed_at)
+        .where(TestAttempt.id.in_(set(attempt_ids)))
+        .order_by(TestAttempt.id)  # Consistent lock order
+        .with_for_update()
+    )
+    return {row.id: (row.status, row.completed_at) for row in result.all()}
+
+
+def _saved_before(answered_at: datetime, completed_at: Optional[datetime]) -> bool:
+    if completed_at is None:
+        return False
+    if completed_at.tzinfo is None:
+        completed_at = completed_at.replace(tzinfo=timezone.utc)
+    return answered_at <= completed_at
+
+
+class AnswerWriteBuffer:
+    """Coalescing write-behind buffer for UserAnswer upserts."""
+
+    def __init__(self, flush_interval: float = 1.0, max_pending: int = 500):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[AnswerKey, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Metrics
+        self.enqueued = 0
+        self.rows_flushed = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.late_rows = 0
+        self.dropped_rows = 0
+        self.failed_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # ---------- Producer side ----------
+
+    def enqueue(
+        self,
+        attempt_id: int,
+        question_id: int,
+        advance_question: bool = False,
+        **fields: Any
+    ) -> bool:
+        """
+        Buffer an answer write. Later calls for the same key override earlier
+        fields. advance_question bumps TestAttempt.current_question if the
+        answer turns out to be new when flushed.
+
+        Returns True if an unflushed answer for this key was already pending.
+        """
+        key = (attempt_id, question_id)
+        fields["answered_at"] = datetime.now(timezone.utc)
+        existing = self._pending.get(key)
+        if existing:
+            existing.update(fields)
+            existing["_advance"] = existing["_advance"] or advance_question
+        else:
+            self._pending[key] = {**fields, "_advance": advance_question}
+        self.enqueued += 1
+
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+        return existing is not None
+
+    def pending_count(self, attempt_id: Optional[int] = None) -> int:
+        if attempt_id is None:
+            return len(self._pending)
+        return sum(1 for a, _ in self._pending if a == attempt_id)
+
+    def pending_question_ids(self, attempt_id: int) -> List[int]:
+        return [q for a, q in self._pending if a == attempt_id]
+
+    # ---------- Flushing ----------
+
+    async def flush_attempt(self, db: AsyncSession, attempt_id: int) -> int:
+        """Synchronously write every pending answer of one attempt using db."""
+        async with self._lock:
+            entries = {k: self._pending.pop(k) for k in list(self._pending) if k[0] == attempt_id}
+            if not entries:
+                return 0
+            try:
+                rejected = await self._write(db, entries)
+            except Exception:
+                self._requeue(entries)
+                raise
+            self._retry_rejected(rejected)
+            return len(entries)
+
+    async def flush(self, db: Optional[AsyncSession] = None) -> int:
+        """Write everything pending. Uses a fresh session unless db is given."""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            entries, self._pending = self._pending, {}
+            try:
+                if db is not None:
+                    rejected = await self._write(db, entries)
+                else:
+                    from ..database import async_session_maker
+                    async with async_session_maker() as session:
+                        rejected = await self._write(session, entries)
+            except Exception:
+                self._requeue(entries)
+                raise
+            self._retry_rejected(rejected)
+            return len(entries)
+
+    async def _write(
+        self, db: AsyncSession, entries: Dict[AnswerKey, Dict[str, Any]]
+    ) -> Dict[AnswerKey, Dict[str, Any]]:
+        """Write entries in one transaction; returns the rows the database rejected."""
+        started = time.perf_counter()
+        rejected: Dict[AnswerKey, Dict[str, Any]] = {}
+        written = 0
+        try:
+            # Lock the attempts so a completion elsewhere can't interleave
+            attempts = await lock_attempts(db, {a for a, _ in entries})
+            late_attempts = set()
+            writable = {}
+            for key, fields in entries.items():
+                status, completed_at = attempts.get(key[0], (None, None))
+                if status == "in_progress":
+                    writable[key] = fields
+                elif status == "completed" and _saved_before(fields["answered_at"], completed_at):
+                    # Saved here while the attempt was completed on another worker
+                    fields["_advance"] = False
+                    writable[key] = fields
+                    late_attempts.add(key[0])
+                else:
+                    self.dropped_rows += 1
+            if len(writable) < len(entries):
+                logger.warning(f"Answer buffer dropped {len(entries) - len(writable)} answers for closed attempts")
+            entries = writable
+
+            # Which advancing answers are new? (one query, only if needed)
+            advancing = [k for k, f in entries.items() if f["_advance"]]
+            existing_keys = set()
+            if advancing:
+                result = await db.execute(
+                    select(UserAnswer.attempt_id, UserAnswer.question_id)
+                    .where(UserAnswer.attempt_id.in_({a for a, _ in advancing}))
+                    .where(UserAnswer.question_id.in_({q for _, q in advancing}))
+                )
+                existing_keys = {(a, q) for a, q in result.all()}
+
+            # Rows in one upsert statement must share columns, so group by field set
+            groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+            for (attempt_id, question_id), fields in entries.items():
+                row = {k: v for k, v in fields.items() if not k.startswith("_")}
+                row.update(attempt_id=attempt_id, question_id=question_id)
+                groups.setdefault(frozenset(row), []).append(row)
+
+            try:
+                async with db.begin_nested():
+                    for rows in groups.values():
+                        await upsert_user_answers(db, rows)
+            except Exception as e:
+                # One bad row fails its whole statement - write them one by one
+                logger.warning(f"Answer buffer batch rejected, writing rows one by one: {e}")
+                for rows in groups.values():
+                    for row in rows:
+                        key = (row["attempt_id"], row["question_id"])
+                        try:
+                            async with db.begin_nested():
+                                await upsert_user_answers(db, [row])
+                        except Exception as row_error:
+                            logger.warning(f"Answer buffer row {key} rejected: {row_error}")
+                            rejected[key] = entries[key]
+                entries = {k: f for k, f in entries.items() if k not in rejected}
+
+            advances: Dict[int, int] = {}
+            for (attempt_id, question_id), fields in entries.items():
+                if fields["_advance"] and (attempt_id, question_id) not in existing_keys:
+                    advances[attempt_id] = advances.get(attempt_id, 0) + 1
+
+            for attempt_id, count in advances.items():
+                await db.execute(
+                    update(TestAttempt)
+                    .where(TestAttempt.id == attempt_id)
+                    .values(current_question=TestAttempt.current_question + count)
+                )
+
+            if late_attempts:
+                await rescore_attempts(db, list(late_attempts))
+                self.late_rows += sum(1 for a, _ in entries if a in late_attempts)
+                logger.warning(f"Re-scored completed attempts {sorted(late_attempts)} after late answers")
+
+            await db.commit()
+            written = len(entries)
+        except Exception:
+            self.flush_failures += 1
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+            raise
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.rows_flushed += written
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+        return rejected
+
+    def _retry_rejected(self, rejected: Dict[AnswerKey, Dict[str, Any]]) -> None:
+        """Re-queue rejected rows for another try, dropping those that keep failing."""
+        for key, fields in rejected.items():
+            fields["_failures"] = fields.get("_failures", 0) + 1
+            if fields["_failures"] >= MAX_ROW_FAILURES:
+                self.failed_rows += 1
+                logger.error(f"Answer buffer dropped answer {key} after {MAX_ROW_FAILURES} rejected writes")
+                continue
+            self._requeue({key: fields})
+
+    def _requeue(self, entries: Dict[AnswerKey, Dict[str, Any]]) -> None:
+        """Put failed entries back without clobbering newer saves."""
+        for key, fields in entries.items():
+            newer = self._pending.get(key)
+            if newer:
+                advance = fields["_advance"] or newer["_advance"]
+                fields.update(newer)
+                fields["_advance"] = advance
+            self._pending[key] = fields
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> None:
+        """Start the periodic background flusher (call from app lifespan)."""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write everything still pending."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Answer buffer flush failed ({len(self._pending)} re-queued): {e}")
+
+    def clear(self) -> None:
+        """Drop pending answers without writing them (used by tests)."""
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._pending),
+            "enqueued": self.enqueued,
+            "rows_flushed": self.rows_flushed,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "late_rows": self.late_rows,
+            "dropped_rows": self.dropped_rows,
+            "failed_rows": self.failed_rows,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+# Singleton instance
+answer_buffer = AnswerWriteBuffer(
+    flush_interval=settings.answer_buffer_flush_interval_seconds,
+    max_pending=settings.answer_buffer_max_pending,
+)
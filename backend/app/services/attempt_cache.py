@@ -0,0 +1,239 @@
+"""
+Attempt Timing Cache
+
+Heartbeats arrive every 30 seconds for every active candidate. Everything
+they need (started_at, duration, status, saved-answer count) is kept here so
+a heartbeat normally touches no database at all:
+
+- /start fills the entry
+- Answer-save paths keep the saved-answer set current
+- Completion paths mark the entry completed
+- A miss (other worker, restart, expired entry) reloads from the DB
+
+Entries expire after attempt_cache_ttl_seconds so that state changed by
+another gunicorn worker is picked up. last_activity timestamps from POST
+heartbeats are batched and written periodically with one bulk UPDATE.
+"""
+import asyncio
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models.test import Test, TestAttempt, UserAnswer
+from .answer_buffer import answer_buffer
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+@dataclass
+class AttemptTiming:
+    attempt_id: int
+    user_id: int
+    test_id: int
+    status: str
+    started_at: Optional[datetime]
+    duration_minutes: Optional[int]
+    answered: Set[int] = field(default_factory=set)
+    expires_at: float = 0.0
+
+    @property
+    def saved_answers(self) -> int:
+        return len(self.answered)
+
+    def remaining_seconds(self) -> Optional[float]:
+        if not self.started_at or self.duration_minutes is None:
+            return None
+        started_at = self.started_at
+        if started_at.tzinfo is None:
+            started_at = started_at.replace(tzinfo=timezone.utc)
+        elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+        return max(0, (self.duration_minutes * 60) - elapsed)
+
+
+class AttemptTimingCache:
+    """Bounded LRU of AttemptTiming entries plus a batched last_activity writer."""
+
+    def __init__(self, maxsize: int = 20000, ttl_seconds: int = 120, activity_flush_interval: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.activity_flush_interval = activity_flush_interval
+        self._entries: "OrderedDict[int, AttemptTiming]" = OrderedDict()
+        self._activity: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- Lookups ----------
+
+    async def get(self, db: AsyncSession, attempt_id: int, user_id: int) -> Optional[AttemptTiming]:
+        """Return the timing entry for a user's attempt, loading it on a miss."""
+        entry = self._entries.get(attempt_id)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self._entries.move_to_end(attempt_id)
+            self.hits += 1
+            return entry if entry.user_id == user_id else None
+
+        self.misses += 1
+        entry = await self._load(db, attempt_id)
+        if entry is None:
+            self._entries.pop(attempt_id, None)
+            return None
+        self._store(entry)
+        return entry if entry.user_id == user_id else None
+
+    async def _load(self, db: AsyncSession, attempt_id: int) -> Optional[AttemptTiming]:
+        result = await db.execute(
+            select(
+                TestAttempt.user_id, TestAttempt.test_id, TestAttempt.status,
+                TestAttempt.started_at, Test.duration_minutes
+            )
+            .outerjoin(Test, Test.id == TestAttempt.test_id)
+            .where(TestAttempt.id == attempt_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        answered_result = await db.execute(
+            select(UserAnswer.question_id).where(UserAnswer.attempt_id == attempt_id)
+        )
+        answered = set(answered_result.scalars().all())
+        # Answers still waiting in the write-behind buffer count as saved
+        answered.update(answer_buffer.pending_question_ids(attempt_id))
+        return AttemptTiming(
+            attempt_id=attempt_id,
+            user_id=row.user_id,
+            test_id=row.test_id,
+            status=row.status,
+            started_at=row.started_at,
+            duration_minutes=row.duration_minutes,
+            answered=answered,
+        )
+
+    # ---------- Updates from other endpoints ----------
+
+    def put(
+        self,
+        attempt: TestAttempt,
+        duration_minutes: Optional[int],
+        answered: Iterable[int] = ()
+    ) -> None:
+        """Fill the entry for an attempt (called from /start)."""
+        self._store(AttemptTiming(
+            attempt_id=attempt.id,
+            user_id=attempt.user_id,
+            test_id=attempt.test_id,
+            status=attempt.status or "in_progress",
+            started_at=attempt.started_at,
+            duration_minutes=duration_minutes,
+            answered=set(answered),
+        ))
+
+    def mark_answered(self, attempt_id: int, question_ids: Iterable[int]) -> None:
+        entry = self._entries.get(attempt_id)
+        if entry is not None:
+            entry.answered.update(question_ids)
+
+    def set_status(self, attempt_id: int, status: str) -> None:
+        entry = self._entries.get(attempt_id)
+        if entry is not None:
+            entry.status = status
+        if status != "in_progress":
+            self._activity.pop(attempt_id, None)
+
+    def touch(self, attempt_id: int) -> None:
+        """Record heartbeat activity; written by the next batched flush."""
+        self._activity[attempt_id] = datetime.now(timezone.utc)
+
+    def _store(self, entry: AttemptTiming) -> None:
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        self._entries[entry.attempt_id] = entry
+        self._entries.move_to_end(entry.attempt_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    # ---------- Batched last_activity writes ----------
+
+    async def flush_activity(self, db: Optional[AsyncSession] = None) -> int:
+        """Write all pending last_activity timestamps with one bulk UPDATE."""
+        if not self._activity:
+            return 0
+        pending, self._activity = self._activity, {}
+        params = [{"id": attempt_id, "last_activity": ts} for attempt_id, ts in pending.items()]
+        try:
+            if db is not None:
+                await db.execute(update(TestAttempt), params)
+                await db.commit()
+            else:
+                from ..database import async_session_maker
+                async with async_session_maker() as session:
+                    await session.execute(update(TestAttempt), params)
+                    await session.commit()
+        except Exception:
+            # Keep newer timestamps if heartbeats arrived meanwhile
+            for attempt_id, ts in pending.items():
+                self._activity.setdefault(attempt_id, ts)
+            raise
+        return len(params)
+
+    def start(self) -> None:
+        """Start the periodic activity flusher (call from app lifespan)."""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush_activity()
+        except Exception as e:
+            logger.error(f"Final last_activity flush failed: {e}")
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(self.activity_flush_interval)
+            try:
+                await self.flush_activity()
+            except Exception as e:
+                logger.error(f"last_activity flush failed ({len(self._activity)} re-queued): {e}")
+
+    def clear(self) -> None:
+        """Reset entries, pending activity and counters (used by tests)."""
+        self._entries.clear()
+        self._activity.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "pending_activity": len(self._activity),
+        }
+
+
+# Singleton instance
+attempt_cache = AttemptTimingCache(
+    maxsize=settings.attempt_cache_size,
+    ttl_seconds=settings.attempt_cache_ttl_seconds,
+    activity_flush_interval=settings.attempt_activity_flush_interval_seconds,
+)
@@ -0,0 +1,161 @@
+"""
+Blocking I/O Executors
+
+Cloudinary uploads, the Pinecone client and google-genai's sync
+embed_content/generate_content are blocking SDK calls made from async
+handlers. Called directly they stall the worker's event loop (heartbeats,
+answer saves) for as long as the upload takes; with asyncio.to_thread they
+all share the loop's default executor, so a burst of slow uploads still
+starves every other service of threads.
+
+Each external service gets its own bounded thread pool instead:
+
+- max_workers caps concurrent calls to that service; extra calls queue
+- every call has a timeout (queue wait included) and raises
+  BlockingCallTimeout when it expires. A call that already started cannot
+  be interrupted - its thread stays busy until the SDK returns, which shows
+  up as "running" in the stats
+- per-service latency metrics (avg, p95 over recent calls, max) and
+  error/timeout counts for /api/admin/metrics
+
+Pools are created on first use and shut down from the app lifespan.
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Latencies kept per service for the p95
+LATENCY_WINDOW = 256
+
+
+class BlockingCallTimeout(TimeoutError):
+    """A blocking call did not finish within its service timeout."""
+
+
+class ServiceExecutor:
+    """Bounded thread pool for one external service, with latency metrics."""
+
+    def __init__(self, name: str, max_workers: int, timeout_seconds: float):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.timeout_seconds = timeout_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.pending = 0  # submitted and not yet returned to the caller
+        self.running = 0  # currently executing in a pool thread
+        self.peak_pending = 0
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=f"{self.name}-io",
+            )
+        return self._executor
+
+    def _call(self, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    async def run(self, fn: Callable, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) in this service's pool and await the result."""
+        timeout = self.timeout_seconds if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._call, fn, args, kwargs)
+
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self._pool(), call), timeout or None)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"{self.name} call {getattr(fn, '__name__', fn)} timed out after {timeout}s")
+            raise BlockingCallTimeout(f"{self.name} call timed out after {timeout}s") from None
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.pending -= 1
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.calls += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self._latencies.append(elapsed_ms)
+
+    def shutdown(self) -> None:
+        """Drop queued calls; running SDK calls finish in the background."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "max_workers": self.max_workers,
+            "timeout_seconds": self.timeout_seconds,
+            "pending": self.pending,
+            "running": self.running,
+            "queued": max(self.pending - self.running, 0),
+            "peak_pending": self.peak_pending,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2) if latencies else 0.0,
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class BlockingIO:
+    """One ServiceExecutor per external service, addressed by name."""
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]]):
+        self.executors = {
+            name: ServiceExecutor(name, max_workers, timeout_seconds)
+            for name, (max_workers, timeout_seconds) in limits.items()
+        }
+
+    async def run(self, service: str, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking call in the named service's pool (see ServiceExecutor.run)."""
+        return await self.executors[service].run(fn, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        for executor in self.executors.values():
+            executor.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: executor.stats() for name, executor in self.executors.items()}
+
+
+# Singleton instance
+blocking_io = BlockingIO({
+    "cloudinary": (settings.cloudinary_io_workers, settings.cloudinary_io_timeout_seconds),
+    "pinecone": (settings.pinecone_io_workers, settings.pinecone_io_timeout_seconds),
+    "genai": (settings.genai_io_workers, settings.genai_io_timeout_seconds),
+})
@@ -0,0 +1,414 @@
+"""
+Candidate Search
+
+Hybrid HR search over candidate profiles. A search used to need an LLM call
+to parse the query plus a vector round trip, and nothing exposed it. Now:
+
+1. parse: the query is turned into skills / minimum years by the LLM once,
+   then served from an in-process LRU (QueryParseCache)
+2. filter: skill names resolve to skill ids (skill dictionary, no inserts);
+   CandidateSkillIndex - skill_id -> sorted profile ids, loaded from
+   profile_skills in one query and kept in NumPy arrays - yields the
+   profiles having any requested skill, with a match count, and drops
+   profiles below the minimum years
+3. rank: at most candidate_search_rerank_limit of them (best lexical
+   match first) are re-ranked by cosine similarity of their stored vectors
+   to the query embedding; score = lexical and semantic halves
+4. hydrate: only the requested page is loaded, in one batched query
+
+Queries without known skills fall back to a vector top-k (with the years
+filter). The cost of steps 2-3 depends on the number of matching profiles
+(capped), not on corpus size.
+
+The index is loaded on first use and then refreshed in the background every
+candidate_index_ttl_seconds (one load at a time, searches keep using the
+previous index meanwhile); profiles updated in this worker in between are
+overlaid via note_profile().
+
+LLM output is untrusted: parsed queries are coerced (skills to a list of
+strings, min_years to a float or None) before they are cached.
+"""
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ..config import get_settings
+from ..models.profile import CandidateProfile, profile_skills
+from ..models.user import User
+from .skill_dictionary import skill_dictionary
+from .vector_search import vector_search_service, extract_skills_from_query
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Share of the final score given to the skill match (the rest is semantic)
+LEXICAL_WEIGHT = 0.5
+
+
+def _coerce_years(value: Any) -> Optional[float]:
+    """Non-negative float years, or None for anything else."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        years = float(value)
+    except (TypeError, ValueError):
+        return None
+    return years if math.isfinite(years) and years >= 0 else None
+
+
+def _coerce_parsed(parsed: Any) -> Dict[str, Any]:
+    """Parsed query with the fields search relies on coerced to their types."""
+    parsed = dict(parsed) if isinstance(parsed, dict) else {}
+    skills = parsed.get("skills")
+    parsed["skills"] = [
+        skill.strip() for skill in skills if isinstance(skill, str) and skill.strip()
+    ] if isinstance(skills, list) else []
+    parsed["min_years"] = _coerce_years(parsed.get("min_years"))
+    return parsed
+
+
+class QueryParseCache:
+    """LRU of LLM-parsed HR queries, keyed by the whitespace/case-normalized query."""
+
+    def __init__(self, maxsize: int = 512, ttl_seconds: int = 3600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def parse(self, query: str) -> Dict[str, Any]:
+        key = " ".join(query.lower().split())
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        try:
+            parsed = _coerce_parsed(await extract_skills_from_query(query))
+        except Exception as e:
+            # Not cached - the next identical query retries the LLM
+            self.errors += 1
+            logger.warning(f"HR query parsing failed: {e}")
+            return {"skills": [], "min_years": None, "role": None, "other_requirements": None}
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, parsed)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return parsed
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class CandidateSkillIndex:
+    """In-memory skill_id -> profile ids inverted index with years of experience."""
+
+    def __init__(self, ttl_seconds: int = 300):
+        self.ttl_seconds = ttl_seconds
+        self._loaded_at: Optional[float] = None
+        self._by_skill: Dict[int, np.ndarray] = {}
+        self._profile_ids = np.zeros(0, dtype=np.int64)  # sorted
+        self._years = np.zeros(0, dtype=np.float32)  # aligned with _profile_ids
+        # Profiles changed in this worker since the last load: id -> (skill ids, years)
+        self._overlay: Dict[int, Tuple[Set[int], float]] = {}
+        self._load_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.loads = 0
+        self.refresh_failures = 0
+
+    async def load(self, db: AsyncSession) -> None:
+        """(Re)load the whole index: one query per table."""
+        overlay_before = dict(self._overlay)
+        result = await db.execute(
+            select(CandidateProfile.id, CandidateProfile.years_of_experience).order_by(CandidateProfile.id)
+        )
+        rows = result.all()
+        profile_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        years = np.array([row[1] or 0 for row in rows], dtype=np.float32)
+
+        result = await db.execute(
+            select(profile_skills.c.skill_id, profile_skills.c.profile_id)
+            .order_by(profile_skills.c.skill_id, profile_skills.c.profile_id)
+        )
+        pairs = np.array(result.all(), dtype=np.int64).reshape(-1, 2)
+        by_skill = {}
+        if len(pairs):
+            skill_ids, starts = np.unique(pairs[:, 0], return_index=True)
+            for skill_id, profiles in zip(skill_ids, np.split(pairs[:, 1], starts[1:])):
+                by_skill[int(skill_id)] = profiles
+
+        # Swap in one step; keep overlay entries noted while we were loading
+        self._profile_ids, self._years, self._by_skill = profile_ids, years, by_skill
+        self._overlay = {
+            profile_id: entry for profile_id, entry in self._overlay.items()
+            if overlay_before.get(profile_id) is not entry
+        }
+        self._loaded_at = time.monotonic()
+        self.loads += 1
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """
+        Load on first use (single-flight); afterwards a stale index is
+        refreshed in the background while searches use the current one.
+        """
+        if self._loaded_at is None:
+            async with self._load_lock:
+                if self._loaded_at is None:
+                    await self.load(db)
+        elif self._stale() and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        from ..database import async_session_maker
+
+        try:
+            async with self._load_lock:
+                if not self._stale():
+                    return
+                async with async_session_maker() as db:
+                    await self.load(db)
+        except Exception as e:
+            # Keep serving the previous index; the next search retries
+            self.refresh_failures += 1
+            logger.warning(f"Candidate skill index refresh failed: {e}")
+
+    def note_profile(self, profile_id: int, skill_ids: Iterable[int], years: Optional[float]) -> None:
+        """Overlay a profile whose skills/years changed in this worker."""
+        self._overlay[profile_id] = (set(skill_ids), float(years or 0))
+
+    def matches(self, skill_ids: List[int], min_years: Optional[float] = None) -> Dict[int, int]:
+        """{profile_id: number of the skills it has} for profiles with any of skill_ids."""
+        arrays = [self._by_skill[skill_id] for skill_id in skill_ids if skill_id in self._by_skill]
+        counts: Dict[int, int] = {}
+        if arrays:
+            profiles, matched = np.unique(np.concatenate(arrays), return_counts=True)
+            if min_years:
+                positions = np.minimum(np.searchsorted(self._profile_ids, profiles), max(len(self._profile_ids) - 1, 0))
+                if len(self._profile_ids):
+                    keep = (self._profile_ids[positions] == profiles) & (self._years[positions] >= min_years)
+                else:
+                    keep = np.zeros(len(profiles), dtype=bool)
+                profiles, matched = profiles[keep], matched[keep]
+            counts = dict(zip(profiles.tolist(), matched.tolist()))
+
+        wanted = set(skill_ids)
+        for profile_id, (skills, years) in self._overlay.items():
+            count = len(skills & wanted)
+            if count and (not min_years or years >= min_years):
+                counts[profile_id] = count
+            else:
+                counts.pop(profile_id, None)
+        return counts
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def clear(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        self._by_skill = {}
+        self._profile_ids = np.zeros(0, dtype=np.int64)
+        self._years = np.zeros(0, dtype=np.float32)
+        self._overlay = {}
+        self._loaded_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "profiles": len(self._profile_ids),
+            "skills": len(self._by_skill),
+            "links": int(sum(len(p) for p in self._by_skill.values())),
+            "overlay": len(self._overlay),
+            "loads": self.loads,
+            "refresh_failures": self.refresh_failures,
+        }
+
+
+def _cosine_scores(query: List[float], vectors: Dict[str, List[float]]) -> Dict[str, float]:
+    if not vectors:
+        return {}
+    q = np.asarray(query, dtype=np.float32)
+    q_norm = float(np.linalg.norm(q))
+    if q_norm == 0.0:
+        return {}
+    ids = list(vectors)
+    matrix = np.asarray([vectors[vector_id] for vector_id in ids], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    scores = (matrix @ q) / (norms * q_norm)
+    return dict(zip(ids, scores.tolist()))
+
+
+class CandidateSearch:
+    """Hybrid lexical + semantic candidate search."""
+
+    def __init__(self, rerank_limit: int = 1000, index_ttl_seconds: int = 300, parse_cache_size: int = 512):
+        self.rerank_limit = rerank_limit
+        self.parser = QueryParseCache(maxsize=parse_cache_size)
+        self.index = CandidateSkillIndex(ttl_seconds=index_ttl_seconds)
+
+        # Metrics
+        self.searches = 0
+        self.semantic_only = 0
+        self.total_ms = 0.0
+
+    async def _rank(
+        self,
+        db: AsyncSession,
+        query: str,
+        skills: List[str],
+        min_years: Optional[float],
+        required_skills: bool
+    ) -> List[Tuple[int, float]]:
+        """All ranked (profile_id, score) pairs."""
+        skill_ids = list((await skill_dictionary.lookup(db, skills)).values()) if skills else []
+
+        if not skill_ids:
+            if required_skills or not query.strip():
+                # Explicit skill filters that no profile can have
+                return []
+            # No known skills - semantic top-k with the years filter
+            self.semantic_only += 1
+            await vector_search_service.initialize()
+            if not vector_search_service.available:
+                return []
+            query_embedding = await vector_search_service.get_query_embedding(query)
+            if not any(query_embedding):
+                return []
+            matches = await vector_search_service.backend.query(
+                query_embedding, top_k=self.rerank_limit, min_years=min_years
+            )
+            return [(int(m.id.replace("profile_", "")), m.score) for m in matches]
+
+        await self.index.ensure_loaded(db)
+        counts = self.index.matches(skill_ids, min_years)
+        # Best lexical matches first; ties by profile id for stable pages
+        shortlisted = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:self.rerank_limit]
+
+        semantic: Dict[str, float] = {}
+        if shortlisted and query.strip():
+            await vector_search_service.initialize()
+            if vector_search_service.available:
+                try:
+                    query_embedding = await vector_search_service.get_query_embedding(query)
+                    vectors = await vector_search_service.backend.fetch(
+                        [f"profile_{profile_id}" for profile_id, _ in shortlisted]
+                    )
+                    semantic = _cosine_scores(query_embedding, vectors)
+                except Exception as e:
+                    logger.warning(f"Vector re-rank skipped: {e}")
+
+        wanted = len(skill_ids)
+        ranked = []
+        for profile_id, count in shortlisted:
+            lexical = count / wanted
+            if semantic:
+                score = LEXICAL_WEIGHT * lexical + (1 - LEXICAL_WEIGHT) * semantic.get(f"profile_{profile_id}", 0.0)
+            else:
+                score = lexical
+            ranked.append((profile_id, score))
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
+
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        skill_filters: Optional[List[str]] = None,
+        min_experience: Optional[float] = None,
+        page: int = 1,
+        page_size: int = 20
+    ) -> Dict[str, Any]:
+        """One page of ranked, hydrated candidates plus the interpreted query."""
+        started = time.perf_counter()
+        parsed = await self.parser.parse(query) if query.strip() else {}
+
+        skills = list(dict.fromkeys((skill_filters or []) + parsed.get("skills", [])))
+        min_years = _coerce_years(min_experience if min_experience is not None else parsed.get("min_years"))
+
+        ranked = await self._rank(db, query, skills, min_years, required_skills=bool(skill_filters))
+        page_items = ranked[(page - 1) * page_size:page * page_size]
+
+        results = []
+        if page_items:
+            result = await db.execute(
+                select(CandidateProfile, User.name, User.email)
+                .join(User, User.id == CandidateProfile.user_id)
+                .options(selectinload(CandidateProfile.skills))
+                .where(CandidateProfile.id.in_([profile_id for profile_id, _ in page_items]))
+            )
+            hydrated = {profile.id: (profile, name, email) for profile, name, email in result.all()}
+            for profile_id, score in page_items:
+                if profile_id not in hydrated:
+                    continue  # Deleted since indexing
+                profile, name, email = hydrated[profile_id]
+                results.append({
+                    "profile_id": profile_id,
+                    "score": round(score, 4),
+                    "name": name,
+                    "email": email,
+                    "current_role": profile.current_role,
+                    "current_company": profile.current_company,
+                    "years_exp": profile.years_of_experience,
+                    "skills": [skill.display_name for skill in profile.skills],
+                    "professional_summary": profile.professional_summary,
+                })
+
+        self.searches += 1
+        self.total_ms += (time.perf_counter() - started) * 1000
+        return {
+            "results": results,
+            "total": len(ranked),
+            "page": page,
+            "page_size": page_size,
+            "skills": skills,
+            "min_experience": min_years,
+        }
+
+    def clear(self) -> None:
+        self.parser.clear()
+        self.index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "searches": self.searches,
+            "semantic_only": self.semantic_only,
+            "avg_ms": round(self.total_ms / self.searches, 2) if self.searches else 0.0,
+            "query_parse_cache": self.parser.stats(),
+            "skill_index": self.index.stats(),
+        }
+
+
+# Singleton instance
+candidate_search = CandidateSearch(
+    rerank_limit=settings.candidate_search_rerank_limit,
+    index_ttl_seconds=settings.candidate_index_ttl_seconds,
+    parse_cache_size=settings.candidate_query_cache_size,
+)
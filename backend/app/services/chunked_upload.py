@@ -0,0 +1,484 @@
+"""
+Chunked Uploads
+
+Answer files and proctoring videos used to arrive in one request. On a weak
+network a dropped connection meant sending the whole file again, and those
+retries piled up at the end of tests when load was highest. Uploads can now
+be sent in pieces:
+
+    POST /api/tests/uploads                          -> upload_id, chunk_size
+    PUT  /api/tests/uploads/{upload_id}/chunks/{n}   raw body, one chunk
+    GET  /api/tests/uploads/{upload_id}              received / missing chunks
+    POST /api/tests/uploads/{upload_id}/complete     assemble + push (202)
+
+- every chunk except the last is exactly chunk_size bytes, so chunk n lives
+  at offset n * chunk_size; re-sending a chunk replaces it
+- chunk bodies are streamed to <staging>/<upload_id>/<n>.chunk (temp file +
+  rename); upload_chunks records which chunks arrived, so a client that
+  reconnects asks GET for the missing ones and sends only those
+- complete concatenates the chunks in the kernel (os.copy_file_range) and
+  pushes the file in the background: answer files to Supabase (stored as
+  the FILE: answer), videos to Cloudinary. A failed push leaves the chunks
+  in place and the session FAILED; calling complete again retries it
+- complete claims the session with a conditional UPDATE (UPLOADING/FAILED
+  -> PROCESSING), so concurrent calls on different workers push once
+- a session PROCESSING for upload_processing_timeout_minutes (its worker
+  died or was recycled mid-push) is moved back to FAILED when it is next
+  read or by the periodic purge
+
+The staging dir must be shared by everything serving the same upload
+(gunicorn workers on one host share data/upload_staging) and must not be
+under static/, which is served publicly without the ownership check.
+Sessions left unfinished for upload_session_ttl_hours are purged.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterable, Dict, List, Optional
+
+import aiofiles
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+
+from ..config import get_settings
+from ..database import dialect_insert
+from ..models.test import TestAttempt
+from ..models.upload import UploadSession, UploadChunk, UploadStatus, UploadKind
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+DEFAULT_STAGING_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "upload_staging"
+)
+
+ALLOWED_EXTENSIONS = {
+    UploadKind.ANSWER_FILE.value: {".xlsx", ".xls", ".csv"},
+    UploadKind.PROCTORING_VIDEO.value: {".webm", ".mp4", ".mov", ".mkv"},
+}
+
+# Purge of expired sessions runs at most this often per worker
+PURGE_INTERVAL_SECONDS = 600
+
+# Read/write size when copy_file_range is unavailable
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+def _copy_fd(source: int, destination: int, count: int) -> int:
+    """Append count bytes from source to destination, in-kernel where possible."""
+    copied_total = 0
+    zero_copy = hasattr(os, "copy_file_range")
+    while count > 0:
+        if zero_copy:
+            try:
+                copied = os.copy_file_range(source, destination, count)
+            except OSError:
+                # Filesystem without copy_file_range support (e.g. across devices)
+                zero_copy = False
+                continue
+        else:
+            data = os.read(source, min(count, COPY_BUFFER_BYTES))
+            copied = len(data)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(destination, view):]
+        if copied == 0:
+            break
+        count -= copied
+        copied_total += copied
+    return copied_total
+
+
+def assemble_chunks(chunk_paths: List[str], destination: str) -> int:
+    """Concatenate chunk files into destination; returns the bytes written."""
+    written = 0
+    out = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        for chunk_path in chunk_paths:
+            source = os.open(chunk_path, os.O_RDONLY)
+            try:
+                written += _copy_fd(source, out, os.fstat(source).st_size)
+            finally:
+                os.close(source)
+    finally:
+        os.close(out)
+    return written
+
+
+class ChunkedUploads:
+    """Resumable upload sessions staged on disk, pushed to cloud storage in the background."""
+
+    def __init__(self, staging_dir: str, chunk_size: int, session_factory=None):
+        self.staging_dir = staging_dir
+        self.chunk_size = chunk_size
+        self._session_factory = session_factory
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._last_purge = 0.0
+
+        # Metrics
+        self.sessions_started = 0
+        self.chunks_received = 0
+        self.bytes_received = 0
+        self.completed = 0
+        self.failed = 0
+        self.purged = 0
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from ..database import async_session_maker
+            return async_session_maker()
+        return self._session_factory()
+
+    def session_dir(self, upload_id: str) -> str:
+        return os.path.join(self.staging_dir, upload_id)
+
+    def _chunk_path(self, upload_id: str, chunk_index: int) -> str:
+        return os.path.join(self.session_dir(upload_id), f"{chunk_index:06d}.chunk")
+
+    @staticmethod
+    def total_chunks(session: UploadSession) -> int:
+        return -(-session.total_size // session.chunk_size)
+
+    # ==================== Session lifecycle ====================
+
+    async def init(
+        self,
+        db,
+        user_id: int,
+        kind: str,
+        attempt_id: int,
+        filename: str,
+        total_size: int,
+        content_type: Optional[str] = None,
+        question_id: Optional[int] = None
+    ) -> UploadSession:
+        """Validate and create an upload session (commits)."""
+        if kind not in ALLOWED_EXTENSIONS:
+            raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(ALLOWED_EXTENSIONS)}")
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in ALLOWED_EXTENSIONS[kind]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid file format '{ext}'. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS[kind]))}"
+            )
+        if kind == UploadKind.ANSWER_FILE.value and question_id is None:
+            raise HTTPException(status_code=400, detail="question_id is required for answer files")
+
+        max_size = (
+            settings.upload_max_video_bytes if kind == UploadKind.PROCTORING_VIDEO.value
+            else settings.upload_max_answer_file_bytes
+        )
+        if total_size <= 0:
+            raise HTTPException(status_code=400, detail="Empty file not allowed")
+        if total_size > max_size:
+            raise HTTPException(status_code=413, detail=f"File too large (max {max_size // (1024 * 1024)}MB)")
+
+        attempt = await db.execute(
+            select(TestAttempt.id).where(TestAttempt.id == attempt_id, TestAttempt.user_id == user_id)
+        )
+        if attempt.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Attempt not found")
+
+        await self._maybe_purge(db)
+
+        session = UploadSession(
+            id=secrets.token_hex(16),
+            user_id=user_id,
+            attempt_id=attempt_id,
+            question_id=question_id,
+            kind=kind,
+            filename=filename[:255],
+            content_type=content_type,
+            total_size=total_size,
+            chunk_size=self.chunk_size,
+            status=UploadStatus.UPLOADING.value,
+        )
+        db.add(session)
+        await db.commit()
+        os.makedirs(self.session_dir(session.id), exist_ok=True)
+        self.sessions_started += 1
+        return session
+
+    async def get(self, db, upload_id: str, user_id: int) -> UploadSession:
+        """The caller's upload session (404 if it does not exist or is not theirs)."""
+        result = await db.execute(
+            select(UploadSession)
+            .where(UploadSession.id == upload_id, UploadSession.user_id == user_id)
+            .execution_options(populate_existing=True)
+        )
+        session = result.scalar_one_or_none()
+        if session is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if session.status == UploadStatus.PROCESSING.value and await self.fail_stale_processing(db, [upload_id]):
+            await db.refresh(session)
+        return session
+
+    async def received_chunks(self, db, upload_id: str) -> List[int]:
+        result = await db.execute(
+            select(UploadChunk.chunk_index)
+            .where(UploadChunk.upload_id == upload_id)
+            .order_by(UploadChunk.chunk_index)
+        )
+        return list(result.scalars().all())
+
+    async def describe(self, db, session: UploadSession) -> Dict[str, Any]:
+        """Session state for the client, including which chunks are still missing."""
+        received = await self.received_chunks(db, session.id)
+        received_set = set(received)
+        total_chunks = self.total_chunks(session)
+        return {
+            "upload_id": session.id,
+            "kind": session.kind,
+            "status": session.status,
+            "total_size": session.total_size,
+            "chunk_size": session.chunk_size,
+            "total_chunks": total_chunks,
+            "received_chunks": received,
+            "missing_chunks": [i for i in range(total_chunks) if i not in received_set],
+            "file_url": session.file_url,
+            "error_message": session.error_message,
+        }
+
+    async def write_chunk(
+        self,
+        db,
+        session: UploadSession,
+        chunk_index: int,
+        body: AsyncIterable[bytes]
+    ) -> None:
+        """Stream one chunk to staging and record it (commits). Re-sent chunks replace the old one."""
+        if session.status != UploadStatus.UPLOADING.value:
+            raise HTTPException(status_code=409, detail=f"Upload is {session.status}")
+        if not 0 <= chunk_index < self.total_chunks(session):
+            raise HTTPException(status_code=400, detail="Chunk index out of range")
+
+        offset = chunk_index * session.chunk_size
+        expected = min(session.chunk_size, session.total_size - offset)
+        path = self._chunk_path(session.id, chunk_index)
+        tmp_path = f"{path}.{secrets.token_hex(4)}.part"
+        os.makedirs(self.session_dir(session.id), exist_ok=True)
+
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for data in body:
+                    size += len(data)
+                    if size > expected:
+                        raise HTTPException(status_code=413, detail=f"Chunk {chunk_index} must be {expected} bytes")
+                    await f.write(data)
+            if size != expected:
+                raise HTTPException(status_code=400, detail=f"Chunk {chunk_index} must be {expected} bytes, got {size}")
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        insert = dialect_insert(db)
+        stmt = insert(UploadChunk).values(
+            upload_id=session.id, chunk_index=chunk_index, offset=offset, size=size,
+            received_at=datetime.now(timezone.utc),
+        )
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["upload_id", "chunk_index"],
+            set_={"size": stmt.excluded.size, "received_at": stmt.excluded.received_at},
+        ))
+        await db.commit()
+        self.chunks_received += 1
+        self.bytes_received += size
+
+    async def complete(self, db, session: UploadSession) -> UploadSession:
+        """Start assembling and pushing the upload (commits). Safe to call again, from any worker."""
+        if session.status in (UploadStatus.COMPLETED.value, UploadStatus.PROCESSING.value):
+            return session
+
+        received = set(await self.received_chunks(db, session.id))
+        missing = [i for i in range(self.total_chunks(session)) if i not in received]
+        if missing:
+            raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "missing_chunks": missing})
+
+        # Only one caller wins the claim, whichever worker it lands on
+        result = await db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == session.id,
+                UploadSession.status.in_([UploadStatus.UPLOADING.value, UploadStatus.FAILED.value]),
+            )
+            .values(
+                status=UploadStatus.PROCESSING.value,
+                error_message=None,
+                processing_started_at=datetime.now(timezone.utc),
+            )
+            .returning(UploadSession.id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.scalar_one_or_none() is not None
+        await db.commit()
+        await db.refresh(session)
+        if claimed:
+            self._tasks[session.id] = asyncio.create_task(self._finalize(session.id))
+        return session
+
+    async def wait(self, upload_id: str) -> None:
+        """Wait for this worker's background push of an upload, if any."""
+        task = self._tasks.get(upload_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Interrupt running pushes (call from app lifespan); they end up FAILED and can be retried."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ==================== Background push ====================
+
+    async def _finalize(self, upload_id: str) -> None:
+        try:
+            async with self._sessions() as db:
+                session = await db.get(UploadSession, upload_id)
+                try:
+                    url = await self._assemble_and_push(db, session)
+                except BaseException as e:
+                    await db.rollback()
+                    interrupted = isinstance(e, asyncio.CancelledError)
+                    logger.error(f"Chunked upload {upload_id} failed: {e!r}")
+                    session = await db.get(UploadSession, upload_id)
+                    session.status = UploadStatus.FAILED.value
+                    session.error_message = "Interrupted, please complete again" if interrupted else str(e)[:500]
+                    await db.commit()
+                    self.failed += 1
+                    if interrupted:
+                        raise
+                    return
+
+                session.status = UploadStatus.COMPLETED.value
+                session.file_url = url
+                session.completed_at = datetime.now(timezone.utc)
+                await db.commit()
+                self.completed += 1
+            await asyncio.to_thread(shutil.rmtree, self.session_dir(upload_id), True)
+        finally:
+            self._tasks.pop(upload_id, None)
+
+    async def _assemble_and_push(self, db, session: UploadSession) -> str:
+        ext = os.path.splitext(session.filename)[1].lower()
+        chunk_paths = [self._chunk_path(session.id, i) for i in range(self.total_chunks(session))]
+        assembled = os.path.join(self.session_dir(session.id), f"assembled{ext}")
+        written = await asyncio.to_thread(assemble_chunks, chunk_paths, assembled)
+        if written != session.total_size:
+            raise RuntimeError(f"Assembled {written} of {session.total_size} bytes")
+
+        if session.kind == UploadKind.PROCTORING_VIDEO.value:
+            from .cloudinary_service import upload_test_proctoring_video
+            result = await upload_test_proctoring_video(assembled, session.attempt_id, session.user_id)
+            if not result:
+                raise RuntimeError("Cloudinary upload failed")
+            return result["url"]
+
+        from .supabase_upload import upload_file_to_supabase
+        from .answer_buffer import answer_buffer, upsert_user_answers
+
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        file_path = f"answers/{session.attempt_id}_{session.question_id}_{timestamp}{ext}"
+        url = await upload_file_to_supabase(
+            assembled,
+            bucket="division-docs",
+            file_path=file_path,
+            content_type=session.content_type or "application/octet-stream",
+            upsert=True
+        )
+        # Write buffered saves first so a stale auto-save can't overwrite the file URL
+        await answer_buffer.flush_attempt(db, session.attempt_id)
+        await upsert_user_answers(db, [{
+            "attempt_id": session.attempt_id,
+            "question_id": session.question_id,
+            "answer_text": f"FILE:{url}",
+        }])
+        return url
+
+    # ==================== Maintenance ====================
+
+    async def _maybe_purge(self, db) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        try:
+            await self.fail_stale_processing(db)
+            await self.purge_expired(db)
+        except Exception as e:
+            logger.warning(f"Purging expired uploads failed: {e}")
+
+    async def fail_stale_processing(self, db, upload_ids: Optional[List[str]] = None) -> int:
+        """
+        Move sessions stuck in PROCESSING for upload_processing_timeout_minutes
+        (all, or just upload_ids) back to FAILED so complete can retry them (commits).
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.upload_processing_timeout_minutes)
+        stmt = (
+            update(UploadSession)
+            .where(
+                UploadSession.status == UploadStatus.PROCESSING.value,
+                UploadSession.processing_started_at < cutoff,
+            )
+            .values(status=UploadStatus.FAILED.value, error_message="Interrupted, please complete again")
+            .returning(UploadSession.id)
+            .execution_options(synchronize_session=False)
+        )
+        if upload_ids is not None:
+            stmt = stmt.where(UploadSession.id.in_(upload_ids))
+        stale = list((await db.execute(stmt)).scalars().all())
+        await db.commit()
+        if stale:
+            logger.warning(f"Chunked uploads stuck in processing marked failed: {stale}")
+            self.failed += len(stale)
+        return len(stale)
+
+    async def purge_expired(self, db) -> int:
+        """Drop unfinished sessions older than upload_session_ttl_hours and their staged chunks (commits)."""
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.upload_session_ttl_hours)
+        result = await db.execute(
+            select(UploadSession.id).where(
+                UploadSession.created_at < cutoff,
+                UploadSession.status.in_([UploadStatus.UPLOADING.value, UploadStatus.FAILED.value]),
+            )
+        )
+        expired = list(result.scalars().all())
+        if not expired:
+            return 0
+        await db.execute(delete(UploadChunk).where(UploadChunk.upload_id.in_(expired)))
+        await db.execute(delete(UploadSession).where(UploadSession.id.in_(expired)))
+        await db.commit()
+        for upload_id in expired:
+            await asyncio.to_thread(shutil.rmtree, self.session_dir(upload_id), True)
+        self.purged += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chunk_size": self.chunk_size,
+            "sessions_started": self.sessions_started,
+            "chunks_received": self.chunks_received,
+            "bytes_received": self.bytes_received,
+            "pushing": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "purged": self.purged,
+        }
+
+
+# Singleton instance
+chunked_uploads = ChunkedUploads(
+    staging_dir=settings.upload_staging_dir or DEFAULT_STAGING_DIR,
+    chunk_size=settings.upload_chunk_bytes,
+)
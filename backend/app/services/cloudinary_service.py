@@ -1,5 +1,8 @@
 """
 Cloudinary Service - Upload and manage test-related media (videos, images, documents)
+
+The Cloudinary SDK is synchronous; uploads and deletes run in the cloudinary
+thread pool (see blocking_io) so they never block the event loop.
 """
 import cloudinary
 import cloudinary.uploader
@@ -7,6 +10,8 @@ import cloudinary.api
 from typing import Optional, Dict, Any, BinaryIO
 import logging
 
+from .blocking_io import blocking_io
+
 logger = logging.getLogger(__name__)
 
 # Initialize Cloudinary from settings
@@ -65,7 +70,10 @@ async def upload_video(
         return None
     
     try:
-        result = cloudinary.uploader.upload(
+        # Chunked upload: the SDK reads and sends 20MB at a time
+        result = await blocking_io.run(
+            "cloudinary",
+            cloudinary.uploader.upload_large,
             file,
             folder=folder,
             public_id=public_id,
@@ -125,7 +133,7 @@ async def upload_image(
         if transformation:
             upload_options["transformation"] = transformation
         
-        result = cloudinary.uploader.upload(file, **upload_options)
+        result = await blocking_io.run("cloudinary", cloudinary.uploader.upload, file, **upload_options)
         
         return {
             "url": result.get("secure_url"),
@@ -163,7 +171,9 @@ async def upload_document(
         return None
     
     try:
-        result = cloudinary.uploader.upload(
+        result = await blocking_io.run(
+            "cloudinary",
+            cloudinary.uploader.upload,
             file,
             folder=folder,
             public_id=public_id,
@@ -197,7 +207,9 @@ async def delete_media(public_id: str, resource_type: str = "image") -> bool:
         return False
     
     try:
-        result = cloudinary.uploader.destroy(
+        result = await blocking_io.run(
+            "cloudinary",
+            cloudinary.uploader.destroy,
             public_id,
             resource_type=resource_type
         )
@@ -0,0 +1,121 @@
+"""
+CPU Worker Pool
+
+Resume rendering (PyMuPDF) and response post-processing (JSON repair,
+normalization) are CPU-bound. asyncio.to_thread still shares the GIL with
+the event loop, so concurrent parses stalled unrelated requests in the same
+gunicorn worker. This pool runs them in separate processes instead.
+
+- one ProcessPoolExecutor per gunicorn worker, cpu_pool_workers processes
+- "spawn" start method: never fork a process holding an event loop and
+  open DB connections
+- warmed up from the app lifespan so the first parse does not pay for
+  interpreter start-up and the PyMuPDF import
+- submitted callables must be top-level functions with picklable arguments
+- when the pool is not started (tests, scripts, cpu_pool_workers=0) work
+  falls back to asyncio.to_thread
+"""
+import asyncio
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class CpuWorkerPool:
+    """Process pool for CPU-heavy work with queue-depth metrics."""
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        # Metrics
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.fallbacks = 0
+        self.total_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Create the worker processes and warm them up (call from app lifespan)."""
+        if self._executor is not None or self.max_workers <= 0:
+            return
+        from .resume_parser import warm_up_worker
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        # One warm-up task per process; the executor spawns them on demand
+        for _ in range(self.max_workers):
+            self._executor.submit(warm_up_worker)
+        logger.info(f"CPU worker pool started with {self.max_workers} processes")
+
+    def stop(self) -> None:
+        """Shut the processes down, dropping work that has not started."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run fn(*args) in a worker process and await the result."""
+        if self._executor is None:
+            self.fallbacks += 1
+            return await asyncio.to_thread(fn, *args)
+
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        started = time.perf_counter()
+        executor = self._executor
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            self.completed += 1
+            return result
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a hostile PDF) - replace the pool
+            self.failed += 1
+            # Every in-flight call fails together; only the first one replaces
+            # the pool, later ones must not tear down its replacement
+            if self._executor is executor:
+                logger.error("CPU worker pool broken, restarting it")
+                self.stop()
+                self.start()
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+            self.total_ms += (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "running": self.running,
+            "max_workers": self.max_workers,
+            "pending": self.pending,
+            "queued": max(self.pending - self.max_workers, 0),
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "fallbacks": self.fallbacks,
+            "avg_ms": round(self.total_ms / finished, 2) if finished else 0.0,
+        }
+
+
+# Singleton instance
+cpu_pool = CpuWorkerPool(max_workers=settings.cpu_pool_workers)
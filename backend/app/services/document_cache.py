@@ -0,0 +1,450 @@
+"""
+Document Disk Cache
+
+During a drive every candidate opens the same division documents and
+question media (large HTML/PDF files, images on Supabase/Cloudinary)
+through /api/tests/content-proxy. Those files are kept on local disk so they
+can be served with FileResponse (Range + sendfile) instead of going
+upstream for every view.
+
+LAYOUT (content-addressed):
+- objects/<sha256>   file bodies, keyed by SHA-256 of the content, so the same
+                     file published under several URLs is stored once
+- urls/<sha256(url)>.json   maps a source URL to its object, media type and
+                            upstream ETag, so the index survives restarts
+
+- The served ETag is derived from the content hash, so it is identical on
+  every worker and changes exactly when the content does
+- Total size is bounded (LRU eviction by bytes); oversized files are skipped
+- Publishing a test pre-warms its documents (prewarm()); already cached
+  URLs are revalidated upstream with If-None-Match
+- Writes go to a temp file and are renamed into place, so gunicorn workers
+  sharing the directory never see partial files. Each worker keeps its own
+  index and adopts files written by other workers on lookup.
+- The directory must not be under static/: that is served publicly, and the
+  urls/ index name is derivable from a document URL.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import aiofiles
+
+from ..config import get_settings
+from .http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "doc_cache"
+)
+
+# Only remote stores are cached; local /uploads and /static are already on disk
+CACHEABLE_PREFIXES = (
+    "https://res.cloudinary.com/",
+    "https://rmysstjbjaaqctbbswmj.supabase.co/",
+)
+
+PREWARM_CONCURRENCY = 4
+
+
+@dataclass
+class CachedDocument:
+    key: str
+    url: str
+    digest: str
+    path: str
+    size: int
+    media_type: str
+    upstream_etag: Optional[str] = None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest[:32]}"'
+
+
+def collect_document_urls(payload: Dict[str, Any]) -> List[str]:
+    """Cacheable document/media URLs referenced by a test session payload."""
+    urls: List[str] = []
+    for question in payload.get("questions", []):
+        candidates = [question.get("media_url"), question.get("html_content")]
+        candidates.extend(doc.get("content") for doc in (question.get("documents") or []) if isinstance(doc, dict))
+        for url in candidates:
+            if isinstance(url, str) and url.startswith(CACHEABLE_PREFIXES) and url not in urls:
+                urls.append(url)
+    return urls
+
+
+class DocumentWriter:
+    """Tees a streamed upstream body into the cache. Abandoned if it grows too large."""
+
+    def __init__(
+        self,
+        cache: "DocumentCache",
+        url: str,
+        media_type: str,
+        upstream_etag: Optional[str]
+    ):
+        self.cache = cache
+        self.url = url
+        self.key = cache.key_for(url)
+        self.media_type = media_type
+        self.upstream_etag = upstream_etag
+        self.tmp_path = os.path.join(cache.directory, f"{self.key}.{os.getpid()}.part")
+        self.size = 0
+        self._file = None
+        self._hasher = hashlib.sha256()
+        self.abandoned = False
+
+    async def write(self, chunk: bytes) -> None:
+        if self.abandoned:
+            return
+        self.size += len(chunk)
+        if self.size > self.cache.max_file_bytes:
+            await self.abort()
+            return
+        if self._file is None:
+            self._file = await aiofiles.open(self.tmp_path, "wb")
+        await self._file.write(chunk)
+        self._hasher.update(chunk)
+
+    async def commit(self) -> Optional[CachedDocument]:
+        if self.abandoned:
+            return None
+        try:
+            if self._file is None:
+                self._file = await aiofiles.open(self.tmp_path, "wb")
+            await self._file.close()
+            return self.cache._install(
+                self.url, self.tmp_path, self._hasher.hexdigest(), self.size,
+                self.media_type, self.upstream_etag
+            )
+        except Exception as e:
+            logger.warning(f"Document cache write failed for {self.url}: {e}")
+            await self.abort()
+            return None
+        finally:
+            self.cache._filling.discard(self.key)
+
+    async def abort(self) -> None:
+        if self.abandoned:
+            return
+        self.abandoned = True
+        self.cache._filling.discard(self.key)
+        try:
+            if self._file is not None:
+                await self._file.close()
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class DocumentCache:
+    """Size-bounded, content-addressed LRU of upstream documents on local disk."""
+
+    def __init__(self, directory: str, max_bytes: int, max_file_bytes: int):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.urls_dir = os.path.join(directory, "urls")
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._index: "OrderedDict[str, CachedDocument]" = OrderedDict()
+        self._refs: Dict[str, int] = {}  # digest -> number of URLs pointing at it
+        self._total_bytes = 0
+        self._filling: Set[str] = set()
+        self._scheduled: Set[str] = set()  # Keys with a schedule_fill task pending
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.revalidated = 0
+        self.evictions = 0
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.urls_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest)
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.urls_dir, f"{key}.json")
+
+    # ---------- Lookups ----------
+
+    def get(self, url: str) -> Optional[CachedDocument]:
+        """Return the cached document for a URL, or None on a miss."""
+        doc = self._lookup(self.key_for(url))
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return doc
+
+    def _lookup(self, key: str) -> Optional[CachedDocument]:
+        doc = self._index.get(key)
+        if doc is None:
+            # Another worker may have cached it
+            doc = self._read_meta(key)
+            if doc is not None:
+                self._add(doc)
+        if doc is not None and not os.path.exists(doc.path):
+            # Evicted by another worker
+            self._remove(key, delete_files=False)
+            return None
+        if doc is not None:
+            self._index.move_to_end(key)
+        return doc
+
+    # ---------- Filling ----------
+
+    def open_writer(
+        self,
+        url: str,
+        media_type: str,
+        upstream_etag: Optional[str] = None,
+        content_length: Optional[int] = None
+    ) -> Optional[DocumentWriter]:
+        """Start caching a full (200) upstream body, unless already in progress or too large."""
+        key = self.key_for(url)
+        if key in self._filling:
+            return None
+        if content_length is not None and content_length > self.max_file_bytes:
+            return None
+        self._filling.add(key)
+        return DocumentWriter(self, url, media_type, upstream_etag)
+
+    def schedule_fill(self, url: str) -> None:
+        """Fetch a document into the cache in the background (fire and forget)."""
+        # Recorded before the task runs, so concurrent misses start one download
+        key = self.key_for(url)
+        if key in self._filling or key in self._scheduled:
+            return
+        self._scheduled.add(key)
+        task = asyncio.create_task(self.fill(url))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._scheduled.discard(key))
+
+    def schedule_prewarm(self, urls: Iterable[str]) -> None:
+        """Pre-warm a test's documents in the background (called on publish)."""
+        urls = list(urls)
+        if not urls:
+            return
+        task = asyncio.create_task(self.prewarm(urls))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def prewarm(self, urls: Iterable[str]) -> Dict[str, int]:
+        """Fetch or revalidate every URL, a few at a time."""
+        semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+        async def _one(url: str) -> bool:
+            async with semaphore:
+                return await self.fill(url, revalidate=True) is not None
+
+        results = await asyncio.gather(*[_one(url) for url in urls])
+        cached = sum(1 for ok in results if ok)
+        summary = {"requested": len(results), "cached": cached, "failed": len(results) - cached}
+        logger.info(f"Document cache pre-warm: {summary}")
+        return summary
+
+    async def fill(self, url: str, revalidate: bool = False) -> Optional[CachedDocument]:
+        """
+        Fetch url into the cache. Already cached URLs are returned as-is, or
+        with revalidate=True checked upstream with If-None-Match first.
+        """
+        key = self.key_for(url)
+        existing = self._lookup(key)
+        if existing is not None and not revalidate:
+            return existing
+        if key in self._filling:
+            return None
+
+        # Uncompressed, so content-length is the size of the bytes we store
+        headers = {"Accept-Encoding": "identity"}
+        if existing is not None and existing.upstream_etag:
+            headers["If-None-Match"] = existing.upstream_etag
+
+        writer = None
+        try:
+            async with get_http_client().stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and existing is not None:
+                    self.revalidated += 1
+                    return existing
+                if response.status_code != 200:
+                    return None
+                length = None if "content-encoding" in response.headers else response.headers.get("content-length")
+                writer = self.open_writer(
+                    url,
+                    response.headers.get("content-type", "application/octet-stream"),
+                    response.headers.get("etag"),
+                    int(length) if length and length.isdigit() else None,
+                )
+                if writer is None:
+                    return None
+                async for chunk in response.aiter_bytes(chunk_size=65536):
+                    await writer.write(chunk)
+                    if writer.abandoned:
+                        return None
+            return await writer.commit()
+        except Exception as e:
+            logger.warning(f"Document cache fill failed for {url}: {e}")
+            if writer is not None:
+                await writer.abort()
+            return None
+
+    def _install(
+        self,
+        url: str,
+        tmp_path: str,
+        digest: str,
+        size: int,
+        media_type: str,
+        upstream_etag: Optional[str]
+    ) -> CachedDocument:
+        key = self.key_for(url)
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            # Same content already stored (other URL or other worker)
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+
+        meta = {"url": url, "digest": digest, "size": size, "media_type": media_type, "upstream_etag": upstream_etag}
+        meta_tmp = f"{self._meta_path(key)}.{os.getpid()}.part"
+        with open(meta_tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_tmp, self._meta_path(key))
+
+        previous = self._index.get(key)
+        delete_previous = previous is not None and previous.digest != digest
+        self._remove(key, delete_files=False)
+        if delete_previous and previous.digest not in self._refs:
+            # Content changed upstream - drop the stale object
+            self._delete_object(previous.digest)
+
+        doc = CachedDocument(
+            key=key, url=url, digest=digest, path=path, size=size,
+            media_type=media_type, upstream_etag=upstream_etag,
+        )
+        self._add(doc)
+        self.fills += 1
+        self._evict()
+        return doc
+
+    # ---------- Index maintenance ----------
+
+    def _add(self, doc: CachedDocument) -> None:
+        self._index[doc.key] = doc
+        self._index.move_to_end(doc.key)
+        if doc.digest not in self._refs:
+            self._total_bytes += doc.size
+        self._refs[doc.digest] = self._refs.get(doc.digest, 0) + 1
+
+    def _remove(self, key: str, delete_files: bool = True) -> None:
+        doc = self._index.pop(key, None)
+        if doc is not None:
+            self._refs[doc.digest] -= 1
+            if self._refs[doc.digest] == 0:
+                del self._refs[doc.digest]
+                self._total_bytes -= doc.size
+                if delete_files:
+                    self._delete_object(doc.digest)
+        if delete_files:
+            try:
+                os.remove(self._meta_path(key))
+            except OSError:
+                pass
+
+    def _delete_object(self, digest: str) -> None:
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            self._remove(key)
+            self.evictions += 1
+
+    def _read_meta(self, key: str) -> Optional[CachedDocument]:
+        try:
+            with open(self._meta_path(key)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = self._object_path(meta["digest"])
+        if not os.path.exists(path):
+            return None
+        return CachedDocument(
+            key=key, url=meta["url"], digest=meta["digest"], path=path, size=meta["size"],
+            media_type=meta["media_type"], upstream_etag=meta.get("upstream_etag"),
+        )
+
+    def _load_index(self) -> None:
+        """Rebuild the index from disk (least recently written first)."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".part"):
+                # Leftover from a crashed write
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        docs = []
+        for name in os.listdir(self.urls_dir):
+            if not name.endswith(".json"):
+                continue
+            doc = self._read_meta(name[:-len(".json")])
+            if doc is not None:
+                docs.append((os.path.getmtime(self._meta_path(doc.key)), doc))
+        for _, doc in sorted(docs, key=lambda item: item[0]):
+            self._add(doc)
+        self._evict()
+
+    def clear(self) -> None:
+        """Delete every cached file and reset counters (used by tests)."""
+        for key in list(self._index):
+            self._remove(key)
+        self._filling.clear()
+        self._scheduled.clear()
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "urls": len(self._index),
+            "objects": len(self._refs),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "fills": self.fills,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+            "filling": len(self._filling),
+        }
+
+
+# Singleton instance
+document_cache = DocumentCache(
+    directory=settings.document_cache_dir or DEFAULT_CACHE_DIR,
+    max_bytes=settings.document_cache_max_bytes,
+    max_file_bytes=settings.document_cache_max_file_bytes,
+)
@@ -0,0 +1,167 @@
+"""
+Embedding Cache
+
+Every profile re-index and every HR search used to call Gemini
+embed_content once per text, even for unchanged summaries and repeated
+queries. Embeddings are cached by (model, SHA-256 of the text):
+
+- embedding_cache table, shared by all workers and deploys
+- in-process LRU in front of it holding float32 bytes (~3KB per entry)
+
+get_many() answers a whole batch with one SELECT for whatever the LRU does
+not have. Zero vectors (client unavailable) are never stored. Cache errors
+never fail an embedding - they are logged and treated as misses.
+
+Also counts embed_content calls so the metrics show how many calls the
+cache and batching saved.
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+from sqlalchemy import select
+
+from ..config import get_settings
+from ..database import dialect_insert
+from ..models.embedding import EmbeddingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+def embedding_text_hash(text: str) -> str:
+    """Cache key for a text: SHA-256 of its UTF-8 bytes."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _to_bytes(vector: Iterable[float]) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def _from_bytes(payload: bytes) -> List[float]:
+    return np.frombuffer(payload, dtype="<f4").tolist()
+
+
+class EmbeddingCache:
+    """DB-backed embedding cache with an in-process LRU in front."""
+
+    def __init__(self, maxsize: int = 1024, session_factory=None):
+        self.maxsize = maxsize
+        self._session_factory = session_factory
+        # (model, text_hash) -> float32 bytes
+        self._local: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+        # embed_content accounting
+        self.api_calls = 0
+        self.texts_embedded = 0
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from ..database import async_session_maker
+            return async_session_maker()
+        return self._session_factory()
+
+    def _remember(self, key: tuple, payload: bytes) -> None:
+        self._local[key] = payload
+        self._local.move_to_end(key)
+        while len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+
+    async def get_many(self, model: str, text_hashes: List[str]) -> Dict[str, List[float]]:
+        """Cached embeddings for the given text hashes ({text_hash: vector})."""
+        found: Dict[str, List[float]] = {}
+        missing = []
+        for text_hash in dict.fromkeys(text_hashes):
+            payload = self._local.get((model, text_hash))
+            if payload is None:
+                missing.append(text_hash)
+                continue
+            self._local.move_to_end((model, text_hash))
+            self.hits += 1
+            found[text_hash] = _from_bytes(payload)
+
+        if missing:
+            try:
+                async with self._sessions() as db:
+                    result = await db.execute(
+                        select(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding).where(
+                            EmbeddingCacheEntry.model == model,
+                            EmbeddingCacheEntry.text_hash.in_(missing),
+                        )
+                    )
+                    rows = result.all()
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Embedding cache lookup failed: {e}")
+                rows = []
+            for text_hash, payload in rows:
+                self._remember((model, text_hash), payload)
+                found[text_hash] = _from_bytes(payload)
+            self.db_hits += len(rows)
+            self.misses += len(missing) - len(rows)
+
+        return found
+
+    async def put_many(self, model: str, embeddings: Dict[str, List[float]]) -> None:
+        """Store fresh embeddings in one INSERT (first writer wins across workers)."""
+        values = []
+        for text_hash, vector in embeddings.items():
+            if not any(vector):
+                continue
+            payload = _to_bytes(vector)
+            self._remember((model, text_hash), payload)
+            values.append({"model": model, "text_hash": text_hash, "dimension": len(vector), "embedding": payload})
+        if not values:
+            return
+        try:
+            async with self._sessions() as db:
+                insert = dialect_insert(db)
+                await db.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values(values)
+                    .on_conflict_do_nothing(index_elements=["model", "text_hash"])
+                )
+                await db.commit()
+            self.stores += len(values)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Embedding cache store failed: {e}")
+
+    def record_api_call(self, texts: int) -> None:
+        """Count one embed_content call covering `texts` texts."""
+        self.api_calls += 1
+        self.texts_embedded += texts
+
+    def clear(self) -> None:
+        """Drop the in-process tier (tests)."""
+        self._local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.db_hits + self.misses
+        return {
+            "size": len(self._local),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.db_hits) / lookups, 3) if lookups else 0.0,
+            "api_calls": self.api_calls,
+            "texts_embedded": self.texts_embedded,
+            # One call per text without cache or batching
+            "api_calls_saved_by_cache": self.hits + self.db_hits,
+            "api_calls_saved_by_batching": self.texts_embedded - self.api_calls,
+        }
+
+
+# Singleton instance
+embedding_cache = EmbeddingCache(maxsize=settings.embedding_cache_size)
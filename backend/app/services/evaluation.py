@@ -0,0 +1,494 @@
+"""
+Evaluation Engine
+
+Scores attempts against a compiled, cached answer key instead of walking
+question.options lists per answer:
+
+- compile: one query per test builds option-id/option-text hash maps,
+  marks and section membership for every question
+- score: one pass over an attempt's answers, with per-section aggregates
+- rescore_attempts: bulk re-score of many attempts (answer-key corrections,
+  backfills) with one read per table and bulk UPDATEs
+- rescore_completed_attempts / rescore_job: resumable keyset-paginated
+  re-evaluation of every completed attempt (CLI: fix_evaluation_results.py,
+  API: /api/admin/evaluations/rescore; one run at a time across workers,
+  see job_runs)
+
+Grading policy follows the test type (same rules the endpoints always used):
+- job tests: only MCQ questions with a correct answer are auto-scored; other
+  answers keep their stored is_correct/marks_obtained
+- standalone assessments: every answer is compared with correct_answer
+
+Keys are cached per test and dropped by the admin endpoints that change a
+test or its questions; other workers pick changes up after
+answer_key_cache_ttl_seconds.
+"""
+import time
+import inspect
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models.test import Test, TestSection, TestQuestion, Question, TestAttempt, UserAnswer
+from .job_runs import SingletonJob
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+STANDALONE_ASSESSMENT = "standalone_assessment"
+
+
+@dataclass
+class CompiledQuestion:
+    """Answer key entry for one question."""
+    id: int
+    question_type: str
+    question_text: str
+    question_number: Optional[str]
+    section_id: Optional[int]
+    marks: float
+    correct_answer: Optional[str]
+    graded: bool
+    normalizes: bool
+    option_text: Dict[str, str] = field(default_factory=dict)  # option id -> text
+    option_id: Dict[str, str] = field(default_factory=dict)  # option text -> id
+
+    def normalize(self, answer: Optional[str]) -> Optional[str]:
+        """Map an answer given as option text to its option id (ids pass through)."""
+        if not answer or not self.normalizes or answer in self.option_text:
+            return answer
+        return self.option_id.get(answer, answer)
+
+    def display(self, option_id: Optional[str]) -> Optional[str]:
+        """Option text for an option id, or the value itself if it is not an option."""
+        if not option_id:
+            return option_id
+        return self.option_text.get(option_id, option_id)
+
+
+@dataclass
+class GradedAnswer:
+    question: CompiledQuestion
+    answer_text: Optional[str]
+    is_correct: Optional[bool]
+    marks_obtained: Optional[float]
+
+
+@dataclass
+class SectionScore:
+    section_id: Optional[int]
+    section_title: str
+    total_marks: float = 0.0
+    marks_obtained: float = 0.0
+    answers: List[GradedAnswer] = field(default_factory=list)
+
+
+@dataclass
+class AttemptScore:
+    score: float
+    answers: List[GradedAnswer]
+    sections: Dict[Optional[int], SectionScore]
+    unknown_question_ids: List[int]
+
+    @property
+    def correct_count(self) -> int:
+        return sum(1 for a in self.answers if a.is_correct)
+
+
+@dataclass
+class AnswerKey:
+    """Compiled answer key for one test."""
+    test_id: int
+    assessment_type: str
+    total_marks: float
+    passing_marks: float
+    questions: Dict[int, CompiledQuestion]
+    section_titles: Dict[int, str]
+    expires_at: float = 0.0
+
+    @property
+    def standalone(self) -> bool:
+        return self.assessment_type == STANDALONE_ASSESSMENT
+
+    def grade(
+        self,
+        question: CompiledQuestion,
+        answer: Optional[str],
+        stored_is_correct: Optional[bool] = None,
+        stored_marks: Optional[float] = None
+    ) -> GradedAnswer:
+        normalized = question.normalize(answer)
+        if self.standalone:
+            is_correct = (question.correct_answer or "") == (normalized or "")
+        elif question.graded:
+            is_correct = normalized == question.correct_answer
+        else:
+            # Not auto-scored - keep whatever was stored
+            return GradedAnswer(question, normalized, stored_is_correct, stored_marks)
+        return GradedAnswer(question, normalized, is_correct, question.marks if is_correct else 0.0)
+
+    def score(
+        self,
+        answers: Mapping[int, Optional[str]],
+        stored: Optional[Mapping[int, Any]] = None
+    ) -> AttemptScore:
+        """
+        Score {question_id: answer_text} in one pass. stored maps question_id
+        to an object/row with is_correct and marks_obtained, used for answers
+        that are not auto-scored.
+        """
+        total = 0.0
+        graded_answers: List[GradedAnswer] = []
+        sections: Dict[Optional[int], SectionScore] = {}
+        unknown: List[int] = []
+
+        for question_id, answer in answers.items():
+            question = self.questions.get(question_id)
+            if question is None:
+                unknown.append(question_id)
+                continue
+            previous = stored.get(question_id) if stored else None
+            graded = self.grade(
+                question, answer,
+                getattr(previous, "is_correct", None),
+                getattr(previous, "marks_obtained", None),
+            )
+            graded_answers.append(graded)
+            total += graded.marks_obtained or 0
+
+            section = sections.get(question.section_id)
+            if section is None:
+                section = sections[question.section_id] = SectionScore(
+                    section_id=question.section_id,
+                    section_title=self.section_titles.get(question.section_id, "Unknown"),
+                )
+            section.total_marks += question.marks
+            section.marks_obtained += graded.marks_obtained or 0
+            section.answers.append(graded)
+
+        return AttemptScore(score=total, answers=graded_answers, sections=sections, unknown_question_ids=unknown)
+
+    def percentage(self, score: float, total_marks: Optional[float] = None) -> float:
+        total_marks = total_marks or self.total_marks
+        return (score / total_marks * 100) if total_marks and total_marks > 0 else 0.0
+
+    def passed(self, score: float, total_marks: Optional[float] = None) -> bool:
+        if self.standalone:
+            return score >= (self.passing_marks or 0)
+        return self.percentage(score, total_marks) >= 50  # 50% passing
+
+
+def _compile_question(row, standalone: bool) -> CompiledQuestion:
+    option_text: Dict[str, str] = {}
+    option_id: Dict[str, str] = {}
+    if row.options:
+        for opt in row.options:
+            if isinstance(opt, dict) and opt.get("id") is not None:
+                option_text.setdefault(opt["id"], opt.get("text", opt["id"]))
+                if opt.get("text") is not None:
+                    option_id.setdefault(opt["text"], opt["id"])
+    return CompiledQuestion(
+        id=row.id,
+        question_type=row.question_type,
+        question_text=row.question_text or "",
+        question_number=row.question_number,
+        section_id=row.section_id,
+        marks=float(row.marks or 0),
+        correct_answer=row.correct_answer,
+        graded=bool(row.correct_answer) and row.question_type == "mcq",
+        # Job tests only normalize MCQ answers; standalone normalizes everything
+        normalizes=standalone or row.question_type == "mcq",
+        option_text=option_text,
+        option_id=option_id,
+    )
+
+
+_QUESTION_COLUMNS = (
+    Question.id, Question.question_type, Question.question_text, Question.question_number,
+    Question.section_id, Question.marks, Question.correct_answer, Question.options,
+)
+
+
+class AnswerKeyCache:
+    """Bounded LRU of compiled answer keys, one per test."""
+
+    def __init__(self, maxsize: int = 256, ttl_seconds: int = 300):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._keys: "OrderedDict[int, AnswerKey]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.compiles = 0
+
+    async def get(
+        self,
+        db: AsyncSession,
+        test_id: int,
+        question_ids: Iterable[int] = ()
+    ) -> Optional[AnswerKey]:
+        """
+        Return the answer key for a test, compiling it on a miss. question_ids
+        not linked to the test (sample-pool questions) are loaded into the key.
+        """
+        key = self._keys.get(test_id)
+        if key is not None and key.expires_at > time.monotonic():
+            self._keys.move_to_end(test_id)
+            self.hits += 1
+        else:
+            self.misses += 1
+            key = await self._compile(db, test_id)
+            if key is None:
+                self._keys.pop(test_id, None)
+                return None
+            self._store(key)
+
+        missing = {qid for qid in question_ids if qid not in key.questions}
+        if missing:
+            result = await db.execute(select(*_QUESTION_COLUMNS).where(Question.id.in_(missing)))
+            for row in result.all():
+                key.questions[row.id] = _compile_question(row, key.standalone)
+        return key
+
+    async def _compile(self, db: AsyncSession, test_id: int) -> Optional[AnswerKey]:
+        test_result = await db.execute(
+            select(Test.assessment_type, Test.total_marks, Test.passing_marks).where(Test.id == test_id)
+        )
+        test = test_result.first()
+        if test is None:
+            return None
+
+        sections_result = await db.execute(
+            select(TestSection.id, TestSection.title).where(TestSection.test_id == test_id)
+        )
+        section_titles = {row.id: row.title for row in sections_result.all()}
+
+        questions_result = await db.execute(
+            select(*_QUESTION_COLUMNS).where(or_(
+                Question.id.in_(select(TestQuestion.question_id).where(TestQuestion.test_id == test_id)),
+                Question.section_id.in_(select(TestSection.id).where(TestSection.test_id == test_id)),
+            ))
+        )
+        standalone = test.assessment_type == STANDALONE_ASSESSMENT
+        questions = {row.id: _compile_question(row, standalone) for row in questions_result.all()}
+
+        self.compiles += 1
+        return AnswerKey(
+            test_id=test_id,
+            assessment_type=test.assessment_type or "job_test",
+            total_marks=float(test.total_marks or 0),
+            passing_marks=float(test.passing_marks or 0),
+            questions=questions,
+            section_titles=section_titles,
+        )
+
+    def _store(self, key: AnswerKey) -> None:
+        key.expires_at = time.monotonic() + self.ttl_seconds
+        self._keys[key.test_id] = key
+        self._keys.move_to_end(key.test_id)
+        while len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+
+    def invalidate(self, test_id: int) -> None:
+        """Drop one test's key (test settings or its questions changed)."""
+        self._keys.pop(test_id, None)
+
+    def invalidate_all(self) -> None:
+        """Drop every key (shared question bank changed)."""
+        self._keys.clear()
+
+    def clear(self) -> None:
+        """Reset keys and counters (used by tests)."""
+        self._keys.clear()
+        self.hits = 0
+        self.misses = 0
+        self.compiles = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._keys),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "compiles": self.compiles,
+        }
+
+
+# Singleton instance
+answer_keys = AnswerKeyCache(
+    maxsize=settings.answer_key_cache_size,
+    ttl_seconds=settings.answer_key_cache_ttl_seconds,
+)
+
+
+async def rescore_attempts(
+    db: AsyncSession,
+    attempt_ids: Sequence[int],
+    keys: AnswerKeyCache = answer_keys
+) -> Dict[str, Any]:
+    """
+    Re-score many attempts against their current answer keys.
+
+    Reads attempts and answers with one query each, then writes changed
+    UserAnswer rows and attempt totals with bulk UPDATEs. Only attempts
+    whose totals change are written. Does not commit.
+    """
+    summary = {"attempts": 0, "attempts_changed": 0, "answers_changed": 0, "skipped": 0}
+    if not attempt_ids:
+        return summary
+
+    attempts_result = await db.execute(
+        select(TestAttempt.id, TestAttempt.test_id, TestAttempt.total_marks,
+               TestAttempt.score, TestAttempt.percentage, TestAttempt.passed)
+        .where(TestAttempt.id.in_(attempt_ids))
+    )
+    attempts = attempts_result.all()
+
+    answers_result = await db.execute(
+        select(UserAnswer.id, UserAnswer.attempt_id, UserAnswer.question_id, UserAnswer.answer_text,
+               UserAnswer.is_correct, UserAnswer.marks_obtained)
+        .where(UserAnswer.attempt_id.in_(attempt_ids))
+        .order_by(UserAnswer.id)
+    )
+    answers_by_attempt: Dict[int, List[Any]] = {}
+    for row in answers_result.all():
+        answers_by_attempt.setdefault(row.attempt_id, []).append(row)
+
+    # Compile each test's key once, including sample-pool questions
+    question_ids_by_test: Dict[int, set] = {}
+    for attempt in attempts:
+        question_ids_by_test.setdefault(attempt.test_id, set()).update(
+            a.question_id for a in answers_by_attempt.get(attempt.id, [])
+        )
+    test_keys = {
+        test_id: await keys.get(db, test_id, question_ids)
+        for test_id, question_ids in question_ids_by_test.items()
+    }
+
+    answer_updates: List[Dict[str, Any]] = []
+    attempt_updates: List[Dict[str, Any]] = []
+    for attempt in attempts:
+        summary["attempts"] += 1
+        key = test_keys.get(attempt.test_id)
+        rows = answers_by_attempt.get(attempt.id, [])
+        if key is None:
+            summary["skipped"] += 1
+            continue
+
+        rows_by_question = {row.question_id: row for row in rows}
+        result = key.score({row.question_id: row.answer_text for row in rows}, rows_by_question)
+        for graded in result.answers:
+            row = rows_by_question[graded.question.id]
+            if (graded.answer_text, graded.is_correct, graded.marks_obtained) != (
+                row.answer_text, row.is_correct, row.marks_obtained
+            ):
+                answer_updates.append({
+                    "id": row.id,
+                    "answer_text": graded.answer_text,
+                    "is_correct": graded.is_correct,
+                    "marks_obtained": graded.marks_obtained,
+                })
+
+        total_marks = attempt.total_marks or key.total_marks
+        values = {
+            "score": result.score,
+            "percentage": key.percentage(result.score, total_marks),
+            "passed": key.passed(result.score, total_marks),
+        }
+        if (attempt.score, attempt.percentage, attempt.passed) != (values["score"], values["percentage"], values["passed"]):
+            attempt_updates.append({"id": attempt.id, **values})
+
+    if answer_updates:
+        await db.execute(update(UserAnswer), answer_updates)
+    if attempt_updates:
+        await db.execute(update(TestAttempt), attempt_updates)
+
+    summary["answers_changed"] = len(answer_updates)
+    summary["attempts_changed"] = len(attempt_updates)
+    return summary
+
+
+async def rescore_completed_attempts(
+    test_id: Optional[int] = None,
+    after_id: int = 0,
+    chunk_size: int = 500,
+    on_progress: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    session_factory=None
+) -> Dict[str, Any]:
+    """
+    Re-score every completed attempt (optionally of one test) in keyset
+    chunks of chunk_size, ordered by attempt id and starting after after_id.
+
+    Each chunk runs in its own short transaction and is committed before the
+    next one is read, so live traffic is never blocked for long and an
+    interrupted run resumes from the last reported last_attempt_id. A fresh
+    AnswerKeyCache is used so corrected keys are always picked up.
+    on_progress (sync or async) receives the running totals after each chunk.
+    """
+    if session_factory is None:
+        from ..database import async_session_maker
+        session_factory = async_session_maker
+
+    keys = AnswerKeyCache(maxsize=settings.answer_key_cache_size, ttl_seconds=settings.answer_key_cache_ttl_seconds)
+    totals = {
+        "attempts": 0, "attempts_changed": 0, "answers_changed": 0, "skipped": 0,
+        "chunks": 0, "last_attempt_id": after_id,
+    }
+    while True:
+        async with session_factory() as db:
+            query = (
+                select(TestAttempt.id)
+                .where(TestAttempt.status == "completed")
+                .where(TestAttempt.id > totals["last_attempt_id"])
+                .order_by(TestAttempt.id)
+                .limit(chunk_size)
+            )
+            if test_id is not None:
+                query = query.where(TestAttempt.test_id == test_id)
+            attempt_ids = (await db.execute(query)).scalars().all()
+            if not attempt_ids:
+                break
+
+            summary = await rescore_attempts(db, attempt_ids, keys)
+            await db.commit()
+
+        for name in ("attempts", "attempts_changed", "answers_changed", "skipped"):
+            totals[name] += summary[name]
+        totals["chunks"] += 1
+        totals["last_attempt_id"] = attempt_ids[-1]
+
+        if on_progress is not None:
+            result = on_progress(dict(totals))
+            if inspect.isawaitable(result):
+                await result
+        if len(attempt_ids) < chunk_size:
+            break
+
+    # Serve the corrected keys from now on
+    if test_id is not None:
+        answer_keys.invalidate(test_id)
+    else:
+        answer_keys.invalidate_all()
+    return totals
+
+
+class RescoreJob(SingletonJob):
+    """Background re-evaluation run; one at a time across workers, state in job_runs."""
+
+    def __init__(self, session_factory=None):
+        super().__init__("rescore", "re-evaluation", session_factory=session_factory)
+
+    async def work(self, params: Dict[str, Any], report) -> Dict[str, Any]:
+        return await rescore_completed_attempts(
+            params["test_id"], params["after_id"], params["chunk_size"],
+            on_progress=report, session_factory=self._session_factory,
+        )
+
+
+# Singleton instance
+rescore_job = RescoreJob()
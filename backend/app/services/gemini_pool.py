@@ -0,0 +1,298 @@
+"""
+Gemini Key Pool Scheduler
+
+The old pool pinned every request to one "current" key and only moved on
+after a 429 string match; failed keys never came back and nothing limited
+how hard a key was hit. Each configured key now gets:
+
+- a token bucket for requests per minute and one for tokens per minute
+- a concurrency limit (in-flight calls per key)
+- a cooldown after a quota error, after which it rejoins automatically
+
+acquire() hands out the least-loaded healthy key that has budget right now,
+waiting (up to gemini_queue_timeout_seconds) when every key is saturated, so
+throughput grows with the number of keys instead of draining one at a time.
+
+Limits are per process: with N gunicorn workers, configure each key's share
+(e.g. RPM / N).
+"""
+import asyncio
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# How often a waiting request re-checks key availability
+POLL_INTERVAL_SECONDS = 0.05
+
+
+class GeminiCapacityError(Exception):
+    """No key had capacity within the queue timeout."""
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """True for Gemini 429 / RESOURCE_EXHAUSTED / quota errors."""
+    error_str = str(error)
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower()
+
+
+class TokenBucket:
+    """Refilling budget of `per_minute` units; may go negative on overspend."""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be consumed (0 = now)."""
+        self._refill()
+        # Requests larger than the bucket only need a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.per_minute
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+
+class GeminiKey:
+    """Scheduling state of one API key."""
+
+    def __init__(self, index: int, client, rpm: int, tpm: int, max_concurrency: int):
+        self.index = index
+        self.client = client
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+
+        # Metrics
+        self.calls = 0
+        self.errors = 0
+        self.quota_errors = 0
+
+    def cooling_down(self) -> bool:
+        return self.cooldown_until > time.monotonic()
+
+    def wait_time(self, estimated_tokens: int) -> float:
+        """Seconds until this key could take a request (0 = now)."""
+        if self.cooling_down():
+            return self.cooldown_until - time.monotonic()
+        if self.in_flight >= self.max_concurrency:
+            return POLL_INTERVAL_SECONDS
+        return max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+
+
+class GeminiLease:
+    """A key checked out for one call; report actual usage via record_tokens()."""
+
+    def __init__(self, key: GeminiKey, estimated_tokens: int):
+        self.key = key
+        self.client = key.client
+        self.estimated_tokens = estimated_tokens
+
+    def record_tokens(self, actual_tokens: Optional[int]) -> None:
+        """Correct the TPM bucket with the usage Gemini reported."""
+        if actual_tokens:
+            self.key.tokens.consume(actual_tokens - self.estimated_tokens)
+
+
+class GeminiKeyPool:
+    """Least-loaded scheduler over all configured Gemini keys."""
+
+    def __init__(
+        self,
+        rpm_per_key: int = 60,
+        tpm_per_key: int = 1_000_000,
+        max_concurrency_per_key: int = 4,
+        cooldown_seconds: float = 60.0,
+        queue_timeout_seconds: float = 120.0,
+    ):
+        self.rpm_per_key = rpm_per_key
+        self.tpm_per_key = tpm_per_key
+        self.max_concurrency_per_key = max_concurrency_per_key
+        self.cooldown_seconds = cooldown_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._keys: List[GeminiKey] = []
+        self._initialized = False
+
+        # Metrics
+        self.queued = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+
+    def _initialize(self) -> None:
+        """Create one client per configured API key."""
+        if self._initialized:
+            return
+        self._initialized = True
+
+        api_keys = settings.get_gemini_api_keys()
+        if not api_keys:
+            print("WARNING: No GEMINI_API_KEY(s) set - resume parsing disabled")
+            return
+
+        try:
+            from google import genai
+        except ImportError:
+            print("WARNING: google-genai package not installed")
+            return
+
+        for i, key in enumerate(api_keys):
+            try:
+                self.add_client(genai.Client(api_key=key))
+                print(f"✅ Gemini client {i+1}/{len(api_keys)} initialized")
+            except Exception as e:
+                print(f"WARNING: Failed to init Gemini client {i+1}: {e}")
+        print(f"Gemini key pool: {len(self._keys)} keys available")
+
+    def add_client(self, client) -> GeminiKey:
+        """Register a client (one per API key)."""
+        key = GeminiKey(
+            index=len(self._keys),
+            client=client,
+            rpm=self.rpm_per_key,
+            tpm=self.tpm_per_key,
+            max_concurrency=self.max_concurrency_per_key,
+        )
+        self._keys.append(key)
+        return key
+
+    @property
+    def configured(self) -> bool:
+        self._initialize()
+        return bool(self._keys)
+
+    @property
+    def key_count(self) -> int:
+        """Number of configured keys, cooling down or not."""
+        self._initialize()
+        return len(self._keys)
+
+    @property
+    def available_clients_count(self) -> int:
+        """Number of keys not cooling down after a quota error."""
+        self._initialize()
+        return sum(1 for key in self._keys if not key.cooling_down())
+
+    def get_client(self):
+        """Least-loaded healthy client, without rate accounting (legacy callers)."""
+        self._initialize()
+        if not self._keys:
+            return None
+        healthy = [key for key in self._keys if not key.cooling_down()] or self._keys
+        return min(healthy, key=lambda key: key.in_flight).client
+
+    def _pick(self, estimated_tokens: int) -> Optional[GeminiKey]:
+        ready = [key for key in self._keys if key.wait_time(estimated_tokens) == 0.0]
+        if not ready:
+            return None
+        # Least loaded first, then the key with the most request budget left
+        return min(ready, key=lambda key: (key.in_flight, -key.requests.tokens))
+
+    @asynccontextmanager
+    async def acquire(self, estimated_tokens: int = 0) -> AsyncIterator[GeminiLease]:
+        """
+        Check out a key for one Gemini call. Quota errors raised inside the
+        block put the key into cooldown; the error is re-raised.
+        """
+        self._initialize()
+        if not self._keys:
+            raise ValueError("Gemini API not configured. Please set GEMINI_API_KEY.")
+
+        started = time.monotonic()
+        deadline = started + self.queue_timeout_seconds
+        key = self._pick(estimated_tokens)
+        if key is None:
+            self.queued += 1
+            try:
+                while key is None:
+                    wait = min(k.wait_time(estimated_tokens) for k in self._keys)
+                    if time.monotonic() + wait > deadline:
+                        self.rejected += 1
+                        raise GeminiCapacityError(
+                            "All Gemini API keys are rate limited or cooling down. Please try again later."
+                        )
+                    await asyncio.sleep(min(max(wait, POLL_INTERVAL_SECONDS), 1.0))
+                    key = self._pick(estimated_tokens)
+            finally:
+                self.queued -= 1
+
+        key.requests.consume(1)
+        key.tokens.consume(estimated_tokens)
+        key.in_flight += 1
+        key.calls += 1
+        self.acquired += 1
+        self.total_wait_ms += (time.monotonic() - started) * 1000
+        try:
+            yield GeminiLease(key, estimated_tokens)
+        except Exception as e:
+            key.errors += 1
+            if is_quota_error(e):
+                key.quota_errors += 1
+                key.cooldown_until = time.monotonic() + self.cooldown_seconds
+                print(f"🔴 Gemini API key {key.index + 1} hit quota, cooling down for {self.cooldown_seconds:.0f}s")
+            raise
+        finally:
+            key.in_flight -= 1
+
+    def reset_cooldowns(self) -> None:
+        """Bring every key back immediately."""
+        for key in self._keys:
+            key.cooldown_until = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "keys": len(self._keys),
+            "available": sum(1 for key in self._keys if not key.cooling_down()),
+            "in_flight": sum(key.in_flight for key in self._keys),
+            "queued": self.queued,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait_ms / self.acquired, 2) if self.acquired else 0.0,
+            "per_key": [
+                {
+                    "key": key.index + 1,
+                    "in_flight": key.in_flight,
+                    "calls": key.calls,
+                    "errors": key.errors,
+                    "quota_errors": key.quota_errors,
+                    "cooldown_seconds": round(max(key.cooldown_until - now, 0.0), 1),
+                    "rpm_remaining": int(max(key.requests.tokens, 0)),
+                }
+                for key in self._keys
+            ],
+        }
+
+
+# Singleton instance
+gemini_pool = GeminiKeyPool(
+    rpm_per_key=settings.gemini_rpm_per_key,
+    tpm_per_key=settings.gemini_tpm_per_key,
+    max_concurrency_per_key=settings.gemini_max_concurrency_per_key,
+    cooldown_seconds=settings.gemini_key_cooldown_seconds,
+    queue_timeout_seconds=settings.gemini_queue_timeout_seconds,
+)
+
+
+def get_genai_client():
+    """Get the least-loaded healthy Gemini client from the pool."""
+    return gemini_pool.get_client()
@@ -0,0 +1,42 @@
+"""
+Shared HTTP Client
+
+One pooled httpx.AsyncClient for the whole app lifetime. Creating a client
+per request means a fresh TCP + TLS handshake to Supabase/Cloudinary on every
+document view, upload and resume download; the shared client keeps
+connections alive and reuses them.
+
+The client is created lazily on first use and closed from the app lifespan.
+Callers must NOT use it as a context manager (that would close it).
+"""
+from typing import Optional
+
+import httpx
+
+from ..config import get_settings
+
+settings = get_settings()
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared pooled client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(settings.http_timeout_seconds, connect=10.0),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client (call from app lifespan shutdown)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
@@ -0,0 +1,211 @@
+"""
+Singleton Background Jobs
+
+Admin jobs such as the re-evaluation run and the vector re-index used to
+keep their running flag and progress in one worker's memory. With two
+gunicorn workers, a status poll on the other worker said "idle" and a
+second POST there started a parallel full run. State now lives in the
+job_runs table (one row per job name):
+
+- start() claims the row with a conditional UPDATE (not running, or its
+  heartbeat is older than stale_after_seconds because its worker died), so
+  exactly one worker runs the job
+- the running worker writes progress after every chunk and refreshes a
+  heartbeat every stale_after_seconds / 3
+- status() reads the row, so every worker reports the same run; a running
+  row with a stale heartbeat is reported as "interrupted"
+- CLI scripts call run() instead of start(): same claim, but the job runs in
+  the calling task, so a script and an admin-triggered run never overlap
+- writes are tagged with the run_id, so an interrupted run that wakes up
+  can never overwrite a newer run
+"""
+import asyncio
+import json
+import secrets
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.exc import IntegrityError
+
+from ..models.job_run import JobRun
+
+logger = logging.getLogger(__name__)
+
+ProgressReporter = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class JobAlreadyRunning(RuntimeError):
+    """Another worker (or this one) is already running the job."""
+
+
+class SingletonJob:
+    """One run at a time of a named background job, across all workers."""
+
+    def __init__(self, name: str, description: str, stale_after_seconds: int = 300, session_factory=None):
+        self.name = name
+        self.description = description
+        self.stale_after_seconds = stale_after_seconds
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._run_id: Optional[str] = None
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from ..database import async_session_maker
+            return async_session_maker()
+        return self._session_factory()
+
+    async def work(self, params: Dict[str, Any], report: ProgressReporter) -> Dict[str, Any]:
+        """Do the job; report(totals) after each chunk. Returns the final totals."""
+        raise NotImplementedError
+
+    # ---------- Claim and status ----------
+
+    async def start(self, **params: Any) -> Dict[str, Any]:
+        """Claim the job and run it in the background on this worker."""
+        run_id, run = await self._claim(params)
+        self._run_id = run_id
+        self._task = asyncio.create_task(self._run(run_id, params))
+        return self._describe(run, run.started_at)
+
+    async def run(
+        self,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        **params: Any
+    ) -> Dict[str, Any]:
+        """
+        Claim the job and run it to the end in the calling task (CLI scripts).
+        on_progress(totals) is called after each chunk. Raises JobAlreadyRunning
+        if a run is in progress anywhere, and re-raises the run's own error.
+        """
+        run_id, _ = await self._claim(params)
+        return await self._run(run_id, params, on_progress=on_progress, raise_errors=True)
+
+    async def _claim(self, params: Dict[str, Any]) -> Tuple[str, JobRun]:
+        now = datetime.now(timezone.utc)
+        run_id = secrets.token_hex(16)
+        values = dict(
+            run_id=run_id, state="running", params=json.dumps(params), progress=None, error=None,
+            started_at=now, heartbeat_at=now, finished_at=None,
+        )
+        cutoff = now - timedelta(seconds=self.stale_after_seconds)
+
+        async with self._sessions() as db:
+            result = await db.execute(
+                update(JobRun)
+                .where(JobRun.name == self.name)
+                .where(or_(JobRun.state != "running", JobRun.heartbeat_at < cutoff))
+                .values(**values)
+                .returning(JobRun.name)
+            )
+            claimed = result.scalar_one_or_none() is not None
+            if not claimed:
+                exists = await db.execute(select(JobRun.name).where(JobRun.name == self.name))
+                if exists.scalar_one_or_none() is not None:
+                    raise JobAlreadyRunning(f"A {self.description} run is already in progress")
+                db.add(JobRun(name=self.name, **values))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another worker created the row first
+                raise JobAlreadyRunning(f"A {self.description} run is already in progress")
+        return run_id, JobRun(name=self.name, **values)
+
+    async def status(self) -> Dict[str, Any]:
+        """Current/last run, the same on every worker."""
+        async with self._sessions() as db:
+            run = await db.get(JobRun, self.name)
+        if run is None:
+            return {"state": "idle"}
+        return self._describe(run, datetime.now(timezone.utc))
+
+    def _describe(self, run: JobRun, now: datetime) -> Dict[str, Any]:
+        state = run.state
+        if state == "running" and run.heartbeat_at is not None:
+            heartbeat = run.heartbeat_at
+            if heartbeat.tzinfo is None:
+                heartbeat = heartbeat.replace(tzinfo=timezone.utc)
+            if now - heartbeat > timedelta(seconds=self.stale_after_seconds):
+                state = "interrupted"  # Its worker died; progress has the resume point
+
+        status = {"state": state, **json.loads(run.params or "{}")}
+        status["started_at"] = run.started_at.isoformat() if run.started_at else None
+        status["progress"] = json.loads(run.progress) if run.progress else None
+        if run.error:
+            status["error"] = run.error
+        if run.finished_at:
+            status["finished_at"] = run.finished_at.isoformat()
+        return status
+
+    # ---------- Running ----------
+
+    async def _write(self, run_id: str, **values: Any) -> None:
+        async with self._sessions() as db:
+            await db.execute(
+                update(JobRun)
+                .where(JobRun.name == self.name, JobRun.run_id == run_id, JobRun.state == "running")
+                .values(heartbeat_at=datetime.now(timezone.utc), **values)
+            )
+            await db.commit()
+
+    async def _heartbeat(self, run_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.stale_after_seconds / 3)
+            try:
+                await self._write(run_id)
+            except Exception as e:
+                logger.warning(f"{self.description} heartbeat failed: {e}")
+
+    async def _run(
+        self,
+        run_id: str,
+        params: Dict[str, Any],
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        raise_errors: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        async def report(totals: Dict[str, Any]) -> None:
+            if on_progress is not None:
+                on_progress(totals)
+            await self._write(run_id, progress=json.dumps(totals))
+
+        heartbeat = asyncio.create_task(self._heartbeat(run_id))
+        totals, error = None, None
+        try:
+            totals = await self.work(params, report)
+            values = {"state": "completed", "progress": json.dumps(totals)}
+        except asyncio.CancelledError as e:
+            values = {"state": "failed", "error": "Interrupted (worker shut down)"}
+            error = e
+        except Exception as e:
+            # progress holds the resume point
+            logger.error(f"{self.description} run failed: {e}")
+            values = {"state": "failed", "error": str(e)[:500]}
+            error = e
+        finally:
+            heartbeat.cancel()
+
+        try:
+            await self._write(run_id, finished_at=datetime.now(timezone.utc), **values)
+        except Exception as e:
+            logger.error(f"Could not record the end of the {self.description} run: {e}")
+        if error is not None and raise_errors:
+            raise error
+        return totals
+
+    async def wait(self) -> None:
+        """Wait for this worker's run, if any."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Interrupt this worker's run (call from app lifespan); it is recorded as failed."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            # Cancelled before it got to record anything itself
+            await self._write(
+                self._run_id, state="failed", error="Interrupted (worker shut down)",
+                finished_at=datetime.now(timezone.utc),
+            )
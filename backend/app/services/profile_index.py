@@ -0,0 +1,153 @@
+"""
+Profile Re-index
+
+Profiles used to be indexed only one at a time while a resume was applied,
+and an embedding failure (quota, zero vector) left summary_embedding_id
+empty for good. reindex_profiles() rebuilds the vector index in bulk:
+
+- streams candidate_profiles with a summary in keyset pages by id
+- skips profiles whose summary_embedding_hash (summary + filter metadata,
+  see profile_index_hash) matches what is already indexed
+- embeds the rest in batches (cached, see embedding_cache) and upserts
+  vector_upsert_batch_size vectors per request
+- writes summary_embedding_id/hash back with one bulk UPDATE per page
+
+Each page is committed before the next is read; an interrupted run resumes
+from the last reported last_profile_id. Quota errors stop the run (resume
+later); profiles whose embedding was unavailable are counted as failed and
+picked up again by the next run.
+
+CLI: reindex_profiles.py, API: /api/admin/vector-index/reindex (one run at
+a time across workers, see job_runs)
+"""
+import inspect
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import select, update
+
+from ..config import get_settings
+from ..models.profile import CandidateProfile, Skill, profile_skills
+from .job_runs import SingletonJob
+from .vector_search import vector_search_service, profile_vector_metadata, profile_index_hash
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+async def reindex_profiles(
+    after_id: int = 0,
+    chunk_size: int = 500,
+    force: bool = False,
+    on_progress: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    session_factory=None
+) -> Dict[str, Any]:
+    """
+    Index every profile with a professional summary, in keyset pages of
+    chunk_size ordered by profile id and starting after after_id.
+    force=True re-indexes unchanged profiles too.
+    on_progress (sync or async) receives the running totals after each page.
+    """
+    if session_factory is None:
+        from ..database import async_session_maker
+        session_factory = async_session_maker
+
+    await vector_search_service.initialize()
+    if not vector_search_service.available:
+        raise RuntimeError("Vector search backend is not available")
+
+    totals = {
+        "profiles": 0, "indexed": 0, "unchanged": 0, "failed": 0,
+        "chunks": 0, "last_profile_id": after_id,
+    }
+    while True:
+        async with session_factory() as db:
+            result = await db.execute(
+                select(
+                    CandidateProfile.id,
+                    CandidateProfile.professional_summary,
+                    CandidateProfile.years_of_experience,
+                    CandidateProfile.current_role,
+                    CandidateProfile.current_company,
+                    CandidateProfile.summary_embedding_id,
+                    CandidateProfile.summary_embedding_hash,
+                )
+                .where(CandidateProfile.id > totals["last_profile_id"])
+                .where(CandidateProfile.professional_summary.isnot(None))
+                .order_by(CandidateProfile.id)
+                .limit(chunk_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+
+            skills_result = await db.execute(
+                select(profile_skills.c.profile_id, Skill.name)
+                .join(Skill, Skill.id == profile_skills.c.skill_id)
+                .where(profile_skills.c.profile_id.in_([row.id for row in rows]))
+                .order_by(profile_skills.c.profile_id, Skill.name)
+            )
+            skills_by_profile: Dict[int, list] = {}
+            for profile_id, name in skills_result.all():
+                skills_by_profile.setdefault(profile_id, []).append(name)
+
+            pending = []
+            for row in rows:
+                metadata = profile_vector_metadata(
+                    skills_by_profile.get(row.id, []),
+                    row.years_of_experience,
+                    row.current_role,
+                    row.current_company,
+                )
+                index_hash = profile_index_hash(row.professional_summary, metadata)
+                if not force and row.summary_embedding_id and row.summary_embedding_hash == index_hash:
+                    totals["unchanged"] += 1
+                    continue
+                pending.append({
+                    "profile_id": row.id,
+                    "summary": row.professional_summary,
+                    "metadata": metadata,
+                    "hash": index_hash,
+                })
+
+            indexed = await vector_search_service.index_profiles(pending)
+            updates = [
+                {"id": p["profile_id"], "summary_embedding_id": indexed[p["profile_id"]], "summary_embedding_hash": p["hash"]}
+                for p in pending if p["profile_id"] in indexed
+            ]
+            if updates:
+                await db.execute(update(CandidateProfile), updates)
+            await db.commit()
+
+        totals["profiles"] += len(rows)
+        totals["indexed"] += len(updates)
+        totals["failed"] += len(pending) - len(updates)
+        totals["chunks"] += 1
+        totals["last_profile_id"] = rows[-1].id
+
+        if on_progress is not None:
+            result = on_progress(dict(totals))
+            if inspect.isawaitable(result):
+                await result
+        if len(rows) < chunk_size:
+            break
+
+    return totals
+
+
+class ReindexJob(SingletonJob):
+    """Background re-index run; one at a time across workers, state in job_runs."""
+
+    def __init__(self, session_factory=None):
+        super().__init__("vector_reindex", "re-index", session_factory=session_factory)
+
+    async def work(self, params: Dict[str, Any], report) -> Dict[str, Any]:
+        return await reindex_profiles(
+            params["after_id"], params["chunk_size"], params["force"],
+            on_progress=report, session_factory=self._session_factory,
+        )
+
+
+# Singleton instance
+reindex_job = ReindexJob()
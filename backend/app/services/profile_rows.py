@@ -0,0 +1,105 @@
+"""
+Profile Child Rows
+
+Bulk write path for a candidate profile's child tables (education, work
+experience, projects, certifications, publications, awards, languages,
+skills). Going through the ORM relationships (.clear() then .append() per
+row) emits a DELETE and an INSERT per row over several flushes, so re-parse
+time grew with resume length. Here each table costs one DELETE filtered by
+profile_id plus one multi-row INSERT, inside the caller's transaction.
+
+Rows are plain dicts of column values (without profile_id). Nothing here
+commits. Profiles loaded with their relationships before a bulk write must
+be re-read (get_profile_with_relations uses populate_existing).
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.profile import (
+    Education, WorkExperience, Project, Certification, Publication, Award,
+    UserLanguage, profile_skills
+)
+
+# Section name (CandidateProfile relationship) -> child model
+CHILD_MODELS = {
+    "education": Education,
+    "work_experience": WorkExperience,
+    "projects": Project,
+    "certifications": Certification,
+    "publications": Publication,
+    "awards": Award,
+    "languages": UserLanguage,
+}
+
+
+async def replace_child_rows(
+    db: AsyncSession,
+    profile_id: int,
+    sections: Dict[str, List[Dict[str, Any]]]
+) -> Dict[str, int]:
+    """Replace every listed section: one DELETE and one multi-row INSERT each."""
+    counts = {}
+    for section, rows in sections.items():
+        model = CHILD_MODELS[section]
+        await db.execute(delete(model).where(model.profile_id == profile_id))
+        counts[section] = await add_child_rows(db, profile_id, section, rows)
+    return counts
+
+
+async def add_child_rows(
+    db: AsyncSession,
+    profile_id: int,
+    section: str,
+    rows: Iterable[Dict[str, Any]]
+) -> int:
+    """Append rows to a section with a single multi-row INSERT."""
+    values = [dict(row, profile_id=profile_id) for row in rows]
+    if values:
+        await db.execute(insert(CHILD_MODELS[section]), values)
+    return len(values)
+
+
+async def update_child_row(
+    db: AsyncSession,
+    profile_id: int,
+    section: str,
+    row_id: int,
+    values: Dict[str, Any]
+) -> bool:
+    """Update one row owned by the profile; False if it does not exist."""
+    model = CHILD_MODELS[section]
+    stmt = update(model).where(model.id == row_id, model.profile_id == profile_id)
+    if values:
+        result = await db.execute(stmt.values(**values))
+    else:
+        # Nothing to change - still report whether the row exists
+        result = await db.execute(stmt.values(profile_id=profile_id))
+    return result.rowcount > 0
+
+
+async def delete_child_row(db: AsyncSession, profile_id: int, section: str, row_id: int) -> bool:
+    """Delete one row owned by the profile; False if it does not exist."""
+    model = CHILD_MODELS[section]
+    result = await db.execute(delete(model).where(model.id == row_id, model.profile_id == profile_id))
+    return result.rowcount > 0
+
+
+async def replace_profile_skills(
+    db: AsyncSession,
+    profile_id: int,
+    skill_ids: Iterable[int],
+    proficiencies: Optional[Dict[int, Any]] = None
+) -> int:
+    """Replace the profile's skill links: one DELETE and one multi-row INSERT."""
+    await db.execute(delete(profile_skills).where(profile_skills.c.profile_id == profile_id))
+    values = []
+    for skill_id in dict.fromkeys(skill_ids):
+        row = {"profile_id": profile_id, "skill_id": skill_id}
+        if proficiencies and proficiencies.get(skill_id) is not None:
+            row["proficiency"] = proficiencies[skill_id]
+        values.append(row)
+    if values:
+        await db.execute(insert(profile_skills), values)
+    return len(values)
@@ -0,0 +1,132 @@
+"""
+Resume Parse Cache
+
+Candidates often re-upload the same PDF, and retries re-run the whole Gemini
+vision call. Parse results are cached by SHA-256 of the PDF bytes plus
+PARSER_VERSION (prompt + model + schema), so a duplicate upload skips PDF
+rasterization and the LLM call entirely.
+
+Two tiers:
+- resume_parse_results table, shared by all workers and deploys
+- small in-process LRU in front of it holding the normalized JSON
+
+Only meaningful results are stored; failures and empty parses are not.
+Cache errors never fail a parse - they are logged and treated as misses.
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+
+from ..config import get_settings
+from ..database import dialect_insert
+from ..models.resume_job import ResumeParseResult
+from .resume_parser import ParsedResume, PARSER_VERSION
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+def resume_content_hash(pdf_bytes: bytes) -> str:
+    """Cache key for a PDF: SHA-256 of its bytes."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class ResumeParseCache:
+    """DB-backed parse result cache with an in-process LRU in front."""
+
+    def __init__(self, maxsize: int = 128, session_factory=None):
+        self.maxsize = maxsize
+        self._session_factory = session_factory
+        # content_hash -> ParsedResume JSON (rebuilt per hit, callers mutate results)
+        self._local: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from ..database import async_session_maker
+            return async_session_maker()
+        return self._session_factory()
+
+    def _remember(self, content_hash: str, payload: str) -> None:
+        self._local[content_hash] = payload
+        self._local.move_to_end(content_hash)
+        while len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+
+    async def get(self, content_hash: str) -> Optional[ParsedResume]:
+        """Return the cached parse for this PDF hash, or None."""
+        payload = self._local.get(content_hash)
+        if payload is not None:
+            self._local.move_to_end(content_hash)
+            self.hits += 1
+            return ParsedResume.model_validate_json(payload)
+
+        try:
+            async with self._sessions() as db:
+                result = await db.execute(
+                    select(ResumeParseResult.result).where(
+                        ResumeParseResult.content_hash == content_hash,
+                        ResumeParseResult.parser_version == PARSER_VERSION,
+                    )
+                )
+                payload = result.scalar_one_or_none()
+            parsed = ParsedResume.model_validate_json(payload) if payload else None
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Resume parse cache lookup failed: {e}")
+            parsed = None
+
+        if parsed is None:
+            self.misses += 1
+            return None
+        self.db_hits += 1
+        self._remember(content_hash, payload)
+        return parsed
+
+    async def put(self, content_hash: str, parsed: ParsedResume) -> None:
+        """Store a successful parse (first writer wins across workers)."""
+        payload = parsed.model_dump_json()
+        self._remember(content_hash, payload)
+        try:
+            async with self._sessions() as db:
+                insert = dialect_insert(db)
+                await db.execute(
+                    insert(ResumeParseResult)
+                    .values(content_hash=content_hash, parser_version=PARSER_VERSION, result=payload)
+                    .on_conflict_do_nothing(index_elements=["content_hash", "parser_version"])
+                )
+                await db.commit()
+            self.stores += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Resume parse cache store failed: {e}")
+
+    def clear(self) -> None:
+        """Drop the in-process tier (tests)."""
+        self._local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.db_hits + self.misses
+        return {
+            "size": len(self._local),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.db_hits) / lookups, 3) if lookups else 0.0,
+            "parser_version": PARSER_VERSION,
+        }
+
+
+# Singleton instance
+resume_parse_cache = ResumeParseCache(maxsize=settings.resume_parse_cache_size)
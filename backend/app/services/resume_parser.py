@@ -1,108 +1,27 @@
 """
 Resume Parser Service using Gemini for intelligent OCR and data extraction.
-Converts PDF resumes to images and extracts structured data with LLM.
+Sends the PDF text layer (page images for scanned pages) and extracts
+structured data with LLM.
 """
 import io
+import os
 import json
 import base64
-from typing import List, Optional
+import time
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 from pydantic import BaseModel, Field
 import fitz  # PyMuPDF
 
 from ..config import get_settings
+from .cpu_pool import cpu_pool
+from .gemini_pool import gemini_pool, get_genai_client, is_quota_error, GeminiCapacityError
 
-settings = get_settings()
-
-# ============================================================================
-# Multi-API Key Rotation for Gemini (handles quota limits)
-# ============================================================================
-
-class GeminiClientPool:
-    """
-    Pool of Gemini clients with automatic rotation on quota errors.
-    Ensures resume parsing succeeds even if one API key hits its limit.
-    """
-    def __init__(self):
-        self._clients = []
-        self._current_index = 0
-        self._initialized = False
-        self._failed_keys = set()  # Track keys that hit quota
-
-    def _initialize(self):
-        """Initialize all Gemini clients from available API keys."""
-        if self._initialized:
-            return
-
-        api_keys = settings.get_gemini_api_keys()
-        if not api_keys:
-            print("WARNING: No GEMINI_API_KEY(s) set - resume parsing disabled")
-            self._initialized = True
-            return
-
-        try:
-            from google import genai
-            for i, key in enumerate(api_keys):
-                try:
-                    client = genai.Client(api_key=key)
-                    self._clients.append({"client": client, "key_index": i})
-                    print(f"✅ Gemini client {i+1}/{len(api_keys)} initialized")
-                except Exception as e:
-                    print(f"WARNING: Failed to init Gemini client {i+1}: {e}")
-        except ImportError:
-            print("WARNING: google-genai package not installed")
-
-        self._initialized = True
-        print(f"Gemini client pool: {len(self._clients)} clients available")
-
-    def get_client(self):
-        """Get the current Gemini client."""
-        self._initialize()
-        if not self._clients:
-            return None
-        return self._clients[self._current_index]["client"]
-
-    def rotate_on_quota_error(self) -> bool:
-        """
-        Rotate to next client when current hits quota.
-        Returns True if rotation successful, False if all keys exhausted.
-        """
-        if len(self._clients) <= 1:
-            return False
-
-        self._failed_keys.add(self._current_index)
-
-        # Find next working key
-        for _ in range(len(self._clients)):
-            self._current_index = (self._current_index + 1) % len(self._clients)
-            if self._current_index not in self._failed_keys:
-                print(f"🔄 Rotated to Gemini API key {self._current_index + 1}")
-                return True
-
-        print("⚠️ All Gemini API keys exhausted")
-        return False
-
-    def reset_failed_keys(self):
-        """Reset failed keys (call periodically or on new day)."""
-        self._failed_keys.clear()
-
-    @property
-    def available_clients_count(self) -> int:
-        """Number of clients that haven't failed."""
-        self._initialize()
-        return len(self._clients) - len(self._failed_keys)
-
-
-# Global client pool
-_gemini_pool = GeminiClientPool()
-
-def get_genai_client():
-    """Get the current Gemini client from the pool."""
-    return _gemini_pool.get_client()
-
-def rotate_gemini_client() -> bool:
-    """Rotate to next Gemini client on quota error."""
-    return _gemini_pool.rotate_on_quota_error()
+logger = logging.getLogger(__name__)
 
+settings = get_settings()
 
 # ============================================================================
 # Pydantic Schemas for Validated Output
@@ -1288,37 +1207,287 @@ FINAL INSTRUCTIONS
 NOW PARSE THE FOLLOWING RESUME:
 """
 
+# Precedes the extracted text of born-digital pages
+TEXT_LAYER_PREAMBLE = """
+The resume below was extracted from the PDF's text layer (reading order,
+one section per page). Any pages attached as images afterwards are scanned
+pages of the same resume - read them as well.
+
+"""
+
+# Bump when normalize_gemini_output / ParsedResume change shape
+PARSE_SCHEMA_VERSION = 1
+
+# Identifies how a cached parse result was produced (prompt + model + schema)
+PARSER_VERSION = hashlib.sha256(
+    f"{settings.gemini_model}|{PARSE_SCHEMA_VERSION}|{RESUME_PARSER_PROMPT}|{TEXT_LAYER_PREAMBLE}".encode()
+).hexdigest()[:32]
+
 
 # ============================================================================
 # Core Functions
 # ============================================================================
 
-def pdf_to_images(pdf_bytes: bytes, dpi: int = 150) -> List[bytes]:
+# Never shrink a page below this share of its target size to fit the memory
+# budget - text becomes unreadable for the model; stop rendering instead
+MIN_BUDGET_SCALE = 0.5
+
+_IMAGE_MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+
+@dataclass
+class RenderedPage:
+    """One encoded page image ready to send to Gemini."""
+    page_num: int
+    data: bytes
+    mime_type: str
+    dpi: int
+
+
+def _encode_pixmap(pix, image_format: str, quality: int) -> bytes:
+    """Encode a pixmap as JPEG (default), WebP (via Pillow) or PNG."""
+    if image_format == "png":
+        return pix.tobytes("png")
+    if image_format == "webp":
+        from PIL import Image
+        mode = "L" if pix.n == 1 else "RGB"
+        image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=quality)
+        return buffer.getvalue()
+    return pix.tobytes("jpeg", jpg_quality=quality)
+
+
+def iter_page_images(
+    pdf_document,
+    pages: Optional[List[int]] = None,
+    *,
+    target_px: Optional[int] = None,
+    max_dpi: Optional[int] = None,
+    grayscale: Optional[bool] = None,
+    image_format: Optional[str] = None,
+    quality: Optional[int] = None,
+    memory_budget: Optional[int] = None,
+) -> Iterator[RenderedPage]:
     """
-    Convert PDF to list of PNG images using PyMuPDF (no poppler dependency).
-    
+    Render pages of an open fitz document one at a time (streaming).
+
+    Only one pixmap is alive at a time and it is dropped as soon as it is
+    encoded. DPI adapts to the page size so the long edge is about target_px
+    (never above max_dpi). The raw pixmap plus all encoded pages yielded so
+    far stay within memory_budget: DPI is lowered to fit, and rendering stops
+    once a page would have to shrink below MIN_BUDGET_SCALE.
+    """
+    target_px = target_px or settings.resume_raster_target_px
+    max_dpi = max_dpi or settings.resume_raster_max_dpi
+    grayscale = settings.resume_raster_grayscale if grayscale is None else grayscale
+    image_format = (image_format or settings.resume_raster_format).lower()
+    if image_format not in _IMAGE_MIME_TYPES:
+        image_format = "jpeg"
+    quality = quality or settings.resume_raster_quality
+    memory_budget = memory_budget or settings.resume_raster_memory_budget_bytes
+
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    channels = 1 if grayscale else 3
+    used = 0
+
+    for page_num in (range(len(pdf_document)) if pages is None else pages):
+        page = pdf_document[page_num]
+        width, height = page.rect.width, page.rect.height
+        if width <= 0 or height <= 0:
+            continue
+
+        # Adaptive DPI: fixed pixel size on the long edge, whatever the page size
+        dpi = min(max_dpi, target_px * 72.0 / max(width, height))
+        raw_bytes = (width * dpi / 72.0) * (height * dpi / 72.0) * channels
+        available = memory_budget - used
+        if raw_bytes > available:
+            scale = (max(available, 0) / raw_bytes) ** 0.5
+            if scale < MIN_BUDGET_SCALE:
+                logger.warning(f"Raster memory budget reached, skipping pages from {page_num + 1}")
+                return
+            dpi *= scale
+
+        zoom = dpi / 72.0
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False)
+        data = _encode_pixmap(pix, image_format, quality)
+        del pix
+
+        used += len(data)
+        yield RenderedPage(page_num=page_num, data=data, mime_type=_IMAGE_MIME_TYPES[image_format], dpi=round(dpi))
+
+
+def pdf_to_images(pdf_bytes: bytes, pages: Optional[List[int]] = None) -> List[bytes]:
+    """
+    Convert PDF pages to encoded images using PyMuPDF (no poppler dependency).
+
     Args:
         pdf_bytes: Raw PDF file bytes
-        dpi: Resolution for conversion (default 150 for good quality without huge size)
-    
+        pages: Zero-based page numbers to render (default: all pages)
+
     Returns:
-        List of PNG image bytes, one per page
+        List of image bytes (format per settings.resume_raster_format)
     """
-    images = []
     pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-    
-    # Scale factor for DPI (default PDF is 72 DPI)
-    zoom = dpi / 72.0
-    matrix = fitz.Matrix(zoom, zoom)
-    
-    for page_num in range(len(pdf_document)):
-        page = pdf_document[page_num]
-        pix = page.get_pixmap(matrix=matrix)
-        img_bytes = pix.tobytes("png")
-        images.append(img_bytes)
-    
-    pdf_document.close()
-    return images
+    try:
+        return [rendered.data for rendered in iter_page_images(pdf_document, pages)]
+    finally:
+        pdf_document.close()
+
+
+# ============================================================================
+# Text-Layer-First Extraction
+# ============================================================================
+
+# Pages with less extractable text than this are treated as scanned
+MIN_PAGE_TEXT_CHARS = 200
+# Share of readable characters below which the text layer is garbage
+# (broken font encodings extract as symbols / replacement characters)
+MIN_READABLE_RATIO = 0.85
+_READABLE_PUNCTUATION = set(".,;:!?()[]-/@+&%'\"#|*•·–—_~$€£")
+
+
+@dataclass
+class ExtractionPlan:
+    """How a PDF is sent to Gemini: text layer, page images, or both."""
+    route: str  # "text", "mixed" or "vision"
+    page_count: int
+    page_texts: Dict[int, str] = field(default_factory=dict)  # page number -> text layer
+    image_pages: List[int] = field(default_factory=list)  # pages sent as images
+    skipped_pages: int = 0  # pages beyond settings.resume_max_pages
+
+    @property
+    def text_chars(self) -> int:
+        return sum(len(text) for text in self.page_texts.values())
+
+
+def _page_text_usable(text: str) -> bool:
+    """True if a page's text layer is long and clean enough to send as text."""
+    if len(text) < MIN_PAGE_TEXT_CHARS:
+        return False
+    readable = sum(1 for ch in text if ch.isalnum() or ch.isspace() or ch in _READABLE_PUNCTUATION)
+    return readable / len(text) >= MIN_READABLE_RATIO
+
+
+def extract_page_text(page) -> str:
+    """Text layer of a page in reading order (text blocks sorted top-left)."""
+    blocks = page.get_text("blocks", sort=True)
+    # Block tuple: (x0, y0, x1, y1, text, block_no, block_type); type 1 = image
+    return "\n\n".join(block[4].strip() for block in blocks if block[6] == 0 and block[4].strip())
+
+
+def _plan_document(pdf_document, max_pages: int) -> ExtractionPlan:
+    page_texts = {}
+    image_pages = []
+    page_count = len(pdf_document)
+    for page_num in range(min(page_count, max_pages)):
+        text = extract_page_text(pdf_document[page_num])
+        if _page_text_usable(text):
+            page_texts[page_num] = text
+        else:
+            image_pages.append(page_num)
+
+    if not image_pages:
+        route = "text"
+    elif not page_texts:
+        route = "vision"
+    else:
+        route = "mixed"
+    return ExtractionPlan(
+        route=route,
+        page_count=page_count,
+        page_texts=page_texts,
+        image_pages=image_pages,
+        skipped_pages=max(page_count - max_pages, 0),
+    )
+
+
+def plan_extraction(pdf_bytes: bytes, max_pages: Optional[int] = None) -> ExtractionPlan:
+    """
+    Decide per page whether the text layer is usable (born-digital) or the
+    page must be rasterized (scanned / image-only / broken encoding).
+    Pages after max_pages (settings.resume_max_pages) are ignored.
+    """
+    pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return _plan_document(pdf_document, max_pages or settings.resume_max_pages)
+    finally:
+        pdf_document.close()
+
+
+def prepare_extraction(pdf_bytes: bytes) -> Tuple[ExtractionPlan, List[RenderedPage]]:
+    """Plan and rasterize the image pages with a single open document."""
+    pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        plan = _plan_document(pdf_document, settings.resume_max_pages)
+        images = list(iter_page_images(pdf_document, plan.image_pages)) if plan.image_pages else []
+        return plan, images
+    finally:
+        pdf_document.close()
+
+
+# Gemini bills roughly this many tokens per attached image
+TOKENS_PER_IMAGE = 258
+
+
+def estimate_prompt_tokens(plan: ExtractionPlan, images: List[RenderedPage]) -> int:
+    """Rough input token count (~4 chars per token) for rate limiting."""
+    text_chars = len(RESUME_PARSER_PROMPT) + (len(TEXT_LAYER_PREAMBLE) + plan.text_chars if plan.page_texts else 0)
+    return text_chars // 4 + TOKENS_PER_IMAGE * len(images)
+
+
+def warm_up_worker() -> int:
+    """Cpu pool warm-up: importing this module loads PyMuPDF in the worker."""
+    fitz.open().close()
+    return os.getpid()
+
+
+def format_text_layer(plan: ExtractionPlan) -> str:
+    """Compact text prompt part for the text-layer pages."""
+    pages = [f"--- Page {page_num + 1} ---\n{text}" for page_num, text in sorted(plan.page_texts.items())]
+    return TEXT_LAYER_PREAMBLE + "\n\n".join(pages)
+
+
+class ExtractionStats:
+    """Per-route counters so token and latency savings can be measured."""
+
+    ROUTES = ("text", "mixed", "vision")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self._routes = {
+            route: {"documents": 0, "pages": 0, "image_pages": 0, "text_chars": 0,
+                    "prompt_tokens": 0, "total_ms": 0.0}
+            for route in self.ROUTES
+        }
+
+    def record(self, plan: ExtractionPlan, elapsed_ms: float, prompt_tokens: Optional[int]) -> None:
+        route = self._routes[plan.route]
+        route["documents"] += 1
+        route["pages"] += plan.page_count
+        route["image_pages"] += len(plan.image_pages)
+        route["text_chars"] += plan.text_chars
+        route["prompt_tokens"] += prompt_tokens or 0
+        route["total_ms"] += elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for name, route in self._routes.items():
+            documents = route["documents"]
+            result[name] = {
+                "documents": documents,
+                "pages": route["pages"],
+                "image_pages": route["image_pages"],
+                "avg_prompt_tokens": round(route["prompt_tokens"] / documents) if documents else 0,
+                "avg_ms": round(route["total_ms"] / documents, 2) if documents else 0.0,
+            }
+        return result
+
+
+# Singleton instance
+extraction_stats = ExtractionStats()
 
 
 def _safe_get(obj, *keys, default=None):
@@ -1509,56 +1678,204 @@ def normalize_gemini_output(data: dict) -> dict:
     return result
 
 
-async def parse_resume_with_gemini(pdf_bytes: bytes) -> ParsedResume:
+# ============================================================================
+# Streaming Response Parsing
+# ============================================================================
+
+# Top-level output keys normalize_gemini_output reads; completing one of
+# these publishes a new partial result
+SURFACED_SECTIONS = {
+    "personal_info", "professional_summary", "years_of_experience", "career_metrics",
+    "current_role", "current_company", "education", "work_experience", "projects",
+    "skills", "certifications", "publications", "awards", "languages", "coding_profiles",
+}
+
+# Called with (completed section names, ParsedResume built from them)
+SectionCallback = Callable[[List[str], ParsedResume], Awaitable[None]]
+
+
+class StreamingSectionParser:
     """
-    Parse resume PDF using Gemini vision model.
+    Incremental parser for the top-level JSON object Gemini streams back.
+
+    Tracks nesting depth and string state across chunks and decodes each
+    top-level value the moment it is closed, so completed sections are
+    available mid-stream and survive a truncated response intact.
+    """
+
+    def __init__(self):
+        self.sections: Dict[str, Any] = {}
+        self.complete = False  # Closing brace of the top-level object seen
+        self.text = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[str]:
+        """Consume a chunk; return the section names it completed."""
+        self.text += chunk
+        text = self.text
+        completed = []
+        i = self._pos
+        while i < len(text) and not self.complete:
+            ch = text[i]
+            if not self._started:
+                # Skip markdown fences / preamble before the object
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None and self._key_start is not None:
+                        self._key = json.loads(text[self._key_start:i + 1])
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = i
+            elif ch == ":" and self._depth == 1 and self._value_start is None:
+                self._value_start = i + 1
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_value(text[:i], completed)
+                    self.complete = True
+            elif ch == "," and self._depth == 1:
+                self._finish_value(text[:i], completed)
+            i += 1
+        self._pos = i
+        return completed
+
+    def _finish_value(self, text: str, completed: List[str]) -> None:
+        if self._key is not None and self._value_start is not None:
+            try:
+                self.sections[self._key] = json.loads(text[self._value_start:])
+                completed.append(self._key)
+            except json.JSONDecodeError:
+                pass
+        self._key_start = self._key = self._value_start = None
+
+
+def normalize_sections(sections: Dict[str, Any]) -> ParsedResume:
+    """ParsedResume from (possibly partial) top-level sections. Runs in the CPU pool."""
+    return ParsedResume(**normalize_gemini_output(sections))
+
+
+async def parse_resume_with_gemini(pdf_bytes: bytes, on_section: Optional[SectionCallback] = None) -> ParsedResume:
+    """
+    Parse resume PDF using Gemini (text layer first, vision for scanned pages).
 
     Args:
         pdf_bytes: Raw PDF file bytes
+        on_section: Awaited with the partial result each time a profile
+            section finishes streaming (settings.gemini_stream_responses)
 
     Returns:
         ParsedResume object with all extracted data
 
-    Note: Uses asyncio.to_thread for CPU-bound PDF conversion and
-          async Gemini API for true concurrent processing.
+    Note: Uses the CPU worker pool for PDF work and response repair, and
+          async Gemini API for true concurrent processing. Pages with a
+          usable text layer are sent as text; only the rest are rasterized.
     """
-    import asyncio
+    started = time.perf_counter()
 
-    # Convert PDF to images in thread pool (CPU-bound, don't block event loop)
-    images = await asyncio.to_thread(pdf_to_images, pdf_bytes)
+    # Route and rasterize in a worker process (CPU-bound, don't block event loop):
+    # born-digital pages go as text, only scanned pages are rendered
+    plan, images = await cpu_pool.run(prepare_extraction, pdf_bytes)
 
-    if not images:
+    if not plan.page_count:
         raise ValueError("Could not extract any pages from PDF")
 
     # Prepare content parts for Gemini
-    client = get_genai_client()
-    if not client:
+    if not gemini_pool.configured:
         raise ValueError("Gemini API not configured. Please set GEMINI_API_KEY.")
 
     from google import genai
     contents = [RESUME_PARSER_PROMPT]
 
-    for img_bytes in images:
+    if plan.page_texts:
+        contents.append(format_text_layer(plan))
+
+    for rendered in images:
         # Add image as Part
         contents.append(
             genai.types.Part.from_bytes(
-                data=img_bytes,
-                mime_type="image/png"
+                data=rendered.data,
+                mime_type=rendered.mime_type
             )
         )
 
-    # Generate response using ASYNC API (non-blocking, allows concurrent parsing)
-    response = await client.aio.models.generate_content(
-        model=settings.gemini_model,
-        contents=contents,
-        config=genai.types.GenerateContentConfig(
-            temperature=0.1,
-            max_output_tokens=32768,
-        )
+    config = genai.types.GenerateContentConfig(
+        temperature=0.1,
+        max_output_tokens=32768,
+    )
+    parser = None
+    usage = None
+
+    # Generate response using ASYNC API on the least-loaded key with budget
+    async with gemini_pool.acquire(estimate_prompt_tokens(plan, images)) as lease:
+        if settings.gemini_stream_responses:
+            # Decode sections as they stream in instead of waiting for ~32k tokens
+            parser = StreamingSectionParser()
+            stream = await lease.client.aio.models.generate_content_stream(
+                model=settings.gemini_model,
+                contents=contents,
+                config=config
+            )
+            async for chunk in stream:
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                completed = parser.feed(chunk.text or "")
+                if on_section and SURFACED_SECTIONS.intersection(completed):
+                    partial = await cpu_pool.run(normalize_sections, dict(parser.sections))
+                    await on_section(list(parser.sections), partial)
+            response_text = parser.text
+        else:
+            response = await lease.client.aio.models.generate_content(
+                model=settings.gemini_model,
+                contents=contents,
+                config=config
+            )
+            usage = getattr(response, "usage_metadata", None)
+            response_text = response.text
+        lease.record_tokens(getattr(usage, "total_token_count", None))
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    extraction_stats.record(plan, elapsed_ms, prompt_tokens)
+    logger.info(
+        f"Resume extraction route={plan.route} pages={plan.page_count} "
+        f"image_pages={len(plan.image_pages)} skipped_pages={plan.skipped_pages} "
+        f"image_bytes={sum(len(rendered.data) for rendered in images)} text_chars={plan.text_chars} "
+        f"prompt_tokens={prompt_tokens} ms={elapsed_ms:.0f}"
     )
     
-    # Extract and parse JSON
-    response_text = response.text.strip()
+    if parser is not None and parser.sections:
+        if not parser.complete:
+            logger.warning(f"Gemini response truncated, keeping {len(parser.sections)} complete sections")
+        return await cpu_pool.run(normalize_sections, parser.sections)
+
+    # Repair/normalize in a worker process (CPU-bound, don't block event loop)
+    return await cpu_pool.run(parse_gemini_response, response_text)
+
+
+def parse_gemini_response(response_text: str) -> ParsedResume:
+    """
+    Turn Gemini's raw response text into a ParsedResume.
+
+    Top-level and picklable: runs in the CPU worker pool.
+    """
+    response_text = response_text.strip()
     
     # Clean up response if it has markdown code blocks
     if response_text.startswith("```json"):
@@ -1593,33 +1910,34 @@ async def parse_resume_with_gemini(pdf_bytes: bytes) -> ParsedResume:
         return ParsedResume()
 
 
+# Common aliases mapping (normalized spelling -> canonical skill name)
+SKILL_ALIASES = {
+    "js": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "cpp": "c++",
+    "c#": "csharp",
+    "node": "nodejs",
+    "node.js": "nodejs",
+    "react.js": "react",
+    "vue.js": "vue",
+    "angular.js": "angular",
+    "mongo": "mongodb",
+    "postgres": "postgresql",
+    "k8s": "kubernetes",
+    "tf": "terraform",
+    "aws lambda": "aws",
+    "gcp": "google cloud",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "dl": "deep learning",
+}
+
+
 def normalize_skill_name(skill_name: str) -> str:
     """Normalize skill name for consistent storage and matching."""
-    # Common aliases mapping
-    aliases = {
-        "js": "javascript",
-        "ts": "typescript",
-        "py": "python",
-        "cpp": "c++",
-        "c#": "csharp",
-        "node": "nodejs",
-        "node.js": "nodejs",
-        "react.js": "react",
-        "vue.js": "vue",
-        "angular.js": "angular",
-        "mongo": "mongodb",
-        "postgres": "postgresql",
-        "k8s": "kubernetes",
-        "tf": "terraform",
-        "aws lambda": "aws",
-        "gcp": "google cloud",
-        "ml": "machine learning",
-        "ai": "artificial intelligence",
-        "dl": "deep learning",
-    }
-    
     normalized = skill_name.lower().strip()
-    return aliases.get(normalized, normalized)
+    return SKILL_ALIASES.get(normalized, normalized)
 
 
 def deduplicate_skills(skills: List[SkillEntry]) -> List[SkillEntry]:
@@ -1712,36 +2030,56 @@ def repair_truncated_json(raw_response: str) -> dict | None:
         return None
 
 
-async def parse_resume_safe(pdf_bytes: bytes, max_retries: int = 3) -> tuple[ParsedResume | None, str | None]:
+async def parse_resume_safe(
+    pdf_bytes: bytes,
+    max_retries: int = 3,
+    on_section: Optional[SectionCallback] = None
+) -> tuple[ParsedResume | None, str | None]:
     """
     Parse resume with robust error handling, retries, and API key rotation.
 
     Features:
+    - Identical PDFs (same SHA-256, same prompt/model) are served from the
+      parse cache without calling Gemini
     - Retries on transient failures with exponential backoff
-    - Automatically rotates to backup API key on quota errors (429)
+    - Requests are spread over all keys by the Gemini key pool; a key that
+      hits quota (429) cools down and the parse retries on another key.
+      Keys rejoin after their cooldown, so these free retries are capped at
+      one per configured key; further quota errors count as attempts
     - Ensures parsing succeeds if ANY configured API key has quota
 
     Args:
         pdf_bytes: PDF file content
         max_retries: Number of retry attempts per API key
+        on_section: Receives partial results while the response streams
 
     Returns:
         Tuple of (ParsedResume or None, error_message or None)
     """
     import asyncio
+    from .resume_parse_cache import resume_parse_cache, resume_content_hash
+
+    content_hash = resume_content_hash(pdf_bytes)
+    cached = await resume_parse_cache.get(content_hash)
+    if cached is not None:
+        print(f"Resume parse cache hit ({content_hash[:12]})")
+        return (cached, None)
 
     last_error = None
     total_attempts = 0
-    max_total_attempts = max_retries * max(_gemini_pool.available_clients_count, 1)
+    max_total_attempts = max_retries * max(gemini_pool.available_clients_count, 1)
+    quota_retries = 0
+    max_quota_retries = max(gemini_pool.key_count, 1)
 
     while total_attempts < max_total_attempts:
         attempt_in_key = total_attempts % max_retries
         total_attempts += 1
 
         try:
-            result = await parse_resume_with_gemini(pdf_bytes)
+            result = await parse_resume_with_gemini(pdf_bytes, on_section)
             # Check if we got meaningful data
             if result.professional_summary or result.work_experience or result.education:
+                await resume_parse_cache.put(content_hash, result)
                 return (result, None)
             # Empty result - might be parsing issue, retry
             if total_attempts < max_total_attempts:
@@ -1756,20 +2094,27 @@ async def parse_resume_safe(pdf_bytes: bytes, max_retries: int = 3) -> tuple[Par
                 await asyncio.sleep(2 ** attempt_in_key)
                 continue
 
+        except GeminiCapacityError as e:
+            # Every key stayed saturated for the whole queue timeout
+            last_error = str(e)
+            break
+
         except Exception as e:
             error_str = str(e)
             last_error = f"Parsing error: {error_str}"
             print(f"Attempt {total_attempts}/{max_total_attempts}: {last_error}")
 
-            # Check if it's a quota error - try rotating to another API key
-            if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower():
-                print(f"🔴 Quota exceeded on current API key")
-                if rotate_gemini_client():
-                    print(f"🟢 Switched to backup API key, retrying...")
-                    # Don't count this as a failed attempt - we have a fresh key
-                    total_attempts -= 1
-                    await asyncio.sleep(1)  # Brief pause before retry
-                    continue
+            # Quota error - the pool already put that key into cooldown
+            if is_quota_error(e):
+                if gemini_pool.available_clients_count:
+                    if quota_retries < max_quota_retries:
+                        quota_retries += 1
+                        print(f"🟢 Retrying on another API key ({quota_retries}/{max_quota_retries})...")
+                        # Don't count this as a failed attempt - we have a fresh key
+                        total_attempts -= 1
+                        await asyncio.sleep(1)  # Brief pause before retry
+                        continue
+                    # Out of free quota retries - fall through and count it
                 else:
                     # All keys exhausted
                     last_error = "All Gemini API keys have hit quota limits. Please try again later or add more API keys."
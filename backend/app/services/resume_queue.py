@@ -0,0 +1,326 @@
+"""
+Resume Parsing Job Queue
+
+Resume parsing used to be fired with asyncio.create_task() holding the whole
+PDF in memory: no concurrency limit, no backpressure, and a worker restart
+silently lost the task. The resume_parsing_jobs table is now the queue:
+
+- upload/retry endpoints insert or reset a PENDING job that references the
+  stored resume_url (never the PDF bytes) and call notify()
+- each gunicorn worker runs resume_parse_concurrency worker coroutines that
+  claim the oldest PENDING job with SELECT ... FOR UPDATE SKIP LOCKED, so
+  workers never pick the same job and at most N PDFs are in memory per worker
+- while a job is parsed its worker refreshes heartbeat_at every
+  resume_job_stale_seconds / 3, so a slow parse (large PDF, Gemini queue
+  wait, quota retries) is never mistaken for a dead one
+- PROCESSING jobs whose heartbeat is older than resume_job_stale_seconds
+  (their worker died) are re-queued at startup and periodically; jobs that
+  keep dying are failed after MAX_JOB_ATTEMPTS (counted in interrupt_count,
+  separate from the user's retry_count). The queue is the only place that
+  recovers jobs
+- every claim gets a new claim_token; the handler writes through
+  update_claimed(), which only touches the row while that claim holds, so a
+  worker that was presumed dead can never overwrite the job's new run
+- in-flight jobs are put back to PENDING on graceful shutdown
+"""
+import asyncio
+import secrets
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import func, select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models.resume_job import ResumeParsingJob, ResumeParsingStatus
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# A job whose worker died this many times is failed instead of re-queued
+MAX_JOB_ATTEMPTS = 3
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    user_id: int
+    filename: str
+    resume_url: str
+    claim_token: Optional[str] = None
+
+
+JobHandler = Callable[[ClaimedJob], Awaitable[None]]
+
+
+class ResumeParsingQueue:
+    """DB-backed job queue with a fixed number of worker coroutines per process."""
+
+    def __init__(self, concurrency: int = 2, poll_interval: float = 5.0, stale_after_seconds: int = 300):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after_seconds = stale_after_seconds
+        self._handler: Optional[JobHandler] = None
+        self._session_factory = None
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._in_flight: Set[int] = set()
+
+        # Metrics
+        self.claimed = 0
+        self.completed = 0
+        self.failed = 0
+        self.recovered = 0
+        self.total_job_ms = 0.0
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from ..database import async_session_maker
+            return async_session_maker()
+        return self._session_factory()
+
+    # ---------- Producer side ----------
+
+    def notify(self) -> None:
+        """Wake idle workers in this process (a job was just queued)."""
+        self._wakeup.set()
+
+    # ---------- Queue operations ----------
+
+    async def claim_next(self, db: AsyncSession) -> Optional[ClaimedJob]:
+        """Atomically move the oldest PENDING job to PROCESSING and return it."""
+        result = await db.execute(
+            select(ResumeParsingJob.id)
+            .where(ResumeParsingJob.status == ResumeParsingStatus.PENDING)
+            .where(ResumeParsingJob.resume_url.isnot(None))
+            .order_by(ResumeParsingJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job_id = result.scalar_one_or_none()
+        if job_id is None:
+            await db.rollback()
+            return None
+
+        # Conditional UPDATE also guards backends without SKIP LOCKED (SQLite)
+        now = datetime.now(timezone.utc)
+        claim_token = secrets.token_hex(16)
+        claimed = await db.execute(
+            update(ResumeParsingJob)
+            .where(ResumeParsingJob.id == job_id)
+            .where(ResumeParsingJob.status == ResumeParsingStatus.PENDING)
+            .values(
+                status=ResumeParsingStatus.PROCESSING,
+                claim_token=claim_token,
+                started_at=now,
+                heartbeat_at=now,
+                completed_at=None,
+                error_message=None,
+                partial_result=None,
+            )
+            .returning(ResumeParsingJob.user_id, ResumeParsingJob.resume_filename, ResumeParsingJob.resume_url)
+        )
+        row = claimed.first()
+        await db.commit()
+        if row is None:
+            return None
+        self.claimed += 1
+        return ClaimedJob(
+            id=job_id, user_id=row.user_id, filename=row.resume_filename,
+            resume_url=row.resume_url, claim_token=claim_token,
+        )
+
+    async def update_claimed(self, db: AsyncSession, job: ClaimedJob, **values: Any) -> bool:
+        """
+        Write to a job while this worker's claim still holds (also refreshes
+        the heartbeat) and commit. Returns False, writing nothing, once the
+        job was re-queued as stale and possibly claimed by another worker.
+        """
+        result = await db.execute(
+            update(ResumeParsingJob)
+            .where(ResumeParsingJob.id == job.id)
+            .where(ResumeParsingJob.claim_token == job.claim_token)
+            .where(ResumeParsingJob.status == ResumeParsingStatus.PROCESSING)
+            .values(heartbeat_at=datetime.now(timezone.utc), **values)
+        )
+        await db.commit()
+        if not result.rowcount:
+            logger.warning(f"Resume job {job.id} is no longer claimed by this worker; update dropped")
+            return False
+        return True
+
+    async def recover_stale(self, db: AsyncSession) -> int:
+        """Re-queue PROCESSING jobs whose worker died; fail repeat offenders."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.stale_after_seconds)
+        # Jobs claimed before heartbeats existed only have started_at
+        last_seen = func.coalesce(ResumeParsingJob.heartbeat_at, ResumeParsingJob.started_at)
+        stale = (
+            (ResumeParsingJob.status == ResumeParsingStatus.PROCESSING)
+            & or_(last_seen.is_(None), last_seen < cutoff)
+        )
+        if self._in_flight:
+            stale = stale & ResumeParsingJob.id.notin_(self._in_flight)
+
+        await db.execute(
+            update(ResumeParsingJob)
+            .where(stale)
+            .where(func.coalesce(ResumeParsingJob.interrupt_count, 0) >= MAX_JOB_ATTEMPTS)
+            .values(
+                status=ResumeParsingStatus.FAILED,
+                claim_token=None,
+                error_message="Parsing was interrupted repeatedly. Please upload again.",
+                completed_at=datetime.now(timezone.utc),
+            )
+        )
+        result = await db.execute(
+            update(ResumeParsingJob)
+            .where(stale)
+            .values(
+                status=ResumeParsingStatus.PENDING,
+                claim_token=None,
+                started_at=None,
+                heartbeat_at=None,
+                interrupt_count=func.coalesce(ResumeParsingJob.interrupt_count, 0) + 1,
+            )
+        )
+        await db.commit()
+        recovered = result.rowcount or 0
+        if recovered:
+            self.recovered += recovered
+            logger.warning(f"Re-queued {recovered} stale resume parsing jobs")
+            self.notify()
+        return recovered
+
+    async def _requeue_in_flight(self) -> None:
+        if not self._in_flight:
+            return
+        job_ids, self._in_flight = list(self._in_flight), set()
+        async with self._sessions() as db:
+            await db.execute(
+                update(ResumeParsingJob)
+                .where(ResumeParsingJob.id.in_(job_ids))
+                .where(ResumeParsingJob.status == ResumeParsingStatus.PROCESSING)
+                .values(status=ResumeParsingStatus.PENDING, claim_token=None, started_at=None, heartbeat_at=None)
+            )
+            await db.commit()
+        logger.info(f"Re-queued {len(job_ids)} in-flight resume jobs on shutdown")
+
+    # ---------- Workers ----------
+
+    def start(self, handler: JobHandler, session_factory=None) -> None:
+        """Start the worker coroutines (call from app lifespan)."""
+        if self._workers:
+            return
+        self._handler = handler
+        self._session_factory = session_factory
+        self._stopping = False
+        self._workers = [asyncio.create_task(self._maintenance())]
+        self._workers += [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        """Stop the workers and hand unfinished jobs back to the queue."""
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._workers = []
+        try:
+            await self._requeue_in_flight()
+        except Exception as e:
+            logger.error(f"Could not re-queue in-flight resume jobs: {e}")
+
+    async def _maintenance(self) -> None:
+        # Startup recovery, then periodic sweeps for jobs of crashed workers
+        while not self._stopping:
+            try:
+                async with self._sessions() as db:
+                    await self.recover_stale(db)
+            except Exception as e:
+                logger.error(f"Resume job recovery failed: {e}")
+            await asyncio.sleep(self.stale_after_seconds)
+
+    async def _worker(self, index: int) -> None:
+        while not self._stopping:
+            try:
+                async with self._sessions() as db:
+                    job = await self.claim_next(db)
+            except Exception as e:
+                logger.error(f"Resume worker {index} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            self._in_flight.add(job.id)
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            started = time.perf_counter()
+            try:
+                await self._handler(job)
+                self.completed += 1
+            except Exception as e:
+                # Handler records its own failures; this is a last resort
+                self.failed += 1
+                logger.error(f"Resume job {job.id} crashed: {e}")
+                await self._mark_failed(job, str(e))
+            finally:
+                heartbeat.cancel()
+                self._in_flight.discard(job.id)
+                self.total_job_ms += (time.perf_counter() - started) * 1000
+
+    async def _heartbeat(self, job: ClaimedJob) -> None:
+        while True:
+            await asyncio.sleep(self.stale_after_seconds / 3)
+            try:
+                async with self._sessions() as db:
+                    if not await self.update_claimed(db, job):
+                        return
+            except Exception as e:
+                logger.warning(f"Resume job {job.id} heartbeat failed: {e}")
+
+    async def _mark_failed(self, job: ClaimedJob, error: str) -> None:
+        try:
+            async with self._sessions() as db:
+                await self.update_claimed(
+                    db, job,
+                    status=ResumeParsingStatus.FAILED,
+                    error_message=error[:500],
+                    completed_at=datetime.now(timezone.utc),
+                )
+        except Exception as e:
+            logger.error(f"Could not mark resume job {job.id} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "workers": max(len(self._workers) - 1, 0),
+            "concurrency": self.concurrency,
+            "active": len(self._in_flight),
+            "claimed": self.claimed,
+            "completed": self.completed,
+            "failed": self.failed,
+            "recovered": self.recovered,
+            "avg_job_ms": round(self.total_job_ms / finished, 2) if finished else 0.0,
+        }
+
+
+# Singleton instance
+resume_queue = ResumeParsingQueue(
+    concurrency=settings.resume_parse_concurrency,
+    poll_interval=settings.resume_queue_poll_seconds,
+    stale_after_seconds=settings.resume_job_stale_seconds,
+)
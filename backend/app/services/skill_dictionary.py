@@ -0,0 +1,183 @@
+"""
+Skill Dictionary
+
+Applying a parsed resume used to resolve skills one at a time: a SELECT per
+skill plus an INSERT and flush for every unseen one (up to 50 round trips).
+The dictionary keeps normalized skill name -> Skill.id for the whole table
+in process, so resolving a resume's skills costs a constant number of
+queries:
+
+- known names are answered from memory
+- unseen names are created with ONE bulk INSERT ... ON CONFLICT DO NOTHING
+  RETURNING; names another worker created concurrently are picked up with
+  one SELECT
+- the map is loaded at startup and reloaded after a TTL so other workers'
+  skills show up; ids that turn out to be stale (rolled-back inserts,
+  deleted skills) are dropped and re-resolved
+"""
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..database import dialect_insert
+from ..models.profile import Skill, SkillCategory
+from .resume_parser import normalize_skill_name
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Skill.name / Skill.display_name column length
+MAX_SKILL_NAME_LENGTH = 100
+
+
+def _normalize(name: Optional[str]) -> Tuple[str, str]:
+    """(normalized name, display name) as stored in the skills table."""
+    display = (name or "").strip()[:MAX_SKILL_NAME_LENGTH]
+    return normalize_skill_name(display)[:MAX_SKILL_NAME_LENGTH], display
+
+
+def _skill_category(category: Optional[str]) -> SkillCategory:
+    try:
+        return SkillCategory(category)
+    except ValueError:
+        return SkillCategory.OTHER
+
+
+class SkillDictionary:
+    """In-process normalized name -> Skill.id map with bulk creation."""
+
+    def __init__(self, ttl_seconds: int = 300):
+        self.ttl_seconds = ttl_seconds
+        self._ids: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+
+        # Metrics
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+
+    async def load(self, db: AsyncSession) -> None:
+        """(Re)load the whole skills table."""
+        result = await db.execute(select(Skill.name, Skill.id))
+        self._ids = {name: skill_id for name, skill_id in result.all()}
+        self._loaded_at = time.monotonic()
+        self.loads += 1
+
+    async def warm_up(self) -> None:
+        """Load the dictionary at startup (call from app lifespan)."""
+        from ..database import async_session_maker
+        try:
+            async with async_session_maker() as db:
+                await self.load(db)
+            logger.info(f"Skill dictionary loaded with {len(self._ids)} skills")
+        except Exception as e:
+            logger.warning(f"Skill dictionary warm-up failed: {e}")
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    async def resolve(
+        self,
+        db: AsyncSession,
+        entries: Iterable[Tuple[str, Optional[str]]]
+    ) -> Dict[str, int]:
+        """
+        Map (display name, category) entries to Skill ids, creating unseen
+        skills in bulk. Returns {normalized name: skill id}.
+        """
+        if self._stale():
+            await self.load(db)
+
+        wanted: Dict[str, Tuple[str, Optional[str]]] = {}
+        for name, category in entries:
+            normalized, display = _normalize(name)
+            if normalized and normalized not in wanted:
+                wanted[normalized] = (display, category)
+
+        missing = [name for name in wanted if name not in self._ids]
+        self.hits += len(wanted) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            await self._create(db, {name: wanted[name] for name in missing})
+
+        return {name: self._ids[name] for name in wanted if name in self._ids}
+
+    async def lookup(self, db: AsyncSession, names: Iterable[str]) -> Dict[str, int]:
+        """Map names to ids of existing skills only ({normalized name: skill id})."""
+        if self._stale():
+            await self.load(db)
+        found = {}
+        for name in names:
+            normalized, _ = _normalize(name)
+            if normalized in self._ids:
+                found[normalized] = self._ids[normalized]
+        return found
+
+    async def _create(self, db: AsyncSession, new: Dict[str, Tuple[str, Optional[str]]]) -> None:
+        insert = dialect_insert(db)
+        result = await db.execute(
+            insert(Skill)
+            .values([
+                {"name": name, "display_name": display, "category": _skill_category(category), "aliases": []}
+                for name, (display, category) in new.items()
+            ])
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(Skill.name, Skill.id)
+        )
+        created = result.all()
+        self.created += len(created)
+        self._ids.update({name: skill_id for name, skill_id in created})
+
+        # Created by another worker since our last load
+        conflicted = [name for name in new if name not in self._ids]
+        if conflicted:
+            result = await db.execute(select(Skill.name, Skill.id).where(Skill.name.in_(conflicted)))
+            self._ids.update({name: skill_id for name, skill_id in result.all()})
+
+    async def get_skills(
+        self,
+        db: AsyncSession,
+        entries: List[Tuple[str, Optional[str]]]
+    ) -> Dict[str, Skill]:
+        """Resolve entries and load their Skill rows in one query ({normalized name: Skill})."""
+        ids = await self.resolve(db, entries)
+        result = await db.execute(select(Skill).where(Skill.id.in_(ids.values())))
+        skills = {skill.id: skill for skill in result.scalars().all()}
+
+        stale = [name for name, skill_id in ids.items() if skill_id not in skills]
+        if stale:
+            # Cached ids whose rows are gone (e.g. a rolled-back insert) - re-resolve
+            for name in stale:
+                self._ids.pop(name, None)
+            ids.update(await self.resolve(db, [entry for entry in entries if _normalize(entry[0])[0] in stale]))
+            result = await db.execute(select(Skill).where(Skill.id.in_([ids[name] for name in stale if name in ids])))
+            skills.update({skill.id: skill for skill in result.scalars().all()})
+
+        return {name: skills[skill_id] for name, skill_id in ids.items() if skill_id in skills}
+
+    def invalidate(self) -> None:
+        """Force a reload on next use (call after skills are deleted/renamed)."""
+        self._loaded_at = None
+
+    def clear(self) -> None:
+        self._ids = {}
+        self._loaded_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._ids),
+            "loads": self.loads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+        }
+
+
+# Singleton instance
+skill_dictionary = SkillDictionary(ttl_seconds=settings.skill_dictionary_ttl_seconds)
@@ -2,15 +2,275 @@
 Supabase Storage Upload Service
 
 Properly handles file uploads to Supabase Storage with Content-Length header.
+
+Uploads are streamed instead of read into memory first: the body is sent
+in upload_stream_chunk_bytes pieces from the temp file / UploadFile (or any
+async iterator) with an explicit Content-Length, over the shared pooled
+HTTP client. Peak memory per upload is one chunk, not the file size.
+
+Files of supabase_resumable_threshold_bytes or more use Supabase's TUS
+endpoint (/storage/v1/upload/resumable): the object is created first, then
+sent in supabase_tus_chunk_bytes PATCH requests (Supabase requires 6MB).
+A failed PATCH asks the server for its offset (HEAD) and resumes from
+there instead of restarting the whole upload.
 """
+import asyncio
+import base64
 import os
+from urllib.parse import urljoin
 from dotenv import load_dotenv
 load_dotenv()  # Load .env file
 
+import aiofiles
 import httpx
-from io import BytesIO
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, Optional, Tuple
 from fastapi import UploadFile, HTTPException
 
+from ..config import get_settings
+from .http_client import get_http_client
+
+settings = get_settings()
+
+TUS_VERSION = "1.0.0"
+
+# Reads a byte range of the source as a stream: (offset, length) -> chunks
+RangeReader = Callable[[int, int], AsyncIterator[bytes]]
+
+
+class SupabaseUploadError(Exception):
+    """Supabase rejected the upload or could not be reached."""
+
+
+def _supabase_config() -> Tuple[Optional[str], Optional[str]]:
+    return os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+
+def _auth_headers(supabase_key: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {supabase_key}", "apikey": supabase_key}
+
+
+def _public_url(supabase_url: str, bucket: str, file_path: str) -> str:
+    return f"{supabase_url}/storage/v1/object/public/{bucket}/{file_path}"
+
+
+async def iter_file_chunks(
+    path: str,
+    offset: int = 0,
+    length: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Stream length bytes (default: to the end) of a file starting at offset."""
+    chunk_size = chunk_size or settings.upload_stream_chunk_bytes
+    remaining = length
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(offset)
+        while remaining is None or remaining > 0:
+            chunk = await f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def _upload_file_reader(file: UploadFile) -> RangeReader:
+    async def read_range(offset: int, length: int) -> AsyncIterator[bytes]:
+        await file.seek(offset)
+        remaining = length
+        while remaining > 0:
+            chunk = await file.read(min(settings.upload_stream_chunk_bytes, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    return read_range
+
+
+async def _post_object(
+    supabase_url: str,
+    supabase_key: str,
+    bucket: str,
+    file_path: str,
+    body,
+    size: int,
+    content_type: str,
+    upsert: bool,
+    timeout: float
+) -> str:
+    """One POST to the object endpoint; body is bytes or an async iterator."""
+    headers = {
+        **_auth_headers(supabase_key),
+        "Content-Type": content_type,
+        # Explicit length: httpx streams the iterator without chunked encoding
+        "Content-Length": str(size),
+    }
+    if upsert:
+        headers["x-upsert"] = "true"  # Overwrite if exists
+
+    response = await get_http_client().post(
+        f"{supabase_url}/storage/v1/object/{bucket}/{file_path}",
+        headers=headers,
+        content=body,
+        timeout=timeout
+    )
+    if response.status_code not in [200, 201]:
+        error_detail = response.text[:500] if response.text else "Unknown error"
+        raise SupabaseUploadError(f"Supabase upload failed ({response.status_code}): {error_detail}")
+    return _public_url(supabase_url, bucket, file_path)
+
+
+async def _upload_resumable(
+    supabase_url: str,
+    supabase_key: str,
+    bucket: str,
+    file_path: str,
+    read_range: RangeReader,
+    size: int,
+    content_type: str,
+    upsert: bool
+) -> str:
+    """TUS upload in supabase_tus_chunk_bytes PATCHes, resuming after failures."""
+    client = get_http_client()
+    headers = {**_auth_headers(supabase_key), "Tus-Resumable": TUS_VERSION}
+    metadata = {"bucketName": bucket, "objectName": file_path, "contentType": content_type}
+
+    endpoint = f"{supabase_url}/storage/v1/upload/resumable"
+    created = await client.post(
+        endpoint,
+        headers={
+            **headers,
+            "Upload-Length": str(size),
+            "Upload-Metadata": ",".join(
+                f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in metadata.items()
+            ),
+            "x-upsert": "true" if upsert else "false",
+        },
+        timeout=30.0
+    )
+    if created.status_code != 201 or "location" not in created.headers:
+        error_detail = created.text[:500] if created.text else "Unknown error"
+        raise SupabaseUploadError(f"Supabase upload failed ({created.status_code}): {error_detail}")
+    location = urljoin(endpoint, created.headers["location"])
+
+    offset = 0
+    failures = 0
+    while offset < size:
+        length = min(settings.supabase_tus_chunk_bytes, size - offset)
+        try:
+            response = await client.patch(
+                location,
+                headers={
+                    **headers,
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                    "Content-Length": str(length),
+                },
+                content=read_range(offset, length),
+                timeout=120.0
+            )
+            if response.status_code == 204:
+                offset = int(response.headers["upload-offset"])
+                failures = 0
+                continue
+            error = f"({response.status_code}) {response.text[:500]}"
+        except httpx.HTTPError as e:
+            error = str(e) or type(e).__name__
+
+        failures += 1
+        if failures > settings.supabase_tus_max_retries:
+            raise SupabaseUploadError(f"Resumable upload failed at byte {offset}: {error}")
+        await asyncio.sleep(min(2 ** failures, 10))
+        # Resume from whatever the server has kept
+        try:
+            head = await client.head(location, headers=headers, timeout=30.0)
+            if head.status_code == 200:
+                offset = int(head.headers["upload-offset"])
+        except httpx.HTTPError:
+            pass
+
+    return _public_url(supabase_url, bucket, file_path)
+
+
+async def _upload_ranges(
+    bucket: str,
+    file_path: str,
+    read_range: RangeReader,
+    size: int,
+    content_type: str,
+    upsert: bool
+) -> str:
+    supabase_url, supabase_key = _supabase_config()
+    if not supabase_url or not supabase_key:
+        raise SupabaseUploadError("Supabase configuration missing")
+
+    if size >= settings.supabase_resumable_threshold_bytes:
+        return await _upload_resumable(
+            supabase_url, supabase_key, bucket, file_path, read_range, size, content_type, upsert
+        )
+    return await _post_object(
+        supabase_url, supabase_key, bucket, file_path,
+        read_range(0, size), size, content_type, upsert, timeout=120.0
+    )
+
+
+async def upload_file_to_supabase(
+    path: str,
+    bucket: str,
+    file_path: str,
+    content_type: str = "application/octet-stream",
+    upsert: bool = False
+) -> str:
+    """
+    Stream a local file to Supabase Storage (resumable above the threshold).
+
+    Returns:
+        Public URL of the uploaded file
+
+    Raises:
+        SupabaseUploadError on upload failure
+    """
+    size = os.path.getsize(path)
+
+    def read_range(offset: int, length: int) -> AsyncIterator[bytes]:
+        return iter_file_chunks(path, offset, length)
+
+    try:
+        return await _upload_ranges(bucket, file_path, read_range, size, content_type, upsert)
+    except httpx.TimeoutException:
+        raise SupabaseUploadError("Upload timeout")
+    except httpx.HTTPError as e:
+        raise SupabaseUploadError(f"Upload failed: {str(e)}")
+
+
+async def upload_stream_to_supabase(
+    stream: AsyncIterable[bytes],
+    size: int,
+    bucket: str,
+    file_path: str,
+    content_type: str = "application/octet-stream",
+    upsert: bool = False
+) -> str:
+    """
+    Stream an async iterator of exactly size bytes to Supabase Storage.
+
+    A one-shot stream cannot be rewound, so this is always a single POST.
+
+    Raises:
+        SupabaseUploadError on upload failure
+    """
+    supabase_url, supabase_key = _supabase_config()
+    if not supabase_url or not supabase_key:
+        raise SupabaseUploadError("Supabase configuration missing")
+    try:
+        return await _post_object(
+            supabase_url, supabase_key, bucket, file_path,
+            stream, size, content_type, upsert, timeout=120.0
+        )
+    except httpx.TimeoutException:
+        raise SupabaseUploadError("Upload timeout")
+    except httpx.HTTPError as e:
+        raise SupabaseUploadError(f"Upload failed: {str(e)}")
+
 
 async def upload_to_supabase(
     file: UploadFile,
@@ -20,67 +280,50 @@ async def upload_to_supabase(
 ) -> str:
     """
     Upload a file to Supabase Storage with proper Content-Length header.
-    
+    The upload is streamed from the spooled UploadFile, never read whole.
+
     Args:
         file: FastAPI UploadFile object
         bucket: Supabase storage bucket name
         file_path: Path within the bucket (e.g., "html/abc123_file.html")
         content_type: Optional content type override
-    
+
     Returns:
         Public URL of the uploaded file
-    
+
     Raises:
         HTTPException on upload failure
     """
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    
+    supabase_url, supabase_key = _supabase_config()
+
     if not supabase_url or not supabase_key:
         raise HTTPException(status_code=500, detail="Supabase configuration missing")
-    
-    # Read entire file into memory (we need Content-Length)
+
+    # Size from the spooled file (we need Content-Length)
     try:
-        content = await file.read()
-        file_size = len(content)
+        file_size = file.size
+        if file_size is None:
+            file.file.seek(0, os.SEEK_END)
+            file_size = file.file.tell()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
-    
+
     # Check file size limit (100MB)
     if file_size > 100 * 1024 * 1024:
         raise HTTPException(status_code=413, detail="File too large (max 100MB)")
-    
+
     # Determine content type
     if content_type is None:
         content_type = file.content_type or "application/octet-stream"
-    
-    # Upload with explicit Content-Length
+
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                f"{supabase_url}/storage/v1/object/{bucket}/{file_path}",
-                headers={
-                    "Authorization": f"Bearer {supabase_key}",
-                    "apikey": supabase_key,
-                    "Content-Type": content_type,
-                    "Content-Length": str(file_size),
-                },
-                content=content
-            )
-            
-            if response.status_code in [200, 201]:
-                public_url = f"{supabase_url}/storage/v1/object/public/{bucket}/{file_path}"
-                return public_url
-            else:
-                error_detail = response.text[:500] if response.text else "Unknown error"
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Supabase upload failed ({response.status_code}): {error_detail}"
-                )
+        return await _upload_ranges(
+            bucket, file_path, _upload_file_reader(file), file_size, content_type, upsert=False
+        )
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Upload timeout - file too large or slow connection")
-    except HTTPException:
-        raise
+    except SupabaseUploadError as e:
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
@@ -93,57 +336,36 @@ async def upload_bytes_to_supabase(
 ) -> str:
     """
     Upload raw bytes to Supabase Storage.
-    
+
     Args:
         content: Raw bytes to upload
         bucket: Supabase storage bucket name
         file_path: Path within the bucket (e.g., "resumes/user_123_resume.pdf")
         content_type: MIME type of the file
-    
+
     Returns:
         Public URL of the uploaded file
-    
+
     Raises:
         Exception on upload failure
     """
-    import os
-    import httpx
-    
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    
+    supabase_url, supabase_key = _supabase_config()
+
     if not supabase_url or not supabase_key:
         raise Exception("Supabase configuration missing")
-    
+
     file_size = len(content)
-    
+
     # Check file size limit (50MB for resumes)
     if file_size > 50 * 1024 * 1024:
         raise Exception("File too large (max 50MB)")
-    
+
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{supabase_url}/storage/v1/object/{bucket}/{file_path}",
-                headers={
-                    "Authorization": f"Bearer {supabase_key}",
-                    "apikey": supabase_key,
-                    "Content-Type": content_type,
-                    "Content-Length": str(file_size),
-                    "x-upsert": "true",  # Overwrite if exists
-                },
-                content=content
-            )
-            
-            if response.status_code in [200, 201]:
-                public_url = f"{supabase_url}/storage/v1/object/public/{bucket}/{file_path}"
-                return public_url
-            else:
-                error_detail = response.text[:500] if response.text else "Unknown error"
-                raise Exception(f"Supabase upload failed ({response.status_code}): {error_detail}")
+        return await _post_object(
+            supabase_url, supabase_key, bucket, file_path,
+            content, file_size, content_type, upsert=True, timeout=60.0
+        )
     except httpx.TimeoutException:
         raise Exception("Upload timeout")
     except Exception as e:
         raise Exception(f"Upload failed: {str(e)}")
-
-
@@ -0,0 +1,159 @@
+"""
+Test Session Payload Cache
+
+A published test's question list is identical for every candidate, so the
+serialized payload (correct answers stripped) is built once and served from
+a bounded in-process LRU. An optional shared backend (Redis, via
+settings.redis_url) lets gunicorn workers share freshly built payloads.
+
+Admin endpoints that change a test, its questions or its division documents
+call invalidate()/invalidate_all(). Entries in other workers' local caches
+expire after test_session_cache_ttl_seconds.
+"""
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+KEY_PREFIX = "test_session:"
+
+
+class _RedisBackend:
+    """Thin async wrapper over redis.asyncio storing JSON payloads."""
+
+    def __init__(self, url: str, ttl_seconds: int):
+        import redis.asyncio as redis  # Optional dependency
+        self._client = redis.from_url(url)
+        self._ttl = ttl_seconds
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._client.get(key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, payload: Dict[str, Any]) -> None:
+        await self._client.set(key, json.dumps(payload, default=str), ex=self._ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        async for key in self._client.scan_iter(match=f"{prefix}*"):
+            await self._client.delete(key)
+
+
+def _create_shared_backend(ttl_seconds: int):
+    """Create the shared backend if configured and available, else None."""
+    if not settings.redis_url:
+        return None
+    try:
+        return _RedisBackend(settings.redis_url, ttl_seconds)
+    except ImportError:
+        logger.warning("redis package not installed - test session cache is per-worker only")
+    except Exception as e:
+        logger.warning(f"Shared test session cache unavailable: {e}")
+    return None
+
+
+class TestSessionCache:
+    """
+    Bounded LRU of per-test session payloads with an optional shared tier.
+
+    Payloads are plain JSON-serializable dicts. Shared-backend errors are
+    logged and treated as misses so the database stays the source of truth.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl_seconds: int = 300, shared=None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._shared = shared
+        self._entries: "OrderedDict[int, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, test_id: int) -> Optional[Dict[str, Any]]:
+        """Return the cached payload for a test, or None on a miss."""
+        entry = self._entries.get(test_id)
+        if entry is not None:
+            expires_at, payload = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(test_id)
+                self.hits += 1
+                return payload
+            del self._entries[test_id]
+
+        if self._shared is not None:
+            try:
+                payload = await self._shared.get(f"{KEY_PREFIX}{test_id}")
+            except Exception as e:
+                logger.warning(f"Shared cache read failed for test {test_id}: {e}")
+                payload = None
+            if payload is not None:
+                self._store_local(test_id, payload)
+                self.hits += 1
+                return payload
+
+        self.misses += 1
+        return None
+
+    async def set(self, test_id: int, payload: Dict[str, Any]) -> None:
+        """Store a freshly built payload locally and in the shared tier."""
+        self._store_local(test_id, payload)
+        if self._shared is not None:
+            try:
+                await self._shared.set(f"{KEY_PREFIX}{test_id}", payload)
+            except Exception as e:
+                logger.warning(f"Shared cache write failed for test {test_id}: {e}")
+
+    async def invalidate(self, test_id: int) -> None:
+        """Drop a single test's payload (test settings or its questions changed)."""
+        self._entries.pop(test_id, None)
+        if self._shared is not None:
+            try:
+                await self._shared.delete(f"{KEY_PREFIX}{test_id}")
+            except Exception as e:
+                logger.warning(f"Shared cache invalidation failed for test {test_id}: {e}")
+
+    async def invalidate_all(self) -> None:
+        """Drop every payload (shared questions or division documents changed)."""
+        self._entries.clear()
+        if self._shared is not None:
+            try:
+                await self._shared.delete_prefix(KEY_PREFIX)
+            except Exception as e:
+                logger.warning(f"Shared cache flush failed: {e}")
+
+    def clear_local(self) -> None:
+        """Reset the in-process tier and counters (used by tests)."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_backend": self._shared is not None,
+        }
+
+    def _store_local(self, test_id: int, payload: Dict[str, Any]) -> None:
+        self._entries[test_id] = (time.monotonic() + self.ttl_seconds, payload)
+        self._entries.move_to_end(test_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+# Singleton instance
+test_session_cache = TestSessionCache(
+    maxsize=settings.test_session_cache_size,
+    ttl_seconds=settings.test_session_cache_ttl_seconds,
+    shared=_create_shared_backend(settings.test_session_cache_ttl_seconds),
+)
@@ -1,12 +1,16 @@
 """
-Vector Search Service using Pinecone for semantic candidate matching.
-Stores profile embeddings and enables intelligent HR search.
+Vector Search Service for semantic candidate matching.
+Stores profile embeddings (Pinecone or the local index, see vector_store)
+and enables intelligent HR search.
 """
+import hashlib
 import json
 from typing import List, Optional, Dict, Any
-from pinecone import Pinecone, ServerlessSpec
 
 from ..config import get_settings
+from .vector_store import VectorBackend, create_vector_backend
+from .embedding_cache import embedding_cache, embedding_text_hash
+from .blocking_io import blocking_io
 
 settings = get_settings()
 
@@ -31,51 +35,101 @@ def get_genai_client():
         return None
 
 
+def profile_vector_metadata(
+    skills: List[str],
+    years_exp: Optional[float] = None,
+    current_role: Optional[str] = None,
+    current_company: Optional[str] = None
+) -> Dict[str, Any]:
+    """Filterable metadata stored with a profile vector."""
+    return {
+        "skills": sorted({s.lower() for s in skills}),  # Normalize for filtering (stable for hashing)
+        "years_exp": years_exp or 0,
+        "current_role": current_role or "",
+        "current_company": current_company or ""
+    }
+
+
+def profile_index_hash(summary: str, metadata: Dict[str, Any]) -> str:
+    """Hash of everything stored for a profile vector (skip unchanged profiles on re-index)."""
+    payload = json.dumps(
+        {"model": settings.embedding_model, "summary": summary, "metadata": metadata},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 class VectorSearchService:
     """
     Handles vector storage and semantic search for candidate profiles.
-    Uses Gemini for embeddings and Pinecone for vector storage.
+    Uses Gemini for embeddings and a VectorBackend (Pinecone or the local
+    in-process index, see vector_store) for storage.
     """
     
-    def __init__(self):
-        self.pc = None
-        self.index = None
+    def __init__(self, backend: Optional[VectorBackend] = None):
+        self.backend = backend
+        self._available = False
         self._initialized = False
     
+    @property
+    def available(self) -> bool:
+        return self._available
+    
     async def initialize(self):
-        """Initialize Pinecone connection (lazy initialization)."""
+        """Create and connect the configured backend (lazy initialization)."""
         if self._initialized:
             return
-        
-        if not settings.pinecone_api_key:
-            print("Warning: Pinecone API key not configured. Vector search will be disabled.")
-            return
+        self._initialized = True
         
         try:
-            self.pc = Pinecone(api_key=settings.pinecone_api_key)
-            
-            # Check if index exists, create if not
-            existing_indexes = [idx.name for idx in self.pc.list_indexes()]
-            
-            if settings.pinecone_index_name not in existing_indexes:
-                print(f"Creating Pinecone index: {settings.pinecone_index_name}")
-                self.pc.create_index(
-                    name=settings.pinecone_index_name,
-                    dimension=768,  # Gemini embedding dimension
-                    metric="cosine",
-                    spec=ServerlessSpec(
-                        cloud="aws",
-                        region=settings.pinecone_environment
-                    )
-                )
-            
-            self.index = self.pc.Index(settings.pinecone_index_name)
-            self._initialized = True
-            print(f"✅ Pinecone initialized: {settings.pinecone_index_name}")
-            
+            if self.backend is None:
+                self.backend = create_vector_backend()
+            self._available = await self.backend.initialize()
         except Exception as e:
-            print(f"Failed to initialize Pinecone: {e}")
-            self._initialized = False
+            print(f"Failed to initialize vector backend: {e}")
+            self._available = False
+    
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many texts: cached embeddings are reused and the rest are sent
+        to Gemini in batches of embedding_batch_size texts per call.
+
+        Quota errors propagate; other failures give zero vectors.
+        """
+        model = settings.embedding_model
+        hashes = [embedding_text_hash(text) for text in texts]
+        embeddings = await embedding_cache.get_many(model, hashes)
+
+        # Unique texts not in the cache, in first-seen order
+        pending = {h: text for h, text in zip(hashes, texts) if h not in embeddings}
+        if pending:
+            client = get_genai_client()
+            if not client:
+                # Zero vectors if client unavailable (not cached)
+                return [embeddings.get(h) or [0.0] * settings.vector_dimension for h in hashes]
+
+            pending_hashes = list(pending)
+            for start in range(0, len(pending_hashes), settings.embedding_batch_size):
+                batch = pending_hashes[start:start + settings.embedding_batch_size]
+                try:
+                    result = await blocking_io.run(
+                        "genai",
+                        client.models.embed_content,
+                        model=model,
+                        contents=[pending[h] for h in batch],
+                    )
+                except Exception as e:
+                    error_str = str(e)
+                    if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower():
+                        raise
+                    print(f"Embedding error: {e}")
+                    continue
+                embedding_cache.record_api_call(len(batch))
+                fresh = {h: list(e.values) for h, e in zip(batch, result.embeddings)}
+                await embedding_cache.put_many(model, fresh)
+                embeddings.update(fresh)
+
+        return [embeddings.get(h) or [0.0] * settings.vector_dimension for h in hashes]
     
     async def get_embedding(self, text: str) -> List[float]:
         """
@@ -87,15 +141,8 @@ class VectorSearchService:
         Returns:
             List of floats representing the embedding vector
         """
-        client = get_genai_client()
-        if not client:
-            return [0.0] * 768  # Return zero vector if client unavailable
         try:
-            result = client.models.embed_content(
-                model="embedding-001",
-                contents=text,
-            )
-            return result.embeddings[0].values
+            return (await self.get_embeddings([text]))[0]
         except Exception as e:
             error_str = str(e)
             # Gracefully handle quota errors - don't fail the whole operation
@@ -103,28 +150,21 @@ class VectorSearchService:
                 print(f"Embedding quota exceeded, skipping indexing: {error_str[:100]}")
                 raise  # Re-raise to skip indexing
             print(f"Embedding error: {e}")
-            return [0.0] * 768
+            return [0.0] * settings.vector_dimension
     
     async def get_query_embedding(self, text: str) -> List[float]:
         """
         Generate embedding for search query using Gemini.
         """
-        client = get_genai_client()
-        if not client:
-            return [0.0] * 768  # Return zero vector if client unavailable
         try:
-            result = client.models.embed_content(
-                model="embedding-001",
-                contents=text,
-            )
-            return result.embeddings[0].values
+            return (await self.get_embeddings([text]))[0]
         except Exception as e:
             error_str = str(e)
             if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
                 print(f"Query embedding quota exceeded: {error_str[:100]}")
             else:
                 print(f"Query embedding error: {e}")
-            return [0.0] * 768
+            return [0.0] * settings.vector_dimension
     
     async def index_profile(
         self,
@@ -151,8 +191,8 @@ class VectorSearchService:
         """
         await self.initialize()
         
-        if not self.index:
-            print("Pinecone not available, skipping indexing")
+        if not self._available:
+            print("Vector search not available, skipping indexing")
             return None
         
         try:
@@ -165,23 +205,10 @@ class VectorSearchService:
                 return None
 
             # Prepare metadata for filtering
-            metadata = {
-                "skills": [s.lower() for s in skills],  # Normalize for filtering
-                "years_exp": years_exp or 0,
-                "current_role": current_role or "",
-                "current_company": current_company or ""
-            }
+            metadata = profile_vector_metadata(skills, years_exp, current_role, current_company)
 
             vector_id = f"profile_{profile_id}"
-
-            # Upsert to Pinecone
-            self.index.upsert(
-                vectors=[{
-                    "id": vector_id,
-                    "values": embedding,
-                    "metadata": metadata
-                }]
-            )
+            await self.backend.upsert(vector_id, embedding, metadata)
 
             print(f"✅ Indexed profile {profile_id} with {len(skills)} skills")
             return vector_id
@@ -195,6 +222,29 @@ class VectorSearchService:
                 print(f"Failed to index profile: {e}")
             return None
     
+    async def index_profiles(self, profiles: List[Dict[str, Any]]) -> Dict[int, str]:
+        """
+        Index many profiles: summaries are embedded in batches and vectors
+        upserted vector_upsert_batch_size at a time. Each profile dict has
+        profile_id, summary and metadata (see profile_vector_metadata).
+
+        Returns {profile_id: vector_id} for the profiles indexed; profiles
+        whose embedding was unavailable are left out. Quota errors propagate.
+        """
+        await self.initialize()
+        if not self._available or not profiles:
+            return {}
+
+        embeddings = await self.get_embeddings([profile["summary"] for profile in profiles])
+        items = [
+            (f"profile_{profile['profile_id']}", embedding, profile["metadata"])
+            for profile, embedding in zip(profiles, embeddings)
+            if any(embedding)
+        ]
+        for start in range(0, len(items), settings.vector_upsert_batch_size):
+            await self.backend.upsert_many(items[start:start + settings.vector_upsert_batch_size])
+        return {int(vector_id.replace("profile_", "")): vector_id for vector_id, _, _ in items}
+    
     async def search_candidates(
         self,
         query: str,
@@ -216,45 +266,33 @@ class VectorSearchService:
         """
         await self.initialize()
         
-        if not self.index:
-            print("Pinecone not available, returning empty results")
+        if not self._available:
+            print("Vector search not available, returning empty results")
             return []
         
         try:
             # Generate query embedding
             query_embedding = await self.get_query_embedding(query)
             
-            # Build filter
-            filter_dict = {}
-            
-            if skill_filters:
-                # Match any of the required skills
-                filter_dict["skills"] = {"$in": [s.lower() for s in skill_filters]}
-            
-            if min_experience is not None and min_experience > 0:
-                filter_dict["years_exp"] = {"$gte": min_experience}
-            
-            # Execute search
-            results = self.index.query(
-                vector=query_embedding,
+            matches = await self.backend.query(
+                query_embedding,
                 top_k=top_k,
-                filter=filter_dict if filter_dict else None,
-                include_metadata=True
+                skills=skill_filters,
+                min_years=min_experience
             )
             
             # Format results
-            candidates = []
-            for match in results.matches:
-                candidates.append({
+            return [
+                {
                     "profile_id": int(match.id.replace("profile_", "")),
                     "score": match.score,
                     "skills": match.metadata.get("skills", []),
                     "years_exp": match.metadata.get("years_exp"),
                     "current_role": match.metadata.get("current_role"),
                     "current_company": match.metadata.get("current_company")
-                })
-            
-            return candidates
+                }
+                for match in matches
+            ]
             
         except Exception as e:
             print(f"Search failed: {e}")
@@ -264,15 +302,20 @@ class VectorSearchService:
         """Delete a profile from the vector index."""
         await self.initialize()
         
-        if not self.index:
+        if not self._available:
             return False
         
         try:
-            self.index.delete(ids=[f"profile_{profile_id}"])
+            await self.backend.delete([f"profile_{profile_id}"])
             return True
         except Exception as e:
             print(f"Failed to delete profile from index: {e}")
             return False
+    
+    def stats(self) -> Dict[str, Any]:
+        if self.backend is None:
+            return {"backend": settings.vector_backend, "initialized": False}
+        return {**self.backend.stats(), "available": self._available}
 
 
 # Singleton instance
@@ -310,7 +353,9 @@ Now extract:"""
         return {"skills": [], "min_years": None, "role": None, "other_requirements": None}
     
     from google import genai
-    response = client.models.generate_content(
+    response = await blocking_io.run(
+        "genai",
+        client.models.generate_content,
         model=settings.gemini_model,
         contents=prompt,
         config=genai.types.GenerateContentConfig(
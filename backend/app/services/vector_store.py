@@ -0,0 +1,588 @@
+"""
+Vector Store Backends
+
+VectorSearchService used to talk to Pinecone directly with synchronous SDK
+calls inside async methods, so every upsert/query blocked the event loop and
+nothing could run without the hosted index. Storage now sits behind
+VectorBackend, selected with settings.vector_backend:
+
+- "pinecone": the hosted index; SDK calls run in the pinecone pool
+  (see blocking_io)
+- "local": in-process index, no outside service
+
+LOCAL BACKEND LAYOUT (settings.vector_index_dir, default data/vector_index):
+- vectors.f32   float32 matrix (capacity x dimension), memory-mapped; rows
+                are L2-normalized so cosine similarity is a dot product
+- index.json    slot -> vector id and metadata (skills, years_exp, role,
+                company); freed slots (id null) are reused
+
+- Queries pre-filter on metadata (any of the skills, years_exp >= minimum)
+  with a skill inverted index and a years array, then take the exact
+  cosine top-k of the remaining rows
+- Corpora of vector_ann_min_vectors or more get an IVF index (spherical
+  k-means centroids, vector_ann_probes lists searched per query). It lives
+  in memory only and is rebuilt when the corpus doubles. Filters that leave
+  fewer rows than that are still searched exactly.
+- Writes take a file lock, pick up other workers' writes, update the matrix
+  in place and atomically replace index.json. Each gunicorn worker reloads
+  when index.json changes (one stat per query).
+- Reads, writes and reloads run in worker threads, never on the event loop.
+  The in-process lock is only taken once the file lock is held, so queries
+  don't wait behind a writer that is waiting on another worker.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ..config import get_settings
+from .blocking_io import blocking_io
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Not under static/ - that directory is served publicly at /static
+DEFAULT_INDEX_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "vector_index"
+)
+
+INITIAL_CAPACITY = 1024
+
+# Ids per Pinecone fetch request
+PINECONE_FETCH_BATCH = 1000
+
+# k-means training sample per list and iterations for the IVF index
+ANN_TRAIN_POINTS_PER_LIST = 64
+ANN_KMEANS_ITERATIONS = 8
+
+
+# (vector id, values, metadata)
+VectorItem = Tuple[str, List[float], Dict[str, Any]]
+
+
+@dataclass
+class VectorMatch:
+    id: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class VectorBackend:
+    """Storage for profile vectors with metadata filtering."""
+
+    name = "base"
+
+    async def initialize(self) -> bool:
+        """Prepare the backend; False if it cannot be used."""
+        return True
+
+    async def upsert(self, vector_id: str, values: List[float], metadata: Dict[str, Any]) -> None:
+        await self.upsert_many([(vector_id, values, metadata)])
+
+    async def upsert_many(self, items: List[VectorItem]) -> None:
+        """Write a batch of vectors in one request."""
+        raise NotImplementedError
+
+    async def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        skills: Optional[List[str]] = None,
+        min_years: Optional[float] = None
+    ) -> List[VectorMatch]:
+        """Top-k by cosine similarity among vectors having any of `skills` and years_exp >= min_years."""
+        raise NotImplementedError
+
+    async def fetch(self, vector_ids: List[str]) -> Dict[str, List[float]]:
+        """Stored vectors by id (missing ids are left out)."""
+        raise NotImplementedError
+
+    async def delete(self, vector_ids: List[str]) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+# ============================================================================
+# Pinecone
+# ============================================================================
+
+class PineconeBackend(VectorBackend):
+    """Hosted Pinecone index; blocking SDK calls run in a worker thread."""
+
+    name = "pinecone"
+
+    def __init__(self, api_key: str, index_name: str, environment: str, dimension: int = 768):
+        self.api_key = api_key
+        self.index_name = index_name
+        self.environment = environment
+        self.dimension = dimension
+        self.index = None
+
+    def _connect(self):
+        from pinecone import Pinecone, ServerlessSpec
+
+        pc = Pinecone(api_key=self.api_key)
+
+        # Check if index exists, create if not
+        existing_indexes = [idx.name for idx in pc.list_indexes()]
+        if self.index_name not in existing_indexes:
+            print(f"Creating Pinecone index: {self.index_name}")
+            pc.create_index(
+                name=self.index_name,
+                dimension=self.dimension,
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region=self.environment)
+            )
+        return pc.Index(self.index_name)
+
+    async def initialize(self) -> bool:
+        if self.index is not None:
+            return True
+        if not self.api_key:
+            print("Warning: Pinecone API key not configured. Vector search will be disabled.")
+            return False
+        try:
+            self.index = await blocking_io.run("pinecone", self._connect)
+            print(f"✅ Pinecone initialized: {self.index_name}")
+            return True
+        except Exception as e:
+            print(f"Failed to initialize Pinecone: {e}")
+            return False
+
+    async def upsert_many(self, items: List[VectorItem]) -> None:
+        await blocking_io.run(
+            "pinecone",
+            self.index.upsert,
+            vectors=[
+                {"id": vector_id, "values": list(values), "metadata": metadata}
+                for vector_id, values, metadata in items
+            ]
+        )
+
+    async def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        skills: Optional[List[str]] = None,
+        min_years: Optional[float] = None
+    ) -> List[VectorMatch]:
+        filter_dict = {}
+        if skills:
+            # Match any of the required skills
+            filter_dict["skills"] = {"$in": [s.lower() for s in skills]}
+        if min_years is not None and min_years > 0:
+            filter_dict["years_exp"] = {"$gte": min_years}
+
+        results = await blocking_io.run(
+            "pinecone",
+            self.index.query,
+            vector=list(vector),
+            top_k=top_k,
+            filter=filter_dict or None,
+            include_metadata=True
+        )
+        return [VectorMatch(match.id, match.score, dict(match.metadata or {})) for match in results.matches]
+
+    async def fetch(self, vector_ids: List[str]) -> Dict[str, List[float]]:
+        vectors = {}
+        for start in range(0, len(vector_ids), PINECONE_FETCH_BATCH):
+            response = await blocking_io.run("pinecone", self.index.fetch, ids=vector_ids[start:start + PINECONE_FETCH_BATCH])
+            vectors.update({vector_id: list(vector.values) for vector_id, vector in response.vectors.items()})
+        return vectors
+
+    async def delete(self, vector_ids: List[str]) -> None:
+        await blocking_io.run("pinecone", self.index.delete, ids=vector_ids)
+
+
+# ============================================================================
+# Local (memory-mapped NumPy)
+# ============================================================================
+
+def _normalized(values: Iterable[float], dimension: int) -> Optional[np.ndarray]:
+    """float32 unit vector, or None for a zero vector."""
+    vector = np.asarray(values, dtype=np.float32)
+    if vector.shape != (dimension,):
+        raise ValueError(f"Expected a {dimension}-dimensional vector, got shape {vector.shape}")
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        return None
+    return vector / norm
+
+
+def _spherical_kmeans(data: np.ndarray, lists: int, iterations: int, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids for cosine IVF."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        norms = np.linalg.norm(sums, axis=1)
+        filled = norms > 0
+        # Empty lists keep their previous centroid
+        centroids[filled] = sums[filled] / norms[filled, None]
+    return centroids
+
+
+class LocalVectorBackend(VectorBackend):
+    """Exact (and optionally IVF) cosine search over a memory-mapped matrix."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        index_dir: str,
+        dimension: int = 768,
+        ann_min_vectors: int = 50_000,
+        ann_lists: int = 0,
+        ann_probes: int = 8,
+    ):
+        self.index_dir = index_dir
+        self.dimension = dimension
+        self.ann_min_vectors = ann_min_vectors
+        self.ann_lists = ann_lists
+        self.ann_probes = ann_probes
+
+        self._vectors_path = os.path.join(index_dir, "vectors.f32")
+        self._index_path = os.path.join(index_dir, "index.json")
+        self._lock_path = os.path.join(index_dir, "index.lock")
+        self._lock = threading.RLock()
+        self._loaded_mtime: Optional[int] = None
+        self._reset()
+
+        # Metrics
+        self.queries = 0
+        self.ann_queries = 0
+        self.reloads = 0
+        self.ann_builds = 0
+        self.total_query_ms = 0.0
+
+    def _reset(self) -> None:
+        self._vectors: Optional[np.memmap] = None
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._years = np.zeros(0, dtype=np.float32)
+        self._skill_rows: Dict[str, Set[int]] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._ann_built_for = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._slots)
+
+    # ---------- Storage ----------
+
+    def _capacity(self) -> int:
+        return 0 if self._vectors is None else self._vectors.shape[0]
+
+    def _map(self, capacity: int) -> None:
+        """(Re)map vectors.f32 with room for `capacity` rows."""
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        size = capacity * self.dimension * 4
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+        grow = capacity - len(self._alive)
+        if grow > 0:
+            self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+            self._years = np.concatenate([self._years, np.zeros(grow, dtype=np.float32)])
+            self._lists = np.concatenate([self._lists, np.full(grow, -1, dtype=np.int32)])
+
+    def _refresh(self) -> None:
+        """Load index.json if it changed since we last read or wrote it."""
+        try:
+            mtime = os.stat(self._index_path).st_mtime_ns
+        except FileNotFoundError:
+            if self._vectors is None:
+                os.makedirs(self.index_dir, exist_ok=True)
+                self._map(INITIAL_CAPACITY)
+            return
+        if mtime == self._loaded_mtime:
+            return
+
+        with open(self._index_path) as f:
+            data = json.load(f)
+        if data["dimension"] != self.dimension:
+            raise ValueError(f"Vector index at {self.index_dir} has dimension {data['dimension']}, expected {self.dimension}")
+
+        # Keep the trained IVF centroids; only the list assignment is redone
+        centroids, built_for = self._centroids, self._ann_built_for
+        self._reset()
+        self._ids = data["ids"]
+        self._metadata = data["metadata"]
+        self._map(max(INITIAL_CAPACITY, data["capacity"]))
+        for slot, vector_id in enumerate(self._ids):
+            if vector_id is None:
+                self._free.append(slot)
+            else:
+                self._index_slot(slot, vector_id, self._metadata[slot])
+        if centroids is not None:
+            self._centroids, self._ann_built_for = centroids, built_for
+            self._lists = self._assign_lists(centroids)
+        self._loaded_mtime = mtime
+        self.reloads += 1
+
+    def _save(self) -> None:
+        self._vectors.flush()
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "dimension": self.dimension,
+                "capacity": self._capacity(),
+                "ids": self._ids,
+                "metadata": self._metadata,
+            }, f)
+        os.replace(tmp_path, self._index_path)
+        self._loaded_mtime = os.stat(self._index_path).st_mtime_ns
+
+    @contextmanager
+    def _write_lock(self):
+        """
+        Serialize writers across threads and gunicorn workers. flock locks
+        belong to the open file, so threads of this worker queue on it too.
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self._lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with self._lock:
+                    self._refresh()
+                    yield
+                    self._save()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ---------- Metadata index ----------
+
+    def _index_slot(self, slot: int, vector_id: str, metadata: Dict[str, Any]) -> None:
+        self._slots[vector_id] = slot
+        self._alive[slot] = True
+        self._years[slot] = float(metadata.get("years_exp") or 0)
+        for skill in metadata.get("skills") or []:
+            self._skill_rows.setdefault(skill.lower(), set()).add(slot)
+        if self._centroids is not None:
+            self._lists[slot] = int(np.argmax(self._centroids @ self._vectors[slot]))
+
+    def _unindex_slot(self, slot: int) -> None:
+        for skill in (self._metadata[slot] or {}).get("skills") or []:
+            rows = self._skill_rows.get(skill.lower())
+            if rows:
+                rows.discard(slot)
+                if not rows:
+                    del self._skill_rows[skill.lower()]
+        self._alive[slot] = False
+        self._lists[slot] = -1
+
+    # ---------- Writes ----------
+
+    def _upsert_sync(self, items: List[Tuple[str, np.ndarray, Dict[str, Any]]]) -> None:
+        with self._write_lock():
+            for vector_id, vector, metadata in items:
+                slot = self._slots.get(vector_id)
+                if slot is not None:
+                    self._unindex_slot(slot)
+                elif self._free:
+                    slot = self._free.pop()
+                else:
+                    slot = len(self._ids)
+                    if slot >= self._capacity():
+                        self._map(self._capacity() * 2)
+                    self._ids.append(None)
+                    self._metadata.append(None)
+
+                self._vectors[slot] = vector
+                self._ids[slot] = vector_id
+                self._metadata[slot] = metadata
+                self._index_slot(slot, vector_id, metadata)
+
+    def _delete_sync(self, vector_ids: List[str]) -> None:
+        with self._write_lock():
+            for vector_id in vector_ids:
+                slot = self._slots.pop(vector_id, None)
+                if slot is None:
+                    continue
+                self._unindex_slot(slot)
+                self._ids[slot] = None
+                self._metadata[slot] = None
+                self._free.append(slot)
+
+    async def upsert_many(self, items: List[VectorItem]) -> None:
+        normalized = []
+        for vector_id, values, metadata in items:
+            vector = _normalized(values, self.dimension)
+            if vector is None:
+                raise ValueError(f"Cannot index a zero vector ({vector_id})")
+            normalized.append((vector_id, vector, metadata))
+        await asyncio.to_thread(self._upsert_sync, normalized)
+
+    async def delete(self, vector_ids: List[str]) -> None:
+        await asyncio.to_thread(self._delete_sync, vector_ids)
+
+    async def fetch(self, vector_ids: List[str]) -> Dict[str, List[float]]:
+        return await asyncio.to_thread(self._fetch_sync, vector_ids)
+
+    def _fetch_sync(self, vector_ids: List[str]) -> Dict[str, List[float]]:
+        with self._lock:
+            self._refresh()
+            found = [(vector_id, self._slots[vector_id]) for vector_id in vector_ids if vector_id in self._slots]
+            if not found:
+                return {}
+            rows = np.asarray(self._vectors[[slot for _, slot in found]])
+        return {vector_id: row.tolist() for (vector_id, _), row in zip(found, rows)}
+
+    # ---------- ANN ----------
+
+    def _ann_due(self) -> bool:
+        if not self.ann_min_vectors or self.size < self.ann_min_vectors:
+            return False
+        return self._centroids is None or self.size >= 2 * self._ann_built_for
+
+    def _assign_lists(self, centroids: np.ndarray) -> np.ndarray:
+        """Nearest centroid of every live row (-1 for free slots)."""
+        rows = np.flatnonzero(self._alive)
+        assignment = np.full(len(self._alive), -1, dtype=np.int32)
+        for start in range(0, len(rows), 8192):
+            chunk = rows[start:start + 8192]
+            assignment[chunk] = np.argmax(np.asarray(self._vectors[chunk]) @ centroids.T, axis=1)
+        return assignment
+
+    def _build_ann(self) -> None:
+        with self._lock:
+            self._refresh()
+            if not self._ann_due():
+                return
+            rows = np.flatnonzero(self._alive)
+            lists = self.ann_lists or max(1, int(np.sqrt(len(rows))))
+            lists = min(lists, len(rows))
+
+            rng = np.random.default_rng(0)
+            sample_size = min(len(rows), lists * ANN_TRAIN_POINTS_PER_LIST)
+            sample = np.asarray(self._vectors[np.sort(rng.choice(rows, sample_size, replace=False))])
+            centroids = _spherical_kmeans(sample, lists, ANN_KMEANS_ITERATIONS)
+
+            self._centroids = centroids
+            self._lists = self._assign_lists(centroids)
+            self._ann_built_for = len(rows)
+            self.ann_builds += 1
+            logger.info(f"Built IVF vector index: {len(rows)} vectors, {lists} lists")
+
+    # ---------- Queries ----------
+
+    def _filter(self, skills: Optional[List[str]], min_years: Optional[float]) -> np.ndarray:
+        rows = len(self._ids)
+        mask = self._alive[:rows].copy()
+        if skills:
+            skill_mask = np.zeros(rows, dtype=bool)
+            for skill in skills:
+                matched = self._skill_rows.get(skill.lower())
+                if matched:
+                    skill_mask[list(matched)] = True
+            mask &= skill_mask
+        if min_years is not None and min_years > 0:
+            mask &= self._years[:rows] >= min_years
+        return np.flatnonzero(mask)
+
+    def _query_sync(
+        self,
+        vector: np.ndarray,
+        top_k: int,
+        skills: Optional[List[str]],
+        min_years: Optional[float]
+    ) -> List[VectorMatch]:
+        started = time.perf_counter()
+        with self._lock:
+            self._refresh()
+            candidates = self._filter(skills, min_years)
+
+            if self._centroids is not None and len(candidates) >= self.ann_min_vectors:
+                probes = min(self.ann_probes, len(self._centroids))
+                probed = np.argpartition(-(self._centroids @ vector), probes - 1)[:probes]
+                in_probed = candidates[np.isin(self._lists[candidates], probed)]
+                if len(in_probed) >= top_k:
+                    candidates = in_probed
+                    self.ann_queries += 1
+
+            if len(candidates) == 0 or top_k <= 0:
+                matches = []
+            else:
+                scores = np.asarray(self._vectors[candidates]) @ vector
+                if len(scores) > top_k:
+                    best = np.argpartition(-scores, top_k - 1)[:top_k]
+                else:
+                    best = np.arange(len(scores))
+                best = best[np.argsort(-scores[best], kind="stable")]
+                matches = [
+                    VectorMatch(self._ids[candidates[i]], float(scores[i]), dict(self._metadata[candidates[i]]))
+                    for i in best
+                ]
+
+        self.queries += 1
+        self.total_query_ms += (time.perf_counter() - started) * 1000
+        return matches
+
+    async def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        skills: Optional[List[str]] = None,
+        min_years: Optional[float] = None
+    ) -> List[VectorMatch]:
+        query_vector = _normalized(vector, self.dimension)
+        if query_vector is None:
+            return []
+        if self._ann_due():
+            await asyncio.to_thread(self._build_ann)
+        return await asyncio.to_thread(self._query_sync, query_vector, top_k, skills, min_years)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "vectors": self.size,
+            "dimension": self.dimension,
+            "ann_lists": 0 if self._centroids is None else len(self._centroids),
+            "ann_builds": self.ann_builds,
+            "queries": self.queries,
+            "ann_queries": self.ann_queries,
+            "reloads": self.reloads,
+            "avg_query_ms": round(self.total_query_ms / self.queries, 3) if self.queries else 0.0,
+        }
+
+
+def create_vector_backend() -> VectorBackend:
+    """Backend selected by settings.vector_backend."""
+    if settings.vector_backend == "local":
+        return LocalVectorBackend(
+            index_dir=settings.vector_index_dir or DEFAULT_INDEX_DIR,
+            dimension=settings.vector_dimension,
+            ann_min_vectors=settings.vector_ann_min_vectors,
+            ann_lists=settings.vector_ann_lists,
+            ann_probes=settings.vector_ann_probes,
+        )
+    if settings.vector_backend != "pinecone":
+        raise ValueError(f"Unknown vector backend: {settings.vector_backend!r}")
+    return PineconeBackend(
+        api_key=settings.pinecone_api_key,
+        index_name=settings.pinecone_index_name,
+        environment=settings.pinecone_environment,
+        dimension=settings.vector_dimension,
+    )
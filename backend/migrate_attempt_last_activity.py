@@ -0,0 +1,27 @@
+"""
+Migration: Add last_activity column to test_attempts.
+
+Written in batches by the heartbeat endpoint's activity flusher.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Add the test_attempts.last_activity column."""
+    
+    statements = [
+        "ALTER TABLE test_attempts ADD COLUMN IF NOT EXISTS last_activity TIMESTAMP WITH TIME ZONE"
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Added test_attempts.last_activity")
+
+
+if __name__ == "__main__":
+    print("Running migration: Add test_attempts.last_activity...")
+    asyncio.run(migrate())
+    print("Migration complete!")
@@ -0,0 +1,39 @@
+"""
+Migration: Add embedding_cache table.
+
+Gemini embeddings are keyed by model plus SHA-256 of the text so unchanged
+profile summaries and repeated HR queries are not re-embedded.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Create the embedding_cache table."""
+    
+    # Execute each statement separately (asyncpg requirement)
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            id SERIAL PRIMARY KEY,
+            model VARCHAR(64) NOT NULL,
+            text_hash VARCHAR(64) NOT NULL,
+            dimension INTEGER NOT NULL,
+            embedding BYTEA NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            CONSTRAINT uq_embedding_cache_model_hash UNIQUE (model, text_hash)
+        )
+        """
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Created embedding_cache table")
+
+
+if __name__ == "__main__":
+    print("Running migration: Add embedding_cache table...")
+    asyncio.run(migrate())
+    print("Migration complete!")
@@ -0,0 +1,42 @@
+"""
+Migration: Add job_runs table.
+
+Admin background jobs (re-evaluation, vector re-index) keep their state in
+one row per job, so every gunicorn worker reports the same status and only
+one run can be in progress at a time.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Create the job_runs table."""
+    
+    # Execute each statement separately (asyncpg requirement)
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS job_runs (
+            name VARCHAR(50) PRIMARY KEY,
+            run_id VARCHAR(32),
+            state VARCHAR(20) NOT NULL DEFAULT 'idle',
+            params TEXT,
+            progress TEXT,
+            error TEXT,
+            started_at TIMESTAMP WITH TIME ZONE,
+            heartbeat_at TIMESTAMP WITH TIME ZONE,
+            finished_at TIMESTAMP WITH TIME ZONE
+        )
+        """
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Created job_runs table")
+
+
+if __name__ == "__main__":
+    print("Running migration: Add job_runs table...")
+    asyncio.run(migrate())
+    print("Migration complete!")
@@ -0,0 +1,28 @@
+"""
+Migration: Add summary_embedding_hash column to candidate_profiles.
+
+Set when a profile is indexed for vector search; the bulk re-index skips
+profiles whose hash has not changed.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Add the candidate_profiles.summary_embedding_hash column."""
+    
+    statements = [
+        "ALTER TABLE candidate_profiles ADD COLUMN IF NOT EXISTS summary_embedding_hash VARCHAR(64)"
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Added candidate_profiles.summary_embedding_hash")
+
+
+if __name__ == "__main__":
+    print("Running migration: Add candidate_profiles.summary_embedding_hash...")
+    asyncio.run(migrate())
+    print("Migration complete!")
@@ -0,0 +1,28 @@
+"""
+Migration: Add resume_parsing_jobs.partial_result.
+
+Holds the resume sections parsed so far while the Gemini response is still
+streaming, so /resume-status can show them before parsing completes.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Add the resume_parsing_jobs.partial_result column."""
+    
+    statements = [
+        "ALTER TABLE resume_parsing_jobs ADD COLUMN IF NOT EXISTS partial_result TEXT"
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Added resume_parsing_jobs.partial_result")
+
+
+if __name__ == "__main__":
+    print("Running migration: Resume parsing partial results...")
+    asyncio.run(migrate())
+    print("Migration complete!")
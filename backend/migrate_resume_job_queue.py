@@ -0,0 +1,34 @@
+"""
+Migration: Turn resume_parsing_jobs into a work queue.
+
+Adds the stored resume URL each job parses from, an index for the
+queue workers' "oldest PENDING job" claim query, the count of workers
+that died mid-job (kept apart from the user-facing retry_count), and the
+claim token and heartbeat that tell a live worker from a dead one.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Add resume_parsing_jobs.resume_url, interrupt_count, claim columns and the claim index."""
+    
+    statements = [
+        "ALTER TABLE resume_parsing_jobs ADD COLUMN IF NOT EXISTS resume_url VARCHAR(500)",
+        "CREATE INDEX IF NOT EXISTS idx_resume_jobs_status_id ON resume_parsing_jobs(status, id)",
+        "ALTER TABLE resume_parsing_jobs ADD COLUMN IF NOT EXISTS interrupt_count INTEGER DEFAULT 0",
+        "ALTER TABLE resume_parsing_jobs ADD COLUMN IF NOT EXISTS claim_token VARCHAR(32)",
+        "ALTER TABLE resume_parsing_jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITH TIME ZONE"
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Added resume_parsing_jobs.resume_url, interrupt_count, claim_token, heartbeat_at and claim index")
+
+
+if __name__ == "__main__":
+    print("Running migration: Resume parsing job queue...")
+    asyncio.run(migrate())
+    print("Migration complete!")
@@ -0,0 +1,38 @@
+"""
+Migration: Add resume_parse_results table (resume parse cache).
+
+Parse results are keyed by SHA-256 of the PDF plus the parser version so
+duplicate uploads and retries skip the Gemini call.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Create the resume_parse_results table."""
+    
+    # Execute each statement separately (asyncpg requirement)
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS resume_parse_results (
+            id SERIAL PRIMARY KEY,
+            content_hash VARCHAR(64) NOT NULL,
+            parser_version VARCHAR(32) NOT NULL,
+            result TEXT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            CONSTRAINT uq_resume_parse_hash_version UNIQUE (content_hash, parser_version)
+        )
+        """
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Created resume_parse_results table")
+
+
+if __name__ == "__main__":
+    print("Running migration: Add resume_parse_results table...")
+    asyncio.run(migrate())
+    print("Migration complete!")
@@ -0,0 +1,29 @@
+"""
+Migration: Index test_attempts for the admin results list.
+
+/api/admin/test-results pages through completed attempts newest first with
+a keyset on (completed_at, id); this index serves both the filter and the
+order.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Add the (status, completed_at, id) index on test_attempts, in result order."""
+    
+    statements = [
+        "CREATE INDEX IF NOT EXISTS idx_test_attempts_status_completed ON test_attempts(status, completed_at DESC NULLS LAST, id DESC)"
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Added test_attempts results index")
+
+
+if __name__ == "__main__":
+    print("Running migration: Test results index...")
+    asyncio.run(migrate())
+    print("Migration complete!")
@@ -0,0 +1,61 @@
+"""
+Migration: Add upload_sessions and upload_chunks tables.
+
+Resumable chunked uploads of answer files and proctoring videos: one
+session row per upload, one chunk row per chunk staged on disk.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Create the upload_sessions and upload_chunks tables."""
+    
+    # Execute each statement separately (asyncpg requirement)
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS upload_sessions (
+            id VARCHAR(32) PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            attempt_id INTEGER NOT NULL REFERENCES test_attempts(id),
+            question_id INTEGER,
+            kind VARCHAR(32) NOT NULL,
+            filename VARCHAR(255) NOT NULL,
+            content_type VARCHAR(100),
+            total_size BIGINT NOT NULL,
+            chunk_size INTEGER NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'uploading',
+            file_url VARCHAR(500),
+            error_message TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            processing_started_at TIMESTAMP WITH TIME ZONE,
+            completed_at TIMESTAMP WITH TIME ZONE
+        )
+        """,
+        # Tables created before the stale-PROCESSING timeout
+        "ALTER TABLE upload_sessions ADD COLUMN IF NOT EXISTS processing_started_at TIMESTAMP WITH TIME ZONE",
+        "CREATE INDEX IF NOT EXISTS ix_upload_sessions_user_id ON upload_sessions(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_upload_sessions_attempt ON upload_sessions(attempt_id, kind)",
+        """
+        CREATE TABLE IF NOT EXISTS upload_chunks (
+            upload_id VARCHAR(32) NOT NULL REFERENCES upload_sessions(id) ON DELETE CASCADE,
+            chunk_index INTEGER NOT NULL,
+            "offset" BIGINT NOT NULL,
+            size INTEGER NOT NULL,
+            received_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            PRIMARY KEY (upload_id, chunk_index)
+        )
+        """
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Created upload_sessions and upload_chunks tables")
+
+
+if __name__ == "__main__":
+    print("Running migration: Add chunked upload tables...")
+    asyncio.run(migrate())
+    print("Migration complete!")
@@ -0,0 +1,39 @@
+"""
+Migration: Add unique index on user_answers(attempt_id, question_id).
+
+Required by the single-statement answer upserts (INSERT ... ON CONFLICT).
+Removes duplicate answers first, keeping the most recent row per question.
+"""
+import asyncio
+from sqlalchemy import text
+from app.database import engine
+
+
+async def migrate():
+    """Deduplicate user_answers and create the unique index."""
+    
+    # Execute each statement separately (asyncpg requirement)
+    statements = [
+        """
+        DELETE FROM user_answers a
+        USING user_answers b
+        WHERE a.attempt_id = b.attempt_id
+          AND a.question_id = b.question_id
+          AND a.id < b.id
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_user_answers_attempt_question
+        ON user_answers(attempt_id, question_id)
+        """
+    ]
+    
+    async with engine.begin() as conn:
+        for sql in statements:
+            await conn.execute(text(sql))
+        print("✅ Created unique index uq_user_answers_attempt_question")
+
+
+if __name__ == "__main__":
+    print("Running migration: Add unique index on user_answers...")
+    asyncio.run(migrate())
+    print("Migration complete!")
@@ -0,0 +1,94 @@
+"""
+Script to (re)build the vector search index of candidate profiles.
+Use it after switching vector backends, changing the embedding model, or to
+catch up profiles whose indexing failed (quota, missing API key).
+
+Profiles are processed in keyset-paginated chunks; unchanged profiles are
+skipped, summaries are embedded in batches and vectors upserted in batches.
+Progress is checkpointed to a file; re-running resumes where it stopped.
+The run claims the same job as POST /api/admin/vector-index/reindex, so the
+script exits if a re-index is already running anywhere (and vice versa).
+
+Run with: python3 reindex_profiles.py [--chunk-size 500] [--force] [--restart]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import init_db
+from app.services.profile_index import reindex_job
+from app.services.job_runs import JobAlreadyRunning
+
+CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".reindex_checkpoint.json")
+
+
+def load_checkpoint():
+    """Return the last processed profile id, or 0."""
+    try:
+        with open(CHECKPOINT_FILE) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    return checkpoint.get("last_profile_id", 0)
+
+
+def save_checkpoint(last_profile_id):
+    with open(CHECKPOINT_FILE, "w") as f:
+        json.dump({"last_profile_id": last_profile_id}, f)
+
+
+async def reindex_all(chunk_size=500, force=False, restart=False):
+    """Index every profile with a professional summary."""
+    await init_db()
+
+    after_id = 0 if restart else load_checkpoint()
+
+    print("=" * 60)
+    print("RE-INDEXING CANDIDATE PROFILES")
+    print("=" * 60)
+    print(f"\nChunk size: {chunk_size}, force: {force}, resuming after profile {after_id}\n")
+
+    started = time.perf_counter()
+
+    def report(totals):
+        save_checkpoint(totals["last_profile_id"])
+        rate = totals["profiles"] / max(time.perf_counter() - started, 0.001)
+        print(
+            f"  ✅ Chunk {totals['chunks']}: {totals['profiles']} profiles "
+            f"({totals['indexed']} indexed, {totals['unchanged']} unchanged, {totals['failed']} failed) "
+            f"up to profile {totals['last_profile_id']} [{rate:.0f}/s]"
+        )
+
+    try:
+        totals = await reindex_job.run(on_progress=report, after_id=after_id, chunk_size=chunk_size, force=force)
+    except JobAlreadyRunning as e:
+        print(f"❌ {e} - check GET /api/admin/vector-index/reindex and try again when it has finished.")
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print(
+        f"COMPLETE: Checked {totals['profiles']} profiles, indexed {totals['indexed']}, "
+        f"unchanged {totals['unchanged']}, failed {totals['failed']}"
+    )
+    print("=" * 60)
+
+    # Finished - the next run starts from the beginning
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-index candidate profiles for vector search")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Profiles per transaction")
+    parser.add_argument("--force", action="store_true", help="Re-index unchanged profiles too")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    print("\n🔍 Starting profile re-index script...\n")
+    asyncio.run(reindex_all(args.chunk_size, args.force, args.restart))
+    print("\n✅ Done!\n")
@@ -15,6 +15,13 @@ from app.models.course import Course, CourseEnrollment
 from app.models.assessment import Assessment, Badge, AssessmentAttempt
 from app.models.test import Division, Question, Test, TestAttempt
 from app.services.auth import get_password_hash, create_access_token
+from app.services.test_session_cache import test_session_cache
+from app.services.answer_buffer import answer_buffer
+from app.services.attempt_cache import attempt_cache
+from app.services.document_cache import document_cache
+from app.services.evaluation import answer_keys
+from app.services.skill_dictionary import skill_dictionary
+from app.services.candidate_search import candidate_search
 
 # Use in-memory SQLite for testing
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -62,6 +69,14 @@ async def client(test_session: AsyncSession) -> AsyncGenerator[AsyncClient, None
             raise
 
     app.dependency_overrides[get_db] = override_get_db
+    # In-memory DB ids repeat across tests - never serve a previous test's payloads
+    test_session_cache.clear_local()
+    answer_buffer.clear()
+    attempt_cache.clear()
+    document_cache.clear()
+    answer_keys.clear()
+    skill_dictionary.clear()
+    candidate_search.clear()
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
@@ -1,9 +1,11 @@
 """
 Tests for Admin API endpoints
 """
+import asyncio
+
 import pytest
 from httpx import AsyncClient
-from app.models.test import Division, Question, Test
+from app.models.test import Division, Question, Test, TestAttempt, UserAnswer
 from app.models.user import User, UserRole
 
 
@@ -236,6 +238,38 @@ class TestTestManagement:
         assert response.status_code == 200
         assert "published" in response.json()["message"].lower()
 
+    async def test_publish_standalone_prewarms_section_documents(
+        self, client: AsyncClient, test_admin, admin_auth_headers, test_session, monkeypatch
+    ):
+        """Publishing a standalone assessment pre-warms its section questions' documents"""
+        from app.models.test import TestSection
+        from app.services.document_cache import document_cache
+
+        url = "https://res.cloudinary.com/demo/passage.pdf"
+        assessment = Test(
+            title="Standalone", duration_minutes=30, assessment_type="standalone_assessment",
+            total_questions=1, is_published=False
+        )
+        test_session.add(assessment)
+        await test_session.flush()
+        section = TestSection(test_id=assessment.id, title="Reading", order=1)
+        test_session.add(section)
+        await test_session.flush()
+        test_session.add(Question(
+            section_id=section.id, question_type="reading", question_text="Summarize",
+            documents=[{"title": "Passage", "content": url}], marks=1, is_active=True
+        ))
+        await test_session.commit()
+
+        scheduled = []
+        monkeypatch.setattr(document_cache, "schedule_prewarm", lambda urls: scheduled.extend(urls))
+        response = await client.post(
+            f"/api/standalone-assessments/{assessment.id}/publish",
+            headers=admin_auth_headers
+        )
+        assert response.status_code == 200
+        assert scheduled == [url]
+
 
 class TestCandidateManagement:
     """Test candidate management operations"""
@@ -325,6 +359,105 @@ class TestTestAttempts:
         assert all(a["is_flagged"] for a in data)
 
 
+class TestTestResults:
+    """Test the paginated test-results endpoint"""
+
+    async def _seed(self, test_session, test_user, test_test, test_division):
+        from datetime import datetime, timedelta, timezone
+        from app.models.job import Job
+
+        job = Job(company_name="Acme", role="Data Analyst", test_id=test_test.id)
+        standalone = Test(
+            title="Standalone", division_id=test_division.id, duration_minutes=30,
+            assessment_type="standalone_assessment"
+        )
+        test_session.add_all([job, standalone])
+        await test_session.flush()
+
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        attempts = [
+            # Two attempts share a completed_at to exercise the id tie-break
+            TestAttempt(user_id=test_user.id, test_id=test_test.id, status="completed",
+                        percentage=pct, completed_at=base + timedelta(hours=hours))
+            for pct, hours in [(80, 1), (20, 2), (60, 2), (90, 3), (40, 4)]
+        ]
+        # Legacy row without completed_at - listed last
+        attempts.append(TestAttempt(user_id=test_user.id, test_id=test_test.id, status="completed", percentage=70))
+        attempts.append(TestAttempt(user_id=test_user.id, test_id=test_test.id, status="in_progress"))
+        attempts.append(TestAttempt(user_id=test_user.id, test_id=standalone.id, status="completed",
+                                    percentage=99, completed_at=base + timedelta(hours=5)))
+        test_session.add_all(attempts)
+        await test_session.flush()
+        test_session.add(UserAnswer(attempt_id=attempts[0].id, question_id=1, answer_text="FILE:https://x/answer.csv"))
+        await test_session.commit()
+        return job, [a.id for a in attempts[:6]]
+
+    async def test_pages_cover_results_in_order(
+        self, client: AsyncClient, test_session, test_user, test_test, test_division, admin_auth_headers
+    ):
+        """Keyset pages walk completed results newest first without gaps"""
+        job, ids = await self._seed(test_session, test_user, test_test, test_division)
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 3, "include_total": "true"}
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get("/api/admin/test-results", params=params, headers=admin_auth_headers)
+            assert response.status_code == 200
+            page = response.json()
+            assert page["total"] == 6
+            assert len(page["results"]) <= 3
+            seen += page["results"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        # The page boundary falls between the two attempts completed at the same time
+        assert [r["id"] for r in seen] == [ids[4], ids[3], ids[2], ids[1], ids[0], ids[5]]
+        assert seen[4]["file_answer"] == "FILE:https://x/answer.csv"
+        assert seen[4]["job_id"] == job.id
+        assert seen[4]["company"] == "Acme"
+        assert seen[5]["completed_at"] is None
+
+    async def test_filters_are_applied_in_sql(
+        self, client: AsyncClient, test_session, test_user, test_test, test_division, admin_auth_headers
+    ):
+        """job, status and date filters narrow the page and the total"""
+        job, ids = await self._seed(test_session, test_user, test_test, test_division)
+
+        response = await client.get(
+            "/api/admin/test-results",
+            params={"job_id": job.id, "status": "passed", "include_total": "true"},
+            headers=admin_auth_headers
+        )
+        page = response.json()
+        assert [r["id"] for r in page["results"]] == [ids[3], ids[2], ids[0], ids[5]]
+        assert page["total"] == 4
+
+        response = await client.get(
+            "/api/admin/test-results",
+            params={"job_id": job.id, "include_total": "true", "estimate_total": "false"},
+            headers=admin_auth_headers
+        )
+        page = response.json()
+        assert (page["total"], page["passed"], page["failed"]) == (6, 4, 2)
+        assert page["total_is_estimate"] is False
+
+        response = await client.get(
+            "/api/admin/test-results",
+            params={"completed_from": "2026-01-01T02:00:00+00:00", "completed_to": "2026-01-01T04:00:00+00:00"},
+            headers=admin_auth_headers
+        )
+        assert [r["id"] for r in response.json()["results"]] == [ids[3], ids[2], ids[1]]
+
+        response = await client.get("/api/admin/test-results", params={"job_id": job.id + 1}, headers=admin_auth_headers)
+        assert response.json()["results"] == []
+
+        response = await client.get("/api/admin/test-results", params={"cursor": "not-a-cursor"}, headers=admin_auth_headers)
+        assert response.status_code == 400
+
+
 class TestAdminMessaging:
     """Test admin messaging endpoint"""
 
@@ -361,3 +494,197 @@ class TestAdminMessaging:
             headers=admin_auth_headers
         )
         assert response.status_code == 404
+
+
+class TestCandidateSearch:
+    """Test hybrid HR candidate search"""
+
+    async def test_search_filters_ranks_and_paginates(
+        self, client: AsyncClient, test_engine, test_session, admin_auth_headers, tmp_path, monkeypatch
+    ):
+        """Skill matches are filtered in memory, re-ranked by vector and paginated"""
+        from types import SimpleNamespace
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        from app.models import CandidateProfile, Skill, SkillCategory
+        from app.services import candidate_search, vector_search
+        from app.services.embedding_cache import EmbeddingCache
+        from app.services.vector_store import LocalVectorBackend
+
+        python = Skill(name="python", display_name="Python", category=SkillCategory.LANGUAGE)
+        java = Skill(name="java", display_name="Java", category=SkillCategory.LANGUAGE)
+        sql = Skill(name="sql", display_name="SQL", category=SkillCategory.DATABASE)
+        profiles = {}
+        for key, years, skills in [("a", 5, [python, sql]), ("b", 1, [python]), ("c", 3, [java])]:
+            user = User(
+                email=f"{key}@example.com", name=f"Candidate {key.upper()}", registration_number=f"S-{key}",
+                hashed_password="x", role=UserRole.STUDENT
+            )
+            test_session.add(user)
+            await test_session.flush()
+            profiles[key] = CandidateProfile(user_id=user.id, years_of_experience=years, skills=skills)
+            test_session.add(profiles[key])
+        await test_session.commit()
+
+        backend = LocalVectorBackend(str(tmp_path), dimension=4, ann_min_vectors=0)
+        await backend.upsert(f"profile_{profiles['a'].id}", [0.0, 1.0, 0.0, 0.0], {})
+        await backend.upsert(f"profile_{profiles['b'].id}", [1.0, 0.1, 0.0, 0.0], {})
+        await backend.upsert(f"profile_{profiles['c'].id}", [1.0, 0.0, 0.0, 0.0], {})
+
+        parse_calls = []
+        async def extract(query):
+            parse_calls.append(query)
+            return {"skills": ["Python"], "min_years": None}
+        client_stub = SimpleNamespace(models=SimpleNamespace(
+            embed_content=lambda model, contents: SimpleNamespace(
+                embeddings=[SimpleNamespace(values=[1.0, 0.0, 0.0, 0.0]) for _ in contents]
+            )
+        ))
+        monkeypatch.setattr(candidate_search, "extract_skills_from_query", extract)
+        monkeypatch.setattr(candidate_search, "vector_search_service", vector_search.VectorSearchService(backend))
+        monkeypatch.setattr(vector_search, "get_genai_client", lambda: client_stub)
+        monkeypatch.setattr(vector_search, "embedding_cache", EmbeddingCache(
+            session_factory=async_sessionmaker(test_engine, expire_on_commit=False)
+        ))
+
+        response = await client.post("/api/admin/candidates/search", headers=admin_auth_headers, json={
+            "query": "Python developer", "top_k": 1
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert data["skills"] == ["Python"]
+        assert [r["name"] for r in data["results"]] == ["Candidate B"]  # Closer summary vector
+
+        response = await client.post("/api/admin/candidates/search", headers=admin_auth_headers, json={
+            "query": "  python   DEVELOPER", "top_k": 1, "page": 2
+        })
+        data = response.json()
+        assert [r["name"] for r in data["results"]] == ["Candidate A"]
+        assert sorted(data["results"][0]["skills"]) == ["Python", "SQL"]
+        assert len(parse_calls) == 1
+
+        response = await client.post("/api/admin/candidates/search", headers=admin_auth_headers, json={
+            "query": "Python developer", "min_experience": 2
+        })
+        assert [r["name"] for r in response.json()["results"]] == ["Candidate A"]
+
+        response = await client.post("/api/admin/candidates/search", headers=admin_auth_headers, json={
+            "query": "Python developer", "skill_filters": ["Rust"]
+        })
+        # Rust is unknown, Python (parsed) still matches
+        assert response.json()["total"] == 2
+
+        response = await client.post("/api/admin/candidates/search", headers=admin_auth_headers, json={
+            "query": "", "skill_filters": ["Rust"]
+        })
+        assert response.json()["total"] == 0
+
+    async def test_search_coerces_llm_output(self, client: AsyncClient, admin_auth_headers, monkeypatch):
+        """Malformed skills/min_years from the LLM don't break the search"""
+        from app.services import candidate_search
+
+        async def extract(query):
+            return {"skills": "Python", "min_years": "3+ years"}
+        monkeypatch.setattr(candidate_search, "extract_skills_from_query", extract)
+
+        response = await client.post("/api/admin/candidates/search", headers=admin_auth_headers, json={
+            "query": "Python developer"
+        })
+        assert response.status_code == 200
+        assert response.json()["skills"] == []
+        assert response.json()["min_experience"] is None
+
+        assert candidate_search._coerce_parsed({"skills": ["Go", 1, " "], "min_years": "3"}) == {
+            "skills": ["Go"], "min_years": 3.0
+        }
+        assert candidate_search.CandidateSkillIndex().matches([1], candidate_search._coerce_years("3")) == {}
+
+    async def test_skill_index_loads_once(self, test_session):
+        """Concurrent searches on a cold index trigger a single load"""
+        import asyncio
+        from app.services.candidate_search import CandidateSkillIndex
+
+        index = CandidateSkillIndex(ttl_seconds=300)
+        await asyncio.gather(*(index.ensure_loaded(test_session) for _ in range(5)))
+        assert index.loads == 1
+
+
+class TestSupabaseUpload:
+    """Test streaming and resumable uploads to Supabase Storage"""
+
+    def _fake_storage(self, fail_patches=0):
+        """MockTransport answering the object and TUS endpoints in memory"""
+        import httpx
+        state = {"objects": {}, "uploads": {}, "requests": [], "fail_patches": fail_patches}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            path = request.url.path
+            state["requests"].append((request.method, path, dict(request.headers)))
+            if request.method == "POST" and path.startswith("/storage/v1/object/"):
+                state["objects"][path] = request.read()
+                return httpx.Response(200, json={"Key": path})
+            if request.method == "POST" and path == "/storage/v1/upload/resumable":
+                upload_id = f"/storage/v1/upload/resumable/{len(state['uploads'])}"
+                state["uploads"][upload_id] = bytearray()
+                return httpx.Response(201, headers={"Location": upload_id})
+            data = state["uploads"][path]
+            if request.method == "HEAD":
+                return httpx.Response(200, headers={"Upload-Offset": str(len(data))})
+            if request.method == "PATCH":
+                assert int(request.headers["upload-offset"]) == len(data)
+                body = request.read()
+                if state["fail_patches"]:
+                    # Server keeps half of the chunk, then the connection drops
+                    state["fail_patches"] -= 1
+                    data.extend(body[:len(body) // 2])
+                    return httpx.Response(500, text="connection reset")
+                data.extend(body)
+                return httpx.Response(204, headers={"Upload-Offset": str(len(data))})
+            return httpx.Response(404)
+
+        return state, httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def _configure(self, monkeypatch, http):
+        from app.services import supabase_upload
+        monkeypatch.setenv("SUPABASE_URL", "https://supabase.test")
+        monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service-key")
+        monkeypatch.setattr(supabase_upload, "get_http_client", lambda: http)
+        monkeypatch.setattr(supabase_upload.settings, "upload_stream_chunk_bytes", 1000)
+        monkeypatch.setattr(supabase_upload.settings, "supabase_resumable_threshold_bytes", 10_000)
+        monkeypatch.setattr(supabase_upload.settings, "supabase_tus_chunk_bytes", 4000)
+        return supabase_upload
+
+    async def test_small_file_streams_with_content_length(self, tmp_path, monkeypatch):
+        """Files under the threshold are one POST with an explicit length"""
+        state, http = self._fake_storage()
+        supabase_upload = self._configure(monkeypatch, http)
+        payload = bytes(range(256)) * 20
+        path = tmp_path / "doc.pdf"
+        path.write_bytes(payload)
+
+        url = await supabase_upload.upload_file_to_supabase(
+            str(path), "division-docs", "test-media/documents/doc.pdf", "application/pdf"
+        )
+        assert url == "https://supabase.test/storage/v1/object/public/division-docs/test-media/documents/doc.pdf"
+        assert state["objects"]["/storage/v1/object/division-docs/test-media/documents/doc.pdf"] == payload
+        _, _, headers = state["requests"][0]
+        assert headers["content-length"] == str(len(payload))
+        assert "transfer-encoding" not in headers
+
+    async def test_large_file_resumes_after_failed_chunk(self, tmp_path, monkeypatch):
+        """TUS uploads continue from the server's offset after a failure"""
+        state, http = self._fake_storage(fail_patches=1)
+        supabase_upload = self._configure(monkeypatch, http)
+        real_sleep = asyncio.sleep
+        monkeypatch.setattr(supabase_upload.asyncio, "sleep", lambda seconds: real_sleep(0))  # No backoff
+        payload = bytes(range(256)) * 50  # 12800 bytes: 4 TUS chunks
+        path = tmp_path / "big.html"
+        path.write_bytes(payload)
+
+        await supabase_upload.upload_file_to_supabase(str(path), "division-docs", "html/big.html", "text/html")
+        assert bytes(state["uploads"]["/storage/v1/upload/resumable/0"]) == payload
+        methods = [method for method, _, _ in state["requests"]]
+        assert methods.count("HEAD") == 1
+        assert max(
+            int(headers["content-length"]) for method, _, headers in state["requests"] if method == "PATCH"
+        ) <= 4000
@@ -0,0 +1,750 @@
+"""
+Tests for Profile API endpoints
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import fitz
+
+from httpx import AsyncClient
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import ResumeParsingJob, ResumeParsingStatus, CandidateProfile, Skill, SkillCategory
+from app.services.resume_queue import ResumeParsingQueue
+from app.services.cpu_pool import CpuWorkerPool
+from app.services.gemini_pool import GeminiKeyPool, GeminiCapacityError
+from app.services.blocking_io import ServiceExecutor, BlockingCallTimeout
+from app.services.skill_dictionary import SkillDictionary
+from app.services.resume_parse_cache import ResumeParseCache, resume_content_hash
+from app.services.resume_parser import (
+    ParsedResume, plan_extraction, format_text_layer, iter_page_images,
+    parse_gemini_response, StreamingSectionParser, normalize_sections
+)
+
+
+class TestResumeQueue:
+    """Test the resume parsing job queue"""
+
+    async def test_claim_and_recover_stale(self, test_session, test_user):
+        """Jobs are claimed once, oldest first; dead PROCESSING jobs are re-queued"""
+        first = ResumeParsingJob(
+            user_id=test_user.id, resume_filename="a.pdf",
+            resume_url="/uploads/resumes/a.pdf", status=ResumeParsingStatus.PENDING
+        )
+        second = ResumeParsingJob(
+            user_id=test_user.id, resume_filename="b.pdf",
+            resume_url="/uploads/resumes/b.pdf", status=ResumeParsingStatus.PENDING
+        )
+        test_session.add_all([first, second])
+        await test_session.commit()
+
+        queue = ResumeParsingQueue(stale_after_seconds=60)
+        claimed = await queue.claim_next(test_session)
+        assert claimed.id == first.id
+        assert claimed.resume_url == "/uploads/resumes/a.pdf"
+        assert (await queue.claim_next(test_session)).id == second.id
+        assert await queue.claim_next(test_session) is None
+
+        # First job's worker died long ago; second is still being worked on
+        await test_session.refresh(first)
+        first.started_at = datetime.now(timezone.utc) - timedelta(minutes=10)
+        first.heartbeat_at = first.started_at
+        await test_session.commit()
+
+        assert await queue.recover_stale(test_session) == 1
+        await test_session.refresh(first)
+        await test_session.refresh(second)
+        assert first.status == ResumeParsingStatus.PENDING
+        assert first.interrupt_count == 1
+        assert first.retry_count == 0
+        assert second.status == ResumeParsingStatus.PROCESSING
+        assert (await queue.claim_next(test_session)).id == first.id
+
+    async def test_slow_parse_keeps_its_claim(self, test_session, test_user):
+        """A long parse with a fresh heartbeat is not re-queued; a lost claim can't write"""
+        test_session.add(ResumeParsingJob(
+            user_id=test_user.id, resume_filename="a.pdf",
+            resume_url="/uploads/resumes/a.pdf", status=ResumeParsingStatus.PENDING
+        ))
+        await test_session.commit()
+
+        queue = ResumeParsingQueue(stale_after_seconds=60)
+        claimed = await queue.claim_next(test_session)
+        job = await test_session.get(ResumeParsingJob, claimed.id)
+        job.started_at = datetime.now(timezone.utc) - timedelta(minutes=10)
+        await test_session.commit()
+
+        # Still parsing on another worker: the heartbeat keeps it claimed
+        assert await queue.update_claimed(test_session, claimed)
+        assert await queue.recover_stale(test_session) == 0
+
+        # Its worker goes quiet, the job is re-queued and claimed again
+        await test_session.refresh(job)
+        job.heartbeat_at = datetime.now(timezone.utc) - timedelta(minutes=10)
+        await test_session.commit()
+        assert await queue.recover_stale(test_session) == 1
+        reclaimed = await queue.claim_next(test_session)
+        assert reclaimed.claim_token != claimed.claim_token
+
+        # The first worker wakes up: its result is dropped
+        assert not await queue.update_claimed(test_session, claimed, status=ResumeParsingStatus.COMPLETED)
+        await test_session.refresh(job)
+        assert job.status == ResumeParsingStatus.PROCESSING
+        assert await queue.update_claimed(test_session, reclaimed, status=ResumeParsingStatus.COMPLETED)
+
+    async def test_retry_requeues_failed_job(
+        self, client: AsyncClient, test_session, test_user, auth_headers
+    ):
+        """Retry puts the failed job back on the queue with the stored resume"""
+        test_session.add(CandidateProfile(
+            user_id=test_user.id, resume_url="https://example.supabase.co/resume.pdf"
+        ))
+        test_session.add(ResumeParsingJob(
+            user_id=test_user.id, resume_filename="resume.pdf",
+            status=ResumeParsingStatus.FAILED, error_message="boom"
+        ))
+        await test_session.commit()
+
+        response = await client.post("/api/profile/retry-resume", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["retry_count"] == 1
+
+        job = (await test_session.execute(select(ResumeParsingJob))).scalar_one()
+        assert job.status == ResumeParsingStatus.PENDING
+        assert job.resume_url == "https://example.supabase.co/resume.pdf"
+        assert job.error_message is None
+
+    async def test_status_poll_leaves_long_running_job_alone(
+        self, client: AsyncClient, test_session, test_user, auth_headers
+    ):
+        """Polling never fails a PROCESSING job; recovery belongs to the queue"""
+        job = ResumeParsingJob(
+            user_id=test_user.id, resume_filename="resume.pdf", status=ResumeParsingStatus.PROCESSING,
+            started_at=datetime.now(timezone.utc) - timedelta(minutes=10)
+        )
+        test_session.add(job)
+        await test_session.commit()
+
+        response = await client.get("/api/profile/resume-status", headers=auth_headers)
+        assert response.json()["status"] == "processing"
+        await test_session.refresh(job)
+        assert job.status == ResumeParsingStatus.PROCESSING
+
+    async def test_status_shows_streamed_sections(
+        self, client: AsyncClient, test_session, test_user, auth_headers
+    ):
+        """Sections parsed mid-stream are visible while the job is processing"""
+        partial = normalize_sections({"professional_summary": "Backend engineer"})
+        job = ResumeParsingJob(
+            user_id=test_user.id, resume_filename="resume.pdf",
+            status=ResumeParsingStatus.PROCESSING, started_at=datetime.now(timezone.utc),
+            partial_result=json.dumps({"sections": ["professional_summary"], "resume": partial.model_dump()})
+        )
+        test_session.add(job)
+        await test_session.commit()
+
+        response = await client.get(f"/api/profile/resume-status/{job.id}", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["sections_ready"] == ["professional_summary"]
+        assert data["partial_result"]["professional_summary"] == "Backend engineer"
+
+
+class TestResumeParseCache:
+    """Test the content-hash resume parse cache"""
+
+    async def test_parse_result_shared_through_db(self, test_engine):
+        """A parse stored by one worker is served to another without re-parsing"""
+        sessions = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        content_hash = resume_content_hash(b"%PDF-1.4 same resume")
+        parsed = ParsedResume(professional_summary="Backend engineer", years_of_experience=4)
+
+        writer = ResumeParseCache(session_factory=sessions)
+        assert await writer.get(content_hash) is None
+        await writer.put(content_hash, parsed)
+        await writer.put(content_hash, parsed)  # Duplicate store is a no-op
+
+        reader = ResumeParseCache(session_factory=sessions)
+        cached = await reader.get(content_hash)
+        assert cached.professional_summary == "Backend engineer"
+        assert cached.years_of_experience == 4
+        assert await reader.get(content_hash) is not None
+        assert reader.stats()["db_hits"] == 1
+        assert reader.stats()["hits"] == 1
+        assert await reader.get(resume_content_hash(b"other")) is None
+
+
+def _make_pdf(pages):
+    """PDF with one page per entry; None makes a blank (scanned-like) page."""
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        if text:
+            page.insert_textbox(fitz.Rect(50, 50, 550, 800), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class TestResumeExtraction:
+    """Test text-layer-first extraction routing"""
+
+    RESUME_TEXT = (
+        "Jane Doe - Senior Backend Engineer\n"
+        "Experience: Acme Corp 2019-2024, built payment APIs in Python and Go.\n"
+        "Education: B.Tech Computer Science, 2018.\n"
+        "Skills: Python, FastAPI, PostgreSQL, Kubernetes, Redis, AWS.\n"
+    )
+
+    def test_digital_pdf_routed_to_text(self):
+        """Born-digital pages are sent as text, nothing is rasterized"""
+        plan = plan_extraction(_make_pdf([self.RESUME_TEXT, self.RESUME_TEXT]))
+        assert plan.route == "text"
+        assert plan.image_pages == []
+        assert "Acme Corp" in format_text_layer(plan)
+        assert "--- Page 2 ---" in format_text_layer(plan)
+
+    def test_scanned_pages_fall_back_to_vision(self):
+        """Pages without a usable text layer are rendered as images"""
+        assert plan_extraction(_make_pdf([None])).route == "vision"
+
+        plan = plan_extraction(_make_pdf([self.RESUME_TEXT, None]))
+        assert plan.route == "mixed"
+        assert list(plan.page_texts) == [0]
+        assert plan.image_pages == [1]
+
+    def test_page_cap(self):
+        """Pages beyond the cap are neither read nor rendered"""
+        plan = plan_extraction(_make_pdf([None] * 5), max_pages=2)
+        assert plan.image_pages == [0, 1]
+        assert plan.skipped_pages == 3
+
+    def test_rasterizer_adapts_dpi_and_respects_budget(self):
+        """Page size sets the DPI; rendering stops at the memory budget"""
+        doc = fitz.open()
+        doc.new_page(width=612, height=792)  # Letter
+        doc.new_page(width=1224, height=1584)  # Poster, same aspect ratio
+        doc.new_page(width=612, height=792)
+
+        pages = list(iter_page_images(doc, target_px=1600, max_dpi=150, grayscale=True, image_format="jpeg"))
+        assert [page.mime_type for page in pages] == ["image/jpeg"] * 3
+        assert pages[0].dpi == 145
+        assert pages[1].dpi == 73  # Same pixel size on a page twice as large
+
+        # ~2MB grayscale pixmap per page: 1MB renders smaller, 400KB not at all
+        squeezed = list(iter_page_images(doc, [0], target_px=1600, grayscale=True, memory_budget=1024 * 1024))
+        assert squeezed[0].dpi < 145
+        assert list(iter_page_images(doc, target_px=1600, grayscale=True, memory_budget=400 * 1024)) == []
+        doc.close()
+
+    async def test_cpu_pool_runs_parsing_work_in_processes(self):
+        """Rendering and response repair run in worker processes"""
+        pool = CpuWorkerPool(max_workers=1)
+        pool.start()
+        try:
+            plan = await pool.run(plan_extraction, _make_pdf([self.RESUME_TEXT]))
+            assert plan.route == "text"
+            parsed = await pool.run(parse_gemini_response, '```json\n{"professional_summary": "Backend engineer"}\n```')
+            assert parsed.professional_summary == "Backend engineer"
+            assert pool.stats()["completed"] == 2
+            assert pool.stats()["pending"] == 0
+        finally:
+            pool.stop()
+
+
+class TestGeminiKeyPool:
+    """Test the Gemini key scheduler"""
+
+    def _pool(self, keys=2, **limits):
+        pool = GeminiKeyPool(**limits)
+        pool._initialized = True  # Fake clients instead of configured API keys
+        for name in range(keys):
+            pool.add_client(f"client-{name}")
+        return pool
+
+    async def test_concurrent_calls_spread_across_keys(self):
+        """Concurrent calls go to the least-loaded key, not one current key"""
+        pool = self._pool(keys=2, max_concurrency_per_key=2)
+        used = []
+
+        async def call():
+            async with pool.acquire(100) as lease:
+                used.append(lease.client)
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(*(call() for _ in range(4)))
+        assert sorted(used) == ["client-0", "client-0", "client-1", "client-1"]
+        assert pool.stats()["in_flight"] == 0
+
+    async def test_quota_error_cools_key_down(self):
+        """A 429 benches the key; the next call uses another key"""
+        pool = self._pool(keys=2, cooldown_seconds=60)
+        with pytest.raises(RuntimeError):
+            async with pool.acquire() as lease:
+                first = lease.client
+                raise RuntimeError("429 RESOURCE_EXHAUSTED")
+
+        assert pool.available_clients_count == 1
+        async with pool.acquire() as lease:
+            assert lease.client != first
+
+        pool.reset_cooldowns()
+        assert pool.available_clients_count == 2
+
+    async def test_rejects_when_rate_limited(self):
+        """Requests beyond every key's RPM wait, then are rejected at the timeout"""
+        pool = self._pool(keys=1, rpm_per_key=1, queue_timeout_seconds=0.2)
+        async with pool.acquire():
+            pass
+        with pytest.raises(GeminiCapacityError):
+            async with pool.acquire():
+                pass
+        assert pool.stats()["rejected"] == 1
+
+    async def test_quota_retries_are_bounded(self, monkeypatch):
+        """Keys that keep coming back from cooldown can't retry a parse forever"""
+        from app.services import resume_parser
+        from app.services.resume_parse_cache import resume_parse_cache
+
+        calls = []
+
+        async def quota_error(pdf_bytes, on_section=None):
+            calls.append(1)
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+
+        async def miss(content_hash):
+            return None
+
+        async def no_sleep(seconds):
+            pass
+
+        monkeypatch.setattr(resume_parser, "gemini_pool", self._pool(keys=2))
+        monkeypatch.setattr(resume_parser, "parse_resume_with_gemini", quota_error)
+        monkeypatch.setattr(resume_parse_cache, "get", miss)
+        monkeypatch.setattr(asyncio, "sleep", no_sleep)
+
+        result, error = await resume_parser.parse_resume_safe(b"%PDF", max_retries=3)
+        assert result is None
+        assert "429" in error
+        # 2 free retries (one per key) + 3 attempts per key
+        assert len(calls) == 2 + 3 * 2
+
+
+class TestBlockingIO:
+    """Test the per-service pools for blocking SDK calls"""
+
+    async def test_blocking_calls_run_off_the_event_loop(self):
+        """Calls past max_workers queue while the loop keeps running"""
+        import time
+        executor = ServiceExecutor("test", max_workers=1, timeout_seconds=5)
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            calls = [asyncio.create_task(executor.run(time.sleep, 0.1)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            assert executor.stats()["running"] == 1
+            assert executor.stats()["queued"] == 1
+            await asyncio.gather(*calls)
+        finally:
+            beat.cancel()
+            executor.shutdown()
+
+        assert ticks >= 10  # The loop was never blocked by the sleeps
+        stats = executor.stats()
+        assert stats["calls"] == 2
+        assert stats["pending"] == 0
+        assert stats["max_ms"] >= 190  # The second call waited for the first
+
+    async def test_timeouts_and_errors_are_counted(self):
+        """Slow calls raise BlockingCallTimeout; SDK errors propagate"""
+        import time
+        executor = ServiceExecutor("test", max_workers=2, timeout_seconds=0.05)
+        try:
+            with pytest.raises(BlockingCallTimeout):
+                await executor.run(time.sleep, 0.2)
+            with pytest.raises(ZeroDivisionError):
+                await executor.run(lambda: 1 / 0)
+            assert await executor.run(sum, [1, 2], timeout=1) == 3
+        finally:
+            executor.shutdown()
+
+        stats = executor.stats()
+        assert stats["timeouts"] == 1
+        assert stats["errors"] == 1
+        assert stats["calls"] == 3
+
+
+class TestStreamingSectionParser:
+    """Test incremental parsing of streamed Gemini JSON"""
+
+    RESPONSE = (
+        '```json\n{"personal_info": {"name": "Jane {Doe}", "email": "jane@example.com"},\n'
+        '"professional_summary": "Builds \\"fast\\" APIs, [mostly] in Python",\n'
+        '"skills": {"all": [{"name": "Python"}, {"name": "Go"}]},\n'
+        '"education": []}\n```'
+    )
+
+    def test_sections_complete_as_chunks_arrive(self):
+        """Each top-level section is decoded as soon as it is closed"""
+        parser = StreamingSectionParser()
+        completed = []
+        for i in range(0, len(self.RESPONSE), 7):
+            completed += parser.feed(self.RESPONSE[i:i + 7])
+        assert completed == ["personal_info", "professional_summary", "skills", "education"]
+        assert parser.complete
+        assert parser.sections["personal_info"]["name"] == "Jane {Doe}"
+        assert parser.sections["professional_summary"] == 'Builds "fast" APIs, [mostly] in Python'
+
+    def test_truncated_response_keeps_complete_sections(self):
+        """A cut-off response keeps every fully parsed section"""
+        parser = StreamingSectionParser()
+        parser.feed(self.RESPONSE[:self.RESPONSE.index('{"name": "Go"')])
+        assert not parser.complete
+        assert list(parser.sections) == ["personal_info", "professional_summary"]
+        parsed = normalize_sections(parser.sections)
+        assert parsed.personal_info.name == "Jane {Doe}"
+        assert parsed.professional_summary.startswith("Builds")
+
+
+class TestSkillDictionary:
+    """Test bulk skill resolution"""
+
+    async def test_resolves_skills_in_constant_queries(self, test_engine, test_session):
+        """Known, aliased and new skills resolve with one bulk insert"""
+        test_session.add(Skill(name="python", display_name="Python", category=SkillCategory.LANGUAGE))
+        await test_session.commit()
+
+        statements = []
+        def count(*args):
+            statements.append(args[2])
+        event.listen(test_engine.sync_engine, "before_cursor_execute", count)
+        try:
+            dictionary = SkillDictionary()
+            entries = [("Python", "language"), ("JS", "language"), ("javascript", "language")]
+            entries += [(f"Skill {i}", "tool") for i in range(20)]
+            skills = await dictionary.get_skills(test_session, entries)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", count)
+
+        assert len(statements) == 3  # load + bulk insert + load rows
+        assert len(skills) == 22
+        assert skills["python"].display_name == "Python"
+        assert skills["javascript"].display_name == "JS"
+        assert skills["skill 7"].category == SkillCategory.TOOL
+
+        # Another worker with a stale map picks up the concurrently created rows
+        other = SkillDictionary()
+        other._loaded_at = float("inf")  # Never reload
+        ids = await other.resolve(test_session, [("Skill 7", "tool")])
+        assert ids["skill 7"] == skills["skill 7"].id
+
+
+class TestProfileRows:
+    """Test the bulk child row write path"""
+
+    async def test_reparse_replaces_child_rows(self, client: AsyncClient, test_session, test_user):
+        """Re-applying a resume replaces every section instead of appending"""
+        from app.routers.profile import apply_parsed_to_profile, get_profile_with_relations
+
+        first = ParsedResume.model_validate({
+            "education": [{"school": "Old School"}],
+            "languages": [{"language": "English", "proficiency": "fluent"}],
+            "skills": [{"name": "Python", "category": "language"}],
+            "awards": [{"title": "Old Award"}],
+        })
+        await apply_parsed_to_profile(test_session, test_user.id, first, "old.pdf")
+
+        second = ParsedResume.model_validate({
+            "education": [{"school": "MIT", "degree": "BS"}, {"school": "Stanford", "degree": "MS"}],
+            "work_experience": [{"company": "Acme", "role": "Engineer", "is_current": True}],
+            "languages": [{"language": "Hindi", "proficiency": "native"}],
+            "skills": [{"name": "Go", "category": "language"}, {"name": "SQL", "category": "database"}],
+        })
+        await apply_parsed_to_profile(test_session, test_user.id, second, "new.pdf")
+
+        profile = await get_profile_with_relations(test_session, test_user.id)
+        assert profile.resume_filename == "new.pdf"
+        assert sorted(edu.school for edu in profile.education) == ["MIT", "Stanford"]
+        assert [exp.company for exp in profile.work_experience] == ["Acme"]
+        assert [lang.language for lang in profile.languages] == ["Hindi"]
+        assert sorted(skill.name for skill in profile.skills) == ["go", "sql"]
+        assert profile.awards == []
+
+    async def test_manual_section_editing(
+        self, client: AsyncClient, test_session, test_user, auth_headers
+    ):
+        """Sections can be replaced in one request and edited row by row"""
+        test_session.add(CandidateProfile(user_id=test_user.id))
+        await test_session.commit()
+
+        response = await client.put("/api/profile/me/education", headers=auth_headers, json=[
+            {"school": "MIT", "degree": "BS"}, {"school": "Stanford"}
+        ])
+        assert response.status_code == 200
+        education = response.json()["education"]
+        assert sorted(edu["school"] for edu in education) == ["MIT", "Stanford"]
+
+        response = await client.put("/api/profile/me/education", headers=auth_headers, json=[
+            {"school": "CMU"}
+        ])
+        education = response.json()["education"]
+        assert [edu["school"] for edu in education] == ["CMU"]
+
+        response = await client.put(
+            f"/api/profile/me/education/{education[0]['id']}", headers=auth_headers, json={"degree": "PhD"}
+        )
+        assert response.json()["education"][0]["degree"] == "PhD"
+
+        response = await client.delete(f"/api/profile/me/education/{education[0]['id']}", headers=auth_headers)
+        assert response.status_code == 200
+        response = await client.delete(f"/api/profile/me/education/{education[0]['id']}", headers=auth_headers)
+        assert response.status_code == 404
+
+        response = await client.post("/api/profile/me/languages", headers=auth_headers, json={
+            "language": "French", "proficiency": "basic"
+        })
+        assert response.json()["languages"][0]["proficiency"] == "basic"
+
+
+class TestLocalVectorBackend:
+    """Test the in-process vector index"""
+
+    @staticmethod
+    def _vector(rng, dimension=16):
+        return rng.standard_normal(dimension).astype("float32").tolist()
+
+    async def test_filtered_exact_search_and_persistence(self, tmp_path):
+        """Top-k is exact cosine among rows passing the metadata filter, and survives a reload"""
+        import numpy as np
+        from app.services.vector_store import LocalVectorBackend
+
+        rng = np.random.default_rng(1)
+        backend = LocalVectorBackend(str(tmp_path), dimension=16, ann_min_vectors=0)
+        vectors = {}
+        for i in range(50):
+            vectors[f"profile_{i}"] = self._vector(rng)
+            await backend.upsert(f"profile_{i}", vectors[f"profile_{i}"], {
+                "skills": ["python"] if i % 2 else ["java"], "years_exp": i % 10
+            })
+
+        query = self._vector(rng)
+        matches = await backend.query(query, top_k=5, skills=["Python"], min_years=3)
+
+        def cosine(a, b):
+            return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+        expected = sorted(
+            (vid for i, vid in enumerate(vectors) if i % 2 and i % 10 >= 3),
+            key=lambda vid: -cosine(vectors[vid], query)
+        )[:5]
+        assert [m.id for m in matches] == expected
+        assert matches[0].score == pytest.approx(cosine(vectors[expected[0]], query), abs=1e-5)
+
+        await backend.delete([expected[0]])
+        await backend.upsert("profile_1", vectors["profile_1"], {"skills": ["go"], "years_exp": 9})
+
+        # Another worker sees the same index
+        other = LocalVectorBackend(str(tmp_path), dimension=16, ann_min_vectors=0)
+        remaining = [vid for vid in expected[1:] if vid != "profile_1"]
+        matches = await other.query(query, top_k=len(remaining), skills=["python"], min_years=3)
+        assert [m.id for m in matches] == remaining
+        assert other.size == 49
+        assert (await other.query(query, top_k=5, skills=["go"]))[0].id == "profile_1"
+
+    async def test_queries_not_blocked_by_waiting_writer(self, tmp_path):
+        """A writer waiting on another worker's file lock doesn't stall queries"""
+        import asyncio
+        import fcntl
+        import numpy as np
+        from app.services.vector_store import LocalVectorBackend
+
+        rng = np.random.default_rng(4)
+        backend = LocalVectorBackend(str(tmp_path), dimension=16, ann_min_vectors=0)
+        await backend.upsert("profile_0", self._vector(rng), {"skills": ["python"], "years_exp": 1})
+
+        # Another worker holds the write lock
+        with open(tmp_path / "index.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            write = asyncio.create_task(backend.upsert("profile_1", self._vector(rng), {"skills": [], "years_exp": 0}))
+            await asyncio.sleep(0.1)
+            matches = await asyncio.wait_for(backend.query(self._vector(rng), top_k=5), timeout=2)
+            assert [m.id for m in matches] == ["profile_0"]
+            assert not write.done()
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        await asyncio.wait_for(write, timeout=5)
+        assert backend.size == 2
+
+    def test_default_index_dir_is_not_served(self):
+        """Candidate metadata in the index is not under the public /static mount"""
+        import os
+        from app.main import static_dir
+        from app.services.vector_store import DEFAULT_INDEX_DIR
+
+        assert os.path.commonpath([DEFAULT_INDEX_DIR, static_dir]) != static_dir
+
+    async def test_ann_index_recall(self, tmp_path):
+        """The IVF index finds the true nearest neighbours of clustered data"""
+        import numpy as np
+        from app.services.vector_store import LocalVectorBackend
+
+        rng = np.random.default_rng(2)
+        centers = rng.standard_normal((8, 16))
+        backend = LocalVectorBackend(str(tmp_path), dimension=16, ann_min_vectors=200, ann_lists=8, ann_probes=2)
+        for i in range(400):
+            vector = centers[i % 8] + 0.05 * rng.standard_normal(16)
+            await backend.upsert(f"profile_{i}", vector.tolist(), {"skills": [], "years_exp": 0})
+
+        query = (centers[3] + 0.05 * rng.standard_normal(16)).tolist()
+        exact = LocalVectorBackend(str(tmp_path), dimension=16, ann_min_vectors=0)
+        expected = [m.id for m in await exact.query(query, top_k=10)]
+        matches = await backend.query(query, top_k=10)
+
+        assert backend.stats()["ann_lists"] > 0
+        assert backend.stats()["ann_queries"] == 1
+        assert [m.id for m in matches] == expected
+
+
+class TestEmbeddingCache:
+    """Test cached, batched embedding calls"""
+
+    async def test_batches_and_reuses_embeddings(self, test_engine, monkeypatch):
+        """Texts are embedded in batches once; repeats come from memory or the table"""
+        from types import SimpleNamespace
+        from app.services import vector_search
+        from app.services.embedding_cache import EmbeddingCache
+
+        calls = []
+        def embed_content(model, contents):
+            calls.append(list(contents))
+            return SimpleNamespace(embeddings=[
+                SimpleNamespace(values=[float(len(text)), 1.0, 0.5]) for text in contents
+            ])
+        client = SimpleNamespace(models=SimpleNamespace(embed_content=embed_content))
+
+        cache = EmbeddingCache(session_factory=async_sessionmaker(test_engine, expire_on_commit=False))
+        monkeypatch.setattr(vector_search, "embedding_cache", cache)
+        monkeypatch.setattr(vector_search, "get_genai_client", lambda: client)
+        monkeypatch.setattr(vector_search.settings, "embedding_batch_size", 2)
+        service = vector_search.VectorSearchService()
+
+        texts = ["a", "bb", "a", "ccc", "dddd", "eeeee"]
+        vectors = await service.get_embeddings(texts)
+        assert [v[0] for v in vectors] == [1.0, 2.0, 1.0, 3.0, 4.0, 5.0]
+        assert calls == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+
+        assert (await service.get_query_embedding("bb")) == pytest.approx([2.0, 1.0, 0.5])
+        assert len(calls) == 3
+
+        # Another worker reads the shared table
+        other = EmbeddingCache(session_factory=async_sessionmaker(test_engine, expire_on_commit=False))
+        monkeypatch.setattr(vector_search, "embedding_cache", other)
+        assert (await service.get_embedding("ccc"))[0] == 3.0
+        assert len(calls) == 3
+
+        stats = cache.stats()
+        assert stats["api_calls"] == 3
+        assert stats["api_calls_saved_by_batching"] == 2
+        assert stats["api_calls_saved_by_cache"] == 1
+        assert other.stats()["db_hits"] == 1
+
+
+class TestProfileReindex:
+    """Test the bulk vector re-index"""
+
+    async def test_reindex_skips_unchanged_and_resumes(self, test_engine, test_session, tmp_path, monkeypatch):
+        """Profiles are indexed in pages, unchanged ones are skipped on the next run"""
+        from types import SimpleNamespace
+        from app.models import User, UserRole
+        from app.services import profile_index, vector_search
+        from app.services.embedding_cache import EmbeddingCache
+        from app.services.vector_store import LocalVectorBackend
+
+        calls = []
+        def embed_content(model, contents):
+            calls.append(len(contents))
+            return SimpleNamespace(embeddings=[
+                SimpleNamespace(values=[float(len(text)), 1.0, 0.5, 0.25]) for text in contents
+            ])
+        client = SimpleNamespace(models=SimpleNamespace(embed_content=embed_content))
+        sessions = async_sessionmaker(test_engine, expire_on_commit=False)
+        monkeypatch.setattr(vector_search, "embedding_cache", EmbeddingCache(session_factory=sessions))
+        monkeypatch.setattr(vector_search, "get_genai_client", lambda: client)
+        monkeypatch.setattr(vector_search.settings, "vector_upsert_batch_size", 2)
+        backend = LocalVectorBackend(str(tmp_path), dimension=4, ann_min_vectors=0)
+        monkeypatch.setattr(profile_index, "vector_search_service", vector_search.VectorSearchService(backend))
+
+        for i in range(5):
+            user = User(
+                email=f"candidate{i}@example.com", name=f"Candidate {i}", registration_number=f"C{i:03}",
+                hashed_password="x", role=UserRole.STUDENT
+            )
+            test_session.add(user)
+            await test_session.flush()
+            test_session.add(CandidateProfile(
+                user_id=user.id, professional_summary="summary " + "x" * i if i != 2 else None,
+                years_of_experience=i
+            ))
+        await test_session.commit()
+
+        progress = []
+        totals = await profile_index.reindex_profiles(chunk_size=2, session_factory=sessions, on_progress=progress.append)
+        assert totals["profiles"] == 4
+        assert totals["indexed"] == 4
+        assert len(progress) == 2
+        assert backend.size == 4
+        assert calls == [2, 2]
+
+        profiles = (await test_session.execute(
+            select(CandidateProfile).where(CandidateProfile.summary_embedding_id.isnot(None))
+        )).scalars().all()
+        assert len(profiles) == 4
+        assert all(p.summary_embedding_hash for p in profiles)
+
+        # Second run: nothing changed except one profile's metadata
+        profiles[0].years_of_experience = 9
+        await test_session.commit()
+        totals = await profile_index.reindex_profiles(chunk_size=2, session_factory=sessions)
+        assert totals["unchanged"] == 3
+        assert totals["indexed"] == 1
+        assert calls == [2, 2]  # Summary embedding came from the cache
+
+        # Resume after a given profile
+        totals = await profile_index.reindex_profiles(
+            after_id=progress[0]["last_profile_id"], force=True, session_factory=sessions
+        )
+        assert totals["indexed"] == 2
+
+    async def test_reindex_job_runs_once_across_workers(self, test_engine):
+        """A second worker sees the running re-index and can't start another"""
+        from app.services.job_runs import JobAlreadyRunning
+        from app.services.profile_index import ReindexJob
+
+        sessions = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        worker_a, worker_b = ReindexJob(sessions), ReindexJob(sessions)
+        release = asyncio.Event()
+
+        async def slow_work(params, report):
+            await release.wait()
+            return {"indexed": 3, "last_profile_id": 3}
+        worker_a.work = slow_work
+
+        await worker_a.start(after_id=0, chunk_size=500, force=False)
+        with pytest.raises(JobAlreadyRunning):
+            await worker_b.start(after_id=0, chunk_size=500, force=True)
+        assert (await worker_b.status())["state"] == "running"
+
+        release.set()
+        await worker_a.wait()
+        status = await worker_b.status()
+        assert status["state"] == "completed"
+        assert status["progress"]["indexed"] == 3
@@ -101,6 +101,50 @@ class TestStartTest:
         assert response.status_code == 401
 
 
+class TestSessionPayloadCache:
+    """Test cached session payloads for start/session endpoints"""
+
+    async def test_start_test_hides_correct_answer_and_caches(
+        self, client: AsyncClient, test_user, auth_headers, test_test, test_question, test_session
+    ):
+        """Payload is built once and never exposes correct answers"""
+        from app.services.test_session_cache import test_session_cache
+
+        test_session.add(TestQuestion(test_id=test_test.id, question_id=test_question.id, order=1))
+        await test_session.commit()
+
+        response = await client.post(
+            "/api/tests/start", json={"test_id": test_test.id}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert "correct_answer" not in response.json()["questions"][0]
+        assert test_session_cache.stats()["misses"] == 1
+
+        response = await client.get(f"/api/tests/{test_test.id}/session", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["total_questions"] == 1
+        assert test_session_cache.stats()["hits"] == 1
+
+    async def test_admin_question_update_invalidates_payload(
+        self, client: AsyncClient, test_user, auth_headers, test_admin, admin_auth_headers,
+        test_test, test_question, test_session
+    ):
+        """Editing a question is visible on the next session load"""
+        test_session.add(TestQuestion(test_id=test_test.id, question_id=test_question.id, order=1))
+        await test_session.commit()
+
+        await client.post("/api/tests/start", json={"test_id": test_test.id}, headers=auth_headers)
+        response = await client.put(
+            f"/api/admin/questions/{test_question.id}",
+            json={"question_text": "What is 3 + 3?"},
+            headers=admin_auth_headers
+        )
+        assert response.status_code == 200
+
+        response = await client.get(f"/api/tests/{test_test.id}/session", headers=auth_headers)
+        assert response.json()["questions"][0]["question_text"] == "What is 3 + 3?"
+
+
 class TestSubmitAnswer:
     """Test submit answer endpoint"""
 
@@ -136,6 +180,10 @@ class TestSubmitAnswer:
         )
         assert response.status_code == 200
 
+        # Answers are write-behind buffered; flush before inspecting the DB
+        from app.services.answer_buffer import answer_buffer
+        await answer_buffer.flush_attempt(test_session, test_attempt.id)
+
         # Check the answer was scored correctly
         from sqlalchemy import select
         result = await test_session.execute(
@@ -191,6 +239,210 @@ class TestSubmitAnswer:
         assert response.status_code == 404
 
 
+class TestAnswerBuffer:
+    """Test write-behind buffering of answer saves"""
+
+    async def test_auto_saves_coalesce_into_one_row(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt, test_question, test_session
+    ):
+        """Repeated saves for a question produce a single row with the latest answer"""
+        from sqlalchemy import select
+        from app.services.answer_buffer import answer_buffer
+
+        for answer_text in ["3", "5", "4"]:
+            response = await client.post(
+                f"/api/tests/auto-save-answer?attempt_id={test_attempt.id}",
+                json={"question_id": test_question.id, "answer_text": answer_text},
+                headers=auth_headers
+            )
+            assert response.json()["saved"] is True
+        assert answer_buffer.pending_count(test_attempt.id) == 1
+
+        await answer_buffer.flush_attempt(test_session, test_attempt.id)
+        result = await test_session.execute(
+            select(UserAnswer).where(UserAnswer.attempt_id == test_attempt.id)
+        )
+        answers = result.scalars().all()
+        assert len(answers) == 1
+        assert answers[0].answer_text == "4"
+
+    async def test_auto_save_rejects_question_outside_test(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt, test_question
+    ):
+        """Auto-saves for a question the attempt's test doesn't have are not queued"""
+        from app.services.answer_buffer import answer_buffer
+
+        response = await client.post(
+            f"/api/tests/auto-save-answer?attempt_id={test_attempt.id}",
+            json={"question_id": test_question.id + 1000, "answer_text": "4"},
+            headers=auth_headers
+        )
+        assert response.json() == {"saved": False, "reason": "question_not_in_test"}
+        assert answer_buffer.pending_count(test_attempt.id) == 0
+
+    async def test_rejected_row_does_not_block_other_answers(
+        self, test_user, test_attempt, test_question, test_session
+    ):
+        """A row the database rejects is written on its own, then dropped after repeated failures"""
+        from sqlalchemy import select, text
+        from app.services.answer_buffer import answer_buffer, MAX_ROW_FAILURES
+
+        await test_session.commit()
+        await test_session.execute(text("PRAGMA foreign_keys=ON"))
+        answer_buffer.enqueue(test_attempt.id, test_question.id, answer_text="4")
+        answer_buffer.enqueue(test_attempt.id, test_question.id + 1000, answer_text="deleted question")
+
+        assert await answer_buffer.flush(test_session) == 2
+        result = await test_session.execute(
+            select(UserAnswer.question_id).where(UserAnswer.attempt_id == test_attempt.id)
+        )
+        assert result.scalars().all() == [test_question.id]
+        assert answer_buffer.pending_count(test_attempt.id) == 1
+
+        for _ in range(MAX_ROW_FAILURES - 1):
+            await answer_buffer.flush(test_session)
+        assert answer_buffer.pending_count() == 0
+        assert answer_buffer.stats()["failed_rows"] == 1
+
+    async def test_complete_flushes_buffered_answers(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt, test_question
+    ):
+        """Buffered answers are written and scored before completion"""
+        await client.post(
+            f"/api/tests/submit-answer?attempt_id={test_attempt.id}",
+            json={"question_id": test_question.id, "answer_text": "4"},
+            headers=auth_headers
+        )
+
+        response = await client.post(
+            f"/api/tests/complete/{test_attempt.id}",
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["score"] == test_question.marks
+
+    async def test_late_answers_rescore_completed_attempt(
+        self, test_user, test_attempt, test_question, test_session
+    ):
+        """Answers queued before a completion on another worker are written and scored"""
+        from datetime import datetime, timedelta, timezone
+        from app.services.answer_buffer import answer_buffer
+
+        answer_buffer.enqueue(test_attempt.id, test_question.id, answer_text="4")
+        test_attempt.status = "completed"
+        test_attempt.completed_at = datetime.now(timezone.utc) + timedelta(seconds=5)
+        test_attempt.total_marks = test_question.marks
+        test_attempt.score = 0
+        await test_session.commit()
+
+        assert await answer_buffer.flush_attempt(test_session, test_attempt.id) == 1
+        await test_session.refresh(test_attempt)
+        assert test_attempt.score == test_question.marks
+
+    async def test_answers_after_completion_are_dropped(
+        self, test_user, test_attempt, test_question, test_session
+    ):
+        """Answers saved after the attempt was completed never reach the DB"""
+        from datetime import datetime, timedelta, timezone
+        from sqlalchemy import select
+        from app.services.answer_buffer import answer_buffer
+
+        test_attempt.status = "completed"
+        test_attempt.completed_at = datetime.now(timezone.utc) - timedelta(seconds=5)
+        await test_session.commit()
+        answer_buffer.enqueue(test_attempt.id, test_question.id, answer_text="4")
+
+        assert await answer_buffer.flush_attempt(test_session, test_attempt.id) == 1
+        result = await test_session.execute(
+            select(UserAnswer).where(UserAnswer.attempt_id == test_attempt.id)
+        )
+        assert result.scalars().all() == []
+
+
+class TestBulkSaveAnswers:
+    """Test bulk save answers endpoint"""
+
+    async def test_bulk_save_upserts_and_scores(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt, test_question, test_session
+    ):
+        """Re-saving updates rows in place and MCQ answers are scored"""
+        from sqlalchemy import select
+
+        url = f"/api/tests/bulk-save-answers/{test_attempt.id}"
+        response = await client.post(
+            url, json=[{"question_id": test_question.id, "answer_text": "3"}], headers=auth_headers
+        )
+        assert response.status_code == 200
+        response = await client.post(
+            url, json=[{"question_id": test_question.id, "answer_text": "4"}], headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["saved"] == 1
+
+        result = await test_session.execute(
+            select(UserAnswer).where(UserAnswer.attempt_id == test_attempt.id)
+            .execution_options(populate_existing=True)
+        )
+        answers = result.scalars().all()
+        assert len(answers) == 1
+        assert answers[0].answer_text == "4"
+        assert answers[0].is_correct is True
+        assert answers[0].marks_obtained == test_question.marks
+
+
+class TestHeartbeat:
+    """Test heartbeat endpoints backed by the attempt timing cache"""
+
+    async def test_heartbeat_counts_saved_answers(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt, test_question
+    ):
+        """GET heartbeat reports remaining time and buffered answers"""
+        await client.post(
+            f"/api/tests/auto-save-answer?attempt_id={test_attempt.id}",
+            json={"question_id": test_question.id, "answer_text": "4"},
+            headers=auth_headers
+        )
+        response = await client.get(f"/api/tests/heartbeat/{test_attempt.id}", headers=auth_headers)
+        data = response.json()
+        assert data["status"] == "ok"
+        assert data["attempt_status"] == "in_progress"
+        assert data["remaining_seconds"] > 0
+        assert data["saved_answers"] == 1
+
+    async def test_heartbeat_after_complete_is_not_alive(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt
+    ):
+        """Completing an attempt updates the cached status"""
+        response = await client.post(f"/api/tests/heartbeat/{test_attempt.id}", headers=auth_headers)
+        assert response.json()["alive"] is True
+
+        await client.post(f"/api/tests/complete/{test_attempt.id}", headers=auth_headers)
+
+        response = await client.post(f"/api/tests/heartbeat/{test_attempt.id}", headers=auth_headers)
+        assert response.json()["alive"] is False
+
+    async def test_last_activity_written_in_batch(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt, test_session
+    ):
+        """POST heartbeat defers the last_activity write to the batched flush"""
+        from app.services.attempt_cache import attempt_cache
+
+        await client.post(f"/api/tests/heartbeat/{test_attempt.id}", headers=auth_headers)
+        await test_session.refresh(test_attempt)
+        assert test_attempt.last_activity is None
+
+        assert await attempt_cache.flush_activity(test_session) == 1
+        await test_session.refresh(test_attempt)
+        assert test_attempt.last_activity is not None
+
+    async def test_heartbeat_other_users_attempt(
+        self, client: AsyncClient, test_admin, admin_auth_headers, test_attempt
+    ):
+        """Heartbeat does not leak another user's attempt"""
+        response = await client.get(f"/api/tests/heartbeat/{test_attempt.id}", headers=admin_auth_headers)
+        assert response.json()["status"] == "error"
+
+
 class TestCompleteTest:
     """Test complete test endpoint"""
 
@@ -237,6 +489,34 @@ class TestCompleteTest:
         assert response.status_code == 400
         assert "already completed" in response.json()["detail"]
 
+    async def test_complete_keeps_result_of_concurrent_completion(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt, test_session, monkeypatch
+    ):
+        """An attempt completed elsewhere before the row lock keeps that result"""
+        from datetime import datetime, timezone
+        from sqlalchemy import update
+        from app.routers import tests as tests_router
+
+        completed_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        lock_attempts = tests_router.lock_attempts
+
+        async def completed_meanwhile(db, attempt_ids):
+            # Emergency submit on another worker wins the race
+            await db.execute(
+                update(TestAttempt).where(TestAttempt.id == test_attempt.id)
+                .values(status="completed", score=7, percentage=70.0, completed_at=completed_at)
+            )
+            return await lock_attempts(db, attempt_ids)
+
+        monkeypatch.setattr(tests_router, "lock_attempts", completed_meanwhile)
+        response = await client.post(f"/api/tests/complete/{test_attempt.id}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["score"] == 7
+
+        await test_session.refresh(test_attempt)
+        assert test_attempt.score == 7
+        assert test_attempt.completed_at.replace(tzinfo=timezone.utc) == completed_at
+
     async def test_complete_test_invalid_attempt(self, client: AsyncClient, test_user, auth_headers):
         """Test completing invalid attempt fails"""
         response = await client.post(
@@ -246,6 +526,229 @@ class TestCompleteTest:
         assert response.status_code == 404
 
 
+class TestEvaluation:
+    """Test compiled answer key scoring"""
+
+    async def test_complete_rescored_against_answer_key(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt, test_question, test_session
+    ):
+        """Test completion re-scores stale answers with the current key"""
+        answer = UserAnswer(
+            attempt_id=test_attempt.id,
+            question_id=test_question.id,
+            answer_text="4",
+            is_correct=False,  # Scored before the key was corrected
+            marks_obtained=0,
+            time_spent_seconds=30
+        )
+        test_session.add(answer)
+        await test_session.commit()
+
+        response = await client.post(f"/api/tests/complete/{test_attempt.id}", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["score"] == 1.0
+        assert data["answers"][0]["is_correct"] is True
+        assert data["answers"][0]["correct_answer"] == "4"
+
+    async def test_every_completion_path_rescores(
+        self, client: AsyncClient, test_user, auth_headers, test_attempt, test_question, test_session
+    ):
+        """Test emergency no-auth and auto-complete score like /complete"""
+        from datetime import datetime, timedelta, timezone
+        from sqlalchemy import select
+
+        test_session.add(UserAnswer(
+            attempt_id=test_attempt.id, question_id=test_question.id,
+            answer_text="4", is_correct=False, marks_obtained=0
+        ))
+        await test_session.commit()
+
+        response = await client.post(
+            f"/api/tests/emergency-submit-no-auth/{test_attempt.id}", params={"email": test_user.email}
+        )
+        assert response.json()["score"] == 1.0
+
+        # Reopen it as an expired attempt
+        test_attempt.status = "in_progress"
+        test_attempt.started_at = datetime.now(timezone.utc) - timedelta(hours=3)
+        await test_session.commit()
+        answer = (await test_session.execute(select(UserAnswer))).scalar_one()
+        answer.marks_obtained = 0
+        await test_session.commit()
+
+        response = await client.post(f"/api/tests/auto-complete-expired/{test_attempt.id}", headers=auth_headers)
+        assert response.json()["score"] == 1.0
+
+    async def test_answer_key_normalizes_option_text(self, test_session, test_test, test_division):
+        """Test option text answers map to option ids through the key"""
+        from app.services.evaluation import AnswerKeyCache
+
+        question = Question(
+            question_type="mcq",
+            question_text="Pick B",
+            division_id=test_division.id,
+            options=[{"id": "a", "text": "Alpha"}, {"id": "b", "text": "Beta"}],
+            correct_answer="b",
+            marks=2.0,
+        )
+        test_session.add(question)
+        await test_session.flush()
+        test_session.add(TestQuestion(test_id=test_test.id, question_id=question.id, order=0))
+        await test_session.commit()
+
+        cache = AnswerKeyCache()
+        key = await cache.get(test_session, test_test.id)
+        scored = key.score({question.id: "Beta"})
+        assert scored.score == 2.0
+        assert scored.answers[0].answer_text == "b"
+        assert key.questions[question.id].display("a") == "Alpha"
+
+        await cache.get(test_session, test_test.id)
+        assert cache.stats()["compiles"] == 1
+
+    async def test_rescore_attempts_bulk_updates(
+        self, test_session, test_attempt, test_question
+    ):
+        """Test bulk re-score writes only changed rows and totals"""
+        from app.services.evaluation import AnswerKeyCache, rescore_attempts
+
+        test_session.add(UserAnswer(
+            attempt_id=test_attempt.id,
+            question_id=test_question.id,
+            answer_text="5",
+            is_correct=False,
+            marks_obtained=0,
+        ))
+        await test_session.commit()
+
+        # Answer key corrected after the drive
+        test_question.correct_answer = "5"
+        await test_session.commit()
+
+        summary = await rescore_attempts(test_session, [test_attempt.id], AnswerKeyCache())
+        await test_session.commit()
+        assert summary["answers_changed"] == 1
+        assert summary["attempts_changed"] == 1
+
+        await test_session.refresh(test_attempt)
+        assert test_attempt.score == 1.0
+        assert test_attempt.percentage == 10.0
+
+        summary = await rescore_attempts(test_session, [test_attempt.id], AnswerKeyCache())
+        assert summary["answers_changed"] == 0
+        assert summary["attempts_changed"] == 0
+
+
+    async def test_rescore_completed_attempts_in_chunks(
+        self, test_engine, test_session, test_user, test_test, test_question
+    ):
+        """Test keyset-chunked re-evaluation reports progress and resumes"""
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.services.evaluation import rescore_completed_attempts
+
+        attempts = []
+        for status in ("completed", "completed", "in_progress", "completed"):
+            attempt = TestAttempt(user_id=test_user.id, test_id=test_test.id, status=status, total_marks=10)
+            test_session.add(attempt)
+            await test_session.flush()
+            test_session.add(UserAnswer(
+                attempt_id=attempt.id, question_id=test_question.id,
+                answer_text="4", is_correct=False, marks_obtained=0,
+            ))
+            attempts.append(attempt)
+        await test_session.commit()
+
+        session_factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        progress = []
+        totals = await rescore_completed_attempts(
+            chunk_size=2, on_progress=progress.append, session_factory=session_factory
+        )
+        assert totals["attempts"] == 3  # in_progress attempt untouched
+        assert totals["attempts_changed"] == 3
+        assert [p["last_attempt_id"] for p in progress] == [attempts[1].id, attempts[3].id]
+
+        # Resuming after the last attempt has nothing left to do
+        totals = await rescore_completed_attempts(
+            after_id=attempts[3].id, session_factory=session_factory
+        )
+        assert totals["attempts"] == 0
+
+    async def test_rescore_job_is_shared_across_workers(self, test_engine, test_session, test_user, test_test):
+        """Test one run at a time and one status, whichever worker is asked"""
+        import asyncio
+        import pytest
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.services.evaluation import RescoreJob
+        from app.services.job_runs import JobAlreadyRunning
+
+        session_factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        worker_a, worker_b = RescoreJob(session_factory), RescoreJob(session_factory)
+        release = asyncio.Event()
+
+        async def slow_work(params, report):
+            await report({"attempts": 1, "last_attempt_id": 7})
+            await release.wait()
+            return {"attempts": 2, "last_attempt_id": 9}
+        worker_a.work = slow_work
+
+        assert (await worker_b.status())["state"] == "idle"
+        await worker_a.start(test_id=None, after_id=0, chunk_size=500)
+        with pytest.raises(JobAlreadyRunning):
+            await worker_b.start(test_id=None, after_id=0, chunk_size=500)
+
+        await asyncio.sleep(0.05)
+        status = await worker_b.status()
+        assert status["state"] == "running"
+        assert status["progress"]["last_attempt_id"] == 7
+
+        release.set()
+        await worker_a.wait()
+        status = await worker_b.status()
+        assert status["state"] == "completed"
+        assert status["progress"]["attempts"] == 2
+        assert status["chunk_size"] == 500
+
+        # Interrupted runs are recorded for every worker to see
+        await worker_a.start(test_id=None, after_id=0, chunk_size=500)
+        await worker_a.stop()
+        assert (await worker_b.status())["state"] == "failed"
+
+    async def test_cli_run_claims_the_same_job(self, test_engine, test_session, test_user, test_test):
+        """A script's foreground run and an admin-triggered run never overlap"""
+        import asyncio
+        import pytest
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.services.evaluation import RescoreJob
+        from app.services.job_runs import JobAlreadyRunning
+
+        session_factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        api, cli = RescoreJob(session_factory), RescoreJob(session_factory)
+        release = asyncio.Event()
+
+        async def work(params, report):
+            await report({"attempts": 1, "last_attempt_id": 3})
+            await release.wait()
+            return {"attempts": 1, "last_attempt_id": 3}
+        api.work = cli.work = work
+
+        await api.start(test_id=None, after_id=0, chunk_size=500)
+        with pytest.raises(JobAlreadyRunning):
+            await cli.run(test_id=None, after_id=0, chunk_size=500)
+        release.set()
+        await api.wait()
+
+        seen = []
+        totals = await cli.run(on_progress=seen.append, test_id=None, after_id=0, chunk_size=500)
+        assert totals["last_attempt_id"] == 3
+        assert seen == [{"attempts": 1, "last_attempt_id": 3}]
+        assert (await api.status())["state"] == "completed"
+
+        # Released: the admin endpoint can claim it again
+        await api.start(test_id=None, after_id=0, chunk_size=500)
+        await api.wait()
+
+
 class TestFlagViolation:
     """Test flag violation endpoint"""
 
@@ -356,3 +859,276 @@ class TestGetResult:
         """Test getting result for invalid attempt fails"""
         response = await client.get("/api/tests/result/99999", headers=auth_headers)
         assert response.status_code == 404
+
+
+class TestChunkedUpload:
+    """Test resumable chunked uploads"""
+
+    def test_default_staging_dir_is_not_served(self):
+        """Staged chunks are not under the public /static mount"""
+        import os
+        from app.main import static_dir
+        from app.services.chunked_upload import DEFAULT_STAGING_DIR
+
+        assert os.path.commonpath([DEFAULT_STAGING_DIR, static_dir]) != static_dir
+
+    async def test_resumed_upload_is_assembled_and_stored_as_answer(
+        self, client: AsyncClient, test_engine, test_session, test_attempt, auth_headers, tmp_path, monkeypatch
+    ):
+        """Missing chunks are reported, and the assembled file becomes the answer"""
+        import os
+        from sqlalchemy import select
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.services import supabase_upload
+        from app.services.chunked_upload import chunked_uploads
+
+        attempt_id = test_attempt.id
+        pushed = {}
+
+        async def fake_upload(path, bucket, file_path, content_type="application/octet-stream", upsert=False):
+            with open(path, "rb") as f:
+                pushed[file_path] = f.read()
+            return f"https://storage.test/{bucket}/{file_path}"
+
+        monkeypatch.setattr(supabase_upload, "upload_file_to_supabase", fake_upload)
+        monkeypatch.setattr(chunked_uploads, "staging_dir", str(tmp_path))
+        monkeypatch.setattr(chunked_uploads, "chunk_size", 4)
+        monkeypatch.setattr(chunked_uploads, "_session_factory", async_sessionmaker(
+            test_engine, class_=AsyncSession, expire_on_commit=False
+        ))
+
+        response = await client.post("/api/tests/uploads", headers=auth_headers, json={
+            "kind": "answer_file", "attempt_id": attempt_id, "question_id": 7,
+            "filename": "answer.csv", "content_type": "text/csv", "total_size": 10,
+        })
+        assert response.status_code == 200
+        upload = response.json()
+        assert upload["total_chunks"] == 3
+        chunks_url = f"/api/tests/uploads/{upload['upload_id']}/chunks"
+
+        # Out of order, then a disconnect before chunk 1
+        assert (await client.put(f"{chunks_url}/2", headers=auth_headers, content=b"89")).status_code == 200
+        assert (await client.put(f"{chunks_url}/0", headers=auth_headers, content=b"0123")).status_code == 200
+        response = await client.get(f"/api/tests/uploads/{upload['upload_id']}", headers=auth_headers)
+        assert response.json()["missing_chunks"] == [1]
+        response = await client.post(f"/api/tests/uploads/{upload['upload_id']}/complete", headers=auth_headers)
+        assert response.status_code == 409
+
+        # Wrong-sized chunks are rejected
+        assert (await client.put(f"{chunks_url}/1", headers=auth_headers, content=b"45")).status_code == 400
+        assert (await client.put(f"{chunks_url}/1", headers=auth_headers, content=b"4567")).status_code == 200
+
+        response = await client.post(f"/api/tests/uploads/{upload['upload_id']}/complete", headers=auth_headers)
+        assert response.status_code == 202
+        assert response.json()["status"] == "processing"
+        await chunked_uploads.wait(upload["upload_id"])
+
+        response = await client.get(f"/api/tests/uploads/{upload['upload_id']}", headers=auth_headers)
+        data = response.json()
+        assert data["status"] == "completed"
+        assert list(pushed.values()) == [b"0123456789"]
+        assert not os.path.exists(chunked_uploads.session_dir(upload["upload_id"]))
+
+        result = await test_session.execute(
+            select(UserAnswer.answer_text).where(UserAnswer.attempt_id == attempt_id, UserAnswer.question_id == 7)
+        )
+        assert result.scalar_one() == f"FILE:{data['file_url']}"
+
+    async def test_complete_claims_once_and_recovers_stale_processing(
+        self, test_engine, test_user, test_attempt, monkeypatch
+    ):
+        """Concurrent completes push once; a push that died is moved back to FAILED"""
+        import asyncio
+        from datetime import datetime, timedelta, timezone
+        from sqlalchemy import update
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.models.upload import UploadSession, UploadChunk
+        from app.services.chunked_upload import chunked_uploads
+
+        sessions = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        pushes = []
+
+        async def fake_finalize(upload_id):
+            pushes.append(upload_id)
+        monkeypatch.setattr(chunked_uploads, "_finalize", fake_finalize)
+
+        async with sessions() as db:
+            db.add(UploadSession(
+                id="u" * 32, user_id=test_user.id, attempt_id=test_attempt.id, kind="proctoring_video",
+                filename="camera.webm", total_size=2, chunk_size=4, status="uploading",
+            ))
+            await db.flush()
+            db.add(UploadChunk(upload_id="u" * 32, chunk_index=0, offset=0, size=2))
+            await db.commit()
+
+        async def complete():
+            async with sessions() as db:
+                session = await chunked_uploads.get(db, "u" * 32, test_user.id)
+                return (await chunked_uploads.complete(db, session)).status
+
+        assert await asyncio.gather(complete(), complete()) == ["processing", "processing"]
+        await asyncio.sleep(0)
+        assert pushes == ["u" * 32]
+
+        async with sessions() as db:
+            await db.execute(update(UploadSession).values(
+                processing_started_at=datetime.now(timezone.utc) - timedelta(hours=2)
+            ))
+            await db.commit()
+            session = await chunked_uploads.get(db, "u" * 32, test_user.id)
+            assert session.status == "failed"
+            assert (await chunked_uploads.complete(db, session)).status == "processing"
+        await asyncio.sleep(0)
+        assert len(pushes) == 2
+
+    async def test_upload_rejects_other_users_attempt(self, client: AsyncClient, test_attempt, admin_auth_headers):
+        """Uploads can only be started for the caller's own attempt"""
+        response = await client.post("/api/tests/uploads", headers=admin_auth_headers, json={
+            "kind": "proctoring_video", "attempt_id": test_attempt.id,
+            "filename": "camera.webm", "total_size": 1024,
+        })
+        assert response.status_code == 404
+
+
+class TestContentProxy:
+    """Test content proxy disk cache"""
+
+    DOC_URL = "https://res.cloudinary.com/demo/raw/upload/division_doc.html"
+
+    async def _cache_document(self, body: bytes):
+        from app.services.document_cache import document_cache
+
+        writer = document_cache.open_writer(self.DOC_URL, "text/plain", '"doc-v1"', len(body))
+        await writer.write(body)
+        return await writer.commit()
+
+    async def test_proxy_rejects_unknown_source(self, client: AsyncClient):
+        """Test URLs outside the allowed stores are rejected"""
+        response = await client.get("/api/tests/content-proxy", params={"url": "https://evil.example/x.pdf"})
+        assert response.status_code == 400
+
+    async def test_cached_document_supports_range_and_etag(self, client: AsyncClient):
+        """Test cached documents are served locally with 206 and 304"""
+        doc = await self._cache_document(b"<html>0123456789</html>")
+
+        response = await client.get("/api/tests/content-proxy", params={"url": self.DOC_URL})
+        assert response.status_code == 200
+        assert response.content == b"<html>0123456789</html>"
+        assert response.headers["content-type"].startswith("text/html")
+        assert response.headers["etag"] == doc.etag
+
+        response = await client.get(
+            "/api/tests/content-proxy",
+            params={"url": self.DOC_URL},
+            headers={"Range": "bytes=6-9"}
+        )
+        assert response.status_code == 206
+        assert response.content == b"0123"
+
+        response = await client.get(
+            "/api/tests/content-proxy",
+            params={"url": self.DOC_URL},
+            headers={"If-None-Match": doc.etag}
+        )
+        assert response.status_code == 304
+
+    async def test_proxy_streams_uncompressed_upstream_bytes(self, client: AsyncClient, monkeypatch):
+        """Test the proxy asks for identity encoding so Content-Length matches the body"""
+        import gzip
+        import httpx
+        from app.routers import tests as tests_router
+        from app.services.document_cache import document_cache
+
+        body = b"<html>" + b"x" * 5000 + b"</html>"
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if "gzip" in request.headers.get("accept-encoding", ""):
+                compressed = gzip.compress(body)
+                return httpx.Response(200, content=compressed, headers={
+                    "content-encoding": "gzip", "content-length": str(len(compressed))
+                })
+            return httpx.Response(200, content=body, headers={"content-length": str(len(body))})
+
+        upstream = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(tests_router, "get_http_client", lambda: upstream)
+        url = "https://res.cloudinary.com/demo/raw/upload/other_doc.html"
+
+        response = await client.get("/api/tests/content-proxy", params={"url": url})
+        await upstream.aclose()
+        assert response.status_code == 200
+        assert response.content == body
+        assert response.headers["content-length"] == str(len(body))
+        assert document_cache.get(url).size == len(body)
+
+    def test_default_cache_dir_is_not_served(self):
+        """Cached documents and their URL index are not under the public /static mount"""
+        import os
+        from app.main import static_dir
+        from app.services.document_cache import DEFAULT_CACHE_DIR
+
+        assert os.path.commonpath([DEFAULT_CACHE_DIR, static_dir]) != static_dir
+
+    async def test_schedule_fill_starts_one_download_per_url(self, tmp_path, monkeypatch):
+        """Concurrent misses for the same URL schedule a single fill"""
+        import asyncio
+        from app.services.document_cache import DocumentCache
+
+        cache = DocumentCache(str(tmp_path), max_bytes=1000, max_file_bytes=1000)
+        fills = []
+
+        async def fill(url, revalidate=False):
+            fills.append(url)
+            await asyncio.sleep(0.01)
+
+        monkeypatch.setattr(cache, "fill", fill)
+        for _ in range(5):
+            cache.schedule_fill(self.DOC_URL)
+        await asyncio.gather(*cache._tasks)
+        assert fills == [self.DOC_URL]
+
+        # Done - a later miss may fill again
+        cache.schedule_fill(self.DOC_URL)
+        await asyncio.gather(*cache._tasks)
+        assert len(fills) == 2
+
+    async def test_document_cache_evicts_least_recently_used(self, tmp_path):
+        """Test the disk cache stays within its byte budget"""
+        from app.services.document_cache import DocumentCache
+
+        cache = DocumentCache(str(tmp_path), max_bytes=10, max_file_bytes=8)
+        for name in ("a", "b", "c"):
+            writer = cache.open_writer(f"https://res.cloudinary.com/{name}", "text/plain")
+            await writer.write(name.encode() * 5)
+            await writer.commit()
+            if name == "b":
+                assert cache.get("https://res.cloudinary.com/a") is not None
+
+        assert cache.get("https://res.cloudinary.com/b") is None
+        assert cache.get("https://res.cloudinary.com/a") is not None
+        assert cache.get("https://res.cloudinary.com/c") is not None
+        assert cache.open_writer("https://res.cloudinary.com/big", "text/plain", content_length=9) is None
+
+        # Index is rebuilt from disk
+        assert DocumentCache(str(tmp_path), max_bytes=10, max_file_bytes=8).stats()["urls"] == 2
+
+    async def test_document_cache_is_content_addressed(self, tmp_path):
+        """Test identical files under different URLs are stored once"""
+        from app.services.document_cache import DocumentCache, collect_document_urls
+
+        cache = DocumentCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+        docs = []
+        for url in (self.DOC_URL, self.DOC_URL + "?copy=1"):
+            writer = cache.open_writer(url, "text/html")
+            await writer.write(b"same body")
+            docs.append(await writer.commit())
+
+        assert docs[0].path == docs[1].path
+        assert docs[0].etag == docs[1].etag
+        assert cache.stats()["objects"] == 1
+        assert cache.stats()["bytes"] == len(b"same body")
+
+        payload = {"questions": [
+            {"media_url": "/uploads/local.png", "html_content": None,
+             "documents": [{"id": "doc-1", "content": self.DOC_URL}, {"id": "doc-2", "content": self.DOC_URL}]},
+        ]}
+        assert collect_document_urls(payload) == [self.DOC_URL]
@@ -35,12 +35,19 @@ export default function AdminResults() {
     const [searchQuery, setSearchQuery] = useState('');
     const [selectedJob, setSelectedJob] = useState<number | null>(null);
     const [selectedResult, setSelectedResult] = useState<TestResult | null>(null);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [totals, setTotals] = useState<{ total: number; passed: number; failed: number } | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         fetchJobs();
-        fetchResults();
     }, []);
 
+    useEffect(() => {
+        setLoading(true);
+        fetchResults();
+    }, [selectedJob]);
+
     const fetchJobs = async () => {
         try {
             const data = await adminApiService.getJobs();
@@ -50,10 +57,21 @@ export default function AdminResults() {
         }
     };
 
-    const fetchResults = async () => {
+    // Results are paged and filtered by job on the server
+    const fetchResults = async (cursor?: string) => {
         try {
-            const data = await adminApiService.getTestResults();
-            setResults(data);
+            const data = await adminApiService.getTestResults({
+                job_id: selectedJob || undefined,
+                cursor,
+                // Exact counts (with the passed/failed split) for the stats cards
+                include_total: !cursor,
+                estimate_total: false,
+            });
+            setResults(prev => cursor ? [...prev, ...data.results] : data.results);
+            setNextCursor(data.next_cursor);
+            if (!cursor) {
+                setTotals(data.total == null ? null : { total: data.total, passed: data.passed, failed: data.failed });
+            }
         } catch (error) {
             console.error('Failed to fetch results:', error);
         } finally {
@@ -61,6 +79,13 @@ export default function AdminResults() {
         }
     };
 
+    const handleLoadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        await fetchResults(nextCursor);
+        setLoadingMore(false);
+    };
+
     const filteredResults = results.filter(r => {
         const matchesSearch =
             r.user_name.toLowerCase().includes(searchQuery.toLowerCase()) ||
@@ -68,9 +93,7 @@ export default function AdminResults() {
             r.test_title.toLowerCase().includes(searchQuery.toLowerCase()) ||
             (r.job_title && r.job_title.toLowerCase().includes(searchQuery.toLowerCase()));
 
-        const matchesJob = !selectedJob || r.job_id === selectedJob;
-
-        return matchesSearch && matchesJob;
+        return matchesSearch;
     });
 
     const getStatusColor = (status: string) => {
@@ -160,15 +183,15 @@ export default function AdminResults() {
             {/* Stats */}
             <div className="results-stats">
                 <div className="stat-card">
-                    <span className="stat-value">{filteredResults.length}</span>
+                    <span className="stat-value">{searchQuery || !totals ? filteredResults.length : totals.total}</span>
                     <span className="stat-label">Total Submissions</span>
                 </div>
                 <div className="stat-card">
-                    <span className="stat-value green">{filteredResults.filter(r => r.status === 'passed').length}</span>
+                    <span className="stat-value green">{searchQuery || !totals ? filteredResults.filter(r => r.status === 'passed').length : totals.passed}</span>
                     <span className="stat-label">Passed</span>
                 </div>
                 <div className="stat-card">
-                    <span className="stat-value red">{filteredResults.filter(r => r.status === 'failed').length}</span>
+                    <span className="stat-value red">{searchQuery || !totals ? filteredResults.filter(r => r.status === 'failed').length : totals.failed}</span>
                     <span className="stat-label">Failed</span>
                 </div>
             </div>
@@ -261,6 +284,13 @@ export default function AdminResults() {
                             })}
                         </tbody>
                     </table>
+                    {nextCursor && (
+                        <div className="load-more">
+                            <button className="btn-secondary" onClick={handleLoadMore} disabled={loadingMore}>
+                                {loadingMore ? 'Loading...' : 'Load More'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
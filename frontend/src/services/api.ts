@@ -370,8 +370,9 @@ export const adminApiService = {
     },
 
     // Test Results
-    getTestResults: async () => {
-        const response = await adminApi.get('/test-results');
+    // One page of results; pass next_cursor back as cursor for the next page
+    getTestResults: async (params?: { job_id?: number; cursor?: string; limit?: number; include_total?: boolean; estimate_total?: boolean }) => {
+        const response = await adminApi.get('/test-results', { params });
         return response.data;
     },
     downloadAnswerFile: async (resultId: number) => {